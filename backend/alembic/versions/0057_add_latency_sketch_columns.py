@@ -0,0 +1,33 @@
+"""Add mergeable latency sketch columns to provider routing metrics tables.
+
+Revision ID: 0057_add_latency_sketch_columns
+Revises: 0056_add_user_risk_fields
+Create Date: 2026-01-05 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0057_add_latency_sketch_columns"
+down_revision = "0056_add_user_risk_fields"
+branch_labels = None
+depends_on = None
+
+_TABLES = (
+    "provider_routing_metrics_history",
+    "provider_routing_metrics_hourly",
+    "provider_routing_metrics_daily",
+)
+
+
+def upgrade() -> None:
+    for table in _TABLES:
+        op.add_column(table, sa.Column("latency_sketch", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in reversed(_TABLES):
+        op.drop_column(table, "latency_sketch")
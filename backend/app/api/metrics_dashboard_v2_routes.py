@@ -17,7 +17,7 @@ except ModuleNotFoundError:  # pragma: no cover
 from app.db import get_db_session
 from app.deps import get_redis
 from app.jwt_auth import AuthenticatedUser, require_jwt_token
-from app.logging_config import logger
+from app.metrics.latency_sketch import merge_sketch_blobs
 from app.models import (
     CreditTransaction,
     Provider,
@@ -25,7 +25,6 @@ from app.models import (
     ProviderRoutingMetricsHistory,
     ProviderRoutingMetricsHourly,
 )
-from app.redis_client import redis_get_json, redis_set_json
 from app.schemas.dashboard_v2 import (
     DashboardCostByProvider,
     DashboardCostByProviderItem,
@@ -44,6 +43,7 @@ from app.schemas.dashboard_v2 import (
     SystemDashboardKpis,
     UserDashboardKpis,
 )
+from app.storage.metrics_query_cache import metrics_query_cache
 
 router = APIRouter(
     prefix="/metrics",
@@ -52,6 +52,8 @@ router = APIRouter(
 )
 
 V2_CACHE_TTL_SECONDS = 60
+# KPI 合并延迟草图时最多解码的行数，超出后退回按请求数加权的 p95。
+_SKETCH_MERGE_MAX_ROWS = 5000
 
 
 def _utc_now() -> dt.datetime:
@@ -164,6 +166,96 @@ def _kpi_stmt(
     )
 
 
+def _sketch_sources(
+    db: Session,
+    *,
+    start_at: dt.datetime,
+    end_at: dt.datetime,
+    model,
+) -> list[tuple[object, dt.datetime, dt.datetime]]:
+    """
+    拆分需要合并草图的时间段：分钟桶中已上卷的整小时改读小时表，
+    只有首尾未对齐 / 尚未上卷的部分才读分钟行。
+    """
+    if model is not ProviderRoutingMetricsHistory:
+        return [(model, start_at, end_at)]
+
+    hour_from = start_at.replace(minute=0, second=0, microsecond=0)
+    if hour_from < start_at:
+        hour_from += dt.timedelta(hours=1)
+    last_hour = db.execute(
+        select(func.max(ProviderRoutingMetricsHourly.window_start)).where(
+            ProviderRoutingMetricsHourly.window_start >= hour_from,
+            ProviderRoutingMetricsHourly.window_start < end_at,
+        )
+    ).scalar_one_or_none()
+    if last_hour is None:
+        return [(model, start_at, end_at)]
+    if last_hour.tzinfo is None:
+        last_hour = last_hour.replace(tzinfo=dt.UTC)
+    rolled_until = min(last_hour + dt.timedelta(hours=1), end_at)
+    return [
+        (model, start_at, hour_from),
+        (ProviderRoutingMetricsHourly, hour_from, rolled_until),
+        (model, rolled_until, end_at),
+    ]
+
+
+def _sketch_latency_p95(
+    db: Session,
+    *,
+    start_at: dt.datetime,
+    end_at: dt.datetime,
+    model,
+    scope_user_id: UUID | None,
+    transport: Literal["http", "sdk", "claude_cli", "all"],
+    is_stream: Literal["true", "false", "all"],
+    total_requests: int,
+) -> float | None:
+    """
+    合并时间范围内各行的延迟草图得到真实 p95。
+
+    返回 None 时由调用方沿用加权平均：
+    - 草图未覆盖全部请求（迁移前的旧数据）；
+    - 需要解码的行数超过 _SKETCH_MERGE_MAX_ROWS（避免一次缓存未命中同步读取海量分钟桶）。
+    """
+    if total_requests <= 0:
+        return None
+
+    stmts: list[Select] = []
+    for source, source_start, source_end in _sketch_sources(
+        db, start_at=start_at, end_at=end_at, model=model
+    ):
+        if source_start >= source_end:
+            continue
+        stmt = select(source.latency_sketch).where(
+            source.window_start >= source_start,
+            source.window_start < source_end,
+            source.latency_sketch.is_not(None),
+        )
+        stmts.append(
+            _apply_common_filters(
+                stmt,
+                model=source,
+                scope_user_id=scope_user_id,
+                transport=transport,
+                is_stream=is_stream,
+            )
+        )
+
+    rows = sum(
+        int(db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one() or 0)
+        for stmt in stmts
+    )
+    if rows > _SKETCH_MERGE_MAX_ROWS:
+        return None
+
+    sketch = merge_sketch_blobs(blob for stmt in stmts for blob in db.execute(stmt).scalars())
+    if sketch.count < total_requests:
+        return None
+    return sketch.quantile(0.95)
+
+
 def _pulse_stmt(
     *,
     start_at: dt.datetime,
@@ -254,76 +346,86 @@ async def user_dashboard_kpis(
     redis: Redis = Depends(get_redis),
 ) -> UserDashboardKpis:
     cache_key = f"metrics:v2:user-dashboard:kpis:{current_user.id}:{time_range}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return UserDashboardKpis.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    model, requests_col = _resolve_rollup_model(time_range)
-    row = db.execute(
-        _kpi_stmt(
-            start_at=start_at,
-            end_at=end_at,
-            model=model,
-            requests_col=requests_col,
-            scope_user_id=UUID(str(current_user.id)),
-            transport=transport,
-            is_stream=is_stream,
-        )
-    ).one()
 
-    total_requests = int(row[0] or 0)
-    if time_range != "today" and total_requests == 0:
-        # Rollup tables may be empty before Celery 统计任务启动；回退到分钟桶聚合以保证接口可用。
+    def _load(db: Session) -> UserDashboardKpis:
+        start_at, end_at = _resolve_time_range(time_range)
+        model, requests_col = _resolve_rollup_model(time_range)
         row = db.execute(
             _kpi_stmt(
                 start_at=start_at,
                 end_at=end_at,
-                model=ProviderRoutingMetricsHistory,
-                requests_col=ProviderRoutingMetricsHistory.total_requests_1m,
+                model=model,
+                requests_col=requests_col,
                 scope_user_id=UUID(str(current_user.id)),
                 transport=transport,
                 is_stream=is_stream,
             )
         ).one()
+
         total_requests = int(row[0] or 0)
-    error_requests = int(row[1] or 0)
-    lat_p95_ms = _weighted_latency(row[2], row[3])
-    error_rate = (error_requests / total_requests) if total_requests else 0.0
-
-    tokens = DashboardTokens(
-        input=int(row[4] or 0),
-        output=int(row[5] or 0),
-        total=int(row[6] or 0),
-        estimated_requests=int(row[7] or 0),
-    )
+        if time_range != "today" and total_requests == 0:
+            # Rollup tables may be empty before Celery 统计任务启动；回退到分钟桶聚合以保证接口可用。
+            row = db.execute(
+                _kpi_stmt(
+                    start_at=start_at,
+                    end_at=end_at,
+                    model=ProviderRoutingMetricsHistory,
+                    requests_col=ProviderRoutingMetricsHistory.total_requests_1m,
+                    scope_user_id=UUID(str(current_user.id)),
+                    transport=transport,
+                    is_stream=is_stream,
+                )
+            ).one()
+            total_requests = int(row[0] or 0)
+            model = ProviderRoutingMetricsHistory
+        error_requests = int(row[1] or 0)
+        lat_p95_ms = _sketch_latency_p95(
+            db,
+            start_at=start_at,
+            end_at=end_at,
+            model=model,
+            scope_user_id=UUID(str(current_user.id)),
+            transport=transport,
+            is_stream=is_stream,
+            total_requests=total_requests,
+        )
+        if lat_p95_ms is None:
+            lat_p95_ms = _weighted_latency(row[2], row[3])
+        error_rate = (error_requests / total_requests) if total_requests else 0.0
 
-    # credits: only count final usage/stream_usage (exclude stream_estimate to avoid double count).
-    credits_stmt = (
-        select(
-            func.coalesce(func.sum(-CreditTransaction.amount), 0).label("spent"),
+        tokens = DashboardTokens(
+            input=int(row[4] or 0),
+            output=int(row[5] or 0),
+            total=int(row[6] or 0),
+            estimated_requests=int(row[7] or 0),
         )
-        .where(CreditTransaction.user_id == UUID(str(current_user.id)))
-        .where(CreditTransaction.created_at >= start_at)
-        .where(CreditTransaction.created_at < end_at)
-        .where(CreditTransaction.amount < 0)
-        .where(CreditTransaction.reason.in_(("usage", "stream_usage")))
-    )
-    credits_spent = int(db.execute(credits_stmt).scalar_one() or 0)
-
-    payload = UserDashboardKpis(
-        time_range=time_range,
-        total_requests=total_requests,
-        error_rate=float(error_rate),
-        latency_p95_ms=float(lat_p95_ms),
-        tokens=tokens,
-        credits_spent=credits_spent,
+
+        # credits: only count final usage/stream_usage (exclude stream_estimate to avoid double count).
+        credits_stmt = (
+            select(
+                func.coalesce(func.sum(-CreditTransaction.amount), 0).label("spent"),
+            )
+            .where(CreditTransaction.user_id == UUID(str(current_user.id)))
+            .where(CreditTransaction.created_at >= start_at)
+            .where(CreditTransaction.created_at < end_at)
+            .where(CreditTransaction.amount < 0)
+            .where(CreditTransaction.reason.in_(("usage", "stream_usage")))
+        )
+        credits_spent = int(db.execute(credits_stmt).scalar_one() or 0)
+
+        payload = UserDashboardKpis(
+            time_range=time_range,
+            total_requests=total_requests,
+            error_rate=float(error_rate),
+            latency_p95_ms=float(lat_p95_ms),
+            tokens=tokens,
+            credits_spent=credits_spent,
+        )
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, UserDashboardKpis, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
     )
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
 
 
 @router.get(
@@ -339,50 +441,48 @@ async def user_dashboard_pulse(
     redis: Redis = Depends(get_redis),
 ) -> DashboardPulse:
     cache_key = f"metrics:v2:user-dashboard:pulse:{current_user.id}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardPulse.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _pulse_window()
-    stmt = _pulse_stmt(
-        start_at=start_at,
-        end_at=end_at,
-        scope_user_id=UUID(str(current_user.id)),
-        transport=transport,
-        is_stream=is_stream,
-    )
-    stmt = _apply_common_filters(
-        stmt,
-        model=ProviderRoutingMetricsHistory,
-        scope_user_id=UUID(str(current_user.id)),
-        transport=transport,
-        is_stream=is_stream,
-    )
-    rows = db.execute(stmt).all()
-
-    points: dict[dt.datetime, DashboardPulsePoint] = {}
-    for row in rows:
-        ts = row[0]
-        weight_sum = row[9] or 0
-        points[ts] = DashboardPulsePoint(
-            window_start=ts,
-            total_requests=int(row[1] or 0),
-            error_4xx_requests=int(row[2] or 0),
-            error_5xx_requests=int(row[3] or 0),
-            error_429_requests=int(row[4] or 0),
-            error_timeout_requests=int(row[5] or 0),
-            latency_p50_ms=_weighted_latency(row[6], weight_sum),
-            latency_p95_ms=_weighted_latency(row[7], weight_sum),
-            latency_p99_ms=_weighted_latency(row[8], weight_sum),
+
+    def _load(db: Session) -> DashboardPulse:
+        start_at, end_at = _pulse_window()
+        stmt = _pulse_stmt(
+            start_at=start_at,
+            end_at=end_at,
+            scope_user_id=UUID(str(current_user.id)),
+            transport=transport,
+            is_stream=is_stream,
+        )
+        stmt = _apply_common_filters(
+            stmt,
+            model=ProviderRoutingMetricsHistory,
+            scope_user_id=UUID(str(current_user.id)),
+            transport=transport,
+            is_stream=is_stream,
         )
+        rows = db.execute(stmt).all()
 
-    filled = _fill_time_buckets(start_at=start_at, end_at=end_at, step_seconds=60, points=points)
-    payload = DashboardPulse(points=filled)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+        points: dict[dt.datetime, DashboardPulsePoint] = {}
+        for row in rows:
+            ts = row[0]
+            weight_sum = row[9] or 0
+            points[ts] = DashboardPulsePoint(
+                window_start=ts,
+                total_requests=int(row[1] or 0),
+                error_4xx_requests=int(row[2] or 0),
+                error_5xx_requests=int(row[3] or 0),
+                error_429_requests=int(row[4] or 0),
+                error_timeout_requests=int(row[5] or 0),
+                latency_p50_ms=_weighted_latency(row[6], weight_sum),
+                latency_p95_ms=_weighted_latency(row[7], weight_sum),
+                latency_p99_ms=_weighted_latency(row[8], weight_sum),
+            )
+
+        filled = _fill_time_buckets(start_at=start_at, end_at=end_at, step_seconds=60, points=points)
+        payload = DashboardPulse(points=filled)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardPulse, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 @router.get(
@@ -400,114 +500,112 @@ async def user_dashboard_tokens(
     redis: Redis = Depends(get_redis),
 ) -> DashboardTokensTimeSeries:
     cache_key = f"metrics:v2:user-dashboard:tokens:{current_user.id}:{time_range}:{bucket}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardTokensTimeSeries.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    use_rollup = time_range != "today"
-    if use_rollup:
-        rollup_model = ProviderRoutingMetricsHourly if bucket == "hour" else ProviderRoutingMetricsDaily
-        bucket_start = rollup_model.window_start.label("bucket_start")
-        stmt = (
-            select(
-                bucket_start,
-                func.coalesce(func.sum(rollup_model.input_tokens_sum), 0).label("input_tokens"),
-                func.coalesce(func.sum(rollup_model.output_tokens_sum), 0).label("output_tokens"),
-                func.coalesce(func.sum(rollup_model.total_tokens_sum), 0).label("total_tokens"),
-                func.coalesce(func.sum(rollup_model.token_estimated_requests), 0).label("estimated_requests"),
+
+    def _load(db: Session) -> DashboardTokensTimeSeries:
+        start_at, end_at = _resolve_time_range(time_range)
+        use_rollup = time_range != "today"
+        if use_rollup:
+            rollup_model = ProviderRoutingMetricsHourly if bucket == "hour" else ProviderRoutingMetricsDaily
+            bucket_start = rollup_model.window_start.label("bucket_start")
+            stmt = (
+                select(
+                    bucket_start,
+                    func.coalesce(func.sum(rollup_model.input_tokens_sum), 0).label("input_tokens"),
+                    func.coalesce(func.sum(rollup_model.output_tokens_sum), 0).label("output_tokens"),
+                    func.coalesce(func.sum(rollup_model.total_tokens_sum), 0).label("total_tokens"),
+                    func.coalesce(func.sum(rollup_model.token_estimated_requests), 0).label("estimated_requests"),
+                )
+                .where(
+                    rollup_model.window_start >= start_at,
+                    rollup_model.window_start < end_at,
+                    rollup_model.user_id == UUID(str(current_user.id)),
+                )
+                .group_by(bucket_start)
+                .order_by(bucket_start.asc())
             )
-            .where(
-                rollup_model.window_start >= start_at,
-                rollup_model.window_start < end_at,
-                rollup_model.user_id == UUID(str(current_user.id)),
+            stmt = _apply_common_filters(
+                stmt,
+                model=rollup_model,
+                scope_user_id=UUID(str(current_user.id)),
+                transport=transport,
+                is_stream=is_stream,
             )
-            .group_by(bucket_start)
-            .order_by(bucket_start.asc())
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=rollup_model,
-            scope_user_id=UUID(str(current_user.id)),
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
-    else:
-        trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
-        stmt = (
-            select(
-                trunc,
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
-                    "estimated_requests"
-                ),
+            rows = db.execute(stmt).all()
+        else:
+            trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
+            stmt = (
+                select(
+                    trunc,
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
+                        "estimated_requests"
+                    ),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= start_at,
+                    ProviderRoutingMetricsHistory.window_start < end_at,
+                    ProviderRoutingMetricsHistory.user_id == UUID(str(current_user.id)),
+                )
+                .group_by(trunc)
+                .order_by(trunc.asc())
             )
-            .where(
-                ProviderRoutingMetricsHistory.window_start >= start_at,
-                ProviderRoutingMetricsHistory.window_start < end_at,
-                ProviderRoutingMetricsHistory.user_id == UUID(str(current_user.id)),
+            stmt = _apply_common_filters(
+                stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=UUID(str(current_user.id)),
+                transport=transport,
+                is_stream=is_stream,
             )
-            .group_by(trunc)
-            .order_by(trunc.asc())
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=ProviderRoutingMetricsHistory,
-            scope_user_id=UUID(str(current_user.id)),
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
-
-    if use_rollup and not rows:
-        # Rollup 尚未产出时回退到分钟桶聚合。
-        trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
-        stmt = (
-            select(
-                trunc,
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
-                    "estimated_requests"
-                ),
+            rows = db.execute(stmt).all()
+
+        if use_rollup and not rows:
+            # Rollup 尚未产出时回退到分钟桶聚合。
+            trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
+            stmt = (
+                select(
+                    trunc,
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
+                        "estimated_requests"
+                    ),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= start_at,
+                    ProviderRoutingMetricsHistory.window_start < end_at,
+                    ProviderRoutingMetricsHistory.user_id == UUID(str(current_user.id)),
+                )
+                .group_by(trunc)
+                .order_by(trunc.asc())
             )
-            .where(
-                ProviderRoutingMetricsHistory.window_start >= start_at,
-                ProviderRoutingMetricsHistory.window_start < end_at,
-                ProviderRoutingMetricsHistory.user_id == UUID(str(current_user.id)),
+            stmt = _apply_common_filters(
+                stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=UUID(str(current_user.id)),
+                transport=transport,
+                is_stream=is_stream,
             )
-            .group_by(trunc)
-            .order_by(trunc.asc())
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=ProviderRoutingMetricsHistory,
-            scope_user_id=UUID(str(current_user.id)),
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
+            rows = db.execute(stmt).all()
 
-    points = [
-        DashboardTokenPoint(
-            window_start=row[0],
-            input_tokens=int(row[1] or 0),
-            output_tokens=int(row[2] or 0),
-            total_tokens=int(row[3] or 0),
-            estimated_requests=int(row[4] or 0),
-        )
-        for row in rows
-    ]
-    payload = DashboardTokensTimeSeries(time_range=time_range, bucket=bucket, points=points)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+        points = [
+            DashboardTokenPoint(
+                window_start=row[0],
+                input_tokens=int(row[1] or 0),
+                output_tokens=int(row[2] or 0),
+                total_tokens=int(row[3] or 0),
+                estimated_requests=int(row[4] or 0),
+            )
+            for row in rows
+        ]
+        payload = DashboardTokensTimeSeries(time_range=time_range, bucket=bucket, points=points)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardTokensTimeSeries, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 @router.get(
@@ -525,76 +623,74 @@ async def user_dashboard_top_models(
     redis: Redis = Depends(get_redis),
 ) -> DashboardTopModels:
     cache_key = f"metrics:v2:user-dashboard:top-models:{current_user.id}:{time_range}:{limit}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardTopModels.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    use_rollup = time_range != "today"
-    if use_rollup:
-        model, requests_col = _resolve_rollup_model(time_range)
-        stmt = (
-            select(
-                model.logical_model,
-                func.coalesce(func.sum(requests_col), 0).label("requests"),
-                func.coalesce(func.sum(model.total_tokens_sum), 0).label("tokens_total"),
+
+    def _load(db: Session) -> DashboardTopModels:
+        start_at, end_at = _resolve_time_range(time_range)
+        use_rollup = time_range != "today"
+        if use_rollup:
+            model, requests_col = _resolve_rollup_model(time_range)
+            stmt = (
+                select(
+                    model.logical_model,
+                    func.coalesce(func.sum(requests_col), 0).label("requests"),
+                    func.coalesce(func.sum(model.total_tokens_sum), 0).label("tokens_total"),
+                )
+                .where(
+                    model.window_start >= start_at,
+                    model.window_start < end_at,
+                    model.user_id == UUID(str(current_user.id)),
+                )
+                .group_by(model.logical_model)
+                .order_by(func.sum(requests_col).desc())
+                .limit(limit)
             )
-            .where(
-                model.window_start >= start_at,
-                model.window_start < end_at,
-                model.user_id == UUID(str(current_user.id)),
+            stmt = _apply_common_filters(
+                stmt,
+                model=model,
+                scope_user_id=UUID(str(current_user.id)),
+                transport=transport,
+                is_stream=is_stream,
             )
-            .group_by(model.logical_model)
-            .order_by(func.sum(requests_col).desc())
-            .limit(limit)
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=model,
-            scope_user_id=UUID(str(current_user.id)),
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
-        if not rows:
-            use_rollup = False
-
-    if not use_rollup:
-        stmt = (
-            select(
-                ProviderRoutingMetricsHistory.logical_model,
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("requests"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("tokens_total"),
+            rows = db.execute(stmt).all()
+            if not rows:
+                use_rollup = False
+
+        if not use_rollup:
+            stmt = (
+                select(
+                    ProviderRoutingMetricsHistory.logical_model,
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("requests"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("tokens_total"),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= start_at,
+                    ProviderRoutingMetricsHistory.window_start < end_at,
+                    ProviderRoutingMetricsHistory.user_id == UUID(str(current_user.id)),
+                )
+                .group_by(ProviderRoutingMetricsHistory.logical_model)
+                .order_by(func.sum(ProviderRoutingMetricsHistory.total_requests_1m).desc())
+                .limit(limit)
             )
-            .where(
-                ProviderRoutingMetricsHistory.window_start >= start_at,
-                ProviderRoutingMetricsHistory.window_start < end_at,
-                ProviderRoutingMetricsHistory.user_id == UUID(str(current_user.id)),
+            stmt = _apply_common_filters(
+                stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=UUID(str(current_user.id)),
+                transport=transport,
+                is_stream=is_stream,
             )
-            .group_by(ProviderRoutingMetricsHistory.logical_model)
-            .order_by(func.sum(ProviderRoutingMetricsHistory.total_requests_1m).desc())
-            .limit(limit)
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=ProviderRoutingMetricsHistory,
-            scope_user_id=UUID(str(current_user.id)),
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
+            rows = db.execute(stmt).all()
 
-    items = [
-        DashboardTopModel(model=row[0], requests=int(row[1] or 0), tokens_total=int(row[2] or 0))
-        for row in rows
-        if row[0]
-    ]
-    payload = DashboardTopModels(items=items)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+        items = [
+            DashboardTopModel(model=row[0], requests=int(row[1] or 0), tokens_total=int(row[2] or 0))
+            for row in rows
+            if row[0]
+        ]
+        payload = DashboardTopModels(items=items)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardTopModels, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 @router.get(
@@ -610,42 +706,40 @@ async def user_dashboard_cost_by_provider(
     redis: Redis = Depends(get_redis),
 ) -> DashboardCostByProvider:
     cache_key = f"metrics:v2:user-dashboard:cost-by-provider:{current_user.id}:{time_range}:{limit}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardCostByProvider.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    stmt = (
-        select(
-            CreditTransaction.provider_id,
-            func.coalesce(func.sum(-CreditTransaction.amount), 0).label("spent"),
-            func.count(CreditTransaction.id).label("tx_count"),
-        )
-        .where(
-            CreditTransaction.user_id == UUID(str(current_user.id)),
-            CreditTransaction.created_at >= start_at,
-            CreditTransaction.created_at < end_at,
-            CreditTransaction.amount < 0,
-            CreditTransaction.reason.in_(("usage", "stream_usage")),
+
+    def _load(db: Session) -> DashboardCostByProvider:
+        start_at, end_at = _resolve_time_range(time_range)
+        stmt = (
+            select(
+                CreditTransaction.provider_id,
+                func.coalesce(func.sum(-CreditTransaction.amount), 0).label("spent"),
+                func.count(CreditTransaction.id).label("tx_count"),
+            )
+            .where(
+                CreditTransaction.user_id == UUID(str(current_user.id)),
+                CreditTransaction.created_at >= start_at,
+                CreditTransaction.created_at < end_at,
+                CreditTransaction.amount < 0,
+                CreditTransaction.reason.in_(("usage", "stream_usage")),
+            )
+            .group_by(CreditTransaction.provider_id)
+            .order_by(func.sum(-CreditTransaction.amount).desc())
+            .limit(limit)
         )
-        .group_by(CreditTransaction.provider_id)
-        .order_by(func.sum(-CreditTransaction.amount).desc())
-        .limit(limit)
+        items = [
+            DashboardCostByProviderItem(
+                provider_id=str(row[0] or "unknown"),
+                credits_spent=int(row[1] or 0),
+                transactions=int(row[2] or 0),
+            )
+            for row in db.execute(stmt).all()
+        ]
+        payload = DashboardCostByProvider(items=items)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardCostByProvider, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
     )
-    items = [
-        DashboardCostByProviderItem(
-            provider_id=str(row[0] or "unknown"),
-            credits_spent=int(row[1] or 0),
-            transactions=int(row[2] or 0),
-        )
-        for row in db.execute(stmt).all()
-    ]
-    payload = DashboardCostByProvider(items=items)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
 
 
 def _parse_csv_provider_ids(value: str | None) -> list[str] | None:
@@ -713,190 +807,188 @@ async def user_dashboard_providers(
         f"{current_user.id}:{time_range}:{bucket}:{transport}:{is_stream}:{limit}:"
         f"{_cache_key_for_provider_ids(requested_provider_ids)}"
     )
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardProviderMetrics.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
 
-    user_uuid = UUID(str(current_user.id))
+    def _load(db: Session) -> DashboardProviderMetrics:
+        user_uuid = UUID(str(current_user.id))
 
-    start_at, end_at = _resolve_time_range(time_range)
-    model, requests_col = _resolve_rollup_model(time_range)
+        start_at, end_at = _resolve_time_range(time_range)
+        model, requests_col = _resolve_rollup_model(time_range)
 
-    def _summary_stmt(model_, requests_col_):
-        stmt = (
-            select(
-                model_.provider_id.label("provider_id"),
-                func.coalesce(func.sum(requests_col_), 0).label("total_requests"),
-                func.coalesce(func.sum(model_.error_requests), 0).label("error_requests"),
-                func.sum(model_.latency_p95_ms * requests_col_).label("lat_p95_sum"),
-                func.sum(requests_col_).label("weight_sum"),
+        def _summary_stmt(model_, requests_col_):
+            stmt = (
+                select(
+                    model_.provider_id.label("provider_id"),
+                    func.coalesce(func.sum(requests_col_), 0).label("total_requests"),
+                    func.coalesce(func.sum(model_.error_requests), 0).label("error_requests"),
+                    func.sum(model_.latency_p95_ms * requests_col_).label("lat_p95_sum"),
+                    func.sum(requests_col_).label("weight_sum"),
+                )
+                .where(model_.window_start >= start_at, model_.window_start < end_at)
+                .group_by(model_.provider_id)
+                .order_by(func.sum(requests_col_).desc())
             )
-            .where(model_.window_start >= start_at, model_.window_start < end_at)
-            .group_by(model_.provider_id)
-            .order_by(func.sum(requests_col_).desc())
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=model_,
-            scope_user_id=user_uuid,
-            transport=transport,
-            is_stream=is_stream,
-        )
-        if requested_provider_ids:
-            stmt = stmt.where(model_.provider_id.in_(requested_provider_ids))
-        else:
-            stmt = stmt.limit(limit)
-        return stmt
-
-    rows = db.execute(_summary_stmt(model, requests_col)).all()
-    if time_range != "today" and not rows:
-        rows = db.execute(
-            _summary_stmt(
-                ProviderRoutingMetricsHistory,
-                ProviderRoutingMetricsHistory.total_requests_1m,
+            stmt = _apply_common_filters(
+                stmt,
+                model=model_,
+                scope_user_id=user_uuid,
+                transport=transport,
+                is_stream=is_stream,
+            )
+            if requested_provider_ids:
+                stmt = stmt.where(model_.provider_id.in_(requested_provider_ids))
+            else:
+                stmt = stmt.limit(limit)
+            return stmt
+
+        rows = db.execute(_summary_stmt(model, requests_col)).all()
+        if time_range != "today" and not rows:
+            rows = db.execute(
+                _summary_stmt(
+                    ProviderRoutingMetricsHistory,
+                    ProviderRoutingMetricsHistory.total_requests_1m,
+                )
+            ).all()
+
+        summary_by_provider: dict[str, tuple[int, int, float]] = {}
+        for row in rows:
+            provider_id_value = str(row.provider_id)
+            total_requests = int(row.total_requests or 0)
+            error_requests = int(row.error_requests or 0)
+            weight_sum = row.weight_sum or 0
+            latency_p95_ms = _weighted_latency(row.lat_p95_sum, weight_sum)
+            error_rate = (error_requests / total_requests) if total_requests else 0.0
+            summary_by_provider[provider_id_value] = (
+                total_requests,
+                error_requests,
+                float(latency_p95_ms),
             )
-        ).all()
-
-    summary_by_provider: dict[str, tuple[int, int, float]] = {}
-    for row in rows:
-        provider_id_value = str(row.provider_id)
-        total_requests = int(row.total_requests or 0)
-        error_requests = int(row.error_requests or 0)
-        weight_sum = row.weight_sum or 0
-        latency_p95_ms = _weighted_latency(row.lat_p95_sum, weight_sum)
-        error_rate = (error_requests / total_requests) if total_requests else 0.0
-        summary_by_provider[provider_id_value] = (
-            total_requests,
-            error_requests,
-            float(latency_p95_ms),
-        )
-
-    target_provider_ids = requested_provider_ids or list(summary_by_provider.keys())
 
-    pulse_start, pulse_end = _pulse_window()
-    step_seconds = 3600
-    start_bucket = _floor_to_step(pulse_start, step_seconds)
-    end_bucket = _floor_to_step(pulse_end, step_seconds)
-    bucket_starts: list[dt.datetime] = []
-    cur = start_bucket
-    while cur <= end_bucket:
-        bucket_starts.append(cur)
-        cur = cur + dt.timedelta(seconds=step_seconds)
+        target_provider_ids = requested_provider_ids or list(summary_by_provider.keys())
+
+        pulse_start, pulse_end = _pulse_window()
+        step_seconds = 3600
+        start_bucket = _floor_to_step(pulse_start, step_seconds)
+        end_bucket = _floor_to_step(pulse_end, step_seconds)
+        bucket_starts: list[dt.datetime] = []
+        cur = start_bucket
+        while cur <= end_bucket:
+            bucket_starts.append(cur)
+            cur = cur + dt.timedelta(seconds=step_seconds)
+
+        # Provider 卡片的“当前 QPS”更适合用更短窗口的平均值（例如近 5 分钟），
+        # 否则按小时平均会在低频/突发场景下容易显示为 0.000。
+        current_qps_window_seconds = 300
+        current_qps_by_provider: dict[str, float] = {}
+        if target_provider_ids:
+            qps_end = _floor_to_step(pulse_end, 60) + dt.timedelta(seconds=60)
+            qps_start = qps_end - dt.timedelta(seconds=current_qps_window_seconds)
+            current_qps_stmt = (
+                select(
+                    ProviderRoutingMetricsHistory.provider_id.label("provider_id"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("total_requests"),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= qps_start,
+                    ProviderRoutingMetricsHistory.window_start < qps_end,
+                    ProviderRoutingMetricsHistory.provider_id.in_(target_provider_ids),
+                )
+                .group_by(ProviderRoutingMetricsHistory.provider_id)
+                .order_by(ProviderRoutingMetricsHistory.provider_id.asc())
+            )
+            current_qps_stmt = _apply_common_filters(
+                current_qps_stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=user_uuid,
+                transport=transport,
+                is_stream=is_stream,
+            )
+            for row in db.execute(current_qps_stmt).all():
+                pid = str(row.provider_id)
+                total_requests = int(row.total_requests or 0)
+                current_qps_by_provider[pid] = float(total_requests / current_qps_window_seconds)
 
-    # Provider 卡片的“当前 QPS”更适合用更短窗口的平均值（例如近 5 分钟），
-    # 否则按小时平均会在低频/突发场景下容易显示为 0.000。
-    current_qps_window_seconds = 300
-    current_qps_by_provider: dict[str, float] = {}
-    if target_provider_ids:
-        qps_end = _floor_to_step(pulse_end, 60) + dt.timedelta(seconds=60)
-        qps_start = qps_end - dt.timedelta(seconds=current_qps_window_seconds)
-        current_qps_stmt = (
+        trunc = _bucket_trunc_expr(db, "hour", ProviderRoutingMetricsHistory.window_start).label("bucket_start")
+        spark_stmt = (
             select(
                 ProviderRoutingMetricsHistory.provider_id.label("provider_id"),
+                trunc,
                 func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("total_requests"),
+                func.coalesce(func.sum(ProviderRoutingMetricsHistory.error_requests), 0).label("error_requests"),
             )
             .where(
-                ProviderRoutingMetricsHistory.window_start >= qps_start,
-                ProviderRoutingMetricsHistory.window_start < qps_end,
-                ProviderRoutingMetricsHistory.provider_id.in_(target_provider_ids),
+                ProviderRoutingMetricsHistory.window_start >= pulse_start,
+                ProviderRoutingMetricsHistory.window_start < pulse_end,
             )
-            .group_by(ProviderRoutingMetricsHistory.provider_id)
-            .order_by(ProviderRoutingMetricsHistory.provider_id.asc())
+            .group_by(ProviderRoutingMetricsHistory.provider_id, trunc)
+            .order_by(ProviderRoutingMetricsHistory.provider_id.asc(), trunc.asc())
         )
-        current_qps_stmt = _apply_common_filters(
-            current_qps_stmt,
+        spark_stmt = _apply_common_filters(
+            spark_stmt,
             model=ProviderRoutingMetricsHistory,
             scope_user_id=user_uuid,
             transport=transport,
             is_stream=is_stream,
         )
-        for row in db.execute(current_qps_stmt).all():
+        if requested_provider_ids:
+            spark_stmt = spark_stmt.where(ProviderRoutingMetricsHistory.provider_id.in_(requested_provider_ids))
+
+        spark_rows = db.execute(spark_stmt).all()
+        spark_by_provider: dict[str, dict[dt.datetime, DashboardProviderMetricPoint]] = {}
+        for row in spark_rows:
             pid = str(row.provider_id)
+            # DB 层 date_trunc 可能受 session time zone 影响；统一落到 UTC 的整点桶，避免 dict key 不对齐导致全 0。
+            bucket_start_value = _floor_to_step(_parse_bucket_start(row.bucket_start), step_seconds)
             total_requests = int(row.total_requests or 0)
-            current_qps_by_provider[pid] = float(total_requests / current_qps_window_seconds)
-
-    trunc = _bucket_trunc_expr(db, "hour", ProviderRoutingMetricsHistory.window_start).label("bucket_start")
-    spark_stmt = (
-        select(
-            ProviderRoutingMetricsHistory.provider_id.label("provider_id"),
-            trunc,
-            func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("total_requests"),
-            func.coalesce(func.sum(ProviderRoutingMetricsHistory.error_requests), 0).label("error_requests"),
-        )
-        .where(
-            ProviderRoutingMetricsHistory.window_start >= pulse_start,
-            ProviderRoutingMetricsHistory.window_start < pulse_end,
-        )
-        .group_by(ProviderRoutingMetricsHistory.provider_id, trunc)
-        .order_by(ProviderRoutingMetricsHistory.provider_id.asc(), trunc.asc())
-    )
-    spark_stmt = _apply_common_filters(
-        spark_stmt,
-        model=ProviderRoutingMetricsHistory,
-        scope_user_id=user_uuid,
-        transport=transport,
-        is_stream=is_stream,
-    )
-    if requested_provider_ids:
-        spark_stmt = spark_stmt.where(ProviderRoutingMetricsHistory.provider_id.in_(requested_provider_ids))
-
-    spark_rows = db.execute(spark_stmt).all()
-    spark_by_provider: dict[str, dict[dt.datetime, DashboardProviderMetricPoint]] = {}
-    for row in spark_rows:
-        pid = str(row.provider_id)
-        # DB 层 date_trunc 可能受 session time zone 影响；统一落到 UTC 的整点桶，避免 dict key 不对齐导致全 0。
-        bucket_start_value = _floor_to_step(_parse_bucket_start(row.bucket_start), step_seconds)
-        total_requests = int(row.total_requests or 0)
-        error_requests = int(row.error_requests or 0)
-        qps = float(total_requests / step_seconds) if total_requests else 0.0
-        error_rate = float(error_requests / total_requests) if total_requests else 0.0
-        spark_by_provider.setdefault(pid, {})[bucket_start_value] = DashboardProviderMetricPoint(
-            window_start=bucket_start_value,
-            qps=qps,
-            error_rate=error_rate,
-        )
-
-    items: list[DashboardProviderMetricsItem] = []
-    for pid in target_provider_ids:
-        summary = summary_by_provider.get(pid)
-        if summary:
-            total_requests, error_requests, latency_p95_ms = summary
-            error_rate_value = float(error_requests / total_requests) if total_requests else 0.0
-        else:
-            total_requests = 0
-            error_rate_value = 0.0
-            latency_p95_ms = 0.0
-
-        series_map = spark_by_provider.get(pid, {})
-        points = [
-            series_map.get(
-                ts,
-                DashboardProviderMetricPoint(window_start=ts, qps=0.0, error_rate=0.0),
+            error_requests = int(row.error_requests or 0)
+            qps = float(total_requests / step_seconds) if total_requests else 0.0
+            error_rate = float(error_requests / total_requests) if total_requests else 0.0
+            spark_by_provider.setdefault(pid, {})[bucket_start_value] = DashboardProviderMetricPoint(
+                window_start=bucket_start_value,
+                qps=qps,
+                error_rate=error_rate,
             )
-            for ts in bucket_starts
-        ]
-        if pid in current_qps_by_provider:
-            current_qps = current_qps_by_provider[pid]
-        else:
-            current_qps = float(points[-1].qps) if points else 0.0
-
-        items.append(
-            DashboardProviderMetricsItem(
-                provider_id=pid,
-                total_requests=total_requests,
-                error_rate=error_rate_value,
-                latency_p95_ms=float(latency_p95_ms),
-                qps=current_qps,
-                points=points,
+
+        items: list[DashboardProviderMetricsItem] = []
+        for pid in target_provider_ids:
+            summary = summary_by_provider.get(pid)
+            if summary:
+                total_requests, error_requests, latency_p95_ms = summary
+                error_rate_value = float(error_requests / total_requests) if total_requests else 0.0
+            else:
+                total_requests = 0
+                error_rate_value = 0.0
+                latency_p95_ms = 0.0
+
+            series_map = spark_by_provider.get(pid, {})
+            points = [
+                series_map.get(
+                    ts,
+                    DashboardProviderMetricPoint(window_start=ts, qps=0.0, error_rate=0.0),
+                )
+                for ts in bucket_starts
+            ]
+            if pid in current_qps_by_provider:
+                current_qps = current_qps_by_provider[pid]
+            else:
+                current_qps = float(points[-1].qps) if points else 0.0
+
+            items.append(
+                DashboardProviderMetricsItem(
+                    provider_id=pid,
+                    total_requests=total_requests,
+                    error_rate=error_rate_value,
+                    latency_p95_ms=float(latency_p95_ms),
+                    qps=current_qps,
+                    points=points,
+                )
             )
-        )
 
-    payload = DashboardProviderMetrics(time_range=time_range, bucket=bucket, items=items)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+        payload = DashboardProviderMetrics(time_range=time_range, bucket=bucket, items=items)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardProviderMetrics, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 def _ensure_superuser(user: AuthenticatedUser) -> None:
@@ -919,59 +1011,69 @@ async def system_dashboard_kpis(
 ) -> SystemDashboardKpis:
     _ensure_superuser(current_user)
     cache_key = f"metrics:v2:system-dashboard:kpis:{time_range}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return SystemDashboardKpis.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    model, requests_col = _resolve_rollup_model(time_range)
-    row = db.execute(
-        _kpi_stmt(
-            start_at=start_at,
-            end_at=end_at,
-            model=model,
-            requests_col=requests_col,
-            scope_user_id=None,
-            transport=transport,
-            is_stream=is_stream,
-        )
-    ).one()
 
-    total_requests = int(row[0] or 0)
-    if time_range != "today" and total_requests == 0:
+    def _load(db: Session) -> SystemDashboardKpis:
+        start_at, end_at = _resolve_time_range(time_range)
+        model, requests_col = _resolve_rollup_model(time_range)
         row = db.execute(
             _kpi_stmt(
                 start_at=start_at,
                 end_at=end_at,
-                model=ProviderRoutingMetricsHistory,
-                requests_col=ProviderRoutingMetricsHistory.total_requests_1m,
+                model=model,
+                requests_col=requests_col,
                 scope_user_id=None,
                 transport=transport,
                 is_stream=is_stream,
             )
         ).one()
+
         total_requests = int(row[0] or 0)
-    error_requests = int(row[1] or 0)
-    lat_p95_ms = _weighted_latency(row[2], row[3])
-    error_rate = (error_requests / total_requests) if total_requests else 0.0
-
-    payload = SystemDashboardKpis(
-        time_range=time_range,
-        total_requests=total_requests,
-        error_rate=float(error_rate),
-        latency_p95_ms=float(lat_p95_ms),
-        tokens=DashboardTokens(
-            input=int(row[4] or 0),
-            output=int(row[5] or 0),
-            total=int(row[6] or 0),
-            estimated_requests=int(row[7] or 0),
-        ),
+        if time_range != "today" and total_requests == 0:
+            row = db.execute(
+                _kpi_stmt(
+                    start_at=start_at,
+                    end_at=end_at,
+                    model=ProviderRoutingMetricsHistory,
+                    requests_col=ProviderRoutingMetricsHistory.total_requests_1m,
+                    scope_user_id=None,
+                    transport=transport,
+                    is_stream=is_stream,
+                )
+            ).one()
+            total_requests = int(row[0] or 0)
+            model = ProviderRoutingMetricsHistory
+        error_requests = int(row[1] or 0)
+        lat_p95_ms = _sketch_latency_p95(
+            db,
+            start_at=start_at,
+            end_at=end_at,
+            model=model,
+            scope_user_id=None,
+            transport=transport,
+            is_stream=is_stream,
+            total_requests=total_requests,
+        )
+        if lat_p95_ms is None:
+            lat_p95_ms = _weighted_latency(row[2], row[3])
+        error_rate = (error_requests / total_requests) if total_requests else 0.0
+
+        payload = SystemDashboardKpis(
+            time_range=time_range,
+            total_requests=total_requests,
+            error_rate=float(error_rate),
+            latency_p95_ms=float(lat_p95_ms),
+            tokens=DashboardTokens(
+                input=int(row[4] or 0),
+                output=int(row[5] or 0),
+                total=int(row[6] or 0),
+                estimated_requests=int(row[7] or 0),
+            ),
+        )
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, SystemDashboardKpis, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
     )
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
 
 
 @router.get(
@@ -988,38 +1090,36 @@ async def system_dashboard_pulse(
 ) -> DashboardPulse:
     _ensure_superuser(current_user)
     cache_key = f"metrics:v2:system-dashboard:pulse:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardPulse.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _pulse_window()
-    stmt = _pulse_stmt(start_at=start_at, end_at=end_at, scope_user_id=None, transport=transport, is_stream=is_stream)
-    stmt = _apply_common_filters(stmt, model=ProviderRoutingMetricsHistory, scope_user_id=None, transport=transport, is_stream=is_stream)
-    rows = db.execute(stmt).all()
-
-    points: dict[dt.datetime, DashboardPulsePoint] = {}
-    for row in rows:
-        ts = row[0]
-        weight_sum = row[9] or 0
-        points[ts] = DashboardPulsePoint(
-            window_start=ts,
-            total_requests=int(row[1] or 0),
-            error_4xx_requests=int(row[2] or 0),
-            error_5xx_requests=int(row[3] or 0),
-            error_429_requests=int(row[4] or 0),
-            error_timeout_requests=int(row[5] or 0),
-            latency_p50_ms=_weighted_latency(row[6], weight_sum),
-            latency_p95_ms=_weighted_latency(row[7], weight_sum),
-            latency_p99_ms=_weighted_latency(row[8], weight_sum),
-        )
 
-    filled = _fill_time_buckets(start_at=start_at, end_at=end_at, step_seconds=60, points=points)
-    payload = DashboardPulse(points=filled)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+    def _load(db: Session) -> DashboardPulse:
+        start_at, end_at = _pulse_window()
+        stmt = _pulse_stmt(start_at=start_at, end_at=end_at, scope_user_id=None, transport=transport, is_stream=is_stream)
+        stmt = _apply_common_filters(stmt, model=ProviderRoutingMetricsHistory, scope_user_id=None, transport=transport, is_stream=is_stream)
+        rows = db.execute(stmt).all()
+
+        points: dict[dt.datetime, DashboardPulsePoint] = {}
+        for row in rows:
+            ts = row[0]
+            weight_sum = row[9] or 0
+            points[ts] = DashboardPulsePoint(
+                window_start=ts,
+                total_requests=int(row[1] or 0),
+                error_4xx_requests=int(row[2] or 0),
+                error_5xx_requests=int(row[3] or 0),
+                error_429_requests=int(row[4] or 0),
+                error_timeout_requests=int(row[5] or 0),
+                latency_p50_ms=_weighted_latency(row[6], weight_sum),
+                latency_p95_ms=_weighted_latency(row[7], weight_sum),
+                latency_p99_ms=_weighted_latency(row[8], weight_sum),
+            )
+
+        filled = _fill_time_buckets(start_at=start_at, end_at=end_at, step_seconds=60, points=points)
+        payload = DashboardPulse(points=filled)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardPulse, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 @router.get(
@@ -1038,103 +1138,101 @@ async def system_dashboard_tokens(
 ) -> DashboardTokensTimeSeries:
     _ensure_superuser(current_user)
     cache_key = f"metrics:v2:system-dashboard:tokens:{time_range}:{bucket}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardTokensTimeSeries.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    use_rollup = time_range != "today"
-    if use_rollup:
-        rollup_model = ProviderRoutingMetricsHourly if bucket == "hour" else ProviderRoutingMetricsDaily
-        bucket_start = rollup_model.window_start.label("bucket_start")
-        stmt = (
-            select(
-                bucket_start,
-                func.coalesce(func.sum(rollup_model.input_tokens_sum), 0).label("input_tokens"),
-                func.coalesce(func.sum(rollup_model.output_tokens_sum), 0).label("output_tokens"),
-                func.coalesce(func.sum(rollup_model.total_tokens_sum), 0).label("total_tokens"),
-                func.coalesce(func.sum(rollup_model.token_estimated_requests), 0).label("estimated_requests"),
+
+    def _load(db: Session) -> DashboardTokensTimeSeries:
+        start_at, end_at = _resolve_time_range(time_range)
+        use_rollup = time_range != "today"
+        if use_rollup:
+            rollup_model = ProviderRoutingMetricsHourly if bucket == "hour" else ProviderRoutingMetricsDaily
+            bucket_start = rollup_model.window_start.label("bucket_start")
+            stmt = (
+                select(
+                    bucket_start,
+                    func.coalesce(func.sum(rollup_model.input_tokens_sum), 0).label("input_tokens"),
+                    func.coalesce(func.sum(rollup_model.output_tokens_sum), 0).label("output_tokens"),
+                    func.coalesce(func.sum(rollup_model.total_tokens_sum), 0).label("total_tokens"),
+                    func.coalesce(func.sum(rollup_model.token_estimated_requests), 0).label("estimated_requests"),
+                )
+                .where(
+                    rollup_model.window_start >= start_at,
+                    rollup_model.window_start < end_at,
+                )
+                .group_by(bucket_start)
+                .order_by(bucket_start.asc())
             )
-            .where(
-                rollup_model.window_start >= start_at,
-                rollup_model.window_start < end_at,
+            stmt = _apply_common_filters(stmt, model=rollup_model, scope_user_id=None, transport=transport, is_stream=is_stream)
+            rows = db.execute(stmt).all()
+        else:
+            trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
+            stmt = (
+                select(
+                    trunc,
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
+                        "estimated_requests"
+                    ),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= start_at,
+                    ProviderRoutingMetricsHistory.window_start < end_at,
+                )
+                .group_by(trunc)
+                .order_by(trunc.asc())
             )
-            .group_by(bucket_start)
-            .order_by(bucket_start.asc())
-        )
-        stmt = _apply_common_filters(stmt, model=rollup_model, scope_user_id=None, transport=transport, is_stream=is_stream)
-        rows = db.execute(stmt).all()
-    else:
-        trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
-        stmt = (
-            select(
-                trunc,
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
-                    "estimated_requests"
-                ),
+            stmt = _apply_common_filters(
+                stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=None,
+                transport=transport,
+                is_stream=is_stream,
             )
-            .where(
-                ProviderRoutingMetricsHistory.window_start >= start_at,
-                ProviderRoutingMetricsHistory.window_start < end_at,
+            rows = db.execute(stmt).all()
+
+        if use_rollup and not rows:
+            trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
+            stmt = (
+                select(
+                    trunc,
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
+                        "estimated_requests"
+                    ),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= start_at,
+                    ProviderRoutingMetricsHistory.window_start < end_at,
+                )
+                .group_by(trunc)
+                .order_by(trunc.asc())
             )
-            .group_by(trunc)
-            .order_by(trunc.asc())
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=ProviderRoutingMetricsHistory,
-            scope_user_id=None,
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
-
-    if use_rollup and not rows:
-        trunc = _bucket_trunc_expr(db, bucket, ProviderRoutingMetricsHistory.window_start).label("bucket_start")
-        stmt = (
-            select(
-                trunc,
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.input_tokens_sum), 0).label("input_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.output_tokens_sum), 0).label("output_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("total_tokens"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.token_estimated_requests), 0).label(
-                    "estimated_requests"
-                ),
+            stmt = _apply_common_filters(
+                stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=None,
+                transport=transport,
+                is_stream=is_stream,
             )
-            .where(
-                ProviderRoutingMetricsHistory.window_start >= start_at,
-                ProviderRoutingMetricsHistory.window_start < end_at,
+            rows = db.execute(stmt).all()
+        points = [
+            DashboardTokenPoint(
+                window_start=row[0],
+                input_tokens=int(row[1] or 0),
+                output_tokens=int(row[2] or 0),
+                total_tokens=int(row[3] or 0),
+                estimated_requests=int(row[4] or 0),
             )
-            .group_by(trunc)
-            .order_by(trunc.asc())
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=ProviderRoutingMetricsHistory,
-            scope_user_id=None,
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
-    points = [
-        DashboardTokenPoint(
-            window_start=row[0],
-            input_tokens=int(row[1] or 0),
-            output_tokens=int(row[2] or 0),
-            total_tokens=int(row[3] or 0),
-            estimated_requests=int(row[4] or 0),
-        )
-        for row in rows
-    ]
-    payload = DashboardTokensTimeSeries(time_range=time_range, bucket=bucket, points=points)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+            for row in rows
+        ]
+        payload = DashboardTokensTimeSeries(time_range=time_range, bucket=bucket, points=points)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardTokensTimeSeries, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 @router.get(
@@ -1153,68 +1251,66 @@ async def system_dashboard_top_models(
 ) -> DashboardTopModels:
     _ensure_superuser(current_user)
     cache_key = f"metrics:v2:system-dashboard:top-models:{time_range}:{limit}:{transport}:{is_stream}"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardTopModels.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
-
-    start_at, end_at = _resolve_time_range(time_range)
-    use_rollup = time_range != "today"
-    if use_rollup:
-        model, requests_col = _resolve_rollup_model(time_range)
-        stmt = (
-            select(
-                model.logical_model,
-                func.coalesce(func.sum(requests_col), 0).label("requests"),
-                func.coalesce(func.sum(model.total_tokens_sum), 0).label("tokens_total"),
-            )
-            .where(
-                model.window_start >= start_at,
-                model.window_start < end_at,
-            )
-            .group_by(model.logical_model)
-            .order_by(func.sum(requests_col).desc())
-            .limit(limit)
-        )
-        stmt = _apply_common_filters(stmt, model=model, scope_user_id=None, transport=transport, is_stream=is_stream)
-        rows = db.execute(stmt).all()
-        if not rows:
-            use_rollup = False
 
-    if not use_rollup:
-        stmt = (
-            select(
-                ProviderRoutingMetricsHistory.logical_model,
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("requests"),
-                func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("tokens_total"),
+    def _load(db: Session) -> DashboardTopModels:
+        start_at, end_at = _resolve_time_range(time_range)
+        use_rollup = time_range != "today"
+        if use_rollup:
+            model, requests_col = _resolve_rollup_model(time_range)
+            stmt = (
+                select(
+                    model.logical_model,
+                    func.coalesce(func.sum(requests_col), 0).label("requests"),
+                    func.coalesce(func.sum(model.total_tokens_sum), 0).label("tokens_total"),
+                )
+                .where(
+                    model.window_start >= start_at,
+                    model.window_start < end_at,
+                )
+                .group_by(model.logical_model)
+                .order_by(func.sum(requests_col).desc())
+                .limit(limit)
             )
-            .where(
-                ProviderRoutingMetricsHistory.window_start >= start_at,
-                ProviderRoutingMetricsHistory.window_start < end_at,
+            stmt = _apply_common_filters(stmt, model=model, scope_user_id=None, transport=transport, is_stream=is_stream)
+            rows = db.execute(stmt).all()
+            if not rows:
+                use_rollup = False
+
+        if not use_rollup:
+            stmt = (
+                select(
+                    ProviderRoutingMetricsHistory.logical_model,
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_requests_1m), 0).label("requests"),
+                    func.coalesce(func.sum(ProviderRoutingMetricsHistory.total_tokens_sum), 0).label("tokens_total"),
+                )
+                .where(
+                    ProviderRoutingMetricsHistory.window_start >= start_at,
+                    ProviderRoutingMetricsHistory.window_start < end_at,
+                )
+                .group_by(ProviderRoutingMetricsHistory.logical_model)
+                .order_by(func.sum(ProviderRoutingMetricsHistory.total_requests_1m).desc())
+                .limit(limit)
             )
-            .group_by(ProviderRoutingMetricsHistory.logical_model)
-            .order_by(func.sum(ProviderRoutingMetricsHistory.total_requests_1m).desc())
-            .limit(limit)
-        )
-        stmt = _apply_common_filters(
-            stmt,
-            model=ProviderRoutingMetricsHistory,
-            scope_user_id=None,
-            transport=transport,
-            is_stream=is_stream,
-        )
-        rows = db.execute(stmt).all()
+            stmt = _apply_common_filters(
+                stmt,
+                model=ProviderRoutingMetricsHistory,
+                scope_user_id=None,
+                transport=transport,
+                is_stream=is_stream,
+            )
+            rows = db.execute(stmt).all()
 
-    items = [
-        DashboardTopModel(model=row[0], requests=int(row[1] or 0), tokens_total=int(row[2] or 0))
-        for row in rows
-        if row[0]
-    ]
-    payload = DashboardTopModels(items=items)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+        items = [
+            DashboardTopModel(model=row[0], requests=int(row[1] or 0), tokens_total=int(row[2] or 0))
+            for row in rows
+            if row[0]
+        ]
+        payload = DashboardTopModels(items=items)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardTopModels, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 @router.get(
@@ -1229,33 +1325,31 @@ async def system_dashboard_providers(
 ) -> DashboardProviderStatus:
     _ensure_superuser(current_user)
     cache_key = "metrics:v2:system-dashboard:providers"
-    cached = await redis_get_json(redis, cache_key)
-    if isinstance(cached, dict):
-        try:
-            return DashboardProviderStatus.model_validate(cached)
-        except Exception:
-            logger.info("metrics v2 cache malformed (key=%s)", cache_key)
 
-    stmt = select(
-        Provider.provider_id,
-        Provider.operation_status,
-        Provider.status,
-        Provider.audit_status,
-        Provider.last_check,
-    ).order_by(Provider.provider_id.asc())
-    items = [
-        DashboardProviderStatusItem(
-            provider_id=row[0],
-            operation_status=row[1],
-            status=row[2],
-            audit_status=row[3],
-            last_check=row[4],
-        )
-        for row in db.execute(stmt).all()
-    ]
-    payload = DashboardProviderStatus(items=items)
-    await redis_set_json(redis, cache_key, payload.model_dump(mode="json"), ttl_seconds=V2_CACHE_TTL_SECONDS)
-    return payload
+    def _load(db: Session) -> DashboardProviderStatus:
+        stmt = select(
+            Provider.provider_id,
+            Provider.operation_status,
+            Provider.status,
+            Provider.audit_status,
+            Provider.last_check,
+        ).order_by(Provider.provider_id.asc())
+        items = [
+            DashboardProviderStatusItem(
+                provider_id=row[0],
+                operation_status=row[1],
+                status=row[2],
+                audit_status=row[3],
+                last_check=row[4],
+            )
+            for row in db.execute(stmt).all()
+        ]
+        payload = DashboardProviderStatus(items=items)
+        return payload
+
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, DashboardProviderStatus, _load, db=db, ttl_seconds=V2_CACHE_TTL_SECONDS
+    )
 
 
 __all__ = ["router"]
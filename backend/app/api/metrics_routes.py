@@ -15,6 +15,7 @@ except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is
 
 from app.db import get_db_session
 from app.deps import get_redis
+from app.http_client_pool import get_upstream_http_pool_stats
 from app.jwt_auth import AuthenticatedUser, require_jwt_token
 from app.logging_config import logger
 from app.models import (
@@ -34,6 +35,8 @@ from app.schemas.metrics import (
     OverviewMetricsTimeSeries,
     ProviderMetricsSummary,
     ProviderMetricsTimeSeries,
+    RoutingL1CacheMetrics,
+    UpstreamHttpPoolMetrics,
     UserActiveProviderMetrics,
     UserAppUsageMetrics,
     UserMetricsSummary,
@@ -42,6 +45,8 @@ from app.schemas.metrics import (
     UserOverviewMetricsSummary,
     UserOverviewMetricsTimeSeries,
 )
+from app.storage.metrics_query_cache import metrics_query_cache
+from app.storage.routing_l1_cache import get_routing_l1_cache_stats
 
 router = APIRouter(
     prefix="/metrics",
@@ -308,118 +313,87 @@ async def get_overview_summary(
     """
     cache_key = f"metrics:overview:summary:{time_range}:{transport}:{is_stream}"
 
-    # 尝试从 Redis 读取缓存（缓存 miss 或 Redis 异常时回退到 DB 查询）
-    if redis is not object:  # pragma: no branch - 类型占位时直接跳过
+    def _load(db: Session) -> OverviewMetricsSummary:
+        current_range, prev_range = _compute_overview_windows(time_range)
+
+        def _load_window(
+            window: tuple[dt.datetime | None, dt.datetime | None] | None,
+        ) -> tuple[int, int, int, int]:
+            if window is None:
+                return 0, 0, 0, 0
+
+            start_at, end_at = window
+            stmt = _build_overview_stmt(
+                start_at=start_at,
+                end_at=end_at,
+                transport=transport,
+                is_stream=is_stream,
+            )
+            row = db.execute(stmt).one()
+
+            total_requests = int(row.total_requests or 0)
+            success_requests = int(row.success_requests or 0)
+            error_requests = int(row.error_requests or 0)
+            active_providers = int(row.active_providers or 0)
+            return total_requests, success_requests, error_requests, active_providers
+
         try:
-            cached = await redis_get_json(redis, cache_key)
+            (
+                total_requests,
+                success_requests,
+                error_requests,
+                active_providers,
+            ) = _load_window(current_range)
+            if prev_range is not None:
+                (
+                    total_requests_prev,
+                    success_requests_prev,
+                    error_requests_prev,
+                    active_providers_prev,
+                ) = _load_window(prev_range)
+            else:
+                total_requests_prev = None
+                success_requests_prev = None
+                error_requests_prev = None
+                active_providers_prev = None
         except Exception:  # pragma: no cover - 防御性日志
-            logger.exception(
-                "Failed to load metrics overview summary from Redis (key=%s)",
-                cache_key,
+            logger.exception("Failed to load metrics overview summary")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to load metrics overview summary",
             )
-            cached = None
-
-        if cached:
-            try:
-                return OverviewMetricsSummary.model_validate(cached)
-            except Exception:  # pragma: no cover - 防御性日志
-                logger.exception(
-                    "Cached metrics overview summary is malformed, ignoring (key=%s)",
-                    cache_key,
-                )
 
-    current_range, prev_range = _compute_overview_windows(time_range)
+        if total_requests > 0:
+            success_rate = success_requests / total_requests
+        else:
+            success_rate = 0.0
 
-    def _load_window(
-        window: tuple[dt.datetime | None, dt.datetime | None] | None,
-    ) -> tuple[int, int, int, int]:
-        if window is None:
-            return 0, 0, 0, 0
+        if total_requests_prev and total_requests_prev > 0:
+            success_rate_prev: float | None = success_requests_prev / total_requests_prev  # type: ignore[operator]
+        else:
+            success_rate_prev = None
 
-        start_at, end_at = window
-        stmt = _build_overview_stmt(
-            start_at=start_at,
-            end_at=end_at,
+        overview = OverviewMetricsSummary(
+            time_range=time_range,
             transport=transport,
             is_stream=is_stream,
+            total_requests=total_requests,
+            success_requests=success_requests,
+            error_requests=error_requests,
+            success_rate=success_rate,
+            total_requests_prev=total_requests_prev,
+            success_requests_prev=success_requests_prev,
+            error_requests_prev=error_requests_prev,
+            success_rate_prev=success_rate_prev,
+            active_providers=active_providers,
+            active_providers_prev=active_providers_prev,
         )
-        row = db.execute(stmt).one()
-
-        total_requests = int(row.total_requests or 0)
-        success_requests = int(row.success_requests or 0)
-        error_requests = int(row.error_requests or 0)
-        active_providers = int(row.active_providers or 0)
-        return total_requests, success_requests, error_requests, active_providers
+        return overview
 
-    try:
-        (
-            total_requests,
-            success_requests,
-            error_requests,
-            active_providers,
-        ) = _load_window(current_range)
-        if prev_range is not None:
-            (
-                total_requests_prev,
-                success_requests_prev,
-                error_requests_prev,
-                active_providers_prev,
-            ) = _load_window(prev_range)
-        else:
-            total_requests_prev = None
-            success_requests_prev = None
-            error_requests_prev = None
-            active_providers_prev = None
-    except Exception:  # pragma: no cover - 防御性日志
-        logger.exception("Failed to load metrics overview summary")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to load metrics overview summary",
-        )
-
-    if total_requests > 0:
-        success_rate = success_requests / total_requests
-    else:
-        success_rate = 0.0
-
-    if total_requests_prev and total_requests_prev > 0:
-        success_rate_prev: float | None = success_requests_prev / total_requests_prev  # type: ignore[operator]
-    else:
-        success_rate_prev = None
-
-    overview = OverviewMetricsSummary(
-        time_range=time_range,
-        transport=transport,
-        is_stream=is_stream,
-        total_requests=total_requests,
-        success_requests=success_requests,
-        error_requests=error_requests,
-        success_rate=success_rate,
-        total_requests_prev=total_requests_prev,
-        success_requests_prev=success_requests_prev,
-        error_requests_prev=error_requests_prev,
-        success_rate_prev=success_rate_prev,
-        active_providers=active_providers,
-        active_providers_prev=active_providers_prev,
+    return await metrics_query_cache.get_or_load(
+        redis, cache_key, OverviewMetricsSummary, _load, db=db, ttl_seconds=OVERVIEW_CACHE_TTL_SECONDS
     )
 
-    # 将结果写入 Redis 缓存，但不影响主流程。
-    if redis is not object:
-        try:
-            await redis_set_json(
-                redis,
-                cache_key,
-                overview.model_dump(),
-                ttl_seconds=OVERVIEW_CACHE_TTL_SECONDS,
-            )
-        except Exception:  # pragma: no cover - 防御性日志
-            logger.exception(
-                "Failed to store metrics overview summary to Redis (key=%s)",
-                cache_key,
-            )
-
-    return overview
-
 
 @router.get(
     "/user-overview/timeseries",
@@ -1543,4 +1517,46 @@ def get_api_key_summary(
     )
 
 
+@router.get(
+    "/upstream-http-pool",
+    response_model=UpstreamHttpPoolMetrics,
+    summary="上游 HTTP 连接池计数器（当前 worker 进程，管理员）",
+)
+def get_upstream_http_pool_metrics(
+    current_user: AuthenticatedUser = Depends(require_jwt_token),
+) -> UpstreamHttpPoolMetrics:
+    """
+    返回当前 worker 进程内上游连接池的复用情况（连接复用/新建、排队等待等）。
+
+    计数器为进程内累计值，多 worker 部署时每个进程各自独立。
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有超级管理员可以查看连接池指标",
+        )
+    return UpstreamHttpPoolMetrics(**get_upstream_http_pool_stats())
+
+
+@router.get(
+    "/routing-l1-cache",
+    response_model=RoutingL1CacheMetrics,
+    summary="路由 L1 缓存计数器（当前 worker 进程，管理员）",
+)
+def get_routing_l1_cache_metrics(
+    current_user: AuthenticatedUser = Depends(require_jwt_token),
+) -> RoutingL1CacheMetrics:
+    """
+    返回当前 worker 进程内逻辑模型 / 路由指标 L1 缓存的命中、未命中与淘汰计数。
+
+    计数器为进程内累计值，多 worker 部署时每个进程各自独立。
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有超级管理员可以查看路由缓存指标",
+        )
+    return RoutingL1CacheMetrics(**get_routing_l1_cache_stats())
+
+
 __all__ = ["router"]
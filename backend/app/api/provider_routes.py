@@ -18,6 +18,7 @@ from app.logging_config import logger
 from app.model_cache import MODELS_CACHE_KEY
 from app.models import Provider, ProviderModel, ProviderSubmission
 from app.provider.config import get_provider_config, load_provider_configs
+from app.provider.config_registry import invalidate_provider_config
 from app.provider.discovery import ensure_provider_models_cached
 from app.provider.health import HealthStatus
 from app.provider.sdk_selector import list_registered_sdk_vendors
@@ -40,6 +41,7 @@ from app.schemas.provider_routes import (
     SDKVendorsResponse,
 )
 from app.services.provider_health_service import get_health_status_with_fallback
+from app.services.provider_model_snapshot import invalidate_provider_model_snapshot
 from app.services.user_provider_service import get_accessible_provider_ids
 from app.storage.redis_service import get_all_provider_metrics, get_routing_metrics
 
@@ -317,6 +319,8 @@ def _sync_provider_models_to_db(
                 row.meta_hash = meta_hash
 
         db.commit()
+        invalidate_provider_model_snapshot()
+        invalidate_provider_config(provider_id_slug)
     except Exception:
         # 防御性日志，不影响 /providers/{id}/models 接口的正常返回。
         logger.exception(
@@ -750,6 +754,7 @@ async def update_provider_model_capabilities(
     db.add(model_row)
     db.commit()
     db.refresh(model_row)
+    invalidate_provider_config(provider_id)
 
     # 缓存失效：/models 聚合缓存 + 逻辑模型缓存（llm:logical:*）增量刷新
     if hasattr(redis, "delete"):
@@ -862,6 +867,8 @@ async def update_provider_model_disabled(
 
     db.commit()
     db.refresh(model_row)
+    invalidate_provider_model_snapshot()
+    invalidate_provider_config(provider_id)
 
     # 缓存失效：/models 聚合缓存 + 逻辑模型缓存（llm:logical:*）增量刷新
     if redis is not object:
@@ -34,6 +34,8 @@ from app.services.key_management_service import (
     validate_key_strength,
 )
 from app.settings import settings
+from app.storage.redis_service import scan_keys
+from app.storage.routing_l1_cache import publish_routing_cache_invalidation
 
 try:
     from redis.asyncio import Redis
@@ -88,6 +90,9 @@ def _get_or_create_gateway_config_row(db: Session) -> GatewayConfigRow:
     return row
 
 
+_DELETE_BATCH_SIZE = 500
+
+
 async def _delete_pattern(redis: Redis, pattern: str) -> int:
     """
     删除匹配给定模式的所有键，返回删除的键数量。
@@ -102,11 +107,12 @@ async def _delete_pattern(redis: Redis, pattern: str) -> int:
         await redis.delete(pattern)  # type: ignore[attr-defined]
         return 1
 
-    keys = await redis.keys(pattern)  # type: ignore[attr-defined]
+    # 使用游标 SCAN 代替 KEYS，避免在共享 Redis 上阻塞其它请求；分批删除。
+    keys = await scan_keys(redis, pattern)
     if not keys:
         return 0
-    # Redis 支持变参删除
-    await redis.delete(*keys)  # type: ignore[arg-type,attr-defined]
+    for start in range(0, len(keys), _DELETE_BATCH_SIZE):
+        await redis.delete(*keys[start : start + _DELETE_BATCH_SIZE])  # type: ignore[arg-type,attr-defined]
     return len(keys)
 
 
@@ -402,6 +408,16 @@ async def clear_cache(
         stats[pattern] = removed
         total += removed
 
+    # 逻辑模型 / 路由指标还存在进程内 L1 缓存，一并广播失效。
+    l1_prefixes = {
+        CacheSegment.LOGICAL_MODELS: "llm:logical:",
+        CacheSegment.ROUTING_METRICS: "llm:metrics:",
+    }
+    for segment in segments:
+        prefix = l1_prefixes.get(segment)
+        if prefix:
+            await publish_routing_cache_invalidation(redis, prefix=prefix)
+
     logger.info(
         "System cache cleared by user=%s (%s), total_keys=%d, details=%s",
         current_user.username,
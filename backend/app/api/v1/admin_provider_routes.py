@@ -15,14 +15,19 @@ from app.deps import get_db, get_redis
 from app.errors import bad_request, forbidden, not_found
 from app.jwt_auth import AuthenticatedUser, require_jwt_token
 from app.logging_config import logger
-from app.models import Provider, ProviderModel
+from app.models import ModelBillingConfig, Provider, ProviderModel
 from app.provider.config import get_provider_config
+from app.provider.config_registry import invalidate_provider_config
 from app.schemas import (
     AdminProviderResponse,
     AdminProvidersResponse,
+    ModelBillingMultiplierResponse,
+    ModelBillingMultiplierUpdateRequest,
     ModelPricingUpdateRequest,
     ProviderAuditActionRequest,
     ProviderAuditLogResponse,
+    ProviderBillingFactorResponse,
+    ProviderBillingFactorUpdateRequest,
     ProviderModelPricingResponse,
     ProviderModelValidationResult,
     ProviderProbeConfigUpdate,
@@ -41,6 +46,7 @@ from app.services.provider_audit_service import (
     trigger_provider_test,
     update_operation_status,
 )
+from app.services.provider_model_snapshot import invalidate_provider_model_snapshot
 from app.services.provider_validation_service import ProviderValidationService
 
 router = APIRouter(
@@ -216,6 +222,7 @@ async def update_provider_probe_config_endpoint(
     db.add(provider)
     db.commit()
     db.refresh(provider)
+    invalidate_provider_config(provider_id)
 
     # 失效逻辑模型缓存
     try:
@@ -659,6 +666,8 @@ def update_provider_model_pricing_endpoint(
     db.add(model)
     db.commit()
     db.refresh(model)
+    invalidate_provider_model_snapshot()
+    invalidate_provider_config(provider.provider_id)
 
     return ProviderModelPricingResponse(
         provider_id=provider.provider_id,
@@ -667,4 +676,74 @@ def update_provider_model_pricing_endpoint(
     )
 
 
+
+@router.put(
+    "/admin/providers/{provider_id}/billing-factor",
+    response_model=ProviderBillingFactorResponse,
+)
+def update_provider_billing_factor_endpoint(
+    payload: ProviderBillingFactorUpdateRequest,
+    provider_id: str = Path(..., description="Provider 的短 ID，例如 moonshot-xxx"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_jwt_token),
+) -> ProviderBillingFactorResponse:
+    """
+    更新 Provider 的结算系数；计费快照随之失效并在后台重建。
+    """
+
+    _ensure_admin(current_user)
+
+    stmt: Select[tuple[Provider]] = select(Provider).where(Provider.provider_id == provider_id)
+    provider = db.execute(stmt).scalars().first()
+    if provider is None:
+        raise not_found(f"Provider '{provider_id}' not found")
+
+    provider.billing_factor = float(payload.billing_factor)
+    db.add(provider)
+    db.commit()
+    db.refresh(provider)
+    invalidate_provider_model_snapshot()
+
+    return ProviderBillingFactorResponse(
+        provider_id=provider.provider_id,
+        billing_factor=float(provider.billing_factor),
+    )
+
+
+@router.put(
+    "/admin/model-billing/{model_name:path}",
+    response_model=ModelBillingMultiplierResponse,
+)
+def update_model_billing_multiplier_endpoint(
+    payload: ModelBillingMultiplierUpdateRequest,
+    model_name: str = Path(..., description="逻辑模型名称，例如 gpt-4o"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_jwt_token),
+) -> ModelBillingMultiplierResponse:
+    """
+    创建或更新逻辑模型的计费倍率（ModelBillingConfig）；计费快照随之失效并在后台重建。
+    """
+
+    _ensure_admin(current_user)
+
+    stmt: Select[tuple[ModelBillingConfig]] = select(ModelBillingConfig).where(
+        ModelBillingConfig.model_name == model_name
+    )
+    config = db.execute(stmt).scalars().first()
+    if config is None:
+        config = ModelBillingConfig(model_name=model_name)
+    config.multiplier = float(payload.multiplier)
+    config.is_active = bool(payload.is_active)
+    db.add(config)
+    db.commit()
+    db.refresh(config)
+    invalidate_provider_model_snapshot()
+
+    return ModelBillingMultiplierResponse(
+        model_name=config.model_name,
+        multiplier=float(config.multiplier),
+        is_active=bool(config.is_active),
+    )
+
+
 __all__ = ["router"]
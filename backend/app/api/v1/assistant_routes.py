@@ -1,9 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import time
-from contextlib import suppress
 from datetime import UTC, datetime
 from typing import Any
 from uuid import UUID
@@ -22,7 +22,7 @@ except ModuleNotFoundError:  # pragma: no cover
 from app.deps import get_db, get_http_client, get_redis
 from app.jwt_auth import AuthenticatedUser, require_jwt_token
 from app.models import Message
-from app.repositories.run_event_repository import append_run_event, list_run_events
+from app.repositories.run_event_repository import append_run_event, get_max_run_event_seq, list_run_events
 from app.schemas import (
     AssistantPresetCreateRequest,
     AssistantPresetListResponse,
@@ -44,7 +44,9 @@ from app.schemas import (
 from app.services import chat_app_service
 from app.services.run_cancel_service import mark_run_canceled
 from app.services.run_event_bus import build_run_event_envelope, publish_run_event_best_effort, run_event_channel
-from app.services.run_event_bus import subscribe_run_events
+from app.services.pubsub_hub import get_pubsub_hub
+from app.services.run_event_bus import iter_run_events, replay_run_event_gap, run_event_to_envelope
+from app.services.run_event_writer import allocate_run_event_seq
 from app.services.chat_history_service import (
     clear_conversation_messages,
     create_assistant,
@@ -413,31 +415,9 @@ async def create_message_endpoint(
         return MessageCreateResponse(message_id=message_id, baseline_run=_run_to_summary(run))
 
     async def _wait_for_terminal_event(*, run_id: UUID, after_seq: int) -> None:
-        last_seq = int(after_seq or 0)
-        # DB replay（防止 worker 很快写完导致我们错过热通道事件）
-        for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=1000):
-            seq = int(getattr(ev, "seq", 0) or 0)
-            if seq <= last_seq:
-                continue
-            last_seq = seq
-            et = str(getattr(ev, "event_type", "") or "")
-            if et in {"message.completed", "message.failed"}:
-                return
-
-        async for env in subscribe_run_events(redis, run_id=run_id, after_seq=last_seq, request=request):
-            if not isinstance(env, dict):
-                continue
-            if str(env.get("type") or "") == "heartbeat":
-                continue
-            try:
-                seq = int(env.get("seq") or 0)
-            except Exception:
-                seq = 0
-            if seq <= last_seq:
-                continue
-            last_seq = seq
-            et = str(env.get("event_type") or "")
-            if et in {"message.completed", "message.failed"}:
+        # 先订阅再回放 DB（防止 worker 很快写完导致我们错过热通道事件）
+        async for env in iter_run_events(redis, db, run_id=run_id, after_seq=after_seq, request=request):
+            if str(env.get("event_type") or "") in {"message.completed", "message.failed"}:
                 return
 
     if stream:
@@ -464,37 +444,12 @@ async def create_message_endpoint(
         )
 
         async def _gen():
-            last_seq = int(created_seq or 0)
             yield _encode_sse_event(event_type="message.created", data=created_payload)
 
-            # 先回放 DB 中的缺失 message.* 事件，再订阅 Redis 热通道实时续订
-            for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=1000):
-                seq = int(getattr(ev, "seq", 0) or 0)
-                if seq <= last_seq:
-                    continue
-                last_seq = seq
-                et = str(getattr(ev, "event_type", "") or "")
-                if not et.startswith("message."):
-                    continue
-                data = getattr(ev, "payload", None) or {}
-                yield _encode_sse_event(event_type=et, data=data)
-                if et in {"message.completed", "message.failed"}:
-                    yield _encode_sse_event(event_type="done", data="[DONE]")
-                    return
-
-            async for env in subscribe_run_events(redis, run_id=run_id, after_seq=last_seq, request=request):
-                if not isinstance(env, dict):
-                    continue
+            # 先订阅 Redis 热通道，再回放 DB 中的缺失 message.* 事件，然后实时续订
+            async for env in iter_run_events(redis, db, run_id=run_id, after_seq=int(created_seq or 0)):
                 if str(env.get("type") or "") == "heartbeat":
                     continue
-                try:
-                    seq = int(env.get("seq") or 0)
-                except Exception:
-                    seq = 0
-                if seq <= last_seq:
-                    continue
-                last_seq = seq
-
                 et = str(env.get("event_type") or "")
                 if not et.startswith("message."):
                     continue
@@ -720,72 +675,23 @@ async def create_image_generation_endpoint(
         raise
 
     async def _wait_for_terminal_event(*, run_id: UUID, after_seq: int) -> None:
-        last_seq = int(after_seq or 0)
-        for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=1000):
-            seq = int(getattr(ev, "seq", 0) or 0)
-            if seq <= last_seq:
-                continue
-            last_seq = seq
-            et = str(getattr(ev, "event_type", "") or "")
-            if et in {"message.completed", "message.failed"}:
-                return
-
-        async for env in subscribe_run_events(redis, run_id=run_id, after_seq=last_seq, request=request):
-            if not isinstance(env, dict):
-                continue
-            if str(env.get("type") or "") == "heartbeat":
-                continue
-            try:
-                seq = int(env.get("seq") or 0)
-            except Exception:
-                seq = 0
-            if seq <= last_seq:
-                continue
-            last_seq = seq
-            et = str(env.get("event_type") or "")
-            if et in {"message.completed", "message.failed"}:
+        # 先订阅再回放 DB（防止 worker 很快写完导致我们错过热通道事件）
+        async for env in iter_run_events(redis, db, run_id=run_id, after_seq=after_seq, request=request):
+            if str(env.get("event_type") or "") in {"message.completed", "message.failed"}:
                 return
 
     if stream:
         async def _gen():
-            last_seq = int(created_seq or 0)
             yield _encode_sse_event(event_type="message.created", data=created_payload)
 
-            for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=1000):
-                seq = int(getattr(ev, "seq", 0) or 0)
-                if seq <= last_seq:
-                    continue
-                last_seq = seq
-                et = str(getattr(ev, "event_type", "") or "")
-                if not et.startswith("message."):
-                    continue
-                data = getattr(ev, "payload", None) or {}
-                if et == "message.completed" and isinstance(data, dict):
-                    img = data.get("image_generation")
-                    if isinstance(img, dict):
-                        data["image_generation"] = _hydrate_image_generation_content(img)
-                yield _encode_sse_event(event_type=et, data=data)
-                if et in {"message.completed", "message.failed"}:
-                    yield _encode_sse_event(event_type="done", data="[DONE]")
-                    return
-
-            async for env in subscribe_run_events(redis, run_id=run_id, after_seq=last_seq, request=request):
-                if not isinstance(env, dict):
-                    continue
+            async for env in iter_run_events(redis, db, run_id=run_id, after_seq=int(created_seq or 0)):
                 if str(env.get("type") or "") == "heartbeat":
                     continue
-                try:
-                    seq = int(env.get("seq") or 0)
-                except Exception:
-                    seq = 0
-                if seq <= last_seq:
-                    continue
-                last_seq = seq
-
                 et = str(env.get("event_type") or "")
                 if not et.startswith("message."):
                     continue
-                data = env.get("payload") if isinstance(env.get("payload"), dict) else {}
+                # envelope 由进程内共享订阅分发给所有订阅方，补全图片内容前先复制，避免原地修改。
+                data = dict(env["payload"]) if isinstance(env.get("payload"), dict) else {}
                 if et == "message.completed" and isinstance(data, dict):
                     img = data.get("image_generation")
                     if isinstance(img, dict):
@@ -892,8 +798,16 @@ async def cancel_run_endpoint(
         db.commit()
         db.refresh(run)
 
-        def _append_and_publish(event_type: str, payload: dict[str, Any]) -> None:
-            row = append_run_event(db, run_id=run_id, event_type=event_type, payload=payload)
+        async def _append_and_publish(event_type: str, payload: dict[str, Any]) -> None:
+            # worker 可能仍在批量写入同一 run 的事件：序号统一从 Redis 计数器分配，避免与其缓冲冲突。
+            seq = None
+            try:
+                seq = await allocate_run_event_seq(
+                    redis, run_id=run_id, floor=get_max_run_event_seq(db, run_id=run_id)
+                )
+            except Exception:
+                seq = None
+            row = append_run_event(db, run_id=run_id, event_type=event_type, payload=payload, seq=seq)
             created_at_iso = None
             try:
                 created_at_iso = row.created_at.isoformat() if getattr(row, "created_at", None) is not None else None
@@ -911,7 +825,7 @@ async def cancel_run_endpoint(
                 ),
             )
 
-        _append_and_publish("run.canceled", {"type": "run.canceled", "run_id": str(run_id)})
+        await _append_and_publish("run.canceled", {"type": "run.canceled", "run_id": str(run_id)})
 
         # 尽量补齐 message.failed payload 的上下文字段（用于兼容 message.* SSE 消费者）
         conv_id = None
@@ -939,7 +853,7 @@ async def cancel_run_endpoint(
             except Exception:
                 assistant_message_id = None
 
-        _append_and_publish(
+        await _append_and_publish(
             "message.failed",
             {
                 "type": "message.failed",
@@ -990,76 +904,37 @@ async def stream_run_events_endpoint(
 
     async def _gen():
         nonlocal last_seq
-        # 先订阅 Redis，再进行 DB replay：避免 replay 与 subscribe 之间的时间窗导致事件丢失。
-        channel = run_event_channel(run_id=run_id)
-        pubsub = redis.pubsub()
-        await pubsub.subscribe(channel)
-        last_activity = time.monotonic()
-
         try:
-            # DB 真相回放（after_seq 之后）
-            for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=limit):
-                seq = int(getattr(ev, "seq", 0) or 0)
-                if seq <= last_seq:
-                    continue
-                last_seq = seq
-                created_at_iso = None
-                try:
-                    created_at_iso = ev.created_at.isoformat() if getattr(ev, "created_at", None) is not None else None
-                except Exception:
-                    created_at_iso = None
+            # 先订阅 Redis，再进行 DB replay：避免 replay 与 subscribe 之间的时间窗导致事件丢失。
+            async with get_pubsub_hub(redis).subscribe(run_event_channel(run_id=run_id)) as sub:
+                # DB 真相回放（after_seq 之后）
+                for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=limit):
+                    env = run_event_to_envelope(ev)
+                    if env["seq"] <= last_seq:
+                        continue
+                    last_seq = env["seq"]
+                    yield _encode_sse_event(event_type=env["event_type"], data=env)
 
                 yield _encode_sse_event(
-                    event_type=str(getattr(ev, "event_type", "event") or "event"),
-                    data={
-                        "type": "run.event",
-                        "run_id": str(run_id),
-                        "seq": seq,
-                        "event_type": str(getattr(ev, "event_type", "event") or "event"),
-                        "created_at": created_at_iso,
-                        "payload": getattr(ev, "payload", None) or {},
-                    },
+                    event_type="replay.done",
+                    data={"type": "replay.done", "run_id": str(run_id), "after_seq": last_seq},
                 )
 
-            yield _encode_sse_event(
-                event_type="replay.done",
-                data={"type": "replay.done", "run_id": str(run_id), "after_seq": last_seq},
-            )
-
-            # Redis 热通道实时续订
-            while True:
-                try:
-                    if await request.is_disconnected():
-                        break
-                except Exception:  # pragma: no cover
-                    break
-
-                msg: dict[str, Any] | None
-                try:
-                    msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                except Exception:
-                    msg = None
-
-                if isinstance(msg, dict) and msg.get("type") == "message":
-                    raw = msg.get("data")
-                    if isinstance(raw, (bytes, bytearray)):
-                        raw_str = raw.decode("utf-8", errors="ignore")
-                    elif isinstance(raw, str):
-                        raw_str = raw
-                    else:
-                        raw_str = ""
-
-                    env: dict[str, Any] | None = None
-                    if raw_str:
-                        try:
-                            parsed = json.loads(raw_str)
-                            if isinstance(parsed, dict):
-                                env = parsed
-                        except Exception:
-                            env = None
-
-                    if not isinstance(env, dict):
+                # Redis 热通道实时续订：客户端断开由 StreamingResponse 感知并取消生成器，无需轮询。
+                last_activity = time.monotonic()
+                while True:
+                    try:
+                        async with asyncio.timeout(max(0.0, 15.0 - (time.monotonic() - last_activity))):
+                            env = await sub.get()
+                    except TimeoutError:
+                        last_activity = time.monotonic()
+                        yield _encode_sse_event(
+                            event_type="heartbeat",
+                            data={"type": "heartbeat", "ts": int(time.time()), "run_id": str(run_id), "after_seq": last_seq},
+                        )
                         continue
+                    if env is None:
+                        break
 
                     if str(env.get("type") or "") == "heartbeat":
                         yield _encode_sse_event(event_type="heartbeat", data=env)
@@ -1071,26 +946,18 @@ async def stream_run_events_endpoint(
                         seq = 0
                     if seq <= last_seq:
                         continue
+                    if seq > last_seq + 1:
+                        # worker 先发布后批量落库：在两者之间加入的订阅方会看到跳号，从 DB 补齐。
+                        for ev in await replay_run_event_gap(db, run_id=run_id, after_seq=last_seq, before_seq=seq):
+                            gap_env = run_event_to_envelope(ev)
+                            yield _encode_sse_event(event_type=gap_env["event_type"], data=gap_env)
 
                     last_seq = seq
                     last_activity = time.monotonic()
                     event_type = str(env.get("event_type") or "run.event")
                     yield _encode_sse_event(event_type=event_type, data=env)
-                    continue
-
-                if time.monotonic() - last_activity >= 15.0:
-                    last_activity = time.monotonic()
-                    yield _encode_sse_event(
-                        event_type="heartbeat",
-                        data={"type": "heartbeat", "ts": int(time.time()), "run_id": str(run_id), "after_seq": last_seq},
-                    )
         except Exception:
             return
-        finally:
-            with suppress(Exception):
-                await pubsub.unsubscribe(channel)
-            with suppress(Exception):
-                await pubsub.close()
 
     return StreamingResponse(_gen(), media_type="text/event-stream")
 
@@ -13,6 +13,9 @@ from uuid import UUID
 from sqlalchemy.orm import Session as DbSession
 
 from app.logging_config import logger
+from app.services.credit_service import (
+    reconcile_streaming_usage as _reconcile_streaming_usage,
+)
 from app.services.credit_service import (
     record_chat_completion_usage as _record_chat_completion_usage,
 )
@@ -192,3 +195,58 @@ def record_stream_usage(
             "idempotency_key": idempotency_key,
         },
     )
+
+
+def record_stream_usage_reconciliation(
+    db: DbSession,
+    *,
+    user_id: UUID,
+    api_key_id: UUID,
+    logical_model_name: str,
+    provider_id: str | None,
+    provider_model_id: str | None,
+    usage: dict[str, Any] | None,
+    idempotency_key: str | None = None,
+) -> None:
+    """
+    流式响应结束后按实际 usage 对账（每个流只投递一次任务）
+
+    idempotency_key 与预扣使用同一个 key，由任务侧决定补扣差额还是全额扣费。
+    """
+    if not isinstance(usage, dict):
+        return
+
+    if os.getenv("PYTEST_CURRENT_TEST"):
+        try:
+            _reconcile_streaming_usage(
+                db,
+                user_id=user_id,
+                api_key_id=api_key_id,
+                logical_model_name=logical_model_name,
+                provider_id=provider_id,
+                provider_model_id=provider_model_id,
+                usage=usage,
+                precharge_idempotency_key=idempotency_key,
+            )
+        except Exception:
+            logger.exception(
+                "Failed to reconcile streaming credit usage "
+                "(user=%s logical_model=%s provider=%s)",
+                user_id,
+                logical_model_name,
+                provider_id,
+            )
+        return
+
+    _enqueue_celery_task(
+        "tasks.credits.reconcile_streaming_usage",
+        kwargs={
+            "user_id": str(user_id),
+            "api_key_id": str(api_key_id) if api_key_id else None,
+            "logical_model_name": logical_model_name,
+            "provider_id": provider_id,
+            "provider_model_id": provider_model_id,
+            "usage": usage,
+            "idempotency_key": idempotency_key,
+        },
+    )
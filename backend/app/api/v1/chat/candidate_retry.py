@@ -9,10 +9,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import time
 from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
-from typing import Any, TypeVar
+from dataclasses import dataclass
+from typing import Any, NoReturn, TypeVar
 
 import httpx
 from fastapi import HTTPException, status
@@ -35,6 +37,8 @@ from app.logging_config import logger
 from app.provider import config as provider_config
 from app.routing.scheduler import CandidateScore
 from app.schemas import PhysicalModel
+from app.settings import settings
+from app.storage.rate_limit import get_redis_rate_limiter
 from app.upstream import UpstreamStreamError, detect_request_format
 from app.api.v1.chat.upstream_error_classifier import extract_error_message
 
@@ -73,6 +77,111 @@ def get_provider_config(provider_id: str):
     return provider_config.get_provider_config(provider_id)
 
 
+def _csv_values(value: str | None) -> set[str]:
+    return {item.strip() for item in (value or "").split(",") if item.strip()}
+
+
+def _hedging_enabled(logical_model_id: str, api_key: AuthenticatedAPIKey) -> bool:
+    """
+    对冲请求为显式开启：按逻辑模型（* 表示全部）或 API Key 配置。
+    """
+    models = _csv_values(settings.hedged_requests_logical_models)
+    if "*" in models or logical_model_id in models:
+        return True
+    return str(getattr(api_key, "id", "")) in _csv_values(settings.hedged_requests_api_key_ids)
+
+
+def _hedge_delay_seconds(upstream: CandidateScore | PhysicalModel) -> float:
+    """
+    自适应对冲延迟：优先取该候选的 P95 延迟（RoutingMetrics），再限制在 [min, max] 内。
+    """
+    delay_ms = float(settings.hedged_requests_default_delay_ms)
+    metrics = upstream.metrics if isinstance(upstream, CandidateScore) else None
+    if metrics is not None:
+        delay_ms = float(metrics.latency_p95_ms)
+    low = float(settings.hedged_requests_min_delay_ms)
+    high = max(low, float(settings.hedged_requests_max_delay_ms))
+    return min(max(delay_ms, low), high) / 1000.0
+
+
+@dataclass
+class _NonStreamAttempt:
+    idx: int
+    upstream: CandidateScore | PhysicalModel
+    provider_id: str
+    model_id: str
+    record: dict[str, Any] | None
+    started_at: float
+    hedged: bool = False
+
+    def elapsed_ms(self) -> int:
+        return int(max(0.0, (time.perf_counter() - self.started_at) * 1000))
+
+
+def _stream_race_budget(logical_model_id: str) -> int:
+    """
+    该逻辑模型每分钟允许的竞速额外请求数；未开启竞速时返回 0。
+
+    配置项为逗号分隔的 `model` 或 `model=N`，精确匹配优先于 `*`。
+    """
+    default = int(settings.stream_race_extra_budget_per_minute)
+    budgets: dict[str, int] = {}
+    for entry in _csv_values(settings.stream_race_logical_models):
+        name, sep, raw = entry.partition("=")
+        try:
+            budget = int(raw) if sep else default
+        except ValueError:
+            budget = default
+        budgets[name.strip()] = max(0, budget)
+    return budgets.get(logical_model_id, budgets.get("*", 0))
+
+
+async def _reserve_race_slot(redis: Redis, logical_model_id: str, budget: int) -> bool:
+    """在该逻辑模型的 60s 滑动窗口中预占一次额外请求（跨 worker 共享）。"""
+    decision = await get_redis_rate_limiter(redis).acquire(
+        f"stream_race:{logical_model_id}:extra",
+        limit=budget,
+        window_seconds=60.0,
+    )
+    return decision.allowed
+
+
+@dataclass
+class _StreamAttempt:
+    idx: int
+    provider_id: str
+    model_id: str
+    iterator: AsyncIterator[bytes]
+    record: dict[str, Any] | None
+    started_at: float
+
+    def elapsed_ms(self) -> int:
+        return int(max(0.0, (time.perf_counter() - self.started_at) * 1000))
+
+
+async def _pull_first_chunk(iterator: AsyncIterator[bytes]) -> bytes | None:
+    try:
+        return await anext(iterator)
+    except StopAsyncIteration:
+        return None
+
+
+async def _prepend_chunk(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+
+async def _close_stream(iterator: AsyncIterator[bytes]) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception as exc:  # pragma: no cover - best effort
+        logger.debug("candidate_retry(stream): failed to close aborted racer: %s", exc)
+
+
 async def try_candidates_non_stream(
     *,
     candidates: Sequence[CandidateScore | PhysicalModel],
@@ -92,90 +201,114 @@ async def try_candidates_non_stream(
     attempts: list[dict[str, Any]] | None = None,
     outcome: dict[str, Any] | None = None,
 ) -> JSONResponse:
+    """
+    按顺序尝试候选；对开启对冲的逻辑模型 / API Key，首选候选超过对冲延迟仍未返回时，
+    并发请求下一个候选，先成功者胜出（只有它触发 on_success / 计费），另一个被取消。
+    """
     resolved_style = _resolve_api_style(payload, api_style)
     state = routing_state or RoutingStateService(redis=redis)
+    # 一次 pipeline 读取所有候选的失败冷却状态，循环内不再逐个访问 Redis。
+    candidate_states = await state.load_candidate_states(
+        [_unwrap_candidate(c) for c in candidates],
+        include_health=False,
+        include_metrics=False,
+        include_weights=False,
+    )
 
     last_status: int | None = None
     last_error_text: str | None = None
     last_provider_id: str | None = None
     skipped_count = 0
+    position = 0
+
+    def _next_runnable() -> tuple[int, CandidateScore | PhysicalModel, Any] | None:
+        """
+        取下一个可尝试的候选，沿途记录冷却跳过 / 未配置的候选。
+        """
+        nonlocal position, skipped_count, last_status, last_error_text, last_provider_id
+        while position < len(candidates):
+            idx = position
+            position += 1
+            upstream = candidates[idx]
+            cand = _unwrap_candidate(upstream)
+            provider_id = cand.provider_id
+            model_id = cand.model_id
+            base_endpoint = cand.endpoint
+
+            cooldown = candidate_states.cooldown(provider_id)
+            if cooldown.should_skip:
+                skipped_count += 1
+                if attempts is not None:
+                    attempts.append(
+                        {
+                            "idx": idx,
+                            "provider_id": provider_id,
+                            "model_id": model_id,
+                            "transport": None,
+                            "endpoint": base_endpoint,
+                            "success": False,
+                            "retryable": True,
+                            "skipped": True,
+                            "skip_reason": "failure_cooldown",
+                            "status_code": None,
+                            "error_category": "failure_cooldown",
+                            "error_message": None,
+                            "duration_ms": 0,
+                            "cooldown": {
+                                "count": cooldown.count,
+                                "threshold": cooldown.threshold,
+                                "cooldown_seconds": cooldown.cooldown_seconds,
+                            },
+                        }
+                    )
+                logger.warning(
+                    "candidate_retry: skipping provider %s (failures=%d/%d, cooldown=%ds)",
+                    provider_id,
+                    cooldown.count,
+                    cooldown.threshold,
+                    cooldown.cooldown_seconds,
+                )
+                continue
 
-    for idx, upstream in enumerate(candidates):
-        cand = _unwrap_candidate(upstream)
-        provider_id = cand.provider_id
-        model_id = cand.model_id
-        base_endpoint = cand.endpoint
+            provider_cfg = get_provider_config(provider_id)
+            if provider_cfg is None:
+                last_status = status.HTTP_503_SERVICE_UNAVAILABLE
+                last_error_text = f"Provider '{provider_id}' is not configured"
+                last_provider_id = provider_id
+                if attempts is not None:
+                    attempts.append(
+                        {
+                            "idx": idx,
+                            "provider_id": provider_id,
+                            "model_id": model_id,
+                            "transport": None,
+                            "endpoint": base_endpoint,
+                            "success": False,
+                            "retryable": False,
+                            "skipped": False,
+                            "status_code": int(last_status),
+                            "error_category": "provider_not_configured",
+                            "error_message": extract_error_message(last_error_text),
+                            "duration_ms": 0,
+                        }
+                    )
+                continue
 
-        cooldown = await state.get_failure_cooldown_status(provider_id)
-        if cooldown.should_skip:
-            skipped_count += 1
-            if attempts is not None:
-                attempts.append(
-                    {
-                        "idx": idx,
-                        "provider_id": provider_id,
-                        "model_id": model_id,
-                        "transport": None,
-                        "endpoint": base_endpoint,
-                        "success": False,
-                        "retryable": True,
-                        "skipped": True,
-                        "skip_reason": "failure_cooldown",
-                        "status_code": None,
-                        "error_category": "failure_cooldown",
-                        "error_message": None,
-                        "duration_ms": 0,
-                        "cooldown": {
-                            "count": cooldown.count,
-                            "threshold": cooldown.threshold,
-                            "cooldown_seconds": cooldown.cooldown_seconds,
-                        },
-                    }
-                )
-            logger.warning(
-                "candidate_retry: skipping provider %s (failures=%d/%d, cooldown=%ds)",
-                provider_id,
-                cooldown.count,
-                cooldown.threshold,
-                cooldown.cooldown_seconds,
-            )
-            continue
-
-        provider_cfg = get_provider_config(provider_id)
-        if provider_cfg is None:
-            last_status = status.HTTP_503_SERVICE_UNAVAILABLE
-            last_error_text = f"Provider '{provider_id}' is not configured"
-            last_provider_id = provider_id
-            if attempts is not None:
-                attempts.append(
-                    {
-                        "idx": idx,
-                        "provider_id": provider_id,
-                        "model_id": model_id,
-                        "transport": None,
-                        "endpoint": base_endpoint,
-                        "success": False,
-                        "retryable": False,
-                        "skipped": False,
-                        "status_code": int(last_status),
-                        "error_category": "provider_not_configured",
-                        "error_message": extract_error_message(last_error_text),
-                        "duration_ms": 0,
-                    }
-                )
-            continue
+            return idx, upstream, provider_cfg
+        return None
 
-        transport = getattr(provider_cfg, "transport", "http")
-        upstream_api_style = getattr(cand, "api_style", "openai")
-        attempt: dict[str, Any] | None = None
-        start_attempt = time.perf_counter()
+    def _begin(
+        idx: int, upstream: CandidateScore | PhysicalModel, provider_cfg: Any, *, hedged: bool = False
+    ) -> _NonStreamAttempt:
+        cand = _unwrap_candidate(upstream)
+        record: dict[str, Any] | None = None
         if attempts is not None:
-            attempt = {
+            record = {
                 "idx": idx,
-                "provider_id": provider_id,
-                "model_id": model_id,
-                "transport": str(transport),
-                "endpoint": base_endpoint,
+                "provider_id": cand.provider_id,
+                "model_id": cand.model_id,
+                "transport": str(getattr(provider_cfg, "transport", "http")),
+                "endpoint": cand.endpoint,
                 "success": None,
                 "retryable": None,
                 "skipped": False,
@@ -184,54 +317,72 @@ async def try_candidates_non_stream(
                 "error_message": None,
                 "duration_ms": None,
             }
-            attempts.append(attempt)
+            if hedged:
+                record["hedged"] = True
+            attempts.append(record)
+        return _NonStreamAttempt(
+            idx=idx,
+            upstream=upstream,
+            provider_id=cand.provider_id,
+            model_id=cand.model_id,
+            record=record,
+            started_at=time.perf_counter(),
+            hedged=hedged,
+        )
 
+    async def _execute(upstream: CandidateScore | PhysicalModel, provider_cfg: Any) -> Any:
+        cand = _unwrap_candidate(upstream)
+        transport = getattr(provider_cfg, "transport", "http")
         if transport == "claude_cli":
-            result = await execute_claude_cli_transport(
+            return await execute_claude_cli_transport(
                 client=client,
                 redis=redis,
                 db=db,
-                provider_id=provider_id,
-                model_id=model_id,
+                provider_id=cand.provider_id,
+                model_id=cand.model_id,
                 payload=payload,
                 logical_model_id=logical_model_id,
                 api_style=resolved_style,
                 api_key=api_key,
             )
-        elif transport == "sdk":
-            result = await execute_sdk_transport(
+        if transport == "sdk":
+            return await execute_sdk_transport(
                 redis=redis,
                 db=db,
-                provider_id=provider_id,
-                model_id=model_id,
+                provider_id=cand.provider_id,
+                model_id=cand.model_id,
                 payload=payload,
                 logical_model_id=logical_model_id,
                 api_style=resolved_style,
                 api_key=api_key,
             )
-        else:
-            result = await execute_http_transport(
-                client=client,
-                redis=redis,
-                db=db,
-                provider_id=provider_id,
-                model_id=model_id,
-                url=base_endpoint,
-                payload=payload,
-                logical_model_id=logical_model_id,
-                api_style=resolved_style,
-                upstream_api_style=upstream_api_style,
-                api_key=api_key,
-                messages_path_override=messages_path_override,
-                fallback_path_override=fallback_path_override,
-            )
+        return await execute_http_transport(
+            client=client,
+            redis=redis,
+            db=db,
+            provider_id=cand.provider_id,
+            model_id=cand.model_id,
+            url=cand.endpoint,
+            payload=payload,
+            logical_model_id=logical_model_id,
+            api_style=resolved_style,
+            upstream_api_style=getattr(cand, "api_style", "openai"),
+            api_key=api_key,
+            messages_path_override=messages_path_override,
+            fallback_path_override=fallback_path_override,
+        )
 
-        duration_ms = int(max(0.0, (time.perf_counter() - start_attempt) * 1000))
+    async def _record(attempt: _NonStreamAttempt, result: Any) -> None:
+        """
+        记录一次尝试的真实结果（失败计数、失败回调与 attempts 记录），不触发 on_success。
+        """
+        nonlocal last_status, last_error_text, last_provider_id
+        provider_id = attempt.provider_id
+        duration_ms = attempt.elapsed_ms()
         if result.success:
             await state.clear_provider_failure(provider_id)
-            await on_success(provider_id, model_id)
-            if attempt is not None:
-                attempt.update(
+            if attempt.record is not None:
+                attempt.record.update(
                     {
                         "success": True,
                         "retryable": False,
@@ -239,16 +390,7 @@ async def try_candidates_non_stream(
                         "duration_ms": duration_ms,
                     }
                 )
-            if outcome is not None:
-                outcome.update(
-                    {
-                        "success": True,
-                        "provider_id": provider_id,
-                        "model_id": model_id,
-                        "status_code": int(getattr(result.response, "status_code", 200) or 200),
-                    }
-                )
-            return result.response  # type: ignore[return-value]
+            return
 
         last_status = result.status_code
         last_error_text = result.error_text
@@ -258,10 +400,11 @@ async def try_candidates_non_stream(
             _call_failure_hook(on_failure, provider_id, bool(result.retryable))
 
         if penalize and result.retryable and result.status_code in (500, 502, 503, 504, 429):
-            await state.increment_provider_failure(provider_id)
+            failure_count = await state.increment_provider_failure(provider_id)
+            candidate_states.note_failure(provider_id, failure_count)
 
-        if attempt is not None:
-            attempt.update(
+        if attempt.record is not None:
+            attempt.record.update(
                 {
                     "success": False,
                     "retryable": bool(result.retryable),
@@ -272,9 +415,33 @@ async def try_candidates_non_stream(
                 }
             )
 
+    async def _settle(attempt: _NonStreamAttempt, result: Any) -> bool:
+        """
+        记录一次尝试的结果：成功返回 True；可重试失败返回 False；不可重试失败抛出 502。
+        """
+        provider_id = attempt.provider_id
+        model_id = attempt.model_id
+        await _record(attempt, result)
+        if result.success:
+            await on_success(provider_id, model_id)
+            if outcome is not None:
+                outcome.update(
+                    {
+                        "success": True,
+                        "provider_id": provider_id,
+                        "model_id": model_id,
+                        "status_code": int(getattr(result.response, "status_code", 200) or 200),
+                    }
+                )
+            return True
+
         if result.retryable:
-            continue
+            return False
+        _raise_upstream_error(attempt, result)
 
+    def _raise_upstream_error(attempt: _NonStreamAttempt, result: Any) -> NoReturn:
+        provider_id = attempt.provider_id
+        model_id = attempt.model_id
         message = extract_error_message(result.error_text)
         category = str(getattr(result, "error_category", "") or "").strip()
         detail = (
@@ -299,6 +466,90 @@ async def try_candidates_non_stream(
             detail=detail,
         )
 
+    if not _hedging_enabled(logical_model_id, api_key):
+        while (runnable := _next_runnable()) is not None:
+            idx, upstream, provider_cfg = runnable
+            attempt = _begin(idx, upstream, provider_cfg)
+            result = await _execute(upstream, provider_cfg)
+            if await _settle(attempt, result):
+                return result.response  # type: ignore[no-any-return]
+    else:
+        in_flight: dict[asyncio.Task[Any], _NonStreamAttempt] = {}
+
+        def _launch(runnable: tuple[int, CandidateScore | PhysicalModel, Any], *, hedged: bool) -> None:
+            idx, upstream, provider_cfg = runnable
+            attempt = _begin(idx, upstream, provider_cfg, hedged=hedged)
+            in_flight[asyncio.create_task(_execute(upstream, provider_cfg))] = attempt
+
+        def _succeeded(task: asyncio.Task[Any]) -> bool:
+            return task.exception() is None and bool(task.result().success)
+
+        # 已完成但尚未结算的尝试：胜者确定（或抛出 502）后只记录其真实结果。
+        finished: list[tuple[asyncio.Task[Any], _NonStreamAttempt]] = []
+        # 其它尝试仍在途时出现的不可重试失败：先记录，等在途尝试都失败后再抛出。
+        fatal: tuple[_NonStreamAttempt, Any] | None = None
+        try:
+            while True:
+                if not in_flight:
+                    if fatal is not None:
+                        _raise_upstream_error(*fatal)
+                    runnable = _next_runnable()
+                    if runnable is None:
+                        break
+                    _launch(runnable, hedged=False)
+                if fatal is None and len(in_flight) == 1 and position < len(candidates):
+                    # 仅一个请求在途：等到它的对冲延迟，仍未返回则并发请求下一个候选。
+                    (primary,) = in_flight.values()
+                    delay = _hedge_delay_seconds(primary.upstream) - primary.elapsed_ms() / 1000.0
+                    done, _ = await asyncio.wait(in_flight, timeout=max(0.0, delay))
+                    if not done and (runnable := _next_runnable()) is not None:
+                        logger.info(
+                            "candidate_retry: hedging provider=%s after %dms (primary=%s)",
+                            _unwrap_candidate(runnable[1]).provider_id,
+                            primary.elapsed_ms(),
+                            primary.provider_id,
+                        )
+                        _launch(runnable, hedged=True)
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                # 同时完成时优先采用成功的结果。
+                finished = [(task, in_flight.pop(task)) for task in sorted(done, key=lambda t: not _succeeded(t))]
+                while finished:
+                    task, attempt = finished.pop(0)
+                    result = task.result()
+                    if not result.success and not result.retryable and (in_flight or finished):
+                        await _record(attempt, result)
+                        fatal = fatal or (attempt, result)
+                        continue
+                    if await _settle(attempt, result):
+                        return result.response  # type: ignore[no-any-return]
+        finally:
+            # 胜出、出错或请求被取消时，取消仍在途的尝试：它们不触发 on_success，也不会计费。
+            for task, attempt in in_flight.items():
+                task.cancel()
+                if attempt.record is not None:
+                    attempt.record.update(
+                        {
+                            "success": False,
+                            "retryable": True,
+                            "error_category": "hedge_cancelled",
+                            "duration_ms": attempt.elapsed_ms(),
+                        }
+                    )
+            for task, attempt in finished:
+                if task.exception() is None:
+                    await _record(attempt, task.result())
+                elif attempt.record is not None:
+                    attempt.record.update(
+                        {
+                            "success": False,
+                            "retryable": True,
+                            "error_message": str(task.exception())[:2000],
+                            "duration_ms": attempt.elapsed_ms(),
+                        }
+                    )
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
     message = f"All upstream providers failed for logical model '{logical_model_id}'"
     details: list[str] = []
     if request_id:
@@ -360,6 +611,10 @@ async def try_candidates_stream(
     attempts: list[dict[str, Any]] | None = None,
     outcome: dict[str, Any] | None = None,
 ) -> AsyncIterator[bytes]:
+    """
+    按顺序尝试候选；对开启竞速的逻辑模型，先同时请求排名靠前的若干候选，
+    以首个数据块（on_first_chunk 触发点）决出胜者并继续转发，其余立即中止。
+    """
     from app.api.v1.chat.transport_handlers_stream import (
         execute_claude_cli_stream,
         execute_http_stream,
@@ -368,89 +623,109 @@ async def try_candidates_stream(
 
     resolved_style = _resolve_api_style(payload, api_style)
     state = routing_state or RoutingStateService(redis=redis)
+    # 一次 pipeline 读取所有候选的失败冷却状态，循环内不再逐个访问 Redis。
+    candidate_states = await state.load_candidate_states(
+        [_unwrap_candidate(c) for c in candidates],
+        include_health=False,
+        include_metrics=False,
+        include_weights=False,
+    )
 
     last_status: int | None = None
     last_error_text: str | None = None
     last_provider_id: str | None = None
     skipped_count = 0
+    position = 0
+
+    def _next_runnable() -> tuple[int, CandidateScore | PhysicalModel, Any] | None:
+        """
+        取下一个可尝试的候选，沿途记录冷却跳过 / 未配置的候选。
+        """
+        nonlocal position, skipped_count, last_status, last_error_text, last_provider_id
+        while position < len(candidates):
+            idx = position
+            position += 1
+            upstream = candidates[idx]
+            cand = _unwrap_candidate(upstream)
+            provider_id = cand.provider_id
+            model_id = cand.model_id
+            base_endpoint = cand.endpoint
+
+            cooldown = candidate_states.cooldown(provider_id)
+            if cooldown.should_skip:
+                skipped_count += 1
+                if attempts is not None:
+                    attempts.append(
+                        {
+                            "idx": idx,
+                            "provider_id": provider_id,
+                            "model_id": model_id,
+                            "transport": None,
+                            "endpoint": base_endpoint,
+                            "success": False,
+                            "retryable": True,
+                            "skipped": True,
+                            "skip_reason": "failure_cooldown",
+                            "status_code": None,
+                            "error_category": "failure_cooldown",
+                            "error_message": None,
+                            "duration_ms": 0,
+                            "cooldown": {
+                                "count": cooldown.count,
+                                "threshold": cooldown.threshold,
+                                "cooldown_seconds": cooldown.cooldown_seconds,
+                            },
+                        }
+                    )
+                logger.warning(
+                    "candidate_retry(stream): skipping provider %s (failures=%d/%d, cooldown=%ds)",
+                    provider_id,
+                    cooldown.count,
+                    cooldown.threshold,
+                    cooldown.cooldown_seconds,
+                )
+                continue
+
+            provider_cfg = get_provider_config(provider_id)
+            if provider_cfg is None:
+                last_status = status.HTTP_503_SERVICE_UNAVAILABLE
+                last_error_text = f"Provider '{provider_id}' is not configured"
+                last_provider_id = provider_id
+                if attempts is not None:
+                    attempts.append(
+                        {
+                            "idx": idx,
+                            "provider_id": provider_id,
+                            "model_id": model_id,
+                            "transport": None,
+                            "endpoint": base_endpoint,
+                            "success": False,
+                            "retryable": False,
+                            "skipped": False,
+                            "status_code": int(last_status),
+                            "error_category": "provider_not_configured",
+                            "error_message": extract_error_message(last_error_text),
+                            "duration_ms": 0,
+                        }
+                    )
+                continue
+
+            return idx, upstream, provider_cfg
+        return None
 
-    for idx, upstream in enumerate(candidates):
+    def _open(idx: int, upstream: CandidateScore | PhysicalModel, provider_cfg: Any) -> _StreamAttempt:
         cand = _unwrap_candidate(upstream)
         provider_id = cand.provider_id
         model_id = cand.model_id
-        base_endpoint = cand.endpoint
-        upstream_api_style = getattr(cand, "api_style", "openai")
-        is_last = idx == len(candidates) - 1
-
-        cooldown = await state.get_failure_cooldown_status(provider_id)
-        if cooldown.should_skip:
-            skipped_count += 1
-            if attempts is not None:
-                attempts.append(
-                    {
-                        "idx": idx,
-                        "provider_id": provider_id,
-                        "model_id": model_id,
-                        "transport": None,
-                        "endpoint": base_endpoint,
-                        "success": False,
-                        "retryable": True,
-                        "skipped": True,
-                        "skip_reason": "failure_cooldown",
-                        "status_code": None,
-                        "error_category": "failure_cooldown",
-                        "error_message": None,
-                        "duration_ms": 0,
-                        "cooldown": {
-                            "count": cooldown.count,
-                            "threshold": cooldown.threshold,
-                            "cooldown_seconds": cooldown.cooldown_seconds,
-                        },
-                    }
-                )
-            logger.warning(
-                "candidate_retry(stream): skipping provider %s (failures=%d/%d, cooldown=%ds)",
-                provider_id,
-                cooldown.count,
-                cooldown.threshold,
-                cooldown.cooldown_seconds,
-            )
-            continue
-
-        provider_cfg = get_provider_config(provider_id)
-        if provider_cfg is None:
-            last_status = status.HTTP_503_SERVICE_UNAVAILABLE
-            last_error_text = f"Provider '{provider_id}' is not configured"
-            last_provider_id = provider_id
-            if attempts is not None:
-                attempts.append(
-                    {
-                        "idx": idx,
-                        "provider_id": provider_id,
-                        "model_id": model_id,
-                        "transport": None,
-                        "endpoint": base_endpoint,
-                        "success": False,
-                        "retryable": False,
-                        "skipped": False,
-                        "status_code": int(last_status),
-                        "error_category": "provider_not_configured",
-                        "error_message": extract_error_message(last_error_text),
-                        "duration_ms": 0,
-                    }
-                )
-            continue
-
         transport = getattr(provider_cfg, "transport", "http")
-        attempt: dict[str, Any] | None = None
-        start_attempt = time.perf_counter()
+        record: dict[str, Any] | None = None
         if attempts is not None:
-            attempt = {
+            record = {
                 "idx": idx,
                 "provider_id": provider_id,
                 "model_id": model_id,
                 "transport": str(transport),
-                "endpoint": base_endpoint,
+                "endpoint": cand.endpoint,
                 "success": None,
                 "retryable": None,
                 "skipped": False,
@@ -460,7 +735,8 @@ async def try_candidates_stream(
                 "ttfb_ms": None,
                 "duration_ms": None,
             }
-            attempts.append(attempt)
+            attempts.append(record)
+        started_at = time.perf_counter()
 
         if transport == "claude_cli":
             iterator = execute_claude_cli_stream(
@@ -492,16 +768,171 @@ async def try_candidates_stream(
                 db=db,
                 provider_id=provider_id,
                 model_id=model_id,
-                url=base_endpoint,
+                url=cand.endpoint,
                 payload=payload,
                 logical_model_id=logical_model_id,
                 api_style=resolved_style,
-                upstream_api_style=upstream_api_style,
+                upstream_api_style=getattr(cand, "api_style", "openai"),
                 api_key=api_key,
                 messages_path_override=messages_path_override,
                 fallback_path_override=fallback_path_override,
             )
+        return _StreamAttempt(
+            idx=idx,
+            provider_id=provider_id,
+            model_id=model_id,
+            iterator=iterator,
+            record=record,
+            started_at=started_at,
+        )
 
+    async def _note_failure(attempt: _StreamAttempt, exc: Exception) -> bool:
+        """
+        记录一次失败（失败钩子 / 冷却计数 / attempts），返回是否可重试。
+        """
+        nonlocal last_status, last_error_text, last_provider_id
+        provider_id = attempt.provider_id
+        error_status = getattr(exc, "status_code", None)
+        error_text = str(exc)
+        last_status = error_status
+        last_error_text = error_text
+        last_provider_id = provider_id
+
+        retryable = _is_stream_error_retryable(exc, error_status)
+        penalize = bool(getattr(exc, "penalize", True))
+        if penalize:
+            _call_failure_hook(on_failure, provider_id, bool(retryable))
+
+        if penalize and retryable and error_status in (500, 502, 503, 504, 429):
+            failure_count = await state.increment_provider_failure(provider_id)
+            candidate_states.note_failure(provider_id, failure_count)
+
+        if attempt.record is not None:
+            attempt.record.update(
+                {
+                    "success": False,
+                    "retryable": bool(retryable),
+                    "status_code": error_status,
+                    "error_category": str(getattr(exc, "error_category", "") or "") or None,
+                    "error_message": extract_error_message(error_text)[:2000],
+                    "duration_ms": attempt.elapsed_ms(),
+                }
+            )
+        return bool(retryable)
+
+    def _upstream_error_chunk(attempt: _StreamAttempt, exc: Exception) -> bytes:
+        error_status = getattr(exc, "status_code", None)
+        message = extract_error_message(str(exc))
+        if outcome is not None:
+            outcome.update(
+                {
+                    "success": False,
+                    "provider_id": attempt.provider_id,
+                    "model_id": attempt.model_id,
+                    "status_code": 200,
+                    "upstream_status": error_status,
+                    "error_message": message[:2000],
+                }
+            )
+        error_payload = {
+            "error": {
+                "type": "upstream_error",
+                "status": error_status,
+                "message": message,
+                "provider_id": attempt.provider_id,
+                "request_id": request_id,
+            }
+        }
+        return f"data: {json.dumps(error_payload, ensure_ascii=False)}\n\n".encode()
+
+    pending: _StreamAttempt | None = None
+    pending_first: bytes | None = None
+    # 预算不足、未能加入竞速的候选：留给顺序重试阶段，不会被跳过。
+    deferred: tuple[int, CandidateScore | PhysicalModel, Any] | None = None
+
+    race_budget = _stream_race_budget(logical_model_id)
+    if race_budget > 0 and settings.stream_race_width > 1:
+        # 首字节竞速：同时请求排名靠前的候选，先产出首个数据块者胜出，其余立即中止。
+        # 每个额外请求都要在该逻辑模型的预算窗口里预占，预算耗尽则只保留已启动的候选。
+        racers: list[_StreamAttempt] = []
+        if (runnable := _next_runnable()) is not None:
+            racers.append(_open(*runnable))
+        while racers and len(racers) < settings.stream_race_width and position < len(candidates):
+            if (runnable := _next_runnable()) is None:
+                break
+            if not await _reserve_race_slot(redis, logical_model_id, race_budget):
+                deferred = runnable
+                break
+            racers.append(_open(*runnable))
+
+        if len(racers) == 1:
+            pending = racers[0]
+        elif racers:
+            for racer in racers:
+                if racer.record is not None:
+                    racer.record["raced"] = True
+            pulls = {asyncio.create_task(_pull_first_chunk(r.iterator)): r for r in racers}
+            last_failure: tuple[_StreamAttempt, Exception, bool] | None = None
+            try:
+                while pulls and pending is None:
+                    done, _ = await asyncio.wait(pulls, return_when=asyncio.FIRST_COMPLETED)
+                    # 同时完成时优先采用成功的结果。
+                    for task in sorted(done, key=lambda t: t.exception() is not None):
+                        racer = pulls.pop(task)
+                        exc = task.exception()
+                        if exc is None:
+                            pending, pending_first = racer, task.result()
+                            if racer.record is not None:
+                                racer.record["ttfb_ms"] = racer.elapsed_ms()
+                            break
+                        if not isinstance(exc, Exception):
+                            raise exc
+                        last_failure = (racer, exc, await _note_failure(racer, exc))
+            finally:
+                # 胜出、全部失败或请求被取消时中止其余候选：它们不会触发 on_first_chunk，也不会计费。
+                for task, racer in pulls.items():
+                    task.cancel()
+                    if racer.record is not None:
+                        racer.record.update(
+                            {
+                                "success": False,
+                                "retryable": True,
+                                "error_category": "race_cancelled",
+                                "duration_ms": racer.elapsed_ms(),
+                            }
+                        )
+                if pulls:
+                    await asyncio.gather(*pulls, return_exceptions=True)
+                    for racer in pulls.values():
+                        await _close_stream(racer.iterator)
+
+            if pending is not None:
+                logger.info(
+                    "candidate_retry(stream): race won by provider=%s after %dms (racers=%d)",
+                    pending.provider_id,
+                    pending.elapsed_ms(),
+                    len(racers),
+                )
+            elif last_failure is not None:
+                failed, exc, retryable = last_failure
+                if not retryable or (deferred is None and failed.idx == len(candidates) - 1):
+                    yield _upstream_error_chunk(failed, exc)
+                    return
+
+    while True:
+        if pending is not None:
+            attempt, first = pending, pending_first
+            pending, pending_first = None, None
+        else:
+            runnable, deferred = deferred or _next_runnable(), None
+            if runnable is None:
+                break
+            attempt, first = _open(*runnable), None
+        provider_id = attempt.provider_id
+        model_id = attempt.model_id
+        is_last = attempt.idx == len(candidates) - 1
+
+        iterator = attempt.iterator if first is None else _prepend_chunk(first, attempt.iterator)
         first_chunk_seen = False
         try:
             async for chunk in iterator:
@@ -509,23 +940,19 @@ async def try_candidates_stream(
                     first_chunk_seen = True
                     await state.clear_provider_failure(provider_id)
                     await on_first_chunk(provider_id, model_id)
-                    if attempt is not None:
-                        attempt["ttfb_ms"] = int(
-                            max(0.0, (time.perf_counter() - start_attempt) * 1000)
-                        )
+                    if attempt.record is not None and attempt.record.get("ttfb_ms") is None:
+                        attempt.record["ttfb_ms"] = attempt.elapsed_ms()
                 yield chunk
 
             if on_stream_complete is not None:
                 on_stream_complete(provider_id)
-            if attempt is not None:
-                attempt.update(
+            if attempt.record is not None:
+                attempt.record.update(
                     {
                         "success": True,
                         "retryable": False,
                         "status_code": 200,
-                        "duration_ms": int(
-                            max(0.0, (time.perf_counter() - start_attempt) * 1000)
-                        ),
+                        "duration_ms": attempt.elapsed_ms(),
                     }
                 )
             if outcome is not None:
@@ -539,72 +966,10 @@ async def try_candidates_stream(
                 )
             return
         except Exception as exc:
-            error_status = getattr(exc, "status_code", None)
-            error_text = str(exc)
-            last_status = error_status
-            last_error_text = error_text
-            last_provider_id = provider_id
-
-            retryable = _is_stream_error_retryable(exc, error_status)
-            penalize = bool(getattr(exc, "penalize", True))
-            if penalize:
-                _call_failure_hook(on_failure, provider_id, bool(retryable))
-
-            if penalize and retryable and error_status in (500, 502, 503, 504, 429):
-                await state.increment_provider_failure(provider_id)
-
+            retryable = await _note_failure(attempt, exc)
             if retryable and not is_last:
-                if attempt is not None:
-                    attempt.update(
-                        {
-                            "success": False,
-                            "retryable": True,
-                            "status_code": error_status,
-                            "error_category": str(getattr(exc, "error_category", "") or "") or None,
-                            "error_message": extract_error_message(error_text)[:2000],
-                            "duration_ms": int(
-                                max(0.0, (time.perf_counter() - start_attempt) * 1000)
-                            ),
-                        }
-                    )
                 continue
-
-            message = extract_error_message(error_text)
-            if attempt is not None:
-                attempt.update(
-                    {
-                        "success": False,
-                        "retryable": bool(retryable),
-                        "status_code": error_status,
-                        "error_category": str(getattr(exc, "error_category", "") or "") or None,
-                        "error_message": message[:2000],
-                        "duration_ms": int(
-                            max(0.0, (time.perf_counter() - start_attempt) * 1000)
-                        ),
-                    }
-                )
-            if outcome is not None:
-                outcome.update(
-                    {
-                        "success": False,
-                        "provider_id": provider_id,
-                        "model_id": model_id,
-                        "status_code": 200,
-                        "upstream_status": error_status,
-                        "error_message": message[:2000],
-                    }
-                )
-            error_payload = {
-                "error": {
-                    "type": "upstream_error",
-                    "status": error_status,
-                    "message": message,
-                    "provider_id": provider_id,
-                    "request_id": request_id,
-                }
-            }
-            error_chunk = f"data: {json.dumps(error_payload, ensure_ascii=False)}\n\n".encode()
-            yield error_chunk
+            yield _upstream_error_chunk(attempt, exc)
             return
 
     message = f"All upstream providers failed for logical model '{logical_model_id}'"
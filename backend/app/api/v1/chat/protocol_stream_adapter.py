@@ -15,6 +15,7 @@ from typing import Any, Literal, cast
 from fastapi.responses import StreamingResponse
 
 from app.services.chat_routing_service import OpenAIToClaudeStreamAdapter, _wrap_chat_stream_response
+from app.services.sse_parser import SSEFramer
 
 ApiStyle = Literal["openai", "claude", "responses"]
 
@@ -35,7 +36,7 @@ class ClaudeToOpenAIStreamAdapter:
 
     def __init__(self, model: str | None) -> None:
         self.model = model
-        self.buffer = ""
+        self.framer = SSEFramer()
         self.started = False
         self.sent_role = False
         self.finish_reason: str | None = None
@@ -60,31 +61,12 @@ class ClaudeToOpenAIStreamAdapter:
 
     def process_chunk(self, chunk: bytes) -> list[bytes]:
         outputs: list[bytes] = []
-        try:
-            decoded = chunk.decode("utf-8")
-        except UnicodeDecodeError:
-            return outputs
         if self.had_error:
             return outputs
-        self.buffer += decoded
-
-        while "\n\n" in self.buffer:
-            raw_event, self.buffer = self.buffer.split("\n\n", 1)
-            raw_event = raw_event.strip()
-            if not raw_event:
-                continue
 
-            event_type: str | None = None
-            data_lines: list[str] = []
-            for line in raw_event.splitlines():
-                if line.startswith("event:"):
-                    event_type = line[len("event:") :].strip()
-                elif line.startswith("data:"):
-                    data_lines.append(line[len("data:") :].strip())
-
-            if not data_lines:
-                continue
-            data_str = "\n".join(data_lines).strip()
+        for event in self.framer.feed_events(chunk):
+            event_type = event.event
+            data_str = event.data.strip()
             if not data_str:
                 continue
 
@@ -26,8 +26,9 @@ except ModuleNotFoundError:  # pragma: no cover
 
 from sqlalchemy.orm import Session as DbSession
 
-from app.api.v1.chat.routing_state import RoutingStateService
-from app.logging_config import logger
+from app.api.v1.chat.routing_state import CandidateRoutingState, RoutingStateService
+from app.db.async_session import async_session_for
+from app.logging_config import log_sampled, logger
 from app.models import Provider, ProviderModel
 from app.routing.mapper import select_candidate_upstreams
 from app.routing.scheduler import CandidateScore, choose_upstream
@@ -37,9 +38,10 @@ from app.schemas import (
     PhysicalModel,
     RoutingMetrics,
 )
-from app.services.bandit_routing_weight_service import build_bandit_routing_weights
+from app.services.bandit_routing_weight_service import abuild_bandit_routing_weights
 from app.services.chat_routing_service import _build_dynamic_logical_model_for_group, _build_ordered_candidates
-from app.services.credit_service import estimate_request_cost_credits
+from app.services.credit_service import aestimate_request_cost_credits
+from app.services.provider_model_snapshot import get_provider_model_snapshot
 from app.settings import settings
 from app.storage.redis_service import get_logical_model
 
@@ -49,6 +51,36 @@ def _status_worse(a: Any, b: Any) -> bool:
     return order.get(getattr(b, "value", str(b)), 0) > order.get(getattr(a, "value", str(a)), 0)
 
 
+def _any_model_disabled_stmt(model_ids: list[str], provider_ids: set[str]):
+    return (
+        select(ProviderModel.model_id)
+        .join(Provider, ProviderModel.provider_id == Provider.id)
+        .where(Provider.provider_id.in_(list(provider_ids)))
+        .where(ProviderModel.model_id.in_(model_ids))
+        .where(ProviderModel.disabled.is_(True))
+        .limit(1)
+    )
+
+
+def _disabled_pairs_stmt(provider_ids: set[str], model_ids: set[str]):
+    return (
+        select(Provider.provider_id, ProviderModel.model_id)
+        .select_from(ProviderModel)
+        .join(Provider, ProviderModel.provider_id == Provider.id)
+        .where(Provider.provider_id.in_(list(provider_ids)))
+        .where(ProviderModel.model_id.in_(list(model_ids)))
+        .where(ProviderModel.disabled.is_(True))
+    )
+
+
+def _collect_disabled_pairs(rows: Any) -> set[tuple[str, str]]:
+    disabled: set[tuple[str, str]] = set()
+    for provider_id, model_id in rows:
+        if isinstance(provider_id, str) and isinstance(model_id, str):
+            disabled.add((provider_id, model_id))
+    return disabled
+
+
 def _infer_required_capabilities_from_request_payload(
     request_payload: dict[str, Any] | None,
 ) -> set[ModelCapability]:
@@ -141,14 +173,7 @@ class ProviderSelector:
             return False
         try:
             rows = (
-                self.db.execute(
-                    select(ProviderModel.model_id)
-                    .join(Provider, ProviderModel.provider_id == Provider.id)
-                    .where(Provider.provider_id.in_(list(provider_ids)))
-                    .where(ProviderModel.model_id.in_(model_ids))
-                    .where(ProviderModel.disabled.is_(True))
-                    .limit(1)
-                )
+                self.db.execute(_any_model_disabled_stmt(model_ids, provider_ids))
                 .scalars()
                 .all()
             )
@@ -161,6 +186,37 @@ class ProviderSelector:
             )
             return False
 
+    async def _ais_any_model_disabled(
+        self,
+        *,
+        model_ids: list[str],
+        provider_ids: set[str],
+    ) -> bool:
+        """
+        _is_any_model_disabled 的异步版本：优先查进程内快照，其次走异步 engine，最后回退到同步查询。
+        """
+        if not model_ids or not provider_ids:
+            return False
+        snapshot = get_provider_model_snapshot(self.db)
+        if snapshot is not None:
+            return snapshot.any_disabled(model_ids, provider_ids)
+        factory = async_session_for(self.db)
+        if factory is None:
+            return self._is_any_model_disabled(model_ids=model_ids, provider_ids=provider_ids)
+        try:
+            async with factory() as session:
+                rows = (
+                    await session.execute(_any_model_disabled_stmt(model_ids, provider_ids))
+                ).scalars().all()
+            return bool(rows)
+        except Exception:
+            logger.exception(
+                "provider_selector: failed to check model disabled state for model_ids=%s providers=%s",
+                model_ids,
+                sorted(provider_ids),
+            )
+            return False
+
     def _load_disabled_pairs(
         self,
         *,
@@ -170,25 +226,42 @@ class ProviderSelector:
         if not provider_ids or not model_ids:
             return set()
         try:
-            rows = self.db.execute(
-                select(Provider.provider_id, ProviderModel.model_id)
-                .select_from(ProviderModel)
-                .join(Provider, ProviderModel.provider_id == Provider.id)
-                .where(Provider.provider_id.in_(list(provider_ids)))
-                .where(ProviderModel.model_id.in_(list(model_ids)))
-                .where(ProviderModel.disabled.is_(True))
-            ).all()
+            rows = self.db.execute(_disabled_pairs_stmt(provider_ids, model_ids)).all()
+        except Exception:
+            logger.exception(
+                "provider_selector: failed to load disabled model pairs for providers=%s",
+                sorted(provider_ids),
+            )
+            return set()
+        return _collect_disabled_pairs(rows)
+
+    async def _aload_disabled_pairs(
+        self,
+        *,
+        provider_ids: set[str],
+        model_ids: set[str],
+    ) -> set[tuple[str, str]]:
+        """
+        _load_disabled_pairs 的异步版本：优先查进程内快照，其次走异步 engine，最后回退到同步查询。
+        """
+        if not provider_ids or not model_ids:
+            return set()
+        snapshot = get_provider_model_snapshot(self.db)
+        if snapshot is not None:
+            return snapshot.disabled_pairs_for(provider_ids, model_ids)
+        factory = async_session_for(self.db)
+        if factory is None:
+            return self._load_disabled_pairs(provider_ids=provider_ids, model_ids=model_ids)
+        try:
+            async with factory() as session:
+                rows = (await session.execute(_disabled_pairs_stmt(provider_ids, model_ids))).all()
         except Exception:
             logger.exception(
                 "provider_selector: failed to load disabled model pairs for providers=%s",
                 sorted(provider_ids),
             )
             return set()
-        disabled: set[tuple[str, str]] = set()
-        for provider_id, model_id in rows:
-            if isinstance(provider_id, str) and isinstance(model_id, str):
-                disabled.add((provider_id, model_id))
-        return disabled
+        return _collect_disabled_pairs(rows)
 
     async def check_candidate_availability(
         self,
@@ -253,9 +326,9 @@ class ProviderSelector:
                     parsed = None
                 if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
                     return list(parsed)
-        # Pre-load disabled pairs for all relevant providers to avoid repetitive DB queries?
-        # Optimization: We do it per model for now as the list is small.
-
+        # 第一阶段：解析逻辑模型并完成静态过滤（能力 / 授权 / API 风格 / 禁用对），
+        # 收集所有候选，以便第二阶段一次性批量读取路由状态。
+        resolved: list[tuple[str, LogicalModel, list[PhysicalModel]]] = []
         for model_id in candidate_logical_models:
             try:
                 # 1) Resolve
@@ -299,7 +372,7 @@ class ProviderSelector:
                     candidates = non_responses
 
                 # 4) Disabled pairs
-                disabled_pairs = self._load_disabled_pairs(
+                disabled_pairs = await self._aload_disabled_pairs(
                     provider_ids={c.provider_id for c in candidates},
                     model_ids={c.model_id for c in candidates},
                 )
@@ -308,17 +381,40 @@ class ProviderSelector:
                         c for c in candidates if (c.provider_id, c.model_id) not in disabled_pairs
                     ]
 
-                if not candidates:
-                    continue
+                if candidates:
+                    resolved.append((model_id, logical_model, candidates))
+            except Exception:
+                # Any failure in resolution or check means this model is not available.
+                logger.debug(
+                    "provider_selector: model unavailable during resolution (model=%s)",
+                    model_id,
+                    exc_info=True,
+                )
+                continue
+
+        # 第二阶段：所有候选 Provider 的冷却 / 健康状态合并为一次 pipeline 读取。
+        health_check_enabled = bool(settings.enable_provider_health_check)
+        candidate_states: CandidateRoutingState | None = None
+        if resolved and self.redis is not object:
+            try:
+                candidate_states = await self.routing_state.load_candidate_states(
+                    [c for _, _, cands in resolved for c in cands],
+                    include_health=health_check_enabled,
+                    include_metrics=False,
+                    include_weights=False,
+                )
+            except Exception:
+                candidate_states = None
 
+        for model_id, logical_model, candidates in resolved:
+            try:
                 # 4.5) Failure cooldown / routing_state penalties
-                if self.redis is not object:
-                    skipped_providers: set[str] = set()
-                    provider_ids = {c.provider_id for c in candidates}
-                    for pid in provider_ids:
-                        status_obj = await self.routing_state.get_failure_cooldown_status(pid)
-                        if status_obj.should_skip:
-                            skipped_providers.add(pid)
+                if candidate_states is not None:
+                    skipped_providers = {
+                        pid
+                        for pid in {c.provider_id for c in candidates}
+                        if candidate_states.cooldown(pid).should_skip
+                    }
                     if skipped_providers:
                         candidates = [c for c in candidates if c.provider_id not in skipped_providers]
 
@@ -327,12 +423,12 @@ class ProviderSelector:
 
                 # 5) Health check
                 healthy_or_unknown_providers: set[str] | None = None
-                if settings.enable_provider_health_check and self.redis is not object:
+                if health_check_enabled and candidate_states is not None:
                     down_providers: set[str] = set()
                     degraded_providers: set[str] = set()
                     healthy_or_unknown_providers = set()
                     for cand in candidates:
-                        health = await self.routing_state.get_cached_health_status(cand.provider_id)
+                        health = candidate_states.health_by_provider.get(cand.provider_id)
                         if health is None:
                             healthy_or_unknown_providers.add(cand.provider_id)
                             continue
@@ -368,7 +464,7 @@ class ProviderSelector:
 
                     feasible = False
                     for cand in budget_candidates:
-                        cost = estimate_request_cost_credits(
+                        cost = await aestimate_request_cost_credits(
                             self.db,
                             logical_model_name=logical_model.logical_id,
                             provider_id=cand.provider_id,
@@ -385,7 +481,6 @@ class ProviderSelector:
                     available.append(model_id)
 
             except Exception:
-                # Any failure in resolution or check means this model is not available.
                 continue
 
         if cache_key and cache_ttl > 0 and self.redis is not object:
@@ -439,7 +534,7 @@ class ProviderSelector:
             model_ids_to_check: list[str] = [lookup_model_id]
             if requested_model_str and requested_model_str not in model_ids_to_check:
                 model_ids_to_check.append(requested_model_str)
-            if self._is_any_model_disabled(
+            if await self._ais_any_model_disabled(
                 model_ids=model_ids_to_check, provider_ids=effective_provider_ids
             ):
                 raise HTTPException(
@@ -468,7 +563,7 @@ class ProviderSelector:
                 )
 
         # Provider owner 的“模型禁用”过滤：禁用的 provider+model 不参与路由。
-        disabled_pairs = self._load_disabled_pairs(
+        disabled_pairs = await self._aload_disabled_pairs(
             provider_ids={c.provider_id for c in candidates},
             model_ids={c.model_id for c in candidates},
         )
@@ -483,12 +578,21 @@ class ProviderSelector:
                 detail={"message": "该模型已被禁用"},
             )
 
+        # 健康 / 路由指标 / 动态权重通过一次 pipeline 批量读取。
+        health_check_enabled = settings.enable_provider_health_check and self.redis is not object
+        candidate_states = await self.routing_state.load_candidate_states(
+            candidates,
+            logical_model_id=logical_model.logical_id,
+            include_cooldown=False,
+            include_health=bool(health_check_enabled),
+        )
+
         # Optional: drop obvious down providers based on cached health.
         health_by_provider: dict[str, Any] = {}
-        if settings.enable_provider_health_check and self.redis is not object:
+        if health_check_enabled:
             down_providers: set[str] = set()
             for cand in candidates:
-                health = await self.routing_state.get_cached_health_status(cand.provider_id)
+                health = candidate_states.health_by_provider.get(cand.provider_id)
                 if health is None:
                     continue
                 health_by_provider[cand.provider_id] = health
@@ -497,21 +601,26 @@ class ProviderSelector:
             if down_providers:
                 filtered = [c for c in candidates if c.provider_id not in down_providers]
                 if filtered:
-                    logger.info(
+                    down_sorted = sorted(down_providers)
+                    log_sampled(
+                        logger,
+                        ("provider_selector.filtered_down", *down_sorted),
                         "provider_selector: filtered down providers by cached health: %s",
-                        sorted(down_providers),
+                        down_sorted,
                     )
                     candidates = filtered
 
         base_weights: dict[str, float] = {c.provider_id: c.base_weight for c in candidates}
+        active_provider_ids = {c.provider_id for c in candidates}
 
-        metrics_by_provider = await self.routing_state.load_metrics_for_candidates(
-            logical_model.logical_id, candidates
-        )
+        metrics_by_provider = {
+            pid: metrics
+            for pid, metrics in candidate_states.metrics_by_provider.items()
+            if pid in active_provider_ids
+        }
 
         # Overlay cached health onto metrics so the scheduler can penalize degraded providers.
         if settings.enable_provider_health_check and health_by_provider:
-            active_provider_ids = {c.provider_id for c in candidates}
             for pid, health in health_by_provider.items():
                 if pid not in active_provider_ids:
                     continue
@@ -533,9 +642,11 @@ class ProviderSelector:
                     if _status_worse(existing.status, health.status):
                         metrics_by_provider[pid] = existing.model_copy(update={"status": health.status})
 
-        dynamic_weights = await self.routing_state.load_dynamic_weights(
-            logical_model.logical_id, candidates
-        )
+        dynamic_weights = {
+            pid: weight
+            for pid, weight in candidate_states.dynamic_weights.items()
+            if pid in active_provider_ids
+        }
         effective_dynamic_weights = dynamic_weights
         if (
             settings.enable_bandit_routing_weight
@@ -545,7 +656,7 @@ class ProviderSelector:
             and bandit_user_text.strip()
         ):
             try:
-                policy_result = build_bandit_routing_weights(
+                policy_result = await abuild_bandit_routing_weights(
                     self.db,
                     project_id=bandit_project_id,
                     assistant_id=bandit_assistant_id,
@@ -622,7 +733,7 @@ class ProviderSelector:
             model_ids_to_check: list[str] = [lookup_model_id]
             if requested_model_str and requested_model_str not in model_ids_to_check:
                 model_ids_to_check.append(requested_model_str)
-            if self._is_any_model_disabled(
+            if await self._ais_any_model_disabled(
                 model_ids=model_ids_to_check, provider_ids=allowed_provider_ids
             ):
                 raise HTTPException(
@@ -14,7 +14,7 @@ import json
 import time
 from collections.abc import AsyncIterator, Callable
 from typing import Any
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import httpx
 from fastapi import HTTPException
@@ -28,17 +28,22 @@ except ModuleNotFoundError:  # pragma: no cover
 from sqlalchemy import select
 from sqlalchemy.orm import Session as DbSession
 
-from app.api.v1.chat.billing import record_completion_usage, record_stream_usage
+from app.api.v1.chat.billing import (
+    record_completion_usage,
+    record_stream_usage,
+    record_stream_usage_reconciliation,
+)
 from app.api.v1.chat.candidate_retry import try_candidates_non_stream, try_candidates_stream
 from app.api.v1.chat.middleware import apply_response_moderation
 from app.api.v1.chat.provider_selector import ProviderSelectionResult, ProviderSelector
 from app.api.v1.chat.routing_state import RoutingStateService
+from app.api.v1.chat.stream_usage_tap import StreamUsageTap
 from app.api.v1.chat.upstream_error_classifier import extract_error_message
 from app.auth import AuthenticatedAPIKey
 from app.logging_config import logger
 from app.models import Provider
 from app.services.metrics_service import record_provider_token_usage
-from app.services.request_log_service import append_request_log, build_request_log_entry
+from app.services.request_log_service import build_request_log_entry, enqueue_request_log
 from app.settings import settings
 
 
@@ -179,7 +184,7 @@ class RequestHandler:
             )
         except HTTPException as exc:
             if log_request:
-                await append_request_log(
+                await enqueue_request_log(
                     self.redis,
                     user_id=str(self.api_key.user_id),
                     entry=build_request_log_entry(
@@ -224,7 +229,7 @@ class RequestHandler:
             )
         except HTTPException as exc:
             if log_request:
-                await append_request_log(
+                await enqueue_request_log(
                     self.redis,
                     user_id=str(self.api_key.user_id),
                     entry=build_request_log_entry(
@@ -272,7 +277,7 @@ class RequestHandler:
             )
 
         if log_request:
-            await append_request_log(
+            await enqueue_request_log(
                 self.redis,
                 user_id=str(self.api_key.user_id),
                 entry=build_request_log_entry(
@@ -328,6 +333,8 @@ class RequestHandler:
 
         user_uuid = _safe_uuid(self.api_key.user_id)
         api_key_uuid = _safe_uuid(self.api_key.id)
+        # 预扣与结束后的对账共用同一个幂等键，对账任务据此只补扣差额。
+        billing_key = idempotency_key or f"stream:{uuid4().hex}"
 
         if selection is None:
             selection = await self.provider_selector.select(
@@ -360,7 +367,7 @@ class RequestHandler:
                     provider_id=primary_provider_id,
                     provider_model_id=primary_model_id,
                     payload=payload,
-                    idempotency_key=idempotency_key,
+                    idempotency_key=billing_key,
                 )
         except Exception:  # pragma: no cover
             logger.exception(
@@ -371,11 +378,14 @@ class RequestHandler:
 
         base_weights = selection.base_weights
         selected_provider_id: str | None = None
+        selected_model_id: str | None = None
         token_estimated = False
+        usage_tap = StreamUsageTap() if settings.streaming_usage_reconcile_enabled else None
 
         async def on_first_chunk(provider_id: str, model_id: str) -> None:
-            nonlocal selected_provider_id, token_estimated
+            nonlocal selected_provider_id, selected_model_id, token_estimated
             selected_provider_id = provider_id
+            selected_model_id = model_id
             if provider_id_sink is not None:
                 try:
                     provider_id_sink(provider_id, model_id)
@@ -467,11 +477,23 @@ class RequestHandler:
                 attempts=attempts,
                 outcome=outcome,
             ):
+                if usage_tap is not None:
+                    usage_tap.feed(chunk)
                 yield chunk
         finally:
+            if usage_tap is not None and user_uuid is not None and api_key_uuid is not None:
+                self._reconcile_stream_usage(
+                    usage_tap,
+                    user_id=user_uuid,
+                    api_key_id=api_key_uuid,
+                    logical_model_name=lookup_model_id,
+                    provider_id=outcome.get("provider_id") or selected_provider_id,
+                    provider_model_id=outcome.get("model_id") or selected_model_id,
+                    idempotency_key=billing_key,
+                )
             if log_request:
                 success = bool(outcome.get("success"))
-                await append_request_log(
+                await enqueue_request_log(
                     self.redis,
                     user_id=str(self.api_key.user_id),
                     entry=build_request_log_entry(
@@ -494,5 +516,37 @@ class RequestHandler:
                     ),
                 )
 
+    def _reconcile_stream_usage(
+        self,
+        usage_tap: StreamUsageTap,
+        *,
+        user_id: UUID,
+        api_key_id: UUID,
+        logical_model_name: str,
+        provider_id: str | None,
+        provider_model_id: str | None,
+        idempotency_key: str,
+    ) -> None:
+        if not provider_id:
+            return
+        try:
+            record_stream_usage_reconciliation(
+                self.db,
+                user_id=user_id,
+                api_key_id=api_key_id,
+                logical_model_name=logical_model_name,
+                provider_id=provider_id,
+                provider_model_id=provider_model_id,
+                usage=usage_tap.usage(),
+                idempotency_key=idempotency_key,
+            )
+        except Exception:  # pragma: no cover
+            logger.exception(
+                "chat_v2: failed to reconcile streaming usage user=%s model=%s provider=%s",
+                user_id,
+                logical_model_name,
+                provider_id,
+            )
+
 
 __all__ = ["RequestHandler"]
@@ -7,7 +7,12 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from pydantic import ValidationError
 
 try:
     from redis.asyncio import Redis
@@ -15,11 +20,22 @@ except ModuleNotFoundError:  # pragma: no cover
     Redis = object  # type: ignore
 
 from app.logging_config import logger
-from app.routing.provider_weight import load_dynamic_weights, record_provider_failure, record_provider_success
+from app.provider.health import HealthStatus
+from app.routing.provider_weight import (
+    clamp_provider_weight,
+    load_dynamic_weights,
+    provider_weight_key,
+    record_provider_failure,
+    record_provider_success,
+)
 from app.schemas import PhysicalModel, RoutingMetrics
-from app.services.provider_health_service import get_cached_health_status
+from app.services.provider_health_service import (
+    HEALTH_STATUS_KEY_TEMPLATE,
+    get_cached_health_status,
+)
 from app.settings import settings
-from app.storage.redis_service import get_routing_metrics
+from app.storage.redis_service import METRICS_KEY_TEMPLATE, get_routing_metrics
+from app.storage.routing_l1_cache import get_routing_l1_cache
 
 FAILURE_KEY_PREFIX = "provider:failure:"
 
@@ -33,6 +49,61 @@ class FailureCooldownStatus:
     should_skip: bool
 
 
+@dataclass
+class CandidateRoutingState:
+    """
+    一组候选 Provider 的路由状态快照（由 RoutingStateService.load_candidate_states 批量读取）。
+
+    - 未加载或缺失的项不会出现在对应映射中；
+    - note_failure 用于在同一请求内根据最新失败计数刷新冷却判断，避免重复读 Redis。
+    """
+
+    metrics_by_provider: dict[str, RoutingMetrics] = field(default_factory=dict)
+    health_by_provider: dict[str, HealthStatus] = field(default_factory=dict)
+    cooldown_by_provider: dict[str, FailureCooldownStatus] = field(default_factory=dict)
+    dynamic_weights: dict[str, float] = field(default_factory=dict)
+
+    def cooldown(self, provider_id: str) -> FailureCooldownStatus:
+        status = self.cooldown_by_provider.get(provider_id)
+        if status is not None:
+            return status
+        return _build_cooldown_status(provider_id, 0)
+
+    def note_failure(self, provider_id: str, count: int) -> None:
+        # 计数写入失败时（count<=0）保留原快照，避免把已有的冷却状态清掉。
+        if count <= 0:
+            return
+        self.cooldown_by_provider[provider_id] = _build_cooldown_status(provider_id, count)
+
+
+def _build_cooldown_status(provider_id: str, count: int) -> FailureCooldownStatus:
+    threshold = int(settings.provider_failure_threshold)
+    cooldown = int(settings.provider_failure_cooldown_seconds)
+    return FailureCooldownStatus(
+        provider_id=provider_id,
+        count=count,
+        threshold=threshold,
+        cooldown_seconds=cooldown,
+        should_skip=threshold > 0 and count >= threshold,
+    )
+
+
+def _decode_json(raw: Any) -> Any | None:
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_count(raw: Any) -> int:
+    try:
+        return int(raw) if raw else 0
+    except (TypeError, ValueError):
+        return 0
+
+
 class RoutingStateService:
     """
     路由状态门面：统一维护/读取路由相关缓存与策略。
@@ -83,6 +154,168 @@ class RoutingStateService:
         except Exception:  # pragma: no cover
             return {}
 
+    async def load_candidate_states(
+        self,
+        upstreams: Sequence[PhysicalModel],
+        *,
+        logical_model_id: str | None = None,
+        include_cooldown: bool = True,
+        include_health: bool = True,
+        include_metrics: bool = True,
+        include_weights: bool = True,
+    ) -> CandidateRoutingState:
+        """
+        批量读取候选 Provider 的失败冷却 / 健康 / 路由指标 / 动态权重。
+
+        所有读取放在同一个非事务 pipeline 中（MGET + ZADD NX + ZMSCORE），
+        一次 Redis 往返即可拿到整组候选的状态；metrics 与动态权重需要 logical_model_id。
+        Redis 不支持 pipeline 或 pipeline 执行失败时，回退到逐个读取的旧路径。
+        """
+        state = CandidateRoutingState()
+        base_map: dict[str, float] = {}
+        for up in upstreams:
+            # 相同 provider 多个上游取第一个配置值（与 load_dynamic_weights 保持一致）。
+            base_map.setdefault(up.provider_id, up.base_weight)
+        provider_ids = list(base_map.keys())
+        if not provider_ids:
+            return state
+
+        include_cooldown = include_cooldown and int(settings.provider_failure_threshold) > 0
+        include_health = include_health and bool(settings.enable_provider_health_check)
+        include_metrics = include_metrics and bool(logical_model_id)
+        include_weights = include_weights and bool(logical_model_id)
+
+        # 路由指标先查进程内 L1，只对未命中的 key 走 Redis。
+        metrics_cache = get_routing_l1_cache() if include_metrics else None
+        metrics_keys: dict[str, str] = {}
+        if include_metrics:
+            for pid in provider_ids:
+                key = METRICS_KEY_TEMPLATE.format(logical_model=logical_model_id, provider_id=pid)
+                if metrics_cache is not None:
+                    hit, cached = metrics_cache.get(key)
+                    if hit:
+                        if cached is not None:
+                            state.metrics_by_provider[pid] = cached
+                        continue
+                metrics_keys[pid] = key
+            include_metrics = bool(metrics_keys)
+
+        if not (include_cooldown or include_health or include_metrics or include_weights):
+            return state
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            if include_cooldown:
+                pipe.mget([f"{FAILURE_KEY_PREFIX}{pid}" for pid in provider_ids])
+            if include_health:
+                pipe.mget(
+                    [HEALTH_STATUS_KEY_TEMPLATE.format(provider_id=pid) for pid in provider_ids]
+                )
+            if include_metrics:
+                pipe.mget(list(metrics_keys.values()))
+            if include_weights:
+                weight_key = provider_weight_key(logical_model_id)
+                # 先写入默认权重（NX 保证不覆盖已有动态值），再批量读取。
+                pipe.zadd(weight_key, base_map, nx=True)
+                pipe.zmscore(weight_key, provider_ids)
+            results = list(await pipe.execute())
+        except Exception as exc:
+            logger.debug("load_candidate_states pipeline unavailable, fallback: %s", exc)
+            return await self._load_candidate_states_serial(
+                upstreams,
+                provider_ids,
+                logical_model_id=logical_model_id,
+                include_cooldown=include_cooldown,
+                include_health=include_health,
+                include_metrics=include_metrics,
+                include_weights=include_weights,
+            )
+
+        if include_cooldown:
+            raw_counts = results.pop(0) or [None] * len(provider_ids)
+            for pid, raw in zip(provider_ids, raw_counts, strict=True):
+                state.cooldown_by_provider[pid] = _build_cooldown_status(pid, _decode_count(raw))
+
+        if include_health:
+            raw_health = results.pop(0) or [None] * len(provider_ids)
+            for pid, raw in zip(provider_ids, raw_health, strict=True):
+                data = _decode_json(raw)
+                if not data:
+                    continue
+                try:
+                    state.health_by_provider[pid] = HealthStatus.model_validate(data)
+                except ValidationError:
+                    continue
+
+        if include_metrics:
+            raw_metrics = results.pop(0) or [None] * len(metrics_keys)
+            for (pid, key), raw in zip(metrics_keys.items(), raw_metrics, strict=True):
+                data = _decode_json(raw)
+                metrics: RoutingMetrics | None = None
+                if data:
+                    try:
+                        metrics = RoutingMetrics.model_validate(data)
+                    except Exception:
+                        metrics = None
+                if metrics_cache is not None:
+                    metrics_cache.put(key, metrics)
+                if metrics is not None:
+                    state.metrics_by_provider[pid] = metrics
+
+        if include_weights:
+            results.pop(0)  # ZADD NX 的返回值
+            scores = results.pop(0) or [None] * len(provider_ids)
+            clamped_updates: dict[str, float] = {}
+            for pid, raw in zip(provider_ids, scores, strict=True):
+                base_weight = base_map[pid]
+                if raw is None:
+                    state.dynamic_weights[pid] = base_weight
+                    continue
+                clamped = clamp_provider_weight(float(raw), base_weight)
+                state.dynamic_weights[pid] = clamped
+                if clamped != float(raw):
+                    clamped_updates[pid] = clamped
+            if clamped_updates:
+                try:
+                    await self.redis.zadd(provider_weight_key(logical_model_id), clamped_updates)
+                except Exception:  # pragma: no cover - 不影响主流程
+                    logger.debug(
+                        "load_candidate_states: failed to write back clamped weights (logical_model=%s)",
+                        logical_model_id,
+                        exc_info=True,
+                    )
+
+        return state
+
+    async def _load_candidate_states_serial(
+        self,
+        upstreams: Sequence[PhysicalModel],
+        provider_ids: list[str],
+        *,
+        logical_model_id: str | None,
+        include_cooldown: bool,
+        include_health: bool,
+        include_metrics: bool,
+        include_weights: bool,
+    ) -> CandidateRoutingState:
+        state = CandidateRoutingState()
+        for pid in provider_ids:
+            if include_cooldown:
+                state.cooldown_by_provider[pid] = await self.get_failure_cooldown_status(pid)
+            if include_health:
+                health = await self.get_cached_health_status(pid)
+                if health is not None:
+                    state.health_by_provider[pid] = health
+        if include_metrics and logical_model_id:
+            state.metrics_by_provider = await self.load_metrics_for_candidates(
+                logical_model_id, list(upstreams)
+            )
+        if include_weights and logical_model_id:
+            state.dynamic_weights = await self.load_dynamic_weights(
+                logical_model_id, list(upstreams)
+            )
+        return state
+
     def record_success(self, logical_model_id: str, provider_id: str, base_weight: float) -> None:
         record_provider_success(self.redis, logical_model_id, provider_id, base_weight)
 
@@ -144,5 +377,5 @@ class RoutingStateService:
             logger.exception("Failed to clear provider failure flag for %s", provider_id)
 
 
-__all__ = ["FailureCooldownStatus", "RoutingStateService"]
+__all__ = ["CandidateRoutingState", "FailureCooldownStatus", "RoutingStateService"]
 
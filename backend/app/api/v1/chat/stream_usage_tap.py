@@ -0,0 +1,146 @@
+"""
+流式响应的 usage 旁路采集（不改动、不重新缓冲下游 chunk）。
+
+- 只在 chunk 中出现 `"usage"` 字节时解析对应的 SSE `data:` 行，其余 chunk 只做一次字节计数；
+- 支持 OpenAI（顶层 usage）、Claude（message_start.message.usage / message_delta.usage）
+  与 Responses（response.completed.response.usage）三种输出格式；
+- 上游没有返回 usage 时，按输出增量（`"delta"`）个数近似 completion_tokens。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+_USAGE_MARKER = b'"usage"'
+_DELTA_MARKER = b'"delta"'
+# 跨 chunk 的不完整行最多保留的字节数；超长行（例如大段 base64）不参与 usage 解析。
+_MAX_CARRY_BYTES = 64 * 1024
+
+
+def _as_int(value: Any) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int) and value >= 0:
+        return value
+    return None
+
+
+class StreamUsageTap:
+    """
+    逐 chunk 调用 feed(chunk)，流结束后通过 usage() 取得汇总结果。
+    """
+
+    __slots__ = ("_carry", "input_tokens", "output_deltas", "output_tokens", "total_tokens")
+
+    def __init__(self) -> None:
+        self._carry = b""
+        self.input_tokens: int | None = None
+        self.output_tokens: int | None = None
+        self.total_tokens: int | None = None
+        self.output_deltas = 0
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.output_deltas += chunk.count(_DELTA_MARKER)
+
+        last_nl = chunk.rfind(b"\n")
+        if last_nl < 0:
+            if len(self._carry) + len(chunk) <= _MAX_CARRY_BYTES:
+                self._carry += chunk
+            else:
+                self._carry = b""
+            return
+
+        start = 0
+        if self._carry:
+            first_nl = chunk.find(b"\n")
+            self._parse_line(self._carry + chunk[:first_nl])
+            self._carry = b""
+            start = first_nl + 1
+
+        if chunk.find(_USAGE_MARKER, start, last_nl) >= 0:
+            self._scan(chunk, start, last_nl)
+
+        if last_nl + 1 < len(chunk):
+            tail = chunk[last_nl + 1 :]
+            if len(tail) <= _MAX_CARRY_BYTES:
+                self._carry = tail
+
+    def usage(self) -> dict[str, int] | None:
+        """
+        返回 OpenAI 口径的 usage（prompt_tokens / completion_tokens / total_tokens）；
+        既没有 usage 也没有输出增量时返回 None。
+        """
+        if self._carry:
+            self._parse_line(self._carry)
+            self._carry = b""
+
+        output_tokens = self.output_tokens
+        if output_tokens is None and self.input_tokens is None and self.total_tokens is None:
+            if self.output_deltas <= 0:
+                return None
+            output_tokens = self.output_deltas
+
+        result: dict[str, int] = {}
+        if self.input_tokens is not None:
+            result["prompt_tokens"] = self.input_tokens
+        if output_tokens is not None:
+            result["completion_tokens"] = output_tokens
+        total = self.total_tokens
+        if total is None:
+            total = (self.input_tokens or 0) + (output_tokens or 0)
+        result["total_tokens"] = total
+        return result
+
+    def _scan(self, chunk: bytes, start: int, end: int) -> None:
+        pos = chunk.find(_USAGE_MARKER, start, end)
+        while pos >= 0:
+            line_start = chunk.rfind(b"\n", start, pos) + 1 or start
+            line_end = chunk.find(b"\n", pos, end)
+            if line_end < 0:
+                line_end = end
+            self._parse_line(chunk[line_start:line_end])
+            pos = chunk.find(_USAGE_MARKER, line_end, end)
+
+    def _parse_line(self, line: bytes) -> None:
+        line = line.strip()
+        if not line.startswith(b"data:") or _USAGE_MARKER not in line:
+            return
+        try:
+            data = json.loads(line[5:])
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+
+        usage = data.get("usage")
+        if not isinstance(usage, dict):
+            for container_key in ("message", "response"):
+                container = data.get(container_key)
+                if isinstance(container, dict) and isinstance(container.get("usage"), dict):
+                    usage = container["usage"]
+                    break
+        if isinstance(usage, dict):
+            self._merge(usage)
+
+    def _merge(self, usage: dict[str, Any]) -> None:
+        input_tokens = _as_int(usage.get("prompt_tokens"))
+        if input_tokens is None:
+            input_tokens = _as_int(usage.get("input_tokens"))
+        output_tokens = _as_int(usage.get("completion_tokens"))
+        if output_tokens is None:
+            output_tokens = _as_int(usage.get("output_tokens"))
+        total_tokens = _as_int(usage.get("total_tokens"))
+
+        # Claude 的 message_start / message_delta 会分别给出累计值，取最大值即可。
+        if input_tokens is not None:
+            self.input_tokens = max(self.input_tokens or 0, input_tokens)
+        if output_tokens is not None:
+            self.output_tokens = max(self.output_tokens or 0, output_tokens)
+        if total_tokens is not None:
+            self.total_tokens = max(self.total_tokens or 0, total_tokens)
+
+
+__all__ = ["StreamUsageTap"]
@@ -7,6 +7,7 @@
 from __future__ import annotations
 
 from collections.abc import AsyncIterator
+from contextlib import aclosing
 from typing import Any
 
 import httpx
@@ -189,31 +190,7 @@ async def execute_sdk_stream(
     upstream_payload["stream"] = True
 
     async def _encoded_upstream_iter() -> AsyncIterator[bytes]:
-        if upstream_style == "claude":
-            async for event_dict in stream_sdk_with_metrics(
-                driver=driver,
-                api_key=key_selection.key,
-                model_id=model_id,
-                payload=upstream_payload,
-                base_url=normalize_base_url(provider_cfg.base_url),
-                db=db,
-                provider_id=provider_id,
-                logical_model=logical_model_id,
-                user_id=api_key.user_id,
-                api_key_id=api_key.id,
-            ):
-                if isinstance(event_dict, dict):
-                    yield encode_claude_sdk_event_dict(event_dict)
-            return
-
-        # upstream_style == openai
-        gemini_adapter: GeminiDictToOpenAISSEAdapter | None = None
-        if driver_name in ("google", "vertexai") and _GEMINI_MODEL_REGEX.search(
-            str(payload.get("model") or model_id or "")
-        ):
-            gemini_adapter = GeminiDictToOpenAISSEAdapter(payload.get("model") or model_id)
-
-        async for chunk_dict in stream_sdk_with_metrics(
+        events = stream_sdk_with_metrics(
             driver=driver,
             api_key=key_selection.key,
             model_id=model_id,
@@ -224,14 +201,29 @@ async def execute_sdk_stream(
             logical_model=logical_model_id,
             user_id=api_key.user_id,
             api_key_id=api_key.id,
-        ):
-            if not isinstance(chunk_dict, dict):
-                continue
-            if gemini_adapter is not None:
-                for out in gemini_adapter.process_chunk(chunk_dict):
-                    yield out
-            else:
-                yield encode_openai_sdk_chunk_dict(chunk_dict)
+        )
+        async with aclosing(events):
+            if upstream_style == "claude":
+                async for event_dict in events:
+                    if isinstance(event_dict, dict):
+                        yield encode_claude_sdk_event_dict(event_dict)
+                return
+
+            # upstream_style == openai
+            gemini_adapter: GeminiDictToOpenAISSEAdapter | None = None
+            if driver_name in ("google", "vertexai") and _GEMINI_MODEL_REGEX.search(
+                str(payload.get("model") or model_id or "")
+            ):
+                gemini_adapter = GeminiDictToOpenAISSEAdapter(payload.get("model") or model_id)
+
+            async for chunk_dict in events:
+                if not isinstance(chunk_dict, dict):
+                    continue
+                if gemini_adapter is not None:
+                    for out in gemini_adapter.process_chunk(chunk_dict):
+                        yield out
+                else:
+                    yield encode_openai_sdk_chunk_dict(chunk_dict)
 
         if gemini_adapter is not None:
             for tail in gemini_adapter.finalize():
@@ -239,11 +231,12 @@ async def execute_sdk_stream(
         else:
             yield encode_openai_done()
 
+    upstream = _encoded_upstream_iter()
+    iterator: AsyncIterator[bytes] = upstream
     try:
-        iterator: AsyncIterator[bytes] = _encoded_upstream_iter()
         if upstream_style != api_style:
             iterator = adapt_stream(
-                iterator,
+                upstream,
                 from_style=upstream_style,
                 to_style=api_style,
                 request_model=str(payload.get("model") or model_id),
@@ -254,6 +247,10 @@ async def execute_sdk_stream(
     except Exception:
         record_key_failure(key_selection, retryable=True, status_code=None, redis=redis)
         raise
+    finally:
+        # 下游断开时逐层关闭（adapt_stream 不会关闭其输入），SDK 流与上游连接随之立即释放。
+        await iterator.aclose()
+        await upstream.aclose()
 
 
 async def execute_claude_cli_stream(
@@ -22,7 +22,7 @@ import httpx
 from sqlalchemy.orm import Session as DbSession
 
 from app.auth import AuthenticatedAPIKey
-from app.logging_config import logger
+from app.logging_config import log_sampled, logger
 from app.services.metrics_service import (
     call_upstream_http_with_metrics,
     stream_upstream_with_metrics,
@@ -108,7 +108,9 @@ class HttpTransport(Transport):
         # 准备请求头
         request_headers = headers or {}
 
-        logger.info(
+        log_sampled(
+            logger,
+            ("http_transport.send", provider_id, provider_model_id, is_stream),
             "http_transport: sending %s request to provider=%s model=%s url=%s",
             "streaming" if is_stream else "non-streaming",
             provider_id,
@@ -182,7 +184,9 @@ class HttpTransport(Transport):
         status_code = r.status_code
         text = r.text
 
-        logger.info(
+        log_sampled(
+            logger,
+            ("http_transport.response", provider_id, provider_model_id, status_code),
             "http_transport: upstream response status=%s provider=%s model=%s body_length=%d",
             status_code,
             provider_id,
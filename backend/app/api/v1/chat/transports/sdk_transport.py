@@ -12,7 +12,7 @@ from fastapi import status
 from sqlalchemy.orm import Session as DbSession
 
 from app.auth import AuthenticatedAPIKey
-from app.logging_config import logger
+from app.logging_config import log_sampled, logger
 from app.models import ProviderKey
 from app.provider.config import ProviderConfig
 from app.provider.sdk_selector import get_sdk_driver, normalize_base_url
@@ -90,7 +90,9 @@ class SdkTransport(Transport):
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        logger.info(
+        log_sampled(
+            logger,
+            ("sdk_transport.send", provider_id, provider_model_id, is_stream),
             "sdk_transport: calling %s request provider=%s model=%s driver=%s",
             "streaming" if is_stream else "non-streaming",
             provider_id,
@@ -153,7 +155,9 @@ class SdkTransport(Transport):
                 status_code=500,
             )
 
-        logger.info(
+        log_sampled(
+            logger,
+            ("sdk_transport.success", provider_id, provider_model_id),
             "sdk_transport: success provider=%s model=%s",
             provider_id,
             provider_model_id,
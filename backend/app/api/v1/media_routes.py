@@ -2,22 +2,78 @@ from __future__ import annotations
 
 import time
 
-from fastapi import APIRouter, HTTPException, Query, status
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 
+from app.services.image_disk_cache import CachedImage, get_image_disk_cache
 from app.services.image_storage_service import (
     ImageStorageNotConfigured,
     SignedUrlError,
+    open_image_stream,
     presign_image_get_url,
     verify_signed_image_request,
 )
+from app.settings import settings
 
 router = APIRouter(tags=["media"])
 
 
+def _etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _cache_headers(etag: str | None, max_age: int) -> dict[str, str]:
+    # 对象 key 不可变；浏览器缓存时长不超过短链剩余有效期。
+    headers = {"Cache-Control": f"private, max-age={max_age}"}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def _file_response(cached: CachedImage, request: Request, max_age: int) -> Response:
+    headers = _cache_headers(cached.etag, max_age)
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(cached.path, media_type=cached.content_type, headers=headers)
+
+
+async def _proxy_image(object_key: str, request: Request, max_age: int) -> Response:
+    """
+    网关直接转发对象内容：命中本地缓存时返回文件（支持 Range），否则分块转发并写入缓存。
+    """
+    cache = get_image_disk_cache()
+    if cache is not None:
+        cached = await cache.get(object_key)
+        if cached is not None:
+            return _file_response(cached, request, max_age)
+
+    stream = await open_image_stream(object_key)
+    headers = _cache_headers(stream.etag, max_age)
+    if _etag_matches(request.headers.get("if-none-match"), stream.etag):
+        await stream.close()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    cacheable = cache is not None and not cache.too_large(stream)
+    if cacheable and stream.size_bytes is not None and request.headers.get("range"):
+        # Range 请求需要完整对象：用已打开的流写入缓存，再按区间返回。
+        cached = await cache.fill(object_key, stream=stream)
+        if cached is not None:
+            return _file_response(cached, request, max_age)
+        # 缓存目录不可写等异常情况：流已读完，只能重新回源。
+        stream = await open_image_stream(object_key)
+    # 对象超过缓存容量（或大小未知）时不预先写缓存：Range 请求按 200 返回完整内容，只回源一次。
+    if stream.size_bytes is not None:
+        headers["Content-Length"] = str(stream.size_bytes)
+    body = cache.tee(stream) if cacheable else stream.chunks
+    return StreamingResponse(body, media_type=stream.content_type, headers=headers)
+
+
 @router.get("/media/images/{object_key:path}", include_in_schema=False)
 async def get_generated_image(
     object_key: str,
+    request: Request,
     expires: int = Query(..., description="Unix timestamp (seconds)"),
     sig: str = Query(..., description="HMAC signature"),
 ):
@@ -27,7 +83,8 @@ async def get_generated_image(
     说明：
     - 不要求 API Key/JWT 鉴权；
     - 通过 expires+sig 做短链校验；
-    - 图片实际存储在 OSS 私有桶中，网关校验签名后 302 跳转到 OSS 预签名 URL（直下）。
+    - 图片实际存储在 OSS 私有桶中：默认（IMAGE_DELIVERY_MODE=redirect）校验签名后 302 跳转到 OSS 预签名 URL（直下）；
+      proxy 模式下由网关流式转发，支持 Range / If-None-Match，并使用本地磁盘 LRU 缓存。
     """
     try:
         verify_signed_image_request(object_key, expires=expires, sig=sig)
@@ -37,8 +94,10 @@ async def get_generated_image(
             detail=str(exc),
         ) from exc
 
+    remaining = max(1, int(expires) - int(time.time()))
     try:
-        remaining = max(1, int(expires) - int(time.time()))
+        if settings.image_delivery_mode == "proxy":
+            return await _proxy_image(object_key, request, remaining)
         url = await presign_image_get_url(object_key, expires_seconds=remaining)
     except ImageStorageNotConfigured as exc:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
@@ -17,6 +17,7 @@ from app.errors import bad_request, forbidden, not_found
 from app.jwt_auth import AuthenticatedUser, require_jwt_token
 from app.logging_config import logger
 from app.models import Provider
+from app.provider.config_registry import invalidate_provider_config
 from app.model_cache import MODELS_CACHE_KEY
 from app.schemas.provider import ProviderResponse
 from app.schemas.provider_control import (
@@ -245,6 +246,7 @@ async def delete_user_private_provider_endpoint(
 
     db.delete(provider)
     db.commit()
+    invalidate_provider_config(provider_id)
 
     # 缓存失效：逻辑模型 + 模型列表
     try:
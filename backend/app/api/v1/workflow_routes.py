@@ -30,6 +30,8 @@ from app.schemas.workflow import (
 )
 from app.schemas.workflow import WorkflowSpec
 from app.services.bridge_gateway_client import BridgeGatewayClient
+from app.services.pubsub_hub import get_pubsub_hub
+from app.services.workflow_run_event_bus import workflow_run_event_channel
 from app.services.workflow_runtime import get_workflow_runtime
 
 
@@ -62,21 +64,6 @@ def _encode_sse_event(*, event_type: str, data: Any) -> bytes:
         lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
     return ("\n".join(lines) + "\n\n").encode("utf-8")
 
-def _decode_pubsub_payload(value: Any) -> dict[str, Any] | None:
-    if value is None:
-        return None
-    if isinstance(value, (bytes, bytearray)):
-        raw = value.decode("utf-8", errors="ignore")
-    elif isinstance(value, str):
-        raw = value
-    else:
-        return None
-    try:
-        parsed = json.loads(raw)
-    except Exception:
-        return None
-    return parsed if isinstance(parsed, dict) else None
-
 
 def _ensure_owner(*, current_user: AuthenticatedUser, owner_user_id: UUID) -> None:
     if UUID(str(current_user.id)) != UUID(str(owner_user_id)):
@@ -299,10 +286,7 @@ async def stream_workflow_run_events_endpoint(
         nonlocal last_seq
 
         # 先订阅 Redis，再做 DB replay，避免时间窗丢事件（同 run SSE 策略）
-        pubsub = redis.pubsub()
-        channel = f"workflow_run_events:{run_id}"
-        await pubsub.subscribe(channel)
-        try:
+        async with get_pubsub_hub(redis).subscribe(workflow_run_event_channel(run_id=run_id)) as sub:
             for ev in list_workflow_run_events(db, run_id=run_id, after_seq=last_seq, limit=limit):
                 seq = int(getattr(ev, "seq", 0) or 0)
                 if seq <= last_seq:
@@ -331,43 +315,18 @@ async def stream_workflow_run_events_endpoint(
                 data={"type": "replay.done", "run_id": str(run_id), "after_seq": last_seq},
             )
 
-            while True:
-                try:
-                    if await request.is_disconnected():
-                        break
-                except Exception:  # pragma: no cover
-                    break
-
-                msg = None
+            # 客户端断开由 StreamingResponse 感知并取消生成器，这里只等待共享订阅分发的事件。
+            while (env := await sub.get()) is not None:
+                if str(env.get("type") or "") == "heartbeat":
+                    continue
                 try:
-                    msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    seq = int(env.get("seq") or 0)
                 except Exception:
-                    msg = None
-
-                if isinstance(msg, dict) and msg.get("type") == "message":
-                    env = _decode_pubsub_payload(msg.get("data"))
-                    if env is None:
-                        continue
-                    if str(env.get("type") or "") == "heartbeat":
-                        continue
-                    try:
-                        seq = int(env.get("seq") or 0)
-                    except Exception:
-                        seq = 0
-                    if seq <= last_seq:
-                        continue
-                    last_seq = seq
-                    yield _encode_sse_event(event_type=str(env.get("event_type") or "event"), data=env)
+                    seq = 0
+                if seq <= last_seq:
                     continue
-        finally:
-            try:
-                await pubsub.unsubscribe(channel)
-            except Exception:
-                pass
-            try:
-                await pubsub.close()
-            except Exception:
-                pass
+                last_seq = seq
+                yield _encode_sse_event(event_type=str(env.get("event_type") or "event"), data=env)
 
     return StreamingResponse(_gen(), media_type="text/event-stream")
 
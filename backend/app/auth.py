@@ -13,7 +13,7 @@ from app.services.api_key_cache import (
     get_cached_api_key,
     invalidate_cached_api_key,
 )
-from app.services.api_key_service import derive_api_key_hash, find_api_key_by_hash
+from app.services.api_key_service import afind_api_key_by_hash, derive_api_key_hash
 
 
 @dataclass
@@ -83,7 +83,7 @@ async def require_api_key(
             )
         return _cached_to_authenticated(cached)
 
-    api_key = find_api_key_by_hash(db, key_hash)
+    api_key = await afind_api_key_by_hash(db, key_hash)
     if api_key is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -17,7 +17,7 @@ CELERY_BROKER_URL / CELERY_RESULT_BACKEND 进行配置。
 """
 
 from celery import Celery
-from celery.signals import beat_init, worker_process_init
+from celery.signals import beat_init, worker_process_init, worker_process_shutdown
 
 from app.logging_config import setup_logging
 from app.settings import settings
@@ -76,6 +76,22 @@ def init_worker_logging(**kwargs):
     except Exception:
         pass
 
+    # 常驻事件循环：异步任务在同一个 loop 上执行，复用 Redis / 上游 HTTP 连接池。
+    if settings.celery_worker_persistent_loop:
+        from app.worker_loop import start_worker_loop
+
+        start_worker_loop()
+
+
+@worker_process_shutdown.connect
+def stop_worker_event_loop(**kwargs):
+    """
+    在 Celery worker 进程退出时关闭常驻事件循环及其上的连接池。
+    """
+    from app.worker_loop import stop_worker_loop
+
+    stop_worker_loop()
+
 
 @beat_init.connect
 def init_beat_logging(**kwargs):
@@ -0,0 +1,120 @@
+"""
+异步数据库会话（与同步 engine 并存）。
+
+聊天热路径上的只读查询（禁用对、定价、倍率、Bandit 统计、API Key 查找）
+通过这里的 AsyncSession 执行，避免同步查询阻塞事件循环、拖慢同一 worker 上的所有流式响应。
+
+- 复用 psycopg 3 的原生异步驱动（postgresql+psycopg），与同步 engine 使用同一个 DATABASE_URL；
+- AsyncEngine 的连接池绑定事件循环，因此按 loop 缓存（与 Redis 客户端一致）；
+- 请求使用的同步 Session 不是绑定到全局 engine 时（例如测试里的 SQLite），
+  async_session_for 返回 None，调用方回退到原同步查询。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from importlib.util import find_spec
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.settings import settings
+
+from .session import is_bound_to_global_engine
+
+_async_engines_by_loop: WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncEngine] = (
+    WeakKeyDictionary()
+)
+_sessionmakers_by_loop: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, async_sessionmaker[AsyncSession]
+] = WeakKeyDictionary()
+
+
+def to_async_database_url(url: str) -> str | None:
+    """
+    把同步 DATABASE_URL 转成异步驱动 URL；当前环境不支持时返回 None。
+    """
+    try:
+        parsed = make_url(url)
+    except Exception:
+        return None
+
+    backend = parsed.get_backend_name()
+    driver = parsed.get_driver_name()
+    if backend == "postgresql":
+        if driver == "asyncpg" and find_spec("asyncpg") is not None:
+            return parsed.render_as_string(hide_password=False)
+        if find_spec("psycopg") is None:
+            return None
+        return parsed.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        if find_spec("aiosqlite") is None:
+            return None
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return None
+
+
+def _current_loop() -> asyncio.AbstractEventLoop:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError as exc:  # pragma: no cover - easier debugging for sync misuse
+        raise RuntimeError("异步数据库会话必须在运行中的事件循环内获取") from exc
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession] | None:
+    """
+    返回当前事件循环的 AsyncSession 工厂；未启用或驱动不可用时返回 None。
+    """
+    if not settings.database_async_enabled:
+        return None
+    loop = _current_loop()
+    factory = _sessionmakers_by_loop.get(loop)
+    if factory is not None:
+        return factory
+
+    async_url = to_async_database_url(settings.database_url)
+    if async_url is None:
+        return None
+    async_engine = create_async_engine(
+        async_url,
+        pool_size=int(settings.database_async_pool_size),
+        max_overflow=int(settings.database_async_max_overflow),
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    )
+    factory = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    _async_engines_by_loop[loop] = async_engine
+    _sessionmakers_by_loop[loop] = factory
+    return factory
+
+
+def async_session_for(db: Session | None) -> async_sessionmaker[AsyncSession] | None:
+    """
+    仅当请求的同步 Session 绑定在全局 engine 上时返回对应的异步会话工厂，
+    保证异步读取与同步写入看到的是同一个数据库。
+    """
+    if not is_bound_to_global_engine(db):
+        return None
+    return get_async_sessionmaker()
+
+
+async def dispose_async_engine_for_current_loop() -> None:
+    """
+    释放当前事件循环的 AsyncEngine（应用关闭或 Celery 短生命周期 loop 结束时调用）。
+    """
+    loop = _current_loop()
+    _sessionmakers_by_loop.pop(loop, None)
+    async_engine = _async_engines_by_loop.pop(loop, None)
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+__all__ = [
+    "async_session_for",
+    "dispose_async_engine_for_current_loop",
+    "get_async_sessionmaker",
+    "to_async_database_url",
+]
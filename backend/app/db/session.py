@@ -20,6 +20,18 @@ engine = create_engine(
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
+def is_bound_to_global_engine(db: Session | None) -> bool:
+    """
+    判断 Session 是否绑定在全局 engine 上（测试中替换为 SQLite 等其它库时返回 False）。
+    """
+    if db is None:
+        return False
+    try:
+        return db.get_bind() is engine
+    except Exception:
+        return False
+
+
 def get_db_session() -> Generator[Session, None, None]:
     """Provide a SQLAlchemy session for FastAPI dependencies."""
 
@@ -30,4 +42,4 @@ def get_db_session() -> Generator[Session, None, None]:
         db.close()
 
 
-__all__ = ["SessionLocal", "engine", "get_db_session"]
+__all__ = ["SessionLocal", "engine", "get_db_session", "is_bound_to_global_engine"]
@@ -11,6 +11,7 @@ except ModuleNotFoundError:  # pragma: no cover - safety fallback for minimal en
 
 from .db import get_db_session
 from .http_client import CurlCffiClient
+from .http_client_pool import upstream_http_client
 from .redis_client import get_redis_client
 from .settings import settings
 
@@ -35,11 +36,13 @@ async def get_http_client() -> AsyncIterator[CurlCffiClient]:
     
     使用 curl-cffi 替代 httpx 以支持 TLS 指纹伪装（用于 Claude CLI 等场景）。
     支持通过环境变量 HTTP_PROXY/HTTPS_PROXY 配置代理。
+
+    默认从进程级连接池借用长连接会话（见 app.http_client_pool），避免每个请求
+    重新完成 TCP/TLS 握手；UPSTREAM_HTTP_POOL_ENABLED=false 时回退为每请求新建会话。
     """
-    async with CurlCffiClient(
-        timeout=settings.upstream_timeout,
+    async with upstream_http_client(
+        request_timeout=settings.upstream_timeout,
         impersonate="chrome120",  # TLS 指纹伪装为 Chrome 120
-        trust_env=True,  # 启用环境变量代理支持
     ) as client:
         yield client
 
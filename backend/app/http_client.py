@@ -165,6 +165,7 @@ class CurlCffiClient:
         impersonate: str = "chrome120",
         trust_env: bool = True,
         proxies: dict[str, str] | str | None = None,
+        session: AsyncSession | None = None,
     ):
         """
         初始化 CurlCffiClient。
@@ -175,12 +176,15 @@ class CurlCffiClient:
             trust_env: 是否信任环境变量（HTTP_PROXY, HTTPS_PROXY 等），默认 True
             proxies: 代理配置，可以是字符串（单个代理）或字典（按协议配置）
                     例如: "http://localhost:3128" 或 {"http": "...", "https": "..."}
+            session: 外部托管的 AsyncSession（例如 app.http_client_pool 中的长连接会话）；
+                    传入后退出上下文时不会关闭该会话，连接由会话持有者负责回收
         """
         self.timeout = timeout
         self.impersonate = impersonate
         self.trust_env = trust_env
         self.proxies = proxies
-        self._session: AsyncSession | None = None
+        self._session: AsyncSession | None = session
+        self._owns_session = session is None
 
         logger.debug(
             "CurlCffiClient initialized: timeout=%s, impersonate=%s, trust_env=%s, proxies=%s",
@@ -193,12 +197,15 @@ class CurlCffiClient:
     async def __aenter__(self) -> "CurlCffiClient":
         """
         进入 async context manager，创建 AsyncSession。
+
+        若初始化时传入了外部会话，则直接复用，不再新建。
         
         Returns:
             self: 返回客户端实例
         """
-        self._session = AsyncSession()
-        logger.debug("CurlCffiClient session created")
+        if self._owns_session:
+            self._session = AsyncSession()
+            logger.debug("CurlCffiClient session created")
         return self
 
     async def __aexit__(self, *args) -> None:
@@ -208,6 +215,8 @@ class CurlCffiClient:
         Args:
             *args: 异常信息（如果有）
         """
+        if not self._owns_session:
+            return
         if self._session:
             await self._session.close()
             logger.debug("CurlCffiClient session closed")
@@ -0,0 +1,410 @@
+"""
+上游 HTTP 长连接池（进程级，按事件循环隔离）。
+
+`app.deps.get_http_client` 过去为每个请求新建一个 curl-cffi `AsyncSession`，
+导致每次上游调用都要重新完成 TCP/TLS 握手与 HTTP/2 协商。本模块按
+(impersonate, proxy, http_version) 维护长生命周期的会话，让 libcurl 的连接缓存
+在请求之间复用 keep-alive 连接，并提供：
+
+- 每主机最大连接数（CURLMOPT_MAX_HOST_CONNECTIONS）；
+- 句柄借用的有界等待（超时抛出 UpstreamHttpPoolTimeout，候选重试会切换下一个上游）；
+- 后台定时回收空闲会话；
+- 生命周期启动/关闭钩子（见 app.routes.lifespan）；
+- 连接复用/新建、句柄排队等待等计数器（见 /metrics/upstream-http-pool）。
+
+与 app.redis_client 一致，连接池绑定到创建它的事件循环：curl-cffi 的 AsyncCurl
+会在 loop 上注册 socket/timer 回调，不能跨 loop 共享。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any
+from weakref import WeakKeyDictionary
+
+import httpx
+from curl_cffi.const import CurlInfo, CurlMOpt
+from curl_cffi.requests import AsyncSession
+
+from .http_client import CurlCffiClient, _normalize_http_version
+from .logging_config import logger
+from .settings import settings
+
+PoolKey = tuple[str, str | None, int | None]
+
+# 后台空闲会话扫描间隔（秒）。
+_IDLE_SWEEP_INTERVAL_SECONDS = 30.0
+
+
+@dataclass
+class UpstreamHttpPoolStats:
+    """连接池计数器（单调递增，进程重启后清零）。"""
+
+    sessions_created: int = 0
+    sessions_evicted: int = 0
+    leases: int = 0
+    connections_new: int = 0
+    connections_reused: int = 0
+    pool_waits: int = 0
+    pool_timeouts: int = 0
+
+    def merge(self, other: UpstreamHttpPoolStats) -> None:
+        self.sessions_created += other.sessions_created
+        self.sessions_evicted += other.sessions_evicted
+        self.leases += other.leases
+        self.connections_new += other.connections_new
+        self.connections_reused += other.connections_reused
+        self.pool_waits += other.pool_waits
+        self.pool_timeouts += other.pool_timeouts
+
+
+class UpstreamHttpPoolTimeout(httpx.PoolTimeout):
+    """
+    连接池并发句柄全部被占用，且在 acquire_timeout 内未能借到句柄。
+
+    继承 httpx.PoolTimeout，使现有按 httpx.HTTPError/TimeoutException 处理上游错误的
+    调用方（候选重试、指标打点）无需改动即可把它当作可重试的超时失败。
+    """
+
+
+class _PooledAsyncSession(AsyncSession):
+    """
+    在 curl-cffi AsyncSession 上增加有界等待，并记录句柄等待与连接复用情况。
+
+    - pop_curl：句柄池已被占满时记一次 pool_wait，最多等待 acquire_timeout 秒；
+    - release_curl：读取 CURLINFO_NUM_CONNECTS / RESPONSE_CODE，
+      只有收到上游响应且未新建连接的传输才计为复用。
+    """
+
+    def __init__(
+        self,
+        *,
+        stats: UpstreamHttpPoolStats,
+        acquire_timeout: float,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._pool_stats = stats
+        self._acquire_timeout = acquire_timeout
+        # 已借出且尚未统计的句柄；curl-cffi 的流式错误路径会对同一次传输
+        # 调用两次 release_curl，这里保证每次借出只统计一次。
+        self._pending_handles: set[Any] = set()
+
+    async def pop_curl(self):
+        if self.pool.empty():
+            self._pool_stats.pool_waits += 1
+            try:
+                curl = await asyncio.wait_for(super().pop_curl(), timeout=self._acquire_timeout)
+            except TimeoutError as exc:
+                self._pool_stats.pool_timeouts += 1
+                raise UpstreamHttpPoolTimeout(
+                    f"Upstream HTTP pool exhausted: all {self.max_clients} handles busy "
+                    f"for {self._acquire_timeout:.1f}s"
+                ) from exc
+        else:
+            curl = await super().pop_curl()
+        self._pending_handles.add(curl)
+        return curl
+
+    def release_curl(self, curl):
+        if curl in self._pending_handles:
+            self._pending_handles.discard(curl)
+            self._record_transfer(curl)
+        super().release_curl(curl)
+
+    def _record_transfer(self, curl) -> None:
+        try:
+            new_connections = int(curl.getinfo(CurlInfo.NUM_CONNECTS) or 0)
+            response_code = int(curl.getinfo(CurlInfo.RESPONSE_CODE) or 0)
+        except Exception:  # pragma: no cover - 统计失败不影响请求
+            return
+        if new_connections > 0:
+            self._pool_stats.connections_new += new_connections
+        elif response_code > 0:
+            # DNS 失败、连接被拒、请求被取消等情况下 NUM_CONNECTS 同样为 0，
+            # 只有确实拿到上游响应时才说明复用了已有连接。
+            self._pool_stats.connections_reused += 1
+
+
+@dataclass
+class _PoolEntry:
+    session: _PooledAsyncSession
+    in_flight: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class UpstreamHttpClientPool:
+    """
+    按 (impersonate, proxy, http_version) 复用 curl-cffi 会话的连接池。
+
+    用法:
+        pool = get_upstream_http_pool()
+        async with pool.lease(impersonate="chrome120") as client:
+            resp = await client.post(url, json=payload)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_clients: int,
+        max_connections_per_host: int,
+        idle_seconds: float,
+        acquire_timeout: float,
+    ) -> None:
+        self.max_clients = max_clients
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_seconds = idle_seconds
+        self.acquire_timeout = acquire_timeout
+        self.stats = UpstreamHttpPoolStats()
+        self._entries: dict[PoolKey, _PoolEntry] = {}
+        self._sweeper: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @staticmethod
+    def _make_key(impersonate: str, proxy: str | None, http_version: Any) -> PoolKey:
+        return (impersonate, proxy or None, _normalize_http_version(http_version))
+
+    def _create_session(self, key: PoolKey) -> _PooledAsyncSession:
+        impersonate, proxy, http_version = key
+        session_kwargs: dict[str, Any] = {
+            "impersonate": impersonate,
+            "trust_env": True,
+            # 会话在不同用户请求之间共享，禁止跨请求携带上游下发的 Cookie。
+            "discard_cookies": True,
+        }
+        if proxy:
+            session_kwargs["proxy"] = proxy
+        if http_version is not None:
+            session_kwargs["http_version"] = http_version
+        session = _PooledAsyncSession(
+            stats=self.stats,
+            acquire_timeout=self.acquire_timeout,
+            max_clients=self.max_clients,
+            **session_kwargs,
+        )
+        multi = session.acurl
+        with suppress(Exception):
+            multi.setopt(CurlMOpt.MAXCONNECTS, self.max_clients)
+        if self.max_connections_per_host > 0:
+            with suppress(Exception):
+                multi.setopt(CurlMOpt.MAX_HOST_CONNECTIONS, self.max_connections_per_host)
+        self.stats.sessions_created += 1
+        logger.debug(
+            "Upstream HTTP pool session created: impersonate=%s proxy=%s http_version=%s",
+            impersonate,
+            "configured" if proxy else "none",
+            http_version,
+        )
+        return session
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        *,
+        request_timeout: float | None = None,
+        impersonate: str = "chrome120",
+        proxy: str | None = None,
+        http_version: Any = None,
+    ) -> AsyncIterator[CurlCffiClient]:
+        """
+        借出一个绑定到共享会话的 CurlCffiClient。
+
+        request_timeout 是借出客户端上每个 HTTP 请求的超时，不限制 lease 本身的等待时间。
+
+        退出上下文时只归还会话，不会关闭底层连接。
+        """
+        if self._closed:
+            raise RuntimeError("UpstreamHttpClientPool is closed")
+
+        key = self._make_key(impersonate, proxy, http_version)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PoolEntry(session=self._create_session(key))
+            self._entries[key] = entry
+
+        entry.in_flight += 1
+        self.stats.leases += 1
+        try:
+            async with CurlCffiClient(
+                timeout=request_timeout if request_timeout is not None else settings.upstream_timeout,
+                impersonate=impersonate,
+                trust_env=True,
+                proxies=proxy,
+                session=entry.session,
+            ) as client:
+                yield client
+        finally:
+            entry.in_flight -= 1
+            entry.last_used = time.monotonic()
+
+    def start_idle_sweeper(self, interval_seconds: float = _IDLE_SWEEP_INTERVAL_SECONDS) -> None:
+        """
+        启动后台空闲回收任务（幂等）。
+
+        回收不依赖新请求触发，worker 空闲后会话与其 socket 也会按时关闭。
+        """
+        if self._closed or (self._sweeper is not None and not self._sweeper.done()):
+            return
+        self._sweeper = asyncio.create_task(self._sweep_forever(interval_seconds))
+
+    async def _sweep_forever(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.evict_idle()
+            except Exception:  # pragma: no cover - 回收失败不应终止后台任务
+                logger.exception("Upstream HTTP pool idle sweep failed")
+
+    async def evict_idle(self, *, now: float | None = None) -> int:
+        """关闭空闲超过 idle_seconds 且无在途请求的会话，返回回收数量。"""
+        current = time.monotonic() if now is None else now
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if entry.in_flight == 0 and current - entry.last_used >= self.idle_seconds
+        ]
+        for key in expired:
+            entry = self._entries.pop(key)
+            await self._close_session(entry.session)
+            self.stats.sessions_evicted += 1
+        return len(expired)
+
+    @staticmethod
+    async def _close_session(session: AsyncSession) -> None:
+        try:
+            await session.close()
+        except Exception:  # pragma: no cover - best-effort cleanup
+            logger.debug("Failed to close upstream HTTP pool session", exc_info=True)
+
+    async def aclose(self) -> None:
+        self._closed = True
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sweeper
+            self._sweeper = None
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            await self._close_session(entry.session)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self._entries),
+            "in_flight": sum(entry.in_flight for entry in self._entries.values()),
+        }
+
+
+_pools_by_loop: WeakKeyDictionary[asyncio.AbstractEventLoop, UpstreamHttpClientPool] = (
+    WeakKeyDictionary()
+)
+# 已关闭连接池的累计计数，保证 /metrics 中的计数器在 loop 退出后仍然单调。
+_retired_stats = UpstreamHttpPoolStats()
+
+
+def _create_pool() -> UpstreamHttpClientPool:
+    return UpstreamHttpClientPool(
+        max_clients=int(settings.upstream_http_pool_max_clients),
+        max_connections_per_host=int(settings.upstream_http_pool_max_connections_per_host),
+        idle_seconds=float(settings.upstream_http_pool_idle_seconds),
+        acquire_timeout=float(settings.upstream_http_pool_acquire_timeout_seconds),
+    )
+
+
+def get_upstream_http_pool() -> UpstreamHttpClientPool:
+    """
+    Return the upstream HTTP pool bound to the current event loop.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools_by_loop.get(loop)
+    if pool is None:
+        pool = _create_pool()
+        _pools_by_loop[loop] = pool
+    return pool
+
+
+def start_upstream_http_pool() -> UpstreamHttpClientPool:
+    """
+    Create the pool for the current loop and start its idle sweeper (lifespan startup).
+    """
+    pool = get_upstream_http_pool()
+    pool.start_idle_sweeper()
+    return pool
+
+
+async def close_upstream_http_pool_for_current_loop() -> None:
+    """
+    Close and forget the pool for the current running loop (lifespan shutdown).
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools_by_loop.pop(loop, None)
+    if pool is None:
+        return
+    _retired_stats.merge(pool.stats)
+    await pool.aclose()
+
+
+@asynccontextmanager
+async def upstream_http_client(
+    *,
+    request_timeout: float | None = None,
+    impersonate: str = "chrome120",
+) -> AsyncIterator[CurlCffiClient]:
+    """
+    借用当前 loop 连接池中的上游客户端；UPSTREAM_HTTP_POOL_ENABLED=false 时新建一次性会话。
+    """
+    effective_timeout = request_timeout if request_timeout is not None else settings.upstream_timeout
+    if settings.upstream_http_pool_enabled:
+        async with get_upstream_http_pool().lease(request_timeout=effective_timeout, impersonate=impersonate) as client:
+            yield client
+        return
+
+    async with CurlCffiClient(
+        timeout=effective_timeout,
+        impersonate=impersonate,
+        trust_env=True,
+    ) as client:
+        yield client
+
+
+def get_upstream_http_pool_stats() -> dict[str, Any]:
+    """
+    汇总当前进程内所有连接池的计数器与实时状态。
+    """
+    totals = UpstreamHttpPoolStats()
+    totals.merge(_retired_stats)
+    sessions = 0
+    in_flight = 0
+    for pool in list(_pools_by_loop.values()):
+        totals.merge(pool.stats)
+        snap = pool.snapshot()
+        sessions += snap["sessions"]
+        in_flight += snap["in_flight"]
+    return {
+        "enabled": bool(settings.upstream_http_pool_enabled),
+        "sessions": sessions,
+        "in_flight": in_flight,
+        "sessions_created": totals.sessions_created,
+        "sessions_evicted": totals.sessions_evicted,
+        "leases": totals.leases,
+        "connections_new": totals.connections_new,
+        "connections_reused": totals.connections_reused,
+        "pool_waits": totals.pool_waits,
+        "pool_timeouts": totals.pool_timeouts,
+    }
+
+
+__all__ = [
+    "UpstreamHttpClientPool",
+    "UpstreamHttpPoolStats",
+    "UpstreamHttpPoolTimeout",
+    "close_upstream_http_pool_for_current_loop",
+    "get_upstream_http_pool",
+    "get_upstream_http_pool_stats",
+    "start_upstream_http_pool",
+    "upstream_http_client",
+]
@@ -1,14 +1,21 @@
+import atexit
+import copy
 import datetime
 import logging
+import logging.handlers
+import queue
 import shutil
-from collections.abc import Callable
+import threading
+import time
+from collections.abc import Callable, Hashable
 from pathlib import Path
-from typing import TextIO
+from typing import Any, TextIO
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from .settings import settings
 
 _LOGGING_CONFIGURED = False
+_QUEUE_LISTENER: "DispatchingQueueListener | None" = None
 
 
 class LocalTimezoneFormatter(logging.Formatter):
@@ -437,13 +444,220 @@ class FixedBizFilter(logging.Filter):
         return True
 
 
+class LogQueueStats:
+    """Counters shared by the queue handlers and the listener of one logging queue."""
+
+    __slots__ = ("dropped", "reported")
+
+    def __init__(self) -> None:
+        self.dropped = 0
+        self.reported = 0
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Non-blocking front half of the async logging pipeline.
+
+    Records are tagged with their destination handler and put on a shared
+    bounded queue; when the queue is full the record is dropped and counted
+    instead of blocking the caller (typically the event loop thread).
+    Only %-interpolation happens here: filters (e.g. business inference),
+    formatting and file I/O run on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue, target: logging.Handler, stats: LogQueueStats) -> None:
+        super().__init__(log_queue)
+        self.target = target
+        self.stats = stats
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze the message now so later mutation of the args does not leak
+        # into the log line; other handlers still see the original record.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait((self.target, record))
+        except queue.Full:
+            self.stats.dropped += 1
+
+
+class DispatchingQueueListener(logging.handlers.QueueListener):
+    """
+    Background thread that drains the logging queue and hands every record to
+    the handler it was tagged with. Dropped records are reported as a single
+    warning line once the queue has room again.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        stats: LogQueueStats,
+        *,
+        drop_report_handler: logging.Handler | None = None,
+    ) -> None:
+        super().__init__(log_queue, respect_handler_level=True)
+        self.stats = stats
+        self.drop_report_handler = drop_report_handler
+
+    def handle(self, item: Any) -> None:
+        target, record = item
+        self._report_drops()
+        if record.levelno >= target.level:
+            target.handle(record)
+
+    def _report_drops(self) -> None:
+        stats = self.stats
+        dropped = stats.dropped
+        if dropped <= stats.reported or self.drop_report_handler is None:
+            return
+        record = logging.LogRecord(
+            name="apiproxy",
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="logging queue full: dropped %d log records",
+            args=(dropped - stats.reported,),
+            exc_info=None,
+        )
+        stats.reported = dropped
+        self.drop_report_handler.handle(record)
+
+
+def get_logging_queue_stats() -> dict[str, Any]:
+    """Snapshot of the async logging queue (for diagnostics)."""
+    listener = _QUEUE_LISTENER
+    if listener is None:
+        return {"enabled": False, "queued": 0, "capacity": 0, "dropped": 0}
+    return {
+        "enabled": True,
+        "queued": listener.queue.qsize(),
+        "capacity": listener.queue.maxsize,
+        "dropped": listener.stats.dropped,
+    }
+
+
+def stop_logging_queue() -> None:
+    """Flush the queued records and stop the listener thread (idempotent)."""
+    global _QUEUE_LISTENER
+    listener, _QUEUE_LISTENER = _QUEUE_LISTENER, None
+    if listener is None:
+        return
+    try:
+        listener.stop()
+    except Exception:
+        pass
+
+
+class LogSampler:
+    """
+    Rate-limit repetitive log lines per key: within one interval only the first
+    line for a key is emitted; the next emitted line carries the number of lines
+    that were suppressed in between.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float | None = None,
+        *,
+        max_keys: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # None means "read LOG_SAMPLE_INTERVAL_SECONDS on every call".
+        self._interval_seconds = interval_seconds
+        self._max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (window start, suppressed count)
+        self._windows: dict[Hashable, tuple[float, int]] = {}
+
+    def _interval(self) -> float:
+        if self._interval_seconds is not None:
+            return self._interval_seconds
+        return float(getattr(settings, "log_sample_interval_seconds", 0) or 0)
+
+    def allow(self, key: Hashable) -> int | None:
+        """
+        Return the number of suppressed lines when a line for `key` may be
+        emitted now, or None when it should be suppressed.
+        """
+        interval = self._interval()
+        if interval <= 0:
+            return 0
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None and now - window[0] < interval:
+                self._windows[key] = (window[0], window[1] + 1)
+                return None
+            if window is None and len(self._windows) >= self._max_keys:
+                self._windows.clear()
+            self._windows[key] = (now, 0)
+            return window[1] if window is not None else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+    def log(
+        self,
+        target: logging.Logger,
+        level: int,
+        key: Hashable,
+        msg: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        if not target.isEnabledFor(level):
+            return
+        suppressed = self.allow(key)
+        if suppressed is None:
+            return
+        if suppressed:
+            msg = f"{msg} (suppressed %d similar)"
+            args = (*args, suppressed)
+        # Attribute the record to the caller so business inference still works.
+        kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + 1
+        target.log(level, msg, *args, **kwargs)
+
+
+_DEFAULT_SAMPLER = LogSampler()
+
+
+def log_sampled(
+    target: logging.Logger,
+    key: Hashable,
+    msg: str,
+    *args: Any,
+    level: int = logging.INFO,
+    **kwargs: Any,
+) -> None:
+    """
+    Sampled variant of `target.log(level, msg, *args)` for hot paths: at most one
+    line per `key` every LOG_SAMPLE_INTERVAL_SECONDS.
+    """
+    kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + 1
+    _DEFAULT_SAMPLER.log(target, level, key, msg, *args, **kwargs)
+
+
+def reset_log_sampler() -> None:
+    """Forget all sampling windows of `log_sampled` (mainly for tests)."""
+    _DEFAULT_SAMPLER.reset()
+
+
 def setup_logging() -> None:
     """
     Configure application logging.
     Writes logs to a daily rotating folder under LOG_DIR (default: ./logs/),
     with files split by business, e.g. logs/2025-12-12/chat.log.
+
+    With LOG_ASYNC_ENABLED (default) the loggers only enqueue records; a single
+    listener thread runs the filters, formatting and file/console writes.
     """
-    global _LOGGING_CONFIGURED
+    global _LOGGING_CONFIGURED, _QUEUE_LISTENER
     if _LOGGING_CONFIGURED:
         return
 
@@ -477,6 +691,19 @@ def setup_logging() -> None:
     if not isinstance(split_by_business, bool):
         split_by_business = str(split_by_business).strip().lower() in ("1", "true", "yes")
 
+    listener: DispatchingQueueListener | None = None
+    log_queue: queue.Queue | None = None
+    queue_stats = LogQueueStats()
+    if getattr(settings, "log_async_enabled", True):
+        log_queue = queue.Queue(maxsize=max(1, int(getattr(settings, "log_queue_max_size", 10000))))
+        listener = DispatchingQueueListener(log_queue, queue_stats)
+
+    def _attach(target_logger: logging.Logger, handler: logging.Handler) -> None:
+        if log_queue is None:
+            target_logger.addHandler(handler)
+        else:
+            target_logger.addHandler(BoundedQueueHandler(log_queue, handler, queue_stats))
+
     if split_by_business:
         file_handler: logging.Handler = DailyFolderBusinessFileHandler(
             log_dir=log_dir,
@@ -499,7 +726,7 @@ def setup_logging() -> None:
     file_handler.addFilter(lambda record: record.name.startswith("apiproxy"))
     app_logger.setLevel(level_value)
     app_logger.propagate = True  # let logs also go to root/uvicorn handlers (console)
-    app_logger.addHandler(file_handler)
+    _attach(app_logger, file_handler)
 
     # Uvicorn logs: keep access/server logs separate for easier analysis.
     access_file_handler = DailyFolderFileHandler(
@@ -513,7 +740,7 @@ def setup_logging() -> None:
     access_file_handler.addFilter(FixedBizFilter("access"))
     access_logger.setLevel(level_value)
     access_logger.propagate = True
-    access_logger.addHandler(access_file_handler)
+    _attach(access_logger, access_file_handler)
 
     # Debug file for image upstream payloads，仅非生产环境启用，便于排查。
     if getattr(settings, "environment", "development").lower() != "production":
@@ -529,7 +756,7 @@ def setup_logging() -> None:
         image_debug_logger = logging.getLogger("apiproxy.image_debug")
         image_debug_logger.setLevel(logging.DEBUG)
         image_debug_logger.propagate = False
-        image_debug_logger.addHandler(image_debug_handler)
+        _attach(image_debug_logger, image_debug_handler)
 
     server_file_handler = DailyFolderFileHandler(
         log_dir=log_dir,
@@ -546,7 +773,7 @@ def setup_logging() -> None:
     )
     uvicorn_logger.setLevel(level_value)
     uvicorn_logger.propagate = True
-    uvicorn_logger.addHandler(server_file_handler)
+    _attach(uvicorn_logger, server_file_handler)
     uvicorn_error_logger.setLevel(level_value)
     uvicorn_error_logger.propagate = True
 
@@ -564,7 +791,13 @@ def setup_logging() -> None:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
         console_handler.addFilter(EnsureBizFilter())
-        root_logger.addHandler(console_handler)
+        _attach(root_logger, console_handler)
+
+    if listener is not None:
+        listener.drop_report_handler = file_handler
+        listener.start()
+        _QUEUE_LISTENER = listener
+        atexit.register(stop_logging_queue)
 
     _LOGGING_CONFIGURED = True
 
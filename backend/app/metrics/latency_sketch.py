@@ -0,0 +1,173 @@
+"""
+可合并的延迟分位数草图（DDSketch 风格，对数分桶）。
+
+- 值 x 落入桶 ceil(log_gamma(x))，gamma = (1 + α) / (1 - α)，任意分位数的相对误差不超过 α（1%）；
+- 两个草图合并 = 桶计数相加，因此分钟桶 → 小时 → 天的任意粒度都能得到真实分位数，
+  而不是“分位数的加权平均”；
+- 序列化为紧凑的二进制段（varint 编码），多个段首尾拼接仍是合法的草图
+  （解码时桶计数累加），数据库可以直接用 `old || new` 原子合并，无需读改写。
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+
+# 相对精度固定随格式版本走：不同精度的段无法合并，因此不做成配置项。
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+# 小于该值（毫秒）的延迟计入零桶，避免 log(0)。
+_MIN_TRACKABLE_MS = 1e-3
+# 桶数上限：超出时把最低的桶折叠到一起（只损失最低分位的精度，尾延迟不受影响）。
+DEFAULT_MAX_BUCKETS = 2048
+
+_FORMAT_VERSION = 1
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated latency sketch")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+
+class LatencySketch:
+    """对数分桶的延迟草图；只保存桶计数，与样本数量无关。"""
+
+    __slots__ = ("_bins", "count", "max_buckets", "zero_count")
+
+    def __init__(self, *, max_buckets: int = DEFAULT_MAX_BUCKETS) -> None:
+        self._bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.max_buckets = max(1, int(max_buckets))
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def add(self, value_ms: float, weight: int = 1) -> None:
+        if weight <= 0 or value_ms != value_ms:  # NaN
+            return
+        self.count += weight
+        if value_ms <= _MIN_TRACKABLE_MS:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(value_ms) / _LOG_GAMMA)
+        self._bins[index] = self._bins.get(index, 0) + weight
+        if len(self._bins) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: LatencySketch) -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self.zero_count += other.zero_count
+        bins = self._bins
+        for index, value in other._bins.items():
+            bins[index] = bins.get(index, 0) + value
+        if len(bins) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        ordered = sorted(self._bins)
+        overflow = len(ordered) - self.max_buckets
+        if overflow <= 0:
+            return
+        target = ordered[overflow]
+        folded = sum(self._bins.pop(index) for index in ordered[:overflow])
+        self._bins[target] += folded
+
+    @staticmethod
+    def _bucket_value(index: int) -> float:
+        # 桶 (gamma^(i-1), gamma^i] 的代表值，使两端相对误差都不超过 α。
+        return 2.0 * _GAMMA**index / (_GAMMA + 1.0)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        q = min(max(q, 0.0), 1.0)
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = self.zero_count
+        for index in sorted(self._bins):
+            cumulative += self._bins[index]
+            if cumulative > rank:
+                return self._bucket_value(index)
+        return self._bucket_value(max(self._bins))
+
+    def to_bytes(self) -> bytes:
+        """编码为一个自描述的段：version | zero_count | n | (Δindex, count) * n。"""
+        out = bytearray((_FORMAT_VERSION,))
+        _write_varint(out, self.zero_count)
+        _write_varint(out, len(self._bins))
+        previous = 0
+        for index in sorted(self._bins):
+            _write_varint(out, _zigzag(index - previous))
+            _write_varint(out, self._bins[index])
+            previous = index
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview, *, max_buckets: int = DEFAULT_MAX_BUCKETS) -> LatencySketch:
+        """解码一个或多个首尾拼接的段；格式不合法时抛出 ValueError。"""
+        raw = bytes(data)
+        sketch = cls(max_buckets=max_buckets)
+        pos = 0
+        while pos < len(raw):
+            version = raw[pos]
+            if version != _FORMAT_VERSION:
+                raise ValueError(f"unsupported latency sketch version: {version}")
+            zero_count, pos = _read_varint(raw, pos + 1)
+            size, pos = _read_varint(raw, pos)
+            sketch.zero_count += zero_count
+            sketch.count += zero_count
+            index = 0
+            for _ in range(size):
+                delta, pos = _read_varint(raw, pos)
+                value, pos = _read_varint(raw, pos)
+                index += _unzigzag(delta)
+                sketch._bins[index] = sketch._bins.get(index, 0) + value
+                sketch.count += value
+        if len(sketch._bins) > sketch.max_buckets:
+            sketch._collapse()
+        return sketch
+
+
+def merge_sketch_blobs(blobs: Iterable[bytes | bytearray | memoryview | None]) -> LatencySketch:
+    """合并多行的 latency_sketch 列；NULL（迁移前的旧数据）与损坏的值直接跳过。"""
+    merged = LatencySketch()
+    for blob in blobs:
+        if not blob:
+            continue
+        try:
+            merged.merge(LatencySketch.from_bytes(blob))
+        except ValueError:
+            continue
+    return merged
+
+
+__all__ = ["DEFAULT_MAX_BUCKETS", "RELATIVE_ACCURACY", "LatencySketch", "merge_sketch_blobs"]
@@ -8,6 +8,7 @@ from uuid import UUID
 from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
+from app.metrics.latency_sketch import LatencySketch, merge_sketch_blobs
 from app.models import AggregateRoutingMetrics, ProviderRoutingMetricsHistory
 
 
@@ -75,6 +76,7 @@ class AggregatedMetrics:
     success_requests: int = 0
     error_requests: int = 0
     latency_points: list[tuple[float, int]] = field(default_factory=list)
+    latency_sketch: LatencySketch = field(default_factory=LatencySketch)
 
     def add_latency_point(self, value: float, weight: int) -> None:
         if weight <= 0:
@@ -93,14 +95,21 @@ class AggregatedMetrics:
         self.add_latency_point(row.latency_avg_ms, base_weight or row.total_requests_1m)
         self.add_latency_point(row.latency_p95_ms, tail95_weight)
         self.add_latency_point(row.latency_p99_ms, tail99_weight)
+        self.latency_sketch.merge(merge_sketch_blobs([row.latency_sketch]))
+
+    def _latency_quantile(self, percentile: float) -> float:
+        # 草图覆盖全部请求时给出真实分位数；否则（迁移前的旧分钟桶）退回到加权近似。
+        if self.latency_sketch and self.latency_sketch.count >= self.total_requests:
+            return self.latency_sketch.quantile(percentile)
+        return _weighted_percentile(self.latency_points, percentile)
 
     def to_payload(self) -> dict[str, object]:
         total = max(self.total_requests, 0)
         error_rate = (self.error_requests / total) if total else 0.0
-        latency_p50 = _weighted_percentile(self.latency_points, 0.5)
-        latency_p90 = _weighted_percentile(self.latency_points, 0.9)
-        latency_p95 = _weighted_percentile(self.latency_points, 0.95)
-        latency_p99 = _weighted_percentile(self.latency_points, 0.99)
+        latency_p50 = self._latency_quantile(0.5)
+        latency_p90 = self._latency_quantile(0.9)
+        latency_p95 = self._latency_quantile(0.95)
+        latency_p99 = self._latency_quantile(0.99)
 
         return {
             "provider_id": self.key.provider_id,
@@ -4,10 +4,11 @@ import datetime as dt
 import uuid
 
 from celery import shared_task
-from sqlalchemy import Select, delete, func, select, text
+from sqlalchemy import LargeBinary, Select, delete, func, literal, select, text
 
 from app.celery_app import celery_app
 from app.db import SessionLocal
+from app.metrics.latency_sketch import LatencySketch, merge_sketch_blobs
 from app.metrics.offline_recalc import OfflineMetricsRecalculator
 from app.models import GatewayConfig as GatewayConfigRow
 from app.models.provider_metrics_history import (
@@ -270,7 +271,9 @@ def _rollup_select_from_minute(
     """
     Build an aggregation SELECT over minute-bucket history.
 
-    Note: percentile rollups are weighted averages (trend-oriented, not exact).
+    Note: latency sketches are concatenated with string_agg (segments stay mergeable), so
+    percentiles come from the merged sketch; the weighted-average sums are only a fallback
+    for buckets whose minute rows predate the sketch column.
     """
 
     bucket_start = func.date_trunc(bucket, source_model.window_start).label("bucket_start")
@@ -316,6 +319,7 @@ def _rollup_select_from_minute(
             func.coalesce(func.sum(source_model.token_estimated_requests), 0).label(
                 "token_estimated_requests"
             ),
+            func.string_agg(source_model.latency_sketch, literal(b"", LargeBinary)).label("latency_sketch"),
             weight,
         )
         .where(
@@ -334,6 +338,21 @@ def _rollup_select_from_minute(
     )
 
 
+def _apply_latency_sketch(payload: dict, sketch: LatencySketch) -> None:
+    """
+    用合并后的草图覆盖加权平均得到的分位数，并把草图压缩成单个段写入上卷表。
+
+    只有草图覆盖了桶内全部请求时才使用（迁移前的旧分钟桶没有草图，混用会低估样本量）。
+    """
+    if not sketch or sketch.count < int(payload.get("total_requests") or 0):
+        payload["latency_sketch"] = None
+        return
+    payload["latency_p50_ms"] = sketch.quantile(0.5)
+    payload["latency_p95_ms"] = sketch.quantile(0.95)
+    payload["latency_p99_ms"] = sketch.quantile(0.99)
+    payload["latency_sketch"] = sketch.to_bytes()
+
+
 def _upsert_rollup_rows(
     *,
     session,
@@ -365,6 +384,7 @@ def _upsert_rollup_rows(
                 "latency_p50_ms": excluded.latency_p50_ms,
                 "latency_p95_ms": excluded.latency_p95_ms,
                 "latency_p99_ms": excluded.latency_p99_ms,
+                "latency_sketch": excluded.latency_sketch,
                 "error_rate": excluded.error_rate,
                 "success_qps": excluded.success_qps,
                 "status": excluded.status,
@@ -404,6 +424,7 @@ def _upsert_rollup_rows(
                 "latency_p50_ms": excluded.latency_p50_ms,
                 "latency_p95_ms": excluded.latency_p95_ms,
                 "latency_p99_ms": excluded.latency_p99_ms,
+                "latency_sketch": excluded.latency_sketch,
                 "error_rate": excluded.error_rate,
                 "success_qps": excluded.success_qps,
                 "status": excluded.status,
@@ -498,6 +519,7 @@ def _rollup_range(
                     "token_estimated_requests": int(row[21] or 0),
                 }
             )
+            _apply_latency_sketch(payloads[-1], merge_sketch_blobs([row[22]]))
         written = _upsert_rollup_rows(session=session, target_model=target_model, uq_constraint=uq_constraint, rows=payloads)
         session.commit()
         return written
@@ -527,6 +549,7 @@ def _rollup_range(
             source_model.output_tokens_sum,
             source_model.total_tokens_sum,
             source_model.token_estimated_requests,
+            source_model.latency_sketch,
         ).where(
             source_model.window_start >= start_at,
             source_model.window_start < end_at,
@@ -565,6 +588,7 @@ def _rollup_range(
                 "output_tokens_sum": 0,
                 "total_tokens_sum": 0,
                 "token_estimated_requests": 0,
+                "_sketch": LatencySketch(),
             }
             buckets[key] = agg
 
@@ -585,6 +609,7 @@ def _rollup_range(
         agg["output_tokens_sum"] += int(r[19] or 0)
         agg["total_tokens_sum"] += int(r[20] or 0)
         agg["token_estimated_requests"] += int(r[21] or 0)
+        agg["_sketch"].merge(merge_sketch_blobs([r[22]]))
 
     payloads = []
     for agg in buckets.values():
@@ -603,6 +628,7 @@ def _rollup_range(
         agg["error_rate"] = (error_requests / total_requests) if total_requests else 0.0
         agg["success_qps"] = (success_requests / window_seconds) if window_seconds else 0.0
         agg["status"] = "unknown"
+        _apply_latency_sketch(agg, agg.pop("_sketch"))
         payloads.append(agg)
 
     written = _upsert_rollup_rows(session=session, target_model=target_model, uq_constraint=uq_constraint, rows=payloads)
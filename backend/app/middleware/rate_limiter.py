@@ -3,7 +3,6 @@ Rate limiting middleware to prevent brute force and DDoS attacks.
 """
 
 import time
-from collections import defaultdict
 from collections.abc import Callable
 
 from fastapi import Request, Response, status
@@ -12,6 +11,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from app.settings import settings
+from app.storage.rate_limit import LocalSlidingWindowLimiter, RedisSlidingWindowLimiter
 
 try:
     from redis.asyncio import Redis
@@ -23,12 +23,11 @@ class InMemoryRateLimiter:
     """
     内存版限流器（适用于单实例或开发环境）。
     
-    使用滑动窗口算法，记录每个 IP 在时间窗口内的请求次数。
+    使用滑动窗口算法：每个 key 一个固定容量的时间戳环形缓冲，判断与记录均为摊还 O(1)。
     """
 
     def __init__(self):
-        # {ip: [(timestamp, count), ...]}
-        self._requests: dict[str, list[tuple[float, int]]] = defaultdict(list)
+        self._limiter = LocalSlidingWindowLimiter()
 
     async def is_rate_limited(
         self,
@@ -47,57 +46,24 @@ class InMemoryRateLimiter:
         Returns:
             (is_limited, remaining, reset_time)
         """
-        now = time.time()
-        cutoff = now - window_seconds
-
-        # 清理过期记录
-        self._requests[key] = [
-            (ts, count) for ts, count in self._requests[key] if ts > cutoff
-        ]
-
-        # 计算当前窗口内的请求数
-        current_count = sum(count for _, count in self._requests[key])
-
-        if current_count >= max_requests:
-            # 计算重置时间（最早请求的过期时间）
-            if self._requests[key]:
-                oldest_ts = min(ts for ts, _ in self._requests[key])
-                reset_time = int(oldest_ts + window_seconds)
-            else:
-                reset_time = int(now + window_seconds)
-            return True, 0, reset_time
-
-        # 记录本次请求
-        self._requests[key].append((now, 1))
-        remaining = max_requests - current_count - 1
-        reset_time = int(now + window_seconds)
-
-        return False, remaining, reset_time
+        decision = self._limiter.acquire(key, limit=max_requests, window_seconds=window_seconds)
+        return not decision.allowed, decision.remaining, int(decision.reset_at)
 
     async def cleanup_old_entries(self, max_age_seconds: int = 3600):
         """定期清理过期数据（可选的后台任务）"""
-        now = time.time()
-        cutoff = now - max_age_seconds
-        keys_to_delete = []
-
-        for key, requests in self._requests.items():
-            self._requests[key] = [(ts, count) for ts, count in requests if ts > cutoff]
-            if not self._requests[key]:
-                keys_to_delete.append(key)
-
-        for key in keys_to_delete:
-            del self._requests[key]
+        self._limiter.cleanup(max_age_seconds)
 
 
 class RedisRateLimiter:
     """
     Redis 版限流器（适用于分布式部署）。
     
-    使用 Redis 的原子操作实现分布式限流。
+    通过 Lua 脚本在 Redis 端原子地完成滑动窗口的检查与占用（一次往返）。
     """
 
     def __init__(self, redis_client: Redis):
         self.redis = redis_client
+        self._limiter = RedisSlidingWindowLimiter(redis_client)
 
     async def is_rate_limited(
         self,
@@ -108,41 +74,10 @@ class RedisRateLimiter:
         """
         检查是否超过限流阈值（Redis 版本）。
         """
-        now = time.time()
-        redis_key = f"ratelimit:{key}"
-
-        # 使用 Redis 的 ZSET 实现滑动窗口
-        pipe = self.redis.pipeline()
-
-        # 移除过期的请求记录
-        cutoff = now - window_seconds
-        pipe.zremrangebyscore(redis_key, 0, cutoff)
-
-        # 获取当前窗口内的请求数
-        pipe.zcard(redis_key)
-
-        # 添加当前请求
-        pipe.zadd(redis_key, {str(now): now})
-
-        # 设置过期时间
-        pipe.expire(redis_key, window_seconds + 10)
-
-        results = await pipe.execute()
-        current_count = results[1]  # ZCARD 的结果
-
-        if current_count >= max_requests:
-            # 获取最早的请求时间
-            oldest = await self.redis.zrange(redis_key, 0, 0, withscores=True)
-            if oldest:
-                oldest_ts = oldest[0][1]
-                reset_time = int(oldest_ts + window_seconds)
-            else:
-                reset_time = int(now + window_seconds)
-            return True, 0, reset_time
-
-        remaining = max_requests - current_count - 1
-        reset_time = int(now + window_seconds)
-        return False, remaining, reset_time
+        decision = await self._limiter.acquire(
+            f"ratelimit:{key}", limit=max_requests, window_seconds=window_seconds
+        )
+        return not decision.allowed, decision.remaining, int(decision.reset_at)
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
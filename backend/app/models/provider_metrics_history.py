@@ -2,7 +2,18 @@ from __future__ import annotations
 
 from uuid import UUID
 
-from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, String, UniqueConstraint, text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped
 
@@ -110,6 +121,8 @@ class ProviderRoutingMetricsHistory(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     )
     latency_p95_ms: Mapped[float] = Column(Float, nullable=False)
     latency_p99_ms: Mapped[float] = Column(Float, nullable=False)
+    # 可合并的延迟草图（app.metrics.latency_sketch），上卷与 Dashboard 合并它得到真实分位数。
+    latency_sketch: Mapped[bytes | None] = Column(LargeBinary, nullable=True)
 
     error_rate: Mapped[float] = Column(Float, nullable=False)
     success_qps_1m: Mapped[float] = Column(Float, nullable=False)
@@ -180,6 +193,7 @@ class ProviderRoutingMetricsHourly(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     latency_p50_ms: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
     latency_p95_ms: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
     latency_p99_ms: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
+    latency_sketch: Mapped[bytes | None] = Column(LargeBinary, nullable=True)
 
     error_rate: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
     success_qps: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
@@ -245,6 +259,7 @@ class ProviderRoutingMetricsDaily(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     latency_p50_ms: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
     latency_p95_ms: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
     latency_p99_ms: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
+    latency_sketch: Mapped[bytes | None] = Column(LargeBinary, nullable=True)
 
     error_rate: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
     success_qps: Mapped[float] = Column(Float, nullable=False, server_default=text("0"))
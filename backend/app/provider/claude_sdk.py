@@ -2,17 +2,16 @@
 Claude/Anthropic 官方 SDK 调用封装。
 
 仅在 ProviderConfig.transport == "sdk" 时启用，避免和 HTTP 代理路径混用。
+使用 AsyncAnthropic，客户端按 (api_key, base_url) 缓存复用（见 app.provider.sdk_clients）。
 """
 
 from __future__ import annotations
 
 import json
-import threading
 from collections.abc import AsyncIterator
-from queue import SimpleQueue
 from typing import Any
 
-import anyio
+from app.provider.sdk_clients import lease_sdk_client
 
 
 class ClaudeSDKError(Exception):
@@ -21,7 +20,7 @@ class ClaudeSDKError(Exception):
 
 def _create_client(api_key: str, base_url: str | None):
     try:
-        from anthropic import Anthropic  # type: ignore
+        from anthropic import AsyncAnthropic  # type: ignore
     except ImportError as exc:  # pragma: no cover - import guard
         raise ClaudeSDKError("anthropic 未安装，请执行: pip install anthropic") from exc
 
@@ -29,11 +28,15 @@ def _create_client(api_key: str, base_url: str | None):
         kwargs: dict[str, Any] = {"api_key": api_key}
         if base_url:
             kwargs["base_url"] = str(base_url)
-        return Anthropic(**kwargs)
+        return AsyncAnthropic(**kwargs)
     except Exception as exc:  # pragma: no cover - defensive
         raise ClaudeSDKError(f"初始化 anthropic SDK 失败: {exc}") from exc
 
 
+def _lease_client(api_key: str, base_url: str | None):
+    return lease_sdk_client("claude", api_key, base_url, _create_client)
+
+
 def _response_to_dict(obj: Any) -> dict[str, Any]:
     if obj is None:
         return {}
@@ -71,26 +74,22 @@ async def list_models(
     """
     Discover Anthropic 模型列表。
     """
-    client = _create_client(api_key, base_url)
-
-    def _call():
-        return client.models.list()
-
-    try:
-        resp = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise ClaudeSDKError(f"anthropic 列表接口失败: {exc}") from exc
+    async with _lease_client(api_key, base_url) as client:
+        try:
+            resp = await client.models.list()
+        except Exception as exc:
+            raise ClaudeSDKError(f"anthropic 列表接口失败: {exc}") from exc
 
-    # Page 对象通常带 data 字段，先尝试结构化读取。
-    if hasattr(resp, "data") and isinstance(resp.data, list):
-        return [_response_to_dict(item) for item in resp.data if item is not None]
+        # Page 对象通常带 data 字段，先尝试结构化读取。
+        if hasattr(resp, "data") and isinstance(resp.data, list):
+            return [_response_to_dict(item) for item in resp.data if item is not None]
 
-    payload = _response_to_dict(resp)
-    if isinstance(payload, dict) and isinstance(payload.get("data"), list):
-        return [item for item in payload["data"] if isinstance(item, dict)]
-    if isinstance(payload, list):
-        return [item for item in payload if isinstance(item, dict)]
-    return []
+        payload = _response_to_dict(resp)
+        if isinstance(payload, dict) and isinstance(payload.get("data"), list):
+            return [item for item in payload["data"] if isinstance(item, dict)]
+        if isinstance(payload, list):
+            return [item for item in payload if isinstance(item, dict)]
+        return []
 
 
 async def generate_content(
@@ -103,18 +102,15 @@ async def generate_content(
     """
     非流式 messages.create 调用。
     """
-    client = _create_client(api_key, base_url)
-    upstream_payload = _normalize_payload(payload, model_id)
-
-    def _call():
-        return client.messages.create(**upstream_payload)
+    async with _lease_client(api_key, base_url) as client:
+        upstream_payload = _normalize_payload(payload, model_id)
 
-    try:
-        resp = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise ClaudeSDKError(f"anthropic 调用失败: {exc}") from exc
+        try:
+            resp = await client.messages.create(**upstream_payload)
+        except Exception as exc:
+            raise ClaudeSDKError(f"anthropic 调用失败: {exc}") from exc
 
-    return _response_to_dict(resp)
+        return _response_to_dict(resp)
 
 
 async def stream_content(
@@ -125,31 +121,15 @@ async def stream_content(
     base_url: str | None,
 ) -> AsyncIterator[dict[str, Any]]:
     """
-    流式 messages.stream 调用。使用后台线程消费同步 SDK，并将事件转为 dict。
+    流式 messages.stream 调用。在事件循环中按需读取异步事件流，不额外缓冲；
+    下游断开（生成器被关闭/取消）时退出 stream 上下文，随之关闭上游响应。
     """
-    client = _create_client(api_key, base_url)
-    upstream_payload = _normalize_payload(payload, model_id)
-
-    queue: SimpleQueue[Any] = SimpleQueue()
-    sentinel = object()
+    async with _lease_client(api_key, base_url) as client:
+        upstream_payload = _normalize_payload(payload, model_id)
 
-    def _worker():
         try:
-            with client.messages.stream(**upstream_payload) as stream:
-                for event in stream:
-                    queue.put(event)
-        except Exception as exc:  # pragma: no cover - defensive
-            queue.put(exc)
-        finally:
-            queue.put(sentinel)
-
-    thread = threading.Thread(target=_worker, daemon=True)
-    thread.start()
-
-    while True:
-        item = await anyio.to_thread.run_sync(queue.get)
-        if item is sentinel:
-            break
-        if isinstance(item, Exception):
-            raise ClaudeSDKError(f"anthropic 流式调用失败: {item}") from item
-        yield _response_to_dict(item)
+            async with client.messages.stream(**upstream_payload) as stream:
+                async for event in stream:
+                    yield _response_to_dict(event)
+        except Exception as exc:
+            raise ClaudeSDKError(f"anthropic 流式调用失败: {exc}") from exc
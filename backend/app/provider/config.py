@@ -354,7 +354,19 @@ def load_providers_with_configs(
 def get_provider_config(provider_id: str, session: Session | None = None) -> ProviderConfig | None:
     """
     Load a single provider configuration by its slug/identifier.
+
+    Without an explicit session the config is served from the in-process registry
+    (app.provider.config_registry) once it is loaded; the returned object is shared
+    and must be treated as read-only. Callers passing a session always read from it
+    so that their own uncommitted changes stay visible.
     """
+    if session is None:
+        from app.provider.config_registry import lookup_provider_config
+
+        hit, cached = lookup_provider_config(provider_id)
+        if hit:
+            return cached
+
     owns_session = False
     if session is None:
         session = SessionLocal()
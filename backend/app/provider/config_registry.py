@@ -0,0 +1,267 @@
+"""
+进程内 ProviderConfig 注册表。
+
+网关每次尝试候选 Provider 都会调用 `get_provider_config`：过去每次都要开 Session、
+selectinload api_keys / models，并重新解密 key、校验构建 ProviderConfig。
+这里在进程内维护一份构建好的 ProviderConfig（只读，调用方不得修改）：
+
+- 后台任务启动时批量加载全部 Provider，之后定期比对每个 Provider 的指纹
+  （providers.updated_at + api_keys / models 的行数与最大 updated_at），只重建发生变化的 Provider，
+  因此其它 worker 的修改最多延迟 PROVIDER_CONFIG_REGISTRY_REFRESH_SECONDS 生效；
+- 本进程修改 Provider / key / 模型后调用 invalidate_provider_config：该 Provider 立即回退到查库，
+  并唤醒后台任务增量重建；
+- 每个条目带单调递增的版本号，key_pool 据此跳过未变化配置的 key 状态同步。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import suppress
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.db.session import SessionLocal
+from app.logging_config import logger
+from app.models import Provider, ProviderAPIKey, ProviderModel
+from app.provider.config import _build_provider_config
+from app.schemas import ProviderConfig
+from app.settings import settings
+
+
+def load_provider_config_fingerprints(db: Session) -> dict[str, tuple[Any, ...]]:
+    """
+    每个 Provider 的廉价指纹（一次查询）：自身或其 key / 模型行的增删改都会改变指纹。
+    """
+    key_stats = (
+        select(
+            ProviderAPIKey.provider_uuid.label("provider_uuid"),
+            func.count().label("n"),
+            func.max(ProviderAPIKey.updated_at).label("last_updated"),
+        )
+        .group_by(ProviderAPIKey.provider_uuid)
+        .subquery()
+    )
+    model_stats = (
+        select(
+            ProviderModel.provider_id.label("provider_uuid"),
+            func.count().label("n"),
+            func.max(ProviderModel.updated_at).label("last_updated"),
+        )
+        .group_by(ProviderModel.provider_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Provider.provider_id,
+            Provider.updated_at,
+            key_stats.c.n,
+            key_stats.c.last_updated,
+            model_stats.c.n,
+            model_stats.c.last_updated,
+        )
+        .outerjoin(key_stats, key_stats.c.provider_uuid == Provider.id)
+        .outerjoin(model_stats, model_stats.c.provider_uuid == Provider.id)
+    ).all()
+    return {
+        str(provider_id): tuple(str(part) if part is not None else None for part in parts)
+        for provider_id, *parts in rows
+    }
+
+
+class ProviderConfigRegistry:
+    """
+    持有构建好的 ProviderConfig；generation 在每次失效时递增，避免失效前开始的构建覆盖新数据。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # provider_id -> (版本号, 配置)；配置为 None 表示 Provider 存在但不可用（例如没有启用的 key）。
+        self._entries: dict[str, tuple[int, ProviderConfig | None]] = {}
+        self._fingerprints: dict[str, tuple[Any, ...]] = {}
+        self._stale: set[str] = set()
+        self._loaded = False
+        self._generation = 0
+        self._version = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def lookup(self, provider_id: str) -> tuple[bool, ProviderConfig | None]:
+        """
+        返回 (命中, 配置)；未加载、已失效或未知的 Provider 视为未命中，由调用方查库。
+        """
+        if not self._loaded or provider_id in self._stale:
+            return False, None
+        entry = self._entries.get(provider_id)
+        if entry is None:
+            return False, None
+        return True, entry[1]
+
+    def version_of(self, config: ProviderConfig) -> int | None:
+        """
+        config 是注册表中该 Provider 的当前对象时返回其版本号，否则返回 None。
+        """
+        if not self._loaded or config.id in self._stale:
+            return None
+        entry = self._entries.get(config.id)
+        if entry is None or entry[1] is not config:
+            return None
+        return entry[0]
+
+    def invalidate(self, provider_id: str | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if provider_id is None:
+                self._loaded = False
+                self._fingerprints.clear()
+            else:
+                self._stale.add(provider_id)
+                self._fingerprints.pop(provider_id, None)
+
+    def refresh(self, db: Session) -> int:
+        """
+        重建指纹发生变化的 Provider，返回重建数量。
+        """
+        with self._lock:
+            generation = self._generation
+            current = dict(self._fingerprints)
+            full = not self._loaded
+
+        fingerprints = load_provider_config_fingerprints(db)
+        changed = [pid for pid, fp in fingerprints.items() if current.get(pid) != fp]
+        removed = [pid for pid in current if pid not in fingerprints]
+
+        built: dict[str, ProviderConfig | None] = {}
+        if changed:
+            stmt = (
+                select(Provider)
+                .options(
+                    selectinload(Provider.api_keys),
+                    selectinload(Provider.models),
+                )
+                .execution_options(populate_existing=True)
+            )
+            if not full:
+                stmt = stmt.where(Provider.provider_id.in_(changed))
+            for provider in db.execute(stmt).scalars().all():
+                built[provider.provider_id] = _build_provider_config(provider)
+
+        with self._lock:
+            if generation != self._generation:
+                # 构建期间发生了本地失效，丢弃本次结果，等待下一轮重建。
+                return 0
+            for pid in changed:
+                self._version += 1
+                self._entries[pid] = (self._version, built.get(pid))
+                self._fingerprints[pid] = fingerprints[pid]
+            for pid in removed:
+                self._entries.pop(pid, None)
+                self._fingerprints.pop(pid, None)
+            if full:
+                for pid in [pid for pid in self._entries if pid not in fingerprints]:
+                    del self._entries[pid]
+            self._stale.clear()
+            self._loaded = True
+        return len(changed)
+
+
+_registry = ProviderConfigRegistry()
+_refresher_tasks: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, tuple[asyncio.Task[None], asyncio.Event]
+] = WeakKeyDictionary()
+
+
+def get_provider_config_registry() -> ProviderConfigRegistry:
+    return _registry
+
+
+def lookup_provider_config(provider_id: str) -> tuple[bool, ProviderConfig | None]:
+    if not settings.provider_config_registry_enabled:
+        return False, None
+    return _registry.lookup(provider_id)
+
+
+def provider_config_version(config: ProviderConfig) -> int | None:
+    """
+    key_pool 使用：配置来自注册表时返回其版本号，版本不变即可跳过 key 状态同步。
+    """
+    if not settings.provider_config_registry_enabled:
+        return None
+    return _registry.version_of(config)
+
+
+def invalidate_provider_config(provider_id: str | None = None) -> None:
+    """
+    本进程修改 Provider / key / 模型后调用：该 Provider（None 表示全部）回退到查库，并唤醒后台重建。
+    可在同步路由（线程池）中调用。
+    """
+    _registry.invalidate(provider_id)
+    for loop, (task, wake) in list(_refresher_tasks.items()):
+        if task.done() or loop.is_closed():
+            continue
+        with suppress(RuntimeError):
+            loop.call_soon_threadsafe(wake.set)
+
+
+def _refresh_with_new_session() -> None:
+    with SessionLocal() as db:
+        _registry.refresh(db)
+
+
+async def _refresh_forever(interval_seconds: float, wake: asyncio.Event) -> None:
+    while True:
+        wake.clear()
+        try:
+            await asyncio.to_thread(_refresh_with_new_session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("provider config registry refresh failed: %s", exc)
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(wake.wait(), timeout=interval_seconds)
+
+
+def start_provider_config_refresher() -> asyncio.Task[None] | None:
+    """
+    在当前事件循环中启动注册表后台刷新任务（幂等）。
+    """
+    if not settings.provider_config_registry_enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    existing = _refresher_tasks.get(loop)
+    if existing is not None and not existing[0].done():
+        return existing[0]
+    wake = asyncio.Event()
+    task = loop.create_task(
+        _refresh_forever(float(settings.provider_config_registry_refresh_seconds), wake)
+    )
+    _refresher_tasks[loop] = (task, wake)
+    return task
+
+
+async def stop_provider_config_refresher() -> None:
+    loop = asyncio.get_running_loop()
+    entry = _refresher_tasks.pop(loop, None)
+    if entry is None:
+        return
+    task, _ = entry
+    task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+__all__ = [
+    "ProviderConfigRegistry",
+    "get_provider_config_registry",
+    "invalidate_provider_config",
+    "load_provider_config_fingerprints",
+    "lookup_provider_config",
+    "provider_config_version",
+    "start_provider_config_refresher",
+    "stop_provider_config_refresher",
+]
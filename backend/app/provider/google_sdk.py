@@ -3,19 +3,18 @@ Helpers for calling Google Gemini via the official google-genai SDK.
 
 These helpers are only used when ProviderConfig.transport == "sdk" so that
 we bypass HTTP path concatenation (/v1/...) and rely on the vendor SDK
-behaviour instead.
+behaviour instead. The async client (client.aio) is cached per
+(api_key, base_url) via app.provider.sdk_clients.
 """
 
 from __future__ import annotations
 
 import base64
 import json
-import threading
 from collections.abc import AsyncIterator, Iterable
-from queue import SimpleQueue
 from typing import Any
 
-import anyio
+from app.provider.sdk_clients import aclose_sdk_resource, lease_sdk_client
 
 
 class GoogleSDKError(Exception):
@@ -37,6 +36,10 @@ def _create_client(api_key: str, base_url: str | None):
         raise GoogleSDKError(f"初始化 google-genai 失败: {exc}") from exc
 
 
+def _lease_client(api_key: str, base_url: str | None):
+    return lease_sdk_client("google", api_key, base_url, _create_client)
+
+
 def _data_url_to_inline_data(url: str) -> dict[str, str] | None:
     """
     Convert a data: URI into inlineData payload accepted by Gemini.
@@ -127,17 +130,13 @@ async def list_models(
     """
     Discover models via SDK. Falls back to empty list on errors.
     """
-    client = _create_client(api_key, base_url)
-
-    def _call():
-        return list(client.models.list())
-
-    try:
-        items = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise GoogleSDKError(f"google-genai 列表接口失败: {exc}") from exc
+    async with _lease_client(api_key, base_url) as client:
+        try:
+            items = [item async for item in await client.aio.models.list()]
+        except Exception as exc:
+            raise GoogleSDKError(f"google-genai 列表接口失败: {exc}") from exc
 
-    return [_response_to_dict(item) for item in items]
+        return [_response_to_dict(item) for item in items]
 
 
 async def generate_content(
@@ -150,21 +149,18 @@ async def generate_content(
     """
     Non-streaming generate_content 调用。
     """
-    client = _create_client(api_key, base_url)
-    contents = payload.get("contents")
-    if not contents:
-        messages = payload.get("messages") or payload.get("input") or []
-        contents = _messages_to_contents(messages)
-
-    def _call():
-        return client.models.generate_content(model=model_id, contents=contents)
+    async with _lease_client(api_key, base_url) as client:
+        contents = payload.get("contents")
+        if not contents:
+            messages = payload.get("messages") or payload.get("input") or []
+            contents = _messages_to_contents(messages)
 
-    try:
-        response = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise GoogleSDKError(f"google-genai 调用失败: {exc}") from exc
+        try:
+            response = await client.aio.models.generate_content(model=model_id, contents=contents)
+        except Exception as exc:
+            raise GoogleSDKError(f"google-genai 调用失败: {exc}") from exc
 
-    return _response_to_dict(response)
+        return _response_to_dict(response)
 
 
 async def stream_content(
@@ -175,36 +171,24 @@ async def stream_content(
     base_url: str | None,
 ) -> AsyncIterator[dict[str, Any]]:
     """
-    Streaming generate_content 调用。使用后台线程消费同步 SDK，
-    通过队列把分块传回异步上下文。
+    Streaming generate_content 调用。通过 client.aio 在事件循环中按需读取分块，
+    不额外缓冲；下游断开（生成器被关闭/取消）时关闭上游流。
     """
-    client = _create_client(api_key, base_url)
-    contents = payload.get("contents")
-    if not contents:
-        messages = payload.get("messages") or payload.get("input") or []
-        contents = _messages_to_contents(messages)
+    async with _lease_client(api_key, base_url) as client:
+        contents = payload.get("contents")
+        if not contents:
+            messages = payload.get("messages") or payload.get("input") or []
+            contents = _messages_to_contents(messages)
 
-    queue: SimpleQueue[Any] = SimpleQueue()
-    sentinel = object()
+        try:
+            stream = await client.aio.models.generate_content_stream(model=model_id, contents=contents)
+        except Exception as exc:
+            raise GoogleSDKError(f"google-genai 流式调用失败: {exc}") from exc
 
-    def _worker():
         try:
-            for part in client.models.generate_content(
-                model=model_id, contents=contents, stream=True
-            ):
-                queue.put(part)
-        except Exception as exc:  # pragma: no cover - defensive
-            queue.put(exc)
+            async for part in stream:
+                yield _response_to_dict(part)
+        except Exception as exc:
+            raise GoogleSDKError(f"google-genai 流式调用失败: {exc}") from exc
         finally:
-            queue.put(sentinel)
-
-    thread = threading.Thread(target=_worker, daemon=True)
-    thread.start()
-
-    while True:
-        item = await anyio.to_thread.run_sync(queue.get)
-        if item is sentinel:
-            break
-        if isinstance(item, Exception):
-            raise GoogleSDKError(f"google-genai 流式调用失败: {item}") from item
-        yield _response_to_dict(item)
+            await aclose_sdk_resource(stream)
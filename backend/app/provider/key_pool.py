@@ -1,5 +1,11 @@
 """
 Weighted API key selection and backoff for providers with multiple keys.
+
+Selection is lock-free: each provider keeps a versioned snapshot of its key states,
+preference scores and per-score-group alias tables (O(1) weighted sampling).
+The snapshot is rebuilt only when the key config or the scores change; Redis
+preference scores are loaded once on first use and then refreshed in the
+background, so the hot path only awaits the per-key QPS reservation.
 """
 
 from __future__ import annotations
@@ -9,13 +15,16 @@ import hashlib
 import hmac
 import random
 import time
-from dataclasses import dataclass
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 
 from redis.asyncio import Redis
 
 from app.logging_config import logger
+from app.provider.config_registry import provider_config_version
 from app.schemas import ProviderConfig
 from app.settings import settings
+from app.storage.rate_limit import LocalSlidingWindowLimiter, get_redis_rate_limiter
 
 
 @dataclass
@@ -43,8 +52,6 @@ class NoAvailableProviderKey(Exception):
     """
 
 
-_KEY_STATES: dict[str, dict[str, ProviderKeyState]] = {}
-_LOCKS: dict[str, asyncio.Lock] = {}
 _PREFERENCE_BASE = 1.0
 _PREFERENCE_MIN = 0.1
 _PREFERENCE_MAX = 10.0
@@ -54,12 +61,173 @@ _PREFERENCE_FATAL_DELTA = -2.0
 _PREFERENCE_AUTH_FAILURE_DELTA = -3.0
 _PREFERENCE_GROUP_TOLERANCE = 0.05
 _PREFERENCE_KEY_PREFIX = "provider:{provider_id}:key_scores"
+# 优选分在本地缓存的时长；过期后由后台任务刷新，请求路径不等待。
+_PREFERENCE_REFRESH_SECONDS = 5.0
+# 别名表连续抽到不可用 key（退避中 / QPS 超限）的次数上限，超过后在剩余候选中线性抽样。
+_ALIAS_SAMPLE_ATTEMPTS = 3
+
+
+class _AliasTable:
+    """
+    Vose alias method: O(n) build, O(1) weighted sampling.
+    """
+
+    __slots__ = ("alias", "items", "prob", "weights")
+
+    def __init__(self, items: Sequence[ProviderKeyState], weights: Sequence[float]) -> None:
+        self.items = tuple(items)
+        self.weights = tuple(weights)
+        n = len(self.items)
+        total = sum(self.weights)
+        scaled = [w * n / total for w in self.weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            lo, hi = small.pop(), large.pop()
+            self.prob[lo] = scaled[lo]
+            self.alias[lo] = hi
+            scaled[hi] += scaled[lo] - 1.0
+            (small if scaled[hi] < 1.0 else large).append(hi)
+        # 剩余项（浮点误差）概率为 1，指向自身。
+
+    def sample(self) -> ProviderKeyState:
+        n = len(self.items)
+        u = random.random() * n
+        idx = min(int(u), n - 1)
+        if u - idx < self.prob[idx]:
+            return self.items[idx]
+        return self.items[self.alias[idx]]
 
 
-def _get_lock(provider_id: str) -> asyncio.Lock:
-    if provider_id not in _LOCKS:
-        _LOCKS[provider_id] = asyncio.Lock()
-    return _LOCKS[provider_id]
+@dataclass
+class _PreferenceGroup:
+    score: float
+    states: tuple[ProviderKeyState, ...]
+    table: _AliasTable
+
+
+@dataclass
+class _ProviderKeyPool:
+    """
+    Per-provider snapshot. Mutations happen in synchronous code only, so readers on
+    the event loop always see a consistent version without taking a lock.
+    """
+
+    provider_id: str
+    fingerprint: tuple = ()
+    # 配置来自 ProviderConfig 注册表时的版本号；版本不变时跳过同步。
+    config_version: int | None = None
+    states: dict[str, ProviderKeyState] = field(default_factory=dict)
+    # 以明文 key 为索引的本地优选分（仅在内存中）；Redis 中只存 HMAC 哈希。
+    scores: dict[str, float] = field(default_factory=dict)
+    scores_loaded_at: float | None = None
+    refresh_task: asyncio.Task[None] | None = None
+    version: int = 0
+    _groups: list[_PreferenceGroup] = field(default_factory=list)
+    _groups_version: int = -1
+
+    def sync_config(self, provider: ProviderConfig) -> None:
+        """
+        Refresh key state from ProviderConfig when the key set changed.
+        """
+        config_version = provider_config_version(provider)
+        if config_version is not None and config_version == self.config_version:
+            return
+        keys = provider.get_api_keys()
+        if not keys:
+            raise NoAvailableProviderKey(f"Provider {provider.id} has no configured keys")
+        fingerprint = tuple(
+            (entry.key, _mask_label(entry.key, entry.label, idx), entry.weight, entry.max_qps)
+            for idx, entry in enumerate(keys)
+        )
+        self.config_version = config_version
+        if fingerprint == self.fingerprint:
+            return
+
+        states: dict[str, ProviderKeyState] = {}
+        for key, label, weight, max_qps in fingerprint:
+            state = self.states.get(key)
+            if state is None:
+                state = ProviderKeyState(key=key, label=label, weight=weight, max_qps=max_qps)
+            else:
+                # Keep existing backoff state but refresh metadata.
+                state.label = label
+                state.weight = weight
+                state.max_qps = max_qps
+            states[key] = state
+        # 配置中已删除的 key 不再保留状态。
+        self.states = states
+        self.scores = {key: score for key, score in self.scores.items() if key in states}
+        self.fingerprint = fingerprint
+        self.version += 1
+
+    def set_scores(self, scores: dict[str, float], *, loaded_at: float) -> None:
+        self.scores_loaded_at = loaded_at
+        if scores != self.scores:
+            self.scores = scores
+            self.version += 1
+
+    def nudge_score(self, key: str, delta: float) -> None:
+        if key not in self.states:
+            return
+        current = self.scores.get(key, _PREFERENCE_BASE)
+        updated = min(max(current + delta, _PREFERENCE_MIN), _PREFERENCE_MAX)
+        if updated == current:
+            return
+        self.scores[key] = updated
+        # 分组成员不变时沿用现有别名表，避免每次请求成功 / 失败都重建。
+        if self._groups_version == self.version:
+            members = [frozenset(s.key for s in states) for _, states in self._partition()]
+            if members == [frozenset(s.key for s in g.states) for g in self._groups]:
+                return
+        self.version += 1
+
+    def _partition(self) -> list[tuple[float, list[ProviderKeyState]]]:
+        scored = sorted(
+            ((self.scores.get(key, _PREFERENCE_BASE), state) for key, state in self.states.items()),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        partition: list[tuple[float, list[ProviderKeyState]]] = []
+        idx = 0
+        while idx < len(scored):
+            current_score = scored[idx][0]
+            members: list[ProviderKeyState] = []
+            while idx < len(scored) and scored[idx][0] >= current_score - _PREFERENCE_GROUP_TOLERANCE:
+                members.append(scored[idx][1])
+                idx += 1
+            partition.append((current_score, members))
+        return partition
+
+    def groups(self) -> list[_PreferenceGroup]:
+        """
+        Keys grouped by preference score (descending, within tolerance), each group
+        with its own alias table. Rebuilt only when the snapshot version changes.
+        """
+        if self._groups_version == self.version:
+            return self._groups
+        groups: list[_PreferenceGroup] = []
+        for score, members in self._partition():
+            table = _AliasTable(members, [max(s.weight, 0.0001) for s in members])
+            groups.append(_PreferenceGroup(score=score, states=table.items, table=table))
+        self._groups = groups
+        self._groups_version = self.version
+        return groups
+
+
+_POOLS: dict[str, _ProviderKeyPool] = {}
+_LOCAL_QPS_LIMITER = LocalSlidingWindowLimiter()
+
+
+def _get_pool(provider: ProviderConfig) -> _ProviderKeyPool:
+    pool = _POOLS.get(provider.id)
+    if pool is None:
+        pool = _ProviderKeyPool(provider_id=provider.id)
+        _POOLS[provider.id] = pool
+    pool.sync_config(provider)
+    return pool
 
 
 def _mask_label(raw_key: str, explicit: str | None, idx: int) -> str:
@@ -79,51 +247,21 @@ def _hash_provider_key(provider_id: str, raw_key: str) -> str:
     return hmac.new(secret, msg, hashlib.sha256).hexdigest()
 
 
-def _ensure_states(provider: ProviderConfig) -> list[ProviderKeyState]:
+async def _reserve_qps(redis: Redis | None, provider_id: str, state: ProviderKeyState) -> bool:
     """
-    Initialise per-provider key state from ProviderConfig.
+    Reserve one slot in the key's 1s sliding window (atomic Lua script on Redis,
+    in-process ring buffer when Redis is not configured).
     """
-    pool = _KEY_STATES.setdefault(provider.id, {})
-    keys = provider.get_api_keys()
-    if not keys:
-        raise NoAvailableProviderKey(f"Provider {provider.id} has no configured keys")
-
-    for idx, entry in enumerate(keys):
-        label = _mask_label(entry.key, entry.label, idx)
-        if entry.key not in pool:
-            pool[entry.key] = ProviderKeyState(
-                key=entry.key,
-                label=label,
-                weight=entry.weight,
-                max_qps=entry.max_qps,
-            )
-        else:
-            # Keep existing backoff state but refresh metadata.
-            pool_entry = pool[entry.key]
-            pool_entry.label = label
-            pool_entry.weight = entry.weight
-            pool_entry.max_qps = entry.max_qps
-
-    # Drop any state entries no longer present in config.
-    valid_keys = {entry.key for entry in keys}
-    for stale_key in list(pool.keys()):
-        if stale_key not in valid_keys:
-            pool.pop(stale_key, None)
-
-    return list(pool.values())
-
-
-async def _reserve_qps(redis: Redis | None, provider_id: str, state: ProviderKeyState) -> bool:
-    if redis is None or state.max_qps is None:
+    if state.max_qps is None:
         return True
-    bucket = f"provider:{provider_id}:key:{state.label}:qps:{int(time.time())}"
-    count = await redis.incr(bucket)
-    if count == 1:
-        await redis.expire(bucket, 1)
-    if count > state.max_qps:
-        await redis.expire(bucket, 1)
-        return False
-    return True
+    bucket = f"provider:{provider_id}:key:{state.label}:qps"
+    if redis is None:
+        decision = _LOCAL_QPS_LIMITER.acquire(bucket, limit=state.max_qps, window_seconds=1.0)
+    else:
+        decision = await get_redis_rate_limiter(redis).acquire(
+            bucket, limit=state.max_qps, window_seconds=1.0
+        )
+    return decision.allowed
 
 
 async def _load_preference_scores(
@@ -136,21 +274,79 @@ async def _load_preference_scores(
     if redis is None:
         return {}
 
+    members = [_hash_provider_key(provider_id, state.key) for state in states]
+    if not members:
+        return {}
     zset_key = _preference_redis_key(provider_id)
-    scores: dict[str, float] = {}
-    for state in states:
-        member = _hash_provider_key(provider_id, state.key)
-        try:
-            await redis.zadd(zset_key, {member: _PREFERENCE_BASE}, nx=True)
-            score = await redis.zscore(zset_key, member)
-        except Exception as exc:  # pragma: no cover - 防止偏好存取影响主流程
-            logger.debug(
-                "provider=%s preference score lookup failed: %s", provider_id, exc
-            )
-            return {}
-        if score is not None:
-            scores[member] = float(score)
-    return scores
+    try:
+        # 初始化缺失成员与读取分数合并为一次往返。
+        pipe = redis.pipeline(transaction=False)
+        pipe.zadd(zset_key, dict.fromkeys(members, _PREFERENCE_BASE), nx=True)
+        pipe.zmscore(zset_key, members)
+        _, values = await pipe.execute()
+    except Exception as exc:  # pragma: no cover - 防止偏好存取影响主流程
+        logger.debug(
+            "provider=%s preference score lookup failed: %s", provider_id, exc
+        )
+        return {}
+    return {
+        member: float(score)
+        for member, score in zip(members, values or [], strict=False)
+        if score is not None
+    }
+
+
+async def _refresh_preference_scores(redis: Redis, pool: _ProviderKeyPool) -> None:
+    states = list(pool.states.values())
+    started_at = time.monotonic()
+    try:
+        by_member = await _load_preference_scores(redis, pool.provider_id, states)
+    except Exception as exc:  # pragma: no cover - 防止偏好存取影响主流程
+        logger.debug("provider=%s preference refresh failed: %s", pool.provider_id, exc)
+        by_member = {}
+    if not by_member:
+        # 读取失败时保留旧分数，等下一个周期再试。
+        pool.scores_loaded_at = started_at
+        return
+    scores = {
+        state.key: by_member[member]
+        for state in states
+        if (member := _hash_provider_key(pool.provider_id, state.key)) in by_member
+    }
+    pool.set_scores(scores, loaded_at=started_at)
+
+
+async def _ensure_preference_scores(redis: Redis | None, pool: _ProviderKeyPool) -> None:
+    """
+    First use waits for the initial load (shared by concurrent callers); later
+    refreshes run in the background and never block selection.
+    """
+    if redis is None:
+        return
+    task = pool.refresh_task
+    if task is not None and task.done():
+        pool.refresh_task = task = None
+    if task is None:
+        loaded_at = pool.scores_loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < _PREFERENCE_REFRESH_SECONDS:
+            return
+        task = asyncio.create_task(_refresh_preference_scores(redis, pool))
+        pool.refresh_task = task
+    if pool.scores_loaded_at is None:
+        await asyncio.shield(task)
+
+
+def _pick_state(
+    group: _PreferenceGroup, excluded: set[str], now: float
+) -> ProviderKeyState | None:
+    for _ in range(_ALIAS_SAMPLE_ATTEMPTS):
+        state = group.table.sample()
+        if state.key not in excluded and state.backoff_until <= now:
+            return state
+    eligible = [s for s in group.states if s.key not in excluded and s.backoff_until <= now]
+    if not eligible:
+        return None
+    return random.choices(eligible, weights=[max(s.weight, 0.0001) for s in eligible], k=1)[0]
 
 
 async def _adjust_preference_score(
@@ -177,6 +373,16 @@ async def _adjust_preference_score(
         )
 
 
+def _record_preference(redis: Redis | None, selection: SelectedProviderKey, delta: float) -> None:
+    if redis is None:
+        return
+    # 本进程立即生效，Redis 中的共享分数异步更新。
+    pool = _POOLS.get(selection.provider_id)
+    if pool is not None:
+        pool.nudge_score(selection.state.key, delta)
+    asyncio.create_task(_adjust_preference_score(redis, selection, delta))
+
+
 async def acquire_provider_key(
     provider: ProviderConfig, redis: Redis | None = None
 ) -> SelectedProviderKey:
@@ -184,55 +390,26 @@ async def acquire_provider_key(
     Choose an available key for a provider using weighted random selection.
     Keys in backoff or exceeding per-key QPS are skipped.
     """
-    async with _get_lock(provider.id):
-        states = _ensure_states(provider)
-        now = time.time()
-        candidates = [s for s in states if s.backoff_until <= now]
-        if not candidates:
-            raise NoAvailableProviderKey(
-                f"No available keys for provider {provider.id} (all in backoff)"
-            )
-
-        preference_scores = await _load_preference_scores(redis, provider.id, candidates)
-        scored_candidates = sorted(
-            [
-                (
-                    preference_scores.get(
-                        _hash_provider_key(provider.id, state.key), _PREFERENCE_BASE
-                    ),
-                    state,
-                )
-                for state in candidates
-            ],
-            key=lambda item: item[0],
-            reverse=True,
+    pool = _get_pool(provider)
+    now = time.time()
+    if not any(state.backoff_until <= now for state in pool.states.values()):
+        raise NoAvailableProviderKey(
+            f"No available keys for provider {provider.id} (all in backoff)"
         )
 
-        idx = 0
-        while idx < len(scored_candidates):
-            current_score = scored_candidates[idx][0]
-            same_score_states: list[ProviderKeyState] = []
-            while (
-                idx < len(scored_candidates)
-                and scored_candidates[idx][0]
-                >= current_score - _PREFERENCE_GROUP_TOLERANCE
-            ):
-                same_score_states.append(scored_candidates[idx][1])
-                idx += 1
-
-            working_set = list(same_score_states)
-            while working_set:
-                weights = [max(s.weight, 0.0001) for s in working_set]
-                state = random.choices(working_set, weights=weights, k=1)[0]
+    await _ensure_preference_scores(redis, pool)
 
-                if not await _reserve_qps(redis, provider.id, state):
-                    working_set.remove(state)
-                    continue
+    for group in pool.groups():
+        excluded: set[str] = set()
+        while (state := _pick_state(group, excluded, now)) is not None:
+            if not await _reserve_qps(redis, provider.id, state):
+                excluded.add(state.key)
+                continue
 
-                state.last_used_at = now
-                return SelectedProviderKey(
-                    provider_id=provider.id, key=state.key, label=state.label, state=state
-                )
+            state.last_used_at = now
+            return SelectedProviderKey(
+                provider_id=provider.id, key=state.key, label=state.label, state=state
+            )
 
     raise NoAvailableProviderKey(
         f"No available keys for provider {provider.id} (rate limited)"
@@ -244,10 +421,7 @@ def record_key_success(
 ) -> None:
     selection.state.fail_count = 0
     selection.state.backoff_until = 0.0
-    if redis is not None:
-        asyncio.create_task(
-            _adjust_preference_score(redis, selection, _PREFERENCE_SUCCESS_DELTA)
-        )
+    _record_preference(redis, selection, _PREFERENCE_SUCCESS_DELTA)
 
 
 def record_key_failure(
@@ -276,10 +450,7 @@ def record_key_failure(
         status_code,
         retryable,
     )
-    if redis is not None:
-        asyncio.create_task(
-            _adjust_preference_score(redis, selection, delta),
-        )
+    _record_preference(redis, selection, delta)
 
 
 def reset_key_pool(provider_id: str | None = None) -> None:
@@ -287,11 +458,10 @@ def reset_key_pool(provider_id: str | None = None) -> None:
     Clear cached key state (useful in tests).
     """
     if provider_id is None:
-        _KEY_STATES.clear()
-        _LOCKS.clear()
+        _POOLS.clear()
+        _LOCAL_QPS_LIMITER.clear()
     else:
-        _KEY_STATES.pop(provider_id, None)
-        _LOCKS.pop(provider_id, None)
+        _POOLS.pop(provider_id, None)
 
 
 __all__ = [
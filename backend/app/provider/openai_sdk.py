@@ -2,17 +2,16 @@
 Helpers for calling OpenAI via官方 Python SDK。
 
 接口签名与 google_sdk 保持一致，便于在路由/发现流程中做统一分发。
+使用 AsyncOpenAI，客户端按 (api_key, base_url) 缓存复用（见 app.provider.sdk_clients）。
 """
 
 from __future__ import annotations
 
 import json
-import threading
 from collections.abc import AsyncIterator
-from queue import SimpleQueue
 from typing import Any
 
-import anyio
+from app.provider.sdk_clients import aclose_sdk_resource, lease_sdk_client
 
 
 class OpenAISDKError(Exception):
@@ -21,7 +20,7 @@ class OpenAISDKError(Exception):
 
 def _create_client(api_key: str, base_url: str | None):
     try:
-        from openai import OpenAI  # type: ignore
+        from openai import AsyncOpenAI  # type: ignore
     except ImportError as exc:  # pragma: no cover - import guard
         raise OpenAISDKError("openai 未安装，请执行: pip install openai") from exc
 
@@ -29,11 +28,15 @@ def _create_client(api_key: str, base_url: str | None):
         kwargs: dict[str, Any] = {"api_key": api_key}
         if base_url:
             kwargs["base_url"] = str(base_url)
-        return OpenAI(**kwargs)
+        return AsyncOpenAI(**kwargs)
     except Exception as exc:  # pragma: no cover - defensive
         raise OpenAISDKError(f"初始化 openai SDK 失败: {exc}") from exc
 
 
+def _lease_client(api_key: str, base_url: str | None):
+    return lease_sdk_client("openai", api_key, base_url, _create_client)
+
+
 def _response_to_dict(obj: Any) -> dict[str, Any]:
     if obj is None:
         return {}
@@ -66,22 +69,18 @@ async def list_models(
     """
     列出 OpenAI 模型列表，失败时抛出 OpenAISDKError。
     """
-    client = _create_client(api_key, base_url)
-
-    def _call():
-        return client.models.list()
-
-    try:
-        resp = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise OpenAISDKError(f"openai 列表接口失败: {exc}") from exc
+    async with _lease_client(api_key, base_url) as client:
+        try:
+            resp = await client.models.list()
+        except Exception as exc:
+            raise OpenAISDKError(f"openai 列表接口失败: {exc}") from exc
 
-    payload = _response_to_dict(resp)
-    if isinstance(payload, dict) and isinstance(payload.get("data"), list):
-        return [item for item in payload["data"] if isinstance(item, dict)]
-    if isinstance(payload, list):
-        return [item for item in payload if isinstance(item, dict)]
-    return []
+        payload = _response_to_dict(resp)
+        if isinstance(payload, dict) and isinstance(payload.get("data"), list):
+            return [item for item in payload["data"] if isinstance(item, dict)]
+        if isinstance(payload, list):
+            return [item for item in payload if isinstance(item, dict)]
+        return []
 
 
 async def generate_content(
@@ -94,20 +93,17 @@ async def generate_content(
     """
     非流式 chat.completions 调用。
     """
-    client = _create_client(api_key, base_url)
-    upstream_payload = dict(payload)
-    upstream_payload["model"] = model_id
-    upstream_payload.pop("stream", None)
-
-    def _call():
-        return client.chat.completions.create(**upstream_payload)
+    async with _lease_client(api_key, base_url) as client:
+        upstream_payload = dict(payload)
+        upstream_payload["model"] = model_id
+        upstream_payload.pop("stream", None)
 
-    try:
-        resp = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise OpenAISDKError(f"openai 调用失败: {exc}") from exc
+        try:
+            resp = await client.chat.completions.create(**upstream_payload)
+        except Exception as exc:
+            raise OpenAISDKError(f"openai 调用失败: {exc}") from exc
 
-    return _response_to_dict(resp)
+        return _response_to_dict(resp)
 
 
 async def stream_content(
@@ -118,33 +114,23 @@ async def stream_content(
     base_url: str | None,
 ) -> AsyncIterator[dict[str, Any]]:
     """
-    流式 chat.completions 调用。通过后台线程消费同步 SDK，
-    并将分片以 dict 形式传回异步上下文。
+    流式 chat.completions 调用。直接在事件循环中按需读取 SDK 的异步流：
+    下游读多快就向上游拉多快，不额外缓冲；下游断开（生成器被关闭/取消）时关闭上游响应。
     """
-    client = _create_client(api_key, base_url)
-    upstream_payload = dict(payload)
-    upstream_payload["model"] = model_id
-    upstream_payload["stream"] = True
+    async with _lease_client(api_key, base_url) as client:
+        upstream_payload = dict(payload)
+        upstream_payload["model"] = model_id
+        upstream_payload["stream"] = True
 
-    queue: SimpleQueue[Any] = SimpleQueue()
-    sentinel = object()
+        try:
+            stream = await client.chat.completions.create(**upstream_payload)
+        except Exception as exc:
+            raise OpenAISDKError(f"openai 流式调用失败: {exc}") from exc
 
-    def _worker():
         try:
-            for chunk in client.chat.completions.create(**upstream_payload):
-                queue.put(chunk)
-        except Exception as exc:  # pragma: no cover - defensive
-            queue.put(exc)
+            async for chunk in stream:
+                yield _response_to_dict(chunk)
+        except Exception as exc:
+            raise OpenAISDKError(f"openai 流式调用失败: {exc}") from exc
         finally:
-            queue.put(sentinel)
-
-    thread = threading.Thread(target=_worker, daemon=True)
-    thread.start()
-
-    while True:
-        item = await anyio.to_thread.run_sync(queue.get)
-        if item is sentinel:
-            break
-        if isinstance(item, Exception):
-            raise OpenAISDKError(f"openai 流式调用失败: {item}") from item
-        yield _response_to_dict(item)
+            await aclose_sdk_resource(stream)
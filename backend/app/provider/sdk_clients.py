@@ -0,0 +1,157 @@
+"""
+transport=sdk 使用的厂商异步 SDK 客户端缓存（进程级，按事件循环隔离）。
+
+过去每次 SDK 调用都新建同步客户端，并在线程中阻塞读取；现在各厂商 driver 使用官方
+异步客户端（AsyncOpenAI / AsyncAnthropic / google-genai 的 client.aio），
+按 (厂商, api_key 的 SHA-256, base_url) 缓存，使同一上游凭证的请求复用 keep-alive 连接池。
+
+- 客户端内部的 httpx.AsyncClient 绑定到创建它的事件循环，因此缓存按 loop 隔离；
+- 缓存容量由 SDK_CLIENT_CACHE_SIZE 限制（LRU）；driver 通过 lease_sdk_client 持有客户端，
+  被淘汰的客户端等最后一个进行中的请求归还后，在后台任务中关闭，释放其连接池；
+- 进程关闭时由 lifespan 调用 close_sdk_clients_for_current_loop 关闭当前 loop 的全部客户端。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from hashlib import sha256
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from app.logging_config import logger
+from app.settings import settings
+
+ClientKey = tuple[str, str, str | None]
+
+
+@dataclass
+class _CachedClient:
+    key: ClientKey
+    client: Any
+    leases: int = 0
+    evicted: bool = False
+
+
+_clients_by_loop: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, OrderedDict[ClientKey, _CachedClient]
+] = WeakKeyDictionary()
+_closing: set[asyncio.Task[None]] = set()
+
+
+def _client_key(vendor: str, api_key: str, base_url: str | None) -> ClientKey:
+    # 缓存键中只保留 key 的哈希，避免明文常驻在索引结构里。
+    return vendor, sha256(api_key.encode("utf-8")).hexdigest(), base_url or None
+
+
+def _close_in_background(entry: _CachedClient) -> None:
+    task = asyncio.get_running_loop().create_task(_close_client(entry))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def _checkout(
+    vendor: str,
+    api_key: str,
+    base_url: str | None,
+    factory: Callable[[str, str | None], Any],
+) -> _CachedClient:
+    loop = asyncio.get_running_loop()
+    clients = _clients_by_loop.get(loop)
+    if clients is None:
+        clients = OrderedDict()
+        _clients_by_loop[loop] = clients
+
+    key = _client_key(vendor, api_key, base_url)
+    entry = clients.get(key)
+    if entry is not None:
+        clients.move_to_end(key)
+        return entry
+
+    entry = _CachedClient(key=key, client=factory(api_key, base_url))
+    clients[key] = entry
+    while len(clients) > int(settings.sdk_client_cache_size):
+        _, evicted = clients.popitem(last=False)
+        evicted.evicted = True
+        if evicted.leases == 0:
+            _close_in_background(evicted)
+    return entry
+
+
+@asynccontextmanager
+async def lease_sdk_client(
+    vendor: str,
+    api_key: str,
+    base_url: str | None,
+    factory: Callable[[str, str | None], Any],
+) -> AsyncIterator[Any]:
+    """
+    在 with 块内持有当前事件循环中该凭证对应的异步客户端，不存在时调用 factory(api_key, base_url) 创建。
+    factory 抛出的异常（如 SDK 未安装）原样向上传递，不会被缓存。
+
+    持有期间客户端即使被 LRU 淘汰也不会关闭；最后一个持有者退出后才在后台关闭。
+    """
+    entry = _checkout(vendor, api_key, base_url, factory)
+    entry.leases += 1
+    try:
+        yield entry.client
+    finally:
+        entry.leases -= 1
+        if entry.evicted and entry.leases == 0:
+            _close_in_background(entry)
+
+
+async def _close_client(entry: _CachedClient) -> None:
+    vendor, _digest, base_url = entry.key
+    try:
+        await aclose_sdk_resource(entry.client)
+    except Exception as exc:  # pragma: no cover - 关闭失败不影响请求
+        logger.debug("sdk client close failed vendor=%s base_url=%s: %s", vendor, base_url, exc)
+
+
+async def aclose_sdk_resource(resource: Any) -> None:
+    """
+    关闭 SDK 客户端或流式响应：依次尝试 aclose / close，兼容同步与异步实现。
+    google-genai 的客户端通过 .aio 暴露异步接口，关闭其异步部分。
+    """
+    target = getattr(resource, "aio", resource)
+    for attr in ("aclose", "close"):
+        fn = getattr(target, attr, None)
+        if not callable(fn):
+            continue
+        result = fn()
+        if inspect.isawaitable(result):
+            await result
+        return
+
+
+async def close_sdk_clients_for_current_loop() -> None:
+    """
+    关闭并清空当前 loop 缓存的全部 SDK 客户端（lifespan 关闭时调用）。
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients_by_loop.pop(loop, None)
+    for entry in (clients or {}).values():
+        await _close_client(entry)
+    pending = [task for task in _closing if task.get_loop() is loop]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def reset_sdk_clients() -> None:
+    """
+    丢弃全部缓存的客户端（测试使用）。
+    """
+    _clients_by_loop.clear()
+
+
+__all__ = [
+    "aclose_sdk_resource",
+    "close_sdk_clients_for_current_loop",
+    "lease_sdk_client",
+    "reset_sdk_clients",
+]
@@ -13,6 +13,9 @@ Project/location are inferred in the following order:
 - project: service account "project_id" -> env VERTEXAI_PROJECT/GOOGLE_CLOUD_PROJECT
 - location: inferred from base_url (e.g. https://us-central1-aiplatform.googleapis.com/)
             -> env VERTEXAI_LOCATION/GOOGLE_CLOUD_LOCATION -> "us-central1"
+
+Calls go through the async client (client.aio), cached per (api_key, base_url)
+via app.provider.sdk_clients.
 """
 
 from __future__ import annotations
@@ -20,13 +23,11 @@ from __future__ import annotations
 import base64
 import json
 import os
-import threading
 from collections.abc import AsyncIterator, Iterable
-from queue import SimpleQueue
 from typing import Any
 from urllib.parse import urlparse
 
-import anyio
+from app.provider.sdk_clients import aclose_sdk_resource, lease_sdk_client
 
 
 class VertexAISDKError(Exception):
@@ -207,6 +208,10 @@ def _create_client(api_key: str, base_url: str | None):
         raise VertexAISDKError(f"初始化 Vertex AI google-genai 客户端失败: {exc}") from exc
 
 
+def _lease_client(api_key: str, base_url: str | None):
+    return lease_sdk_client("vertexai", api_key, base_url, _create_client)
+
+
 def _ensure_model_id_fields(item: dict[str, Any]) -> dict[str, Any]:
     if isinstance(item.get("id"), str):
         item.setdefault("model_id", item.get("id"))
@@ -225,23 +230,19 @@ async def list_models(
     api_key: str,
     base_url: str | None,
 ) -> list[dict[str, Any]]:
-    client = _create_client(api_key, base_url)
-
-    def _call():
-        return list(client.models.list())
-
-    try:
-        items = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise VertexAISDKError(f"Vertex AI 列表接口失败: {exc}") from exc
-
-    out: list[dict[str, Any]] = []
-    for item in items:
-        raw = _response_to_dict(item)
-        if not isinstance(raw, dict):
-            continue
-        out.append(_ensure_model_id_fields(raw))
-    return out
+    async with _lease_client(api_key, base_url) as client:
+        try:
+            items = [item async for item in await client.aio.models.list()]
+        except Exception as exc:
+            raise VertexAISDKError(f"Vertex AI 列表接口失败: {exc}") from exc
+
+        out: list[dict[str, Any]] = []
+        for item in items:
+            raw = _response_to_dict(item)
+            if not isinstance(raw, dict):
+                continue
+            out.append(_ensure_model_id_fields(raw))
+        return out
 
 
 async def generate_content(
@@ -251,21 +252,18 @@ async def generate_content(
     payload: dict[str, Any],
     base_url: str | None,
 ) -> dict[str, Any]:
-    client = _create_client(api_key, base_url)
-    contents = payload.get("contents")
-    if not contents:
-        messages = payload.get("messages") or payload.get("input") or []
-        contents = _messages_to_contents(messages)
+    async with _lease_client(api_key, base_url) as client:
+        contents = payload.get("contents")
+        if not contents:
+            messages = payload.get("messages") or payload.get("input") or []
+            contents = _messages_to_contents(messages)
 
-    def _call():
-        return client.models.generate_content(model=model_id, contents=contents)
-
-    try:
-        response = await anyio.to_thread.run_sync(_call)
-    except Exception as exc:
-        raise VertexAISDKError(f"Vertex AI 调用失败: {exc}") from exc
+        try:
+            response = await client.aio.models.generate_content(model=model_id, contents=contents)
+        except Exception as exc:
+            raise VertexAISDKError(f"Vertex AI 调用失败: {exc}") from exc
 
-    return _response_to_dict(response)
+        return _response_to_dict(response)
 
 
 async def stream_content(
@@ -275,34 +273,21 @@ async def stream_content(
     payload: dict[str, Any],
     base_url: str | None,
 ) -> AsyncIterator[dict[str, Any]]:
-    client = _create_client(api_key, base_url)
-    contents = payload.get("contents")
-    if not contents:
-        messages = payload.get("messages") or payload.get("input") or []
-        contents = _messages_to_contents(messages)
+    async with _lease_client(api_key, base_url) as client:
+        contents = payload.get("contents")
+        if not contents:
+            messages = payload.get("messages") or payload.get("input") or []
+            contents = _messages_to_contents(messages)
 
-    queue: SimpleQueue[Any] = SimpleQueue()
-    sentinel = object()
+        try:
+            stream = await client.aio.models.generate_content_stream(model=model_id, contents=contents)
+        except Exception as exc:
+            raise VertexAISDKError(f"Vertex AI 流式调用失败: {exc}") from exc
 
-    def _worker():
         try:
-            for part in client.models.generate_content(
-                model=model_id, contents=contents, stream=True
-            ):
-                queue.put(part)
-        except Exception as exc:  # pragma: no cover - defensive
-            queue.put(exc)
+            async for part in stream:
+                yield _response_to_dict(part)
+        except Exception as exc:
+            raise VertexAISDKError(f"Vertex AI 流式调用失败: {exc}") from exc
         finally:
-            queue.put(sentinel)
-
-    thread = threading.Thread(target=_worker, daemon=True)
-    thread.start()
-
-    while True:
-        item = await anyio.to_thread.run_sync(queue.get)
-        if item is sentinel:
-            break
-        if isinstance(item, Exception):
-            raise VertexAISDKError(f"Vertex AI 流式调用失败: {item}") from item
-        yield _response_to_dict(item)
-
+            await aclose_sdk_resource(stream)
@@ -5,6 +5,7 @@ from uuid import UUID
 
 from sqlalchemy import Select, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 
 from app.models import APIKey
@@ -54,8 +55,8 @@ def get_api_key_by_id(
     return db.execute(stmt).scalars().first()
 
 
-def find_api_key_by_hash(db: Session, *, key_hash: str) -> APIKey | None:
-    stmt: Select[tuple[APIKey]] = (
+def _find_api_key_by_hash_stmt(key_hash: str) -> Select[tuple[APIKey]]:
+    return (
         select(APIKey)
         .where(APIKey.key_hash == key_hash)
         .options(
@@ -63,7 +64,15 @@ def find_api_key_by_hash(db: Session, *, key_hash: str) -> APIKey | None:
             selectinload(APIKey.user),
         )
     )
-    return db.execute(stmt).scalars().first()
+
+
+def find_api_key_by_hash(db: Session, *, key_hash: str) -> APIKey | None:
+    return db.execute(_find_api_key_by_hash_stmt(key_hash)).scalars().first()
+
+
+async def afind_api_key_by_hash(db: AsyncSession, *, key_hash: str) -> APIKey | None:
+    result = await db.execute(_find_api_key_by_hash_stmt(key_hash))
+    return result.scalars().first()
 
 
 def create_api_key(
@@ -138,6 +147,7 @@ def delete_api_key(db: Session, *, api_key: APIKey) -> None:
 
 
 __all__ = [
+    "afind_api_key_by_hash",
     "api_key_name_exists",
     "create_api_key",
     "delete_api_key",
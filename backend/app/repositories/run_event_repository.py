@@ -1,36 +1,42 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
 from app.models import RunEvent
 
 
+def get_max_run_event_seq(db: Session, *, run_id: UUID) -> int:
+    """返回 run 当前已落库的最大事件序号（没有事件时为 0）。"""
+    value = db.execute(select(func.max(RunEvent.seq)).where(RunEvent.run_id == run_id)).scalar_one()
+    return int(value or 0)
+
+
 def append_run_event(
     db: Session,
     *,
     run_id: UUID,
     event_type: str,
     payload: dict[str, Any] | None,
+    seq: int | None = None,
 ) -> RunEvent:
     """
     追加一条 RunEvent（append-only）。
 
-    注意：当前实现通过 `max(seq)+1` 分配序号，适用于“单执行者”或低并发场景（例如请求内兼容模式）。
-    当后续迁移到多 worker 并发写同一 run 时，需要引入更严格的序列分配（例如 advisory lock 或
-    独立的计数器表/Redis INCR）以避免 seq 冲突。
+    未传入 seq 时通过 `max(seq)+1` 分配序号，仅适用于“单执行者”场景（例如请求内兼容模式）；
+    与 worker 并发写同一 run 时，应先通过 `app.services.run_event_writer.allocate_run_event_seq`
+    从 Redis 计数器取得序号再传入，避免与批量写入器缓冲中的序号冲突。
     """
-    next_seq = db.execute(
-        select(func.max(RunEvent.seq)).where(RunEvent.run_id == run_id)
-    ).scalar_one()
-    seq = int(next_seq or 0) + 1
+    if seq is None:
+        seq = get_max_run_event_seq(db, run_id=run_id) + 1
 
     row = RunEvent(
         run_id=run_id,
-        seq=seq,
+        seq=int(seq),
         event_type=str(event_type or "").strip() or "event",
         payload=payload or {},
     )
@@ -40,6 +46,17 @@ def append_run_event(
     return row
 
 
+def insert_run_events(db: Session, rows: Sequence[dict[str, Any]]) -> None:
+    """
+    以一条多行 INSERT 写入一批已分配序号的事件（不提交事务）。
+
+    rows 中每项需包含 run_id / seq / event_type / payload，可选 created_at。
+    """
+    if not rows:
+        return
+    db.execute(insert(RunEvent), list(rows))
+
+
 def list_run_events(
     db: Session,
     *,
@@ -55,4 +72,4 @@ def list_run_events(
     return list(db.execute(stmt).scalars().all())
 
 
-__all__ = ["append_run_event", "list_run_events"]
+__all__ = ["append_run_event", "get_max_run_event_seq", "insert_run_events", "list_run_events"]
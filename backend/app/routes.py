@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from contextlib import asynccontextmanager
 
@@ -84,8 +85,10 @@ async def handle_unexpected_error(request: Request, exc: Exception):
 async def lifespan(app: FastAPI):
     """
     应用生命周期管理：
-    - startup: 执行数据库迁移、确保初始管理员账号存在
-    - shutdown: 目前无额外清理逻辑
+    - startup: 执行数据库迁移、确保初始管理员账号存在、启动上游 HTTP 连接池、路由 L1 缓存失效监听、Provider 模型快照刷新
+      与指标缓存热点刷新
+    - shutdown: 关闭工作流运行时、路由 L1 缓存失效监听、Provider 模型快照刷新、指标缓存热点刷新，写出合并中的 Redis 小写入与 bandit 臂统计缓冲，
+      关闭上游 HTTP 连接池与异步数据库连接池
     """
     from app.db.migration_runner import auto_upgrade_database
 
@@ -120,6 +123,57 @@ async def lifespan(app: FastAPI):
     except Exception:
         logger.exception("WorkflowRuntime 启动失败（将影响 /v1/workflow-runs 执行能力）")
 
+    # 上游 HTTP 长连接池：创建当前 loop 的连接池并启动空闲回收任务
+    try:
+        from app.http_client_pool import start_upstream_http_pool
+
+        start_upstream_http_pool()
+    except Exception:
+        logger.exception("上游 HTTP 连接池启动失败")
+
+    # 路由 L1 缓存：监听其它 worker 广播的失效消息
+    try:
+        from app.redis_client import get_redis_client
+        from app.storage.routing_l1_cache import start_routing_cache_invalidation_listener
+
+        start_routing_cache_invalidation_listener(get_redis_client())
+    except Exception:
+        logger.exception("路由 L1 缓存失效监听启动失败")
+
+    # Provider 模型快照（禁用状态 / 定价 / 倍率）：后台构建并定期检查变化
+    try:
+        from app.services.provider_model_snapshot import start_provider_model_snapshot_refresher
+
+        start_provider_model_snapshot_refresher()
+    except Exception:
+        logger.exception("Provider 模型快照刷新任务启动失败")
+
+    # ProviderConfig 注册表：启动时批量加载，之后按指纹增量刷新
+    try:
+        from app.provider.config_registry import start_provider_config_refresher
+
+        start_provider_config_refresher()
+    except Exception:
+        logger.exception("ProviderConfig 注册表刷新任务启动失败")
+
+    # Dashboard / 概览指标缓存：后台提前刷新最热的缓存键
+    try:
+        from app.storage.metrics_query_cache import start_metrics_cache_refresher
+
+        start_metrics_cache_refresher()
+    except Exception:
+        logger.exception("指标缓存热点刷新任务启动失败")
+
+    # Bandit 臂统计写回缓冲：只在 API 进程中启动后台写回线程
+    try:
+        from app.services.bandit_arm_store import bandit_arm_store
+        from app.settings import settings as app_settings
+
+        if app_settings.bandit_arm_cache_enabled:
+            bandit_arm_store.start()
+    except Exception:
+        logger.exception("Bandit 臂统计写回线程启动失败")
+
     # 让应用继续启动并处理请求
     yield
 
@@ -131,6 +185,70 @@ async def lifespan(app: FastAPI):
     except Exception:
         logger.exception("WorkflowRuntime 关闭失败")
 
+    try:
+        from app.storage.routing_l1_cache import stop_routing_cache_invalidation_listener
+
+        await stop_routing_cache_invalidation_listener()
+    except Exception:
+        logger.exception("路由 L1 缓存失效监听关闭失败")
+
+    try:
+        from app.services.provider_model_snapshot import stop_provider_model_snapshot_refresher
+
+        await stop_provider_model_snapshot_refresher()
+    except Exception:
+        logger.exception("Provider 模型快照刷新任务关闭失败")
+
+    try:
+        from app.provider.config_registry import stop_provider_config_refresher
+
+        await stop_provider_config_refresher()
+    except Exception:
+        logger.exception("ProviderConfig 注册表刷新任务关闭失败")
+
+    try:
+        from app.storage.metrics_query_cache import stop_metrics_cache_refresher
+
+        await stop_metrics_cache_refresher()
+    except Exception:
+        logger.exception("指标缓存热点刷新任务关闭失败")
+
+    try:
+        from app.storage.redis_write_coalescer import flush_redis_write_coalescers
+
+        await flush_redis_write_coalescers()
+    except Exception:
+        logger.exception("Redis 合并写入刷新失败")
+
+    try:
+        from app.services.bandit_arm_store import bandit_arm_store
+
+        # 停止写回线程并写回尚未落库的 bandit 后验更新
+        await asyncio.to_thread(bandit_arm_store.shutdown)
+    except Exception:
+        logger.exception("Bandit 臂统计缓冲写回失败")
+
+    try:
+        from app.provider.sdk_clients import close_sdk_clients_for_current_loop
+
+        await close_sdk_clients_for_current_loop()
+    except Exception:
+        logger.exception("SDK 客户端关闭失败")
+
+    try:
+        from app.http_client_pool import close_upstream_http_pool_for_current_loop
+
+        await close_upstream_http_pool_for_current_loop()
+    except Exception:
+        logger.exception("上游 HTTP 连接池关闭失败")
+
+    try:
+        from app.db.async_session import dispose_async_engine_for_current_loop
+
+        await dispose_async_engine_for_current_loop()
+    except Exception:
+        logger.exception("异步数据库连接池关闭失败")
+
 
 def create_app() -> FastAPI:
     from fastapi.middleware.cors import CORSMiddleware
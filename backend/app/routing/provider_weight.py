@@ -6,11 +6,13 @@ from __future__ import annotations
 
 import asyncio
 from collections.abc import Sequence
+from functools import partial
 
 from redis.asyncio import Redis
 
 from app.logging_config import logger
 from app.schemas import PhysicalModel
+from app.storage.redis_write_coalescer import get_redis_write_coalescer, redis_write_coalescing_enabled
 
 # Redis key for storing dynamic weights per logical model.
 _WEIGHT_KEY_TEMPLATE = "routing:{logical_model}:provider_weights"
@@ -25,11 +27,21 @@ _SUCCESS_FACTOR = 0.05
 _RETRYABLE_FAILURE_FACTOR = -0.2
 _FATAL_FAILURE_FACTOR = -0.5
 
+# 未启用写合并时的后台写入任务，保留引用避免任务在完成前被 GC 回收。
+_pending_updates: set[asyncio.Task[None]] = set()
+
 
 def _redis_key(logical_model_id: str) -> str:
     return _WEIGHT_KEY_TEMPLATE.format(logical_model=logical_model_id)
 
 
+def provider_weight_key(logical_model_id: str) -> str:
+    """
+    动态权重 ZSET 的 Redis key（供批量读取路径复用）。
+    """
+    return _redis_key(logical_model_id)
+
+
 def _clamp_weight(value: float, base_weight: float) -> float:
     """
     保证动态权重在合理范围内，避免过大或降到 0。
@@ -121,6 +133,42 @@ async def adjust_provider_weight(
         )
 
 
+def _nudge_provider_weight(
+    redis: Redis,
+    logical_model_id: str,
+    provider_id: str,
+    *,
+    base_weight: float,
+    delta: float,
+) -> None:
+    """
+    提交一次权重微调：默认交给 Redis 写合并器（同一 provider 的增量合并后一次写出），
+    REDIS_WRITE_COALESCE_MS=0 时退回为单独的后台任务。
+    """
+    if not redis_write_coalescing_enabled():
+        task = asyncio.create_task(
+            adjust_provider_weight(
+                redis,
+                logical_model_id,
+                provider_id,
+                base_weight=base_weight,
+                delta=delta,
+            )
+        )
+        _pending_updates.add(task)
+        task.add_done_callback(_pending_updates.discard)
+        return
+
+    safe_base = base_weight or 1.0
+    get_redis_write_coalescer(redis).incr_zset(
+        _redis_key(logical_model_id),
+        provider_id,
+        delta,
+        default=safe_base,
+        clamp=partial(_clamp_weight, base_weight=safe_base),
+    )
+
+
 def record_provider_success(
     redis: Redis | None,
     logical_model_id: str,
@@ -133,15 +181,7 @@ def record_provider_success(
     if redis is None:
         return
     delta = max(base_weight * _SUCCESS_FACTOR, _ABSOLUTE_MIN)
-    asyncio.create_task(
-        adjust_provider_weight(
-            redis,
-            logical_model_id,
-            provider_id,
-            base_weight=base_weight,
-            delta=delta,
-        )
-    )
+    _nudge_provider_weight(redis, logical_model_id, provider_id, base_weight=base_weight, delta=delta)
 
 
 def record_provider_failure(
@@ -160,15 +200,7 @@ def record_provider_failure(
 
     factor = _RETRYABLE_FAILURE_FACTOR if retryable else _FATAL_FAILURE_FACTOR
     delta = base_weight * factor
-    asyncio.create_task(
-        adjust_provider_weight(
-            redis,
-            logical_model_id,
-            provider_id,
-            base_weight=base_weight,
-            delta=delta,
-        )
-    )
+    _nudge_provider_weight(redis, logical_model_id, provider_id, base_weight=base_weight, delta=delta)
 
 
 async def invalidate_provider_weights(
@@ -209,6 +241,7 @@ __all__ = [
     "clamp_provider_weight",
     "invalidate_provider_weights",
     "load_dynamic_weights",
+    "provider_weight_key",
     "record_provider_failure",
     "record_provider_success",
 ]
@@ -8,9 +8,12 @@ talk to Redis directly.
 
 from __future__ import annotations
 
+import logging
 import random
+from bisect import bisect_left
 from collections.abc import Sequence
 from dataclasses import dataclass
+from itertools import accumulate
 
 from app.schemas import (
     LogicalModel,
@@ -60,6 +63,137 @@ def _status_penalty(metrics: RoutingMetrics | None, enable_check: bool = True) -
     return 0.0
 
 
+class _ScoringEngine:
+    """
+    列式打分：把 base / 归一化延迟 / 错误率 / 状态惩罚打包成数组，一次性完成打分、
+    过滤与排序，并同时产出加权采样所需的累积权重数组。
+
+    - 同一 provider 的指标特征只计算一次（动态逻辑模型往往同一 provider 下挂多个模型）；
+    - 单个候选的明细日志仅在 DEBUG 级别开启时输出。
+    """
+
+    __slots__ = ("dynamic_weights", "enable_health_check", "metrics_by_provider", "strategy")
+
+    def __init__(
+        self,
+        metrics_by_provider: dict[str, RoutingMetrics],
+        strategy: SchedulingStrategy,
+        dynamic_weights: dict[str, float] | None,
+        enable_health_check: bool,
+    ) -> None:
+        self.metrics_by_provider = metrics_by_provider
+        self.strategy = strategy
+        self.dynamic_weights = dynamic_weights
+        self.enable_health_check = enable_health_check
+
+    def _pack(
+        self, upstreams: Sequence[PhysicalModel]
+    ) -> tuple[list[float], list[float], list[float], list[float], list[RoutingMetrics | None]]:
+        bases: list[float] = []
+        lats: list[float] = []
+        errs: list[float] = []
+        penalties: list[float] = []
+        metrics_col: list[RoutingMetrics | None] = []
+        features: dict[str, tuple[float, float, float, RoutingMetrics | None]] = {}
+        dynamic_weights = self.dynamic_weights
+        for up in upstreams:
+            provider_id = up.provider_id
+            feature = features.get(provider_id)
+            if feature is None:
+                metrics = self.metrics_by_provider.get(provider_id)
+                if metrics is not None:
+                    feature = (
+                        _normalise_latency(metrics.latency_p95_ms),
+                        metrics.error_rate,
+                        _status_penalty(metrics, enable_check=self.enable_health_check),
+                        metrics,
+                    )
+                else:
+                    feature = (0.5, 0.0, 0.0, None)
+                features[provider_id] = feature
+
+            if dynamic_weights:
+                bases.append(dynamic_weights.get(provider_id, up.base_weight))
+            else:
+                bases.append(up.base_weight)
+            lats.append(feature[0])
+            errs.append(feature[1])
+            penalties.append(feature[2])
+            metrics_col.append(feature[3])
+        return bases, lats, errs, penalties, metrics_col
+
+    def _scores(
+        self, bases: list[float], lats: list[float], errs: list[float], penalties: list[float]
+    ) -> list[float]:
+        strategy = self.strategy
+        alpha, beta, delta = strategy.alpha, strategy.beta, strategy.delta
+        # Cost component is left as zero for now (strategy.gamma * 0); it can be
+        # plugged in later when we track it explicitly.
+        return [
+            base - alpha * lat - beta * err - delta * pen
+            for base, lat, err, pen in zip(bases, lats, errs, penalties, strict=True)
+        ]
+
+    def run(self, upstreams: Sequence[PhysicalModel]) -> tuple[list[CandidateScore], list[float]]:
+        """
+        返回 (按分数降序排列的候选, 对应的累积采样权重)。
+        """
+        from app.logging_config import log_sampled, logger
+
+        bases, lats, errs, penalties, metrics_col = self._pack(upstreams)
+        scores = self._scores(bases, lats, errs, penalties)
+        strategy = self.strategy
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        if debug:
+            for idx, up in enumerate(upstreams):
+                logger.debug(
+                    "Scoring upstream: provider=%s model=%s base=%.2f norm_lat=%.2f err=%.2f "
+                    "quota_penalty=%.2f score=%.2f min_score=%.2f health_check=%s",
+                    up.provider_id,
+                    up.model_id,
+                    bases[idx],
+                    lats[idx],
+                    errs[idx],
+                    penalties[idx],
+                    scores[idx],
+                    strategy.min_score,
+                    "enabled" if self.enable_health_check else "disabled",
+                )
+
+        if self.enable_health_check:
+            # 根据配置决定是否应用 min_score 过滤
+            min_score = strategy.min_score
+            kept = [i for i, score in enumerate(scores) if score >= min_score]
+            if len(kept) != len(scores):
+                for i, score in enumerate(scores):
+                    if score < min_score:
+                        log_sampled(
+                            logger,
+                            ("scheduler.filtered_out", upstreams[i].provider_id, upstreams[i].model_id),
+                            "Filtered out %s/%s: score %.2f < min_score %.2f",
+                            upstreams[i].provider_id,
+                            upstreams[i].model_id,
+                            score,
+                            min_score,
+                            level=logging.WARNING,
+                        )
+        else:
+            kept = list(range(len(scores)))
+
+        # Highest score first (stable, same order as list.sort(reverse=True)).
+        kept.sort(key=scores.__getitem__, reverse=True)
+        results = [
+            CandidateScore(upstream=upstreams[i], metrics=metrics_col[i], score=scores[i])
+            for i in kept
+        ]
+        # Use max(score, 0.0) so that very low scores do not invert weights.
+        cumulative = list(accumulate(max(scores[i], 0.0) for i in kept))
+        if debug:
+            logger.debug("Total scored candidates: %d", len(results))
+        return results, cumulative
+
+
 def score_upstreams(
     logical_model: LogicalModel,
     upstreams: Sequence[PhysicalModel],
@@ -79,89 +213,38 @@ def score_upstreams(
         dynamic_weights: 动态权重（可选）
         enable_health_check: 是否启用健康检查和最低分数过滤
     """
-    from app.logging_config import logger
-
-    results: list[CandidateScore] = []
-    for up in upstreams:
-        metrics = metrics_by_provider.get(up.provider_id)
-
-        # Base weight from mapping.
-        if dynamic_weights:
-            base = dynamic_weights.get(up.provider_id, up.base_weight)
-        else:
-            base = up.base_weight
-
-        # Latency / error contributions.
-        if metrics is not None:
-            norm_lat = _normalise_latency(metrics.latency_p95_ms)
-            err = metrics.error_rate
-        else:
-            norm_lat = 0.5
-            err = 0.0
-
-        # Cost and quota components are left as zero for now; they can be
-        # plugged in later when we track them explicitly.
-        cost_score = 0.0
-        quota_penalty = _status_penalty(metrics, enable_check=enable_health_check)
-
-        score = (
-            base
-            - strategy.alpha * norm_lat
-            - strategy.beta * err
-            - strategy.gamma * cost_score
-            - strategy.delta * quota_penalty
-        )
-
-        logger.info(
-            f"🔍 Scoring upstream: provider={up.provider_id} model={up.model_id} "
-            f"base={base:.2f} norm_lat={norm_lat:.2f} err={err:.2f} "
-            f"quota_penalty={quota_penalty:.2f} score={score:.2f} min_score={strategy.min_score:.2f} "
-            f"health_check={'enabled' if enable_health_check else 'disabled'}"
-        )
-
-        # 根据配置决定是否应用 min_score 过滤
-        if enable_health_check and score < strategy.min_score:
-            logger.warning(
-                f"❌ Filtered out {up.provider_id}/{up.model_id}: "
-                f"score {score:.2f} < min_score {strategy.min_score:.2f}"
-            )
-            continue
-
-        results.append(CandidateScore(upstream=up, metrics=metrics, score=score))
-
-    # Highest score first.
-    results.sort(key=lambda c: c.score, reverse=True)
-    logger.info(f"✅ Total scored candidates: {len(results)}")
+    engine = _ScoringEngine(metrics_by_provider, strategy, dynamic_weights, enable_health_check)
+    results, _ = engine.run(upstreams)
     return results
 
 
-def _weighted_choice(candidates: Sequence[CandidateScore]) -> CandidateScore:
+def _weighted_choice(
+    candidates: Sequence[CandidateScore], cumulative: Sequence[float] | None = None
+) -> CandidateScore:
     """
     Pick one candidate using its score as weight.
 
     When all scores are non-positive (should not normally happen because
     of min_score), we fall back to uniform random choice.
+
+    `cumulative` 为预先算好的累积权重（与 candidates 一一对应），采样只需一次 bisect。
     """
     if not candidates:
         raise RuntimeError("Cannot choose from empty candidates")
 
-    # Use max(score, 0.0) so that very low scores do not invert weights.
-    weights: list[float] = [max(c.score, 0.0) for c in candidates]
-    total = sum(weights)
+    if cumulative is None or len(cumulative) != len(candidates):
+        # Use max(score, 0.0) so that very low scores do not invert weights.
+        cumulative = list(accumulate(max(c.score, 0.0) for c in candidates))
+    total = cumulative[-1]
 
     if total <= 0.0:
         # Fallback: all weights are zero or negative, choose uniformly.
         return random.choice(list(candidates))
 
     r = random.random() * total
-    acc = 0.0
-    for cand, w in zip(candidates, weights):
-        acc += w
-        if r <= acc:
-            return cand
-
-    # Numerical safety net.
-    return candidates[-1]
+    # Numerical safety net: clamp to the last candidate.
+    idx = min(bisect_left(cumulative, r), len(candidates) - 1)
+    return candidates[idx]
 
 
 def choose_upstream(
@@ -184,15 +267,14 @@ def choose_upstream(
         dynamic_weights: 动态权重（可选）
         enable_health_check: 是否启用健康检查和最低分数过滤
     """
-    scored = score_upstreams(
-        logical_model, upstreams, metrics_by_provider, strategy, dynamic_weights, enable_health_check
-    )
+    engine = _ScoringEngine(metrics_by_provider, strategy, dynamic_weights, enable_health_check)
+    scored, cumulative = engine.run(upstreams)
     if not scored:
         raise RuntimeError("No eligible upstream candidates")
 
     # No sticky session match; fall back to weighted random choice based
     # on scores so that traffic can be balanced across healthy upstreams.
-    selected = _weighted_choice(scored)
+    selected = _weighted_choice(scored, cumulative)
     return selected, scored
 
 
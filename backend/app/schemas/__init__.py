@@ -72,10 +72,14 @@ from .metrics import (
 from .model import (
     Model,
     ModelAliasUpdateRequest,
+    ModelBillingMultiplierResponse,
+    ModelBillingMultiplierUpdateRequest,
     ModelCapabilitiesUpdateRequest,
     ModelCapability,
     ModelDisableUpdateRequest,
     ModelPricingUpdateRequest,
+    ProviderBillingFactorResponse,
+    ProviderBillingFactorUpdateRequest,
     ProviderModelAliasResponse,
     ProviderModelCapabilitiesResponse,
     ProviderModelDisabledResponse,
@@ -180,6 +184,10 @@ __all__ = [
     "ModelDisableUpdateRequest",
     "ModelPricingUpdateRequest",
     "ProviderModelPricingResponse",
+    "ModelBillingMultiplierResponse",
+    "ModelBillingMultiplierUpdateRequest",
+    "ProviderBillingFactorResponse",
+    "ProviderBillingFactorUpdateRequest",
     "ModelAliasUpdateRequest",
     "ProviderModelAliasResponse",
     "ProviderModelCapabilitiesResponse",
@@ -363,6 +371,8 @@ __all__ = [
     "MetricsTimeRange",
     "Model",
     "ModelAliasUpdateRequest",
+    "ModelBillingMultiplierResponse",
+    "ModelBillingMultiplierUpdateRequest",
     "ModelCapabilitiesUpdateRequest",
     "ModelCapability",
     "ModelDisableUpdateRequest",
@@ -385,6 +395,8 @@ __all__ = [
     "ProviderAPIKeyUpdateRequest",
     "ProviderAuditActionRequest",
     "ProviderAuditLogResponse",
+    "ProviderBillingFactorResponse",
+    "ProviderBillingFactorUpdateRequest",
     "ProviderConfig",
     "ProviderLimitsResponse",
     "ProviderLimitsUpdateRequest",
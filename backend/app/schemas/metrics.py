@@ -321,6 +321,29 @@ class UserOverviewAppUsage(BaseModel):
     )
 
 
+class UpstreamHttpPoolMetrics(BaseModel):
+    enabled: bool = Field(..., description="是否启用进程级上游 HTTP 连接池")
+    sessions: int = Field(..., description="当前存活的连接池会话数")
+    in_flight: int = Field(..., description="当前借出中的会话租约数")
+    sessions_created: int = Field(..., description="累计创建的会话数")
+    sessions_evicted: int = Field(..., description="因空闲被回收的会话数")
+    leases: int = Field(..., description="累计借出次数（≈ 使用连接池的请求数）")
+    connections_new: int = Field(..., description="新建的上游 TCP 连接数")
+    connections_reused: int = Field(..., description="复用已有 keep-alive 连接的传输次数")
+    pool_waits: int = Field(..., description="因并发句柄用尽而排队等待的次数")
+    pool_timeouts: int = Field(..., description="排队等待超时而失败的次数")
+
+
+class RoutingL1CacheMetrics(BaseModel):
+    enabled: bool = Field(..., description="是否启用路由 L1 进程内缓存")
+    entries: int = Field(..., description="当前缓存条目数")
+    hits: int = Field(..., description="累计命中次数（含负缓存命中）")
+    misses: int = Field(..., description="累计未命中次数（含过期）")
+    evictions: int = Field(..., description="因容量上限被 LRU 淘汰的条目数")
+    expirations: int = Field(..., description="因 TTL 过期被移除的条目数")
+    invalidations: int = Field(..., description="因失效消息被移除的条目数")
+
+
 __all__ = [
     "APIKeyMetricsSummary",
     "ActiveProviderMetrics",
@@ -332,6 +355,8 @@ __all__ = [
     "OverviewMetricsTimeSeries",
     "ProviderMetricsSummary",
     "ProviderMetricsTimeSeries",
+    "RoutingL1CacheMetrics",
+    "UpstreamHttpPoolMetrics",
     "UserActiveProviderMetrics",
     "UserAppUsageMetrics",
     "UserMetricsSummary",
@@ -75,6 +75,42 @@ class ProviderModelPricingResponse(BaseModel):
     )
 
 
+class ProviderBillingFactorUpdateRequest(BaseModel):
+    """
+    管理端更新 Provider 结算系数（Provider.billing_factor）的请求体。
+    """
+
+    billing_factor: float = Field(..., gt=0, description="结算系数，与模型单价、倍率相乘得到最终扣费")
+
+
+class ProviderBillingFactorResponse(BaseModel):
+    """
+    返回 Provider 当前的结算系数。
+    """
+
+    provider_id: str = Field(..., description="Provider 的短 ID（例如 moonshot-xxx）")
+    billing_factor: float = Field(..., description="当前结算系数")
+
+
+class ModelBillingMultiplierUpdateRequest(BaseModel):
+    """
+    管理端更新逻辑模型计费倍率（ModelBillingConfig）的请求体；记录不存在时创建。
+    """
+
+    multiplier: float = Field(..., ge=0, description="计费倍率")
+    is_active: bool = Field(default=True, description="是否启用该倍率；停用后按 1.0 计费")
+
+
+class ModelBillingMultiplierResponse(BaseModel):
+    """
+    返回逻辑模型当前的计费倍率配置。
+    """
+
+    model_name: str = Field(..., description="逻辑模型名称")
+    multiplier: float = Field(..., description="计费倍率")
+    is_active: bool = Field(..., description="是否启用")
+
+
 class ModelAliasUpdateRequest(BaseModel):
     """
     更新单个物理模型「别名映射」的请求体。
@@ -157,10 +193,14 @@ class ProviderModelDisabledResponse(BaseModel):
 __all__ = [
     "Model",
     "ModelAliasUpdateRequest",
+    "ModelBillingMultiplierResponse",
+    "ModelBillingMultiplierUpdateRequest",
     "ModelCapability",
     "ModelCapabilitiesUpdateRequest",
     "ModelDisableUpdateRequest",
     "ModelPricingUpdateRequest",
+    "ProviderBillingFactorResponse",
+    "ProviderBillingFactorUpdateRequest",
     "ProviderModelAliasResponse",
     "ProviderModelCapabilitiesResponse",
     "ProviderModelDisabledResponse",
@@ -9,8 +9,10 @@ from uuid import UUID
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.db.async_session import async_session_for
 from app.models import APIKey, User
 from app.repositories.api_key_repository import (
+    afind_api_key_by_hash as repo_afind_api_key_by_hash,
     api_key_name_exists,
     create_api_key as repo_create_api_key,
     delete_api_key as repo_delete_api_key,
@@ -94,6 +96,17 @@ def find_api_key_by_hash(session: Session, key_hash: str) -> APIKey | None:
     return repo_find_api_key_by_hash(session, key_hash=key_hash)
 
 
+async def afind_api_key_by_hash(session: Session, key_hash: str) -> APIKey | None:
+    """
+    鉴权热路径使用的异步查找；异步 engine 不可用时回退到同步查询。
+    """
+    factory = async_session_for(session)
+    if factory is None:
+        return find_api_key_by_hash(session, key_hash)
+    async with factory() as async_session:
+        return await repo_afind_api_key_by_hash(async_session, key_hash=key_hash)
+
+
 def create_api_key(
     session: Session,
     *,
@@ -176,6 +189,7 @@ __all__ = [
     "API_KEY_PREFIX_LENGTH",
     "APIKeyNameAlreadyExistsError",
     "APIKeyServiceError",
+    "afind_api_key_by_hash",
     "build_api_key_prefix",
     "create_api_key",
     "delete_api_key",
@@ -0,0 +1,380 @@
+"""
+Bandit 臂统计的进程内缓存 + 写回缓冲。
+
+- 读路径：按 (project, assistant, context_key, arm) 缓存 Beta 后验；缺失的臂一次查询批量加载，
+  不存在的行缓存为先验 Beta(1, 1)。条目带 TTL，到期后重新加载以合并其它 worker 写回的更新；
+- 写路径：apply_winner_update 只累加到内存增量，后台线程按间隔把增量合并为一条多行
+  INSERT ... ON CONFLICT DO UPDATE 写回（与 BufferedMetricsRecorder 相同的缓冲思路）；
+- 读到的统计 = 最近一次加载的数据库值 + 正在写回的增量 + 尚未写回的本地增量；写回期间增量保持可见，
+  提交后在同一把锁内并入基线，读取方始终恰好看到每个增量一次；
+- 与写回重叠的数据库加载无法判断是否已包含正在写回的增量，这类结果不写入缓存，下次读取重新加载；
+- 写回失败时逐行重试定位问题行（例如 api_key / 助手被删除后的外键冲突），
+  同一增量连续失败 _MAX_FLUSH_ATTEMPTS 次或缓冲区超限时丢弃并告警，避免一行坏数据阻塞全部写回。
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.logging_config import logger
+from app.models import BanditArmStats
+from app.settings import settings
+
+# 同一增量允许的最大写回失败次数，超过后丢弃并告警。
+_MAX_FLUSH_ATTEMPTS = 3
+# 写回失败时放回缓冲区的上限（相对 max_entries 的倍数）。
+_REQUEUE_LIMIT_FACTOR = 4
+
+
+@dataclass(frozen=True)
+class ArmKey:
+    project_id: UUID
+    assistant_id: UUID
+    context_key: str
+    arm: str
+
+
+@dataclass(frozen=True)
+class ArmPosterior:
+    alpha: float = 1.0
+    beta: float = 1.0
+    samples: int = 0
+
+
+@dataclass
+class ArmDelta:
+    alpha: float = 0.0
+    beta: float = 0.0
+    wins: int = 0
+    losses: int = 0
+    samples: int = 0
+    last_updated_at: dt.datetime | None = None
+    # 该增量已经写回失败的次数。
+    attempts: int = 0
+
+    def merge(self, other: ArmDelta) -> None:
+        self.alpha += other.alpha
+        self.beta += other.beta
+        self.wins += other.wins
+        self.losses += other.losses
+        self.samples += other.samples
+        self.attempts = max(self.attempts, other.attempts)
+        if other.last_updated_at is not None:
+            self.last_updated_at = other.last_updated_at
+
+
+def _apply_delta(base: ArmPosterior, *deltas: ArmDelta | None) -> ArmPosterior:
+    for delta in deltas:
+        if delta is None:
+            continue
+        base = ArmPosterior(
+            alpha=base.alpha + delta.alpha,
+            beta=base.beta + delta.beta,
+            samples=base.samples + delta.samples,
+        )
+    return base
+
+
+def posterior_from_row(row: BanditArmStats) -> ArmPosterior:
+    return ArmPosterior(
+        alpha=float(row.alpha or 1.0),
+        beta=float(row.beta or 1.0),
+        samples=int(row.samples or 0),
+    )
+
+
+class BanditArmStatsStore:
+    """In-memory bandit arm posteriors with write-behind flush."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float,
+        max_entries: int,
+        flush_interval_seconds: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.flush_interval_seconds = flush_interval_seconds
+        self._clock = clock
+
+        self._base: OrderedDict[ArmKey, tuple[float, ArmPosterior]] = OrderedDict()
+        self._pending: dict[ArmKey, ArmDelta] = {}
+        # 已从 _pending 取出、正在写回数据库的增量；写回结束前仍计入读取结果。
+        self._inflight: dict[ArmKey, ArmDelta] = {}
+        # 每次写回开始和结束时递增，用于判断一次数据库加载是否与写回重叠。
+        self._generation = 0
+        self._lock = threading.Lock()
+        # 串行化写回（后台线程与 shutdown），保证同一时刻只有一批在途增量。
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._flush_thread and self._flush_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="bandit-arm-flusher", daemon=True
+        )
+        self._flush_thread.start()
+
+    def shutdown(self) -> None:
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join(timeout=1.0)
+            self._flush_thread = None
+        self.flush()
+
+    @property
+    def running(self) -> bool:
+        """后台写回线程是否在运行；未运行的进程（Celery worker / 脚本）应直接写库。"""
+        return self._flush_thread is not None and self._flush_thread.is_alive()
+
+    @property
+    def generation(self) -> int:
+        """写回代数；调用方在 lookup 前读取并传给 fill，用于识别与写回重叠的加载。"""
+        with self._lock:
+            return self._generation
+
+    def lookup(self, keys: Iterable[ArmKey]) -> tuple[dict[ArmKey, ArmPosterior], list[ArmKey]]:
+        """
+        返回 (已缓存且未过期的后验, 需要从数据库加载的 key)。
+        """
+        now = self._clock()
+        found: dict[ArmKey, ArmPosterior] = {}
+        missing: list[ArmKey] = []
+        with self._lock:
+            for key in keys:
+                entry = self._base.get(key)
+                if entry is None or entry[0] <= now:
+                    missing.append(key)
+                    continue
+                self._base.move_to_end(key)
+                found[key] = _apply_delta(entry[1], self._inflight.get(key), self._pending.get(key))
+        return found, missing
+
+    def fill(
+        self,
+        keys: Iterable[ArmKey],
+        loaded: dict[ArmKey, ArmPosterior],
+        *,
+        generation: int | None = None,
+    ) -> dict[ArmKey, ArmPosterior]:
+        """
+        写入数据库加载结果（缺失的臂按先验缓存），返回叠加本地增量后的后验。
+
+        generation 为加载前读取的 self.generation；加载期间发生过写回、或该 key 仍有在途增量时，
+        数据库值可能已包含也可能未包含这批增量，此时只返回加载值 + 未写回增量，不写入缓存。
+        """
+        expires_at = self._clock() + self.ttl_seconds
+        result: dict[ArmKey, ArmPosterior] = {}
+        with self._lock:
+            overlapped = generation is not None and generation != self._generation
+            for key in keys:
+                base = loaded.get(key, ArmPosterior())
+                result[key] = _apply_delta(base, self._pending.get(key))
+                if overlapped or key in self._inflight:
+                    continue
+                self._base[key] = (expires_at, base)
+                self._base.move_to_end(key)
+            while len(self._base) > self.max_entries:
+                self._base.popitem(last=False)
+        return result
+
+    def record_outcome(
+        self,
+        *,
+        project_id: UUID,
+        assistant_id: UUID,
+        context_key: str,
+        arms: list[str],
+        winner: str,
+    ) -> None:
+        now = dt.datetime.now(dt.UTC)
+        with self._lock:
+            for arm in arms:
+                key = ArmKey(project_id, assistant_id, context_key, arm)
+                delta = self._pending.get(key)
+                if delta is None:
+                    delta = ArmDelta()
+                    self._pending[key] = delta
+                delta.samples += 1
+                delta.last_updated_at = now
+                if arm == winner:
+                    delta.alpha += 1.0
+                    delta.wins += 1
+                else:
+                    delta.beta += 1.0
+                    delta.losses += 1
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._base.clear()
+            self._pending.clear()
+            self._inflight.clear()
+
+    def flush(self, session_factory: Callable[[], Session] | None = None) -> int:
+        with self._flush_lock:
+            return self._flush_locked(session_factory)
+
+    def _flush_locked(self, session_factory: Callable[[], Session] | None) -> int:
+        with self._lock:
+            if not self._pending:
+                return 0
+            items = list(self._pending.items())
+            self._inflight = self._pending
+            self._pending = {}
+            self._generation += 1
+
+        written: list[tuple[ArmKey, ArmDelta]] = []
+        failed = items
+        try:
+            session = (session_factory or SessionLocal)()
+            try:
+                try:
+                    session.execute(_build_upsert_stmt(session, items))
+                    session.commit()
+                    written, failed = items, []
+                except Exception:
+                    session.rollback()
+                    logger.exception("Failed to flush buffered bandit arm stats; retrying row by row")
+                    written, failed = self._flush_rows(session, items)
+            finally:
+                session.close()
+        finally:
+            with self._lock:
+                # 已写回的增量并入缓存的基线、失败的放回缓冲区，并与清空在途增量在同一把锁内完成，
+                # 读取方不会在中间状态看到少算或重复计算的统计。
+                for key, delta in written:
+                    entry = self._base.get(key)
+                    if entry is not None:
+                        expires_at, base = entry
+                        self._base[key] = (expires_at, _apply_delta(base, delta))
+                exhausted, overflow, limit = self._requeue_locked(failed)
+                self._inflight = {}
+                self._generation += 1
+            if exhausted or overflow:
+                logger.warning(
+                    "Dropped bandit arm updates after failed flush (exhausted=%d, over_limit=%d, limit=%d)",
+                    exhausted,
+                    overflow,
+                    limit,
+                )
+        return len(written)
+
+    @staticmethod
+    def _flush_rows(
+        session: Session, items: list[tuple[ArmKey, ArmDelta]]
+    ) -> tuple[list[tuple[ArmKey, ArmDelta]], list[tuple[ArmKey, ArmDelta]]]:
+        """批量写回失败后逐行提交，把问题行与正常行分开。"""
+        written: list[tuple[ArmKey, ArmDelta]] = []
+        failed: list[tuple[ArmKey, ArmDelta]] = []
+        for item in items:
+            try:
+                session.execute(_build_upsert_stmt(session, [item]))
+                session.commit()
+            except Exception:
+                session.rollback()
+                failed.append(item)
+                continue
+            written.append(item)
+        return written, failed
+
+    def _requeue_locked(self, items: list[tuple[ArmKey, ArmDelta]]) -> tuple[int, int, int]:
+        """把写回失败的增量放回缓冲区（调用方持有 self._lock），返回 (丢弃数, 超限数, 上限)。"""
+        limit = self.max_entries * _REQUEUE_LIMIT_FACTOR
+        exhausted = 0
+        overflow = 0
+        for key, delta in items:
+            delta.attempts += 1
+            if delta.attempts >= _MAX_FLUSH_ATTEMPTS:
+                exhausted += 1
+                continue
+            existing = self._pending.get(key)
+            if existing is not None:
+                delta.merge(existing)
+            elif len(self._pending) >= limit:
+                overflow += 1
+                continue
+            self._pending[key] = delta
+        return exhausted, overflow, limit
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval_seconds):
+            try:
+                flushed = self.flush()
+                if flushed:
+                    logger.debug("Flushed %d buffered bandit arm updates", flushed)
+            except Exception:
+                logger.exception("Unexpected error while flushing bandit arm stats")
+
+
+def _build_upsert_stmt(session: Session, items: list[tuple[ArmKey, ArmDelta]]):
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+
+    stmt = insert(BanditArmStats).values(
+        [
+            {
+                "api_key_id": key.project_id,
+                "assistant_id": key.assistant_id,
+                "context_key": key.context_key,
+                "arm_logical_model": key.arm,
+                "alpha": 1.0 + delta.alpha,
+                "beta": 1.0 + delta.beta,
+                "wins": delta.wins,
+                "losses": delta.losses,
+                "samples": delta.samples,
+                "last_updated_at": delta.last_updated_at,
+            }
+            for key, delta in items
+        ]
+    )
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["api_key_id", "context_key", "arm_logical_model"],
+        set_={
+            "alpha": BanditArmStats.alpha + excluded.alpha - 1.0,
+            "beta": BanditArmStats.beta + excluded.beta - 1.0,
+            "wins": BanditArmStats.wins + excluded.wins,
+            "losses": BanditArmStats.losses + excluded.losses,
+            "samples": BanditArmStats.samples + excluded.samples,
+            "last_updated_at": excluded.last_updated_at,
+            "updated_at": func.now(),
+        },
+    )
+
+
+bandit_arm_store = BanditArmStatsStore(
+    ttl_seconds=settings.bandit_arm_cache_ttl_seconds,
+    max_entries=settings.bandit_arm_cache_max_entries,
+    flush_interval_seconds=settings.bandit_arm_flush_interval_seconds,
+)
+
+
+__all__ = [
+    "ArmDelta",
+    "ArmKey",
+    "ArmPosterior",
+    "BanditArmStatsStore",
+    "bandit_arm_store",
+    "posterior_from_row",
+]
@@ -4,6 +4,7 @@ import hmac
 import json
 import random
 import re
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from hashlib import sha256
@@ -12,7 +13,10 @@ from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.db.async_session import async_session_for
+from app.db.session import is_bound_to_global_engine
 from app.models import BanditArmStats
+from app.services.bandit_arm_store import ArmKey, ArmPosterior, bandit_arm_store, posterior_from_row
 from app.settings import settings
 
 _CJK_RE = re.compile(r"[\u4e00-\u9fff]")
@@ -81,6 +85,160 @@ class BanditRecommendation:
     exploration: bool
 
 
+def _normalize_candidates(
+    candidate_logical_models: list[str], *, baseline_logical_model: str
+) -> list[str]:
+    normalized_candidates: list[str] = []
+    seen: set[str] = set()
+    for raw in candidate_logical_models or []:
+        val = str(raw).strip()
+        if not val or val == baseline_logical_model:
+            continue
+        if val in seen:
+            continue
+        normalized_candidates.append(val)
+        seen.add(val)
+    return normalized_candidates
+
+
+def _arm_stats_stmt(
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    context_key: str,
+    arms: list[str],
+):
+    return select(BanditArmStats).where(
+        BanditArmStats.api_key_id == project_id,
+        BanditArmStats.assistant_id == assistant_id,
+        BanditArmStats.context_key == context_key,
+        BanditArmStats.arm_logical_model.in_(arms),
+    )
+
+
+def _rank_candidates(
+    posteriors: dict[str, ArmPosterior],
+    *,
+    normalized_candidates: list[str],
+    k: int,
+) -> tuple[list[CandidateScore], bool]:
+    arm_posteriors = [posteriors.get(arm) or ArmPosterior() for arm in normalized_candidates]
+    exploration = any(p.samples < 10 for p in arm_posteriors)
+    scored = [
+        CandidateScore(
+            logical_model=arm,
+            sampled_score=float(random.betavariate(posterior.alpha, posterior.beta)),
+            samples=posterior.samples,
+        )
+        for arm, posterior in zip(normalized_candidates, arm_posteriors, strict=True)
+    ]
+    scored.sort(key=lambda item: item.sampled_score, reverse=True)
+    if k <= 0:
+        topk = []
+    else:
+        topk = scored[:k]
+    return topk, exploration
+
+
+def _arm_cache_active(db: Session) -> bool:
+    return bool(settings.bandit_arm_cache_enabled) and is_bound_to_global_engine(db)
+
+
+def _arm_keys(
+    *, project_id: UUID, assistant_id: UUID, context_key: str, arms: list[str]
+) -> list[ArmKey]:
+    return [ArmKey(project_id, assistant_id, context_key, arm) for arm in arms]
+
+
+def _posteriors_by_key(keys: list[ArmKey], rows: Iterable[BanditArmStats]) -> dict[ArmKey, ArmPosterior]:
+    by_arm = {key.arm: key for key in keys}
+    loaded: dict[ArmKey, ArmPosterior] = {}
+    for row in rows:
+        key = by_arm.get(row.arm_logical_model)
+        if key is not None:
+            loaded[key] = posterior_from_row(row)
+    return loaded
+
+
+def _load_posteriors(
+    db: Session,
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    context_key: str,
+    arms: list[str],
+) -> dict[str, ArmPosterior]:
+    if not _arm_cache_active(db):
+        rows = db.execute(
+            _arm_stats_stmt(
+                project_id=project_id, assistant_id=assistant_id, context_key=context_key, arms=arms
+            )
+        ).scalars().all()
+        return {row.arm_logical_model: posterior_from_row(row) for row in rows}
+
+    keys = _arm_keys(project_id=project_id, assistant_id=assistant_id, context_key=context_key, arms=arms)
+    generation = bandit_arm_store.generation
+    found, missing = bandit_arm_store.lookup(keys)
+    if missing:
+        rows = db.execute(
+            _arm_stats_stmt(
+                project_id=project_id,
+                assistant_id=assistant_id,
+                context_key=context_key,
+                arms=[key.arm for key in missing],
+            )
+        ).scalars().all()
+        found.update(
+            bandit_arm_store.fill(missing, _posteriors_by_key(missing, rows), generation=generation)
+        )
+    return {key.arm: posterior for key, posterior in found.items()}
+
+
+async def _aload_posteriors(
+    db: Session,
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    context_key: str,
+    arms: list[str],
+) -> dict[str, ArmPosterior]:
+    use_cache = _arm_cache_active(db)
+    keys = _arm_keys(project_id=project_id, assistant_id=assistant_id, context_key=context_key, arms=arms)
+    generation = bandit_arm_store.generation
+    found, missing = bandit_arm_store.lookup(keys) if use_cache else ({}, keys)
+    if missing:
+        stmt = _arm_stats_stmt(
+            project_id=project_id,
+            assistant_id=assistant_id,
+            context_key=context_key,
+            arms=[key.arm for key in missing],
+        )
+        factory = async_session_for(db)
+        if factory is None:
+            rows = db.execute(stmt).scalars().all()
+        else:
+            async with factory() as session:
+                rows = (await session.execute(stmt)).scalars().all()
+        loaded = _posteriors_by_key(missing, rows)
+        found.update(bandit_arm_store.fill(missing, loaded, generation=generation) if use_cache else loaded)
+    return {key.arm: posterior for key, posterior in found.items()}
+
+
+def _resolve_context(
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    user_text: str,
+    context_features: dict | None,
+) -> tuple[dict, str]:
+    if isinstance(context_features, dict) and context_features:
+        features = dict(context_features)
+    else:
+        features = build_context_features(user_text=user_text)
+    context_key = build_context_key(project_id=project_id, assistant_id=assistant_id, features=features)
+    return features, context_key
+
+
 def recommend_challengers(
     db: Session,
     *,
@@ -93,22 +251,15 @@ def recommend_challengers(
     k: int,
     policy_version: str = "ts-v1",
 ) -> BanditRecommendation:
-    if isinstance(context_features, dict) and context_features:
-        features = dict(context_features)
-    else:
-        features = build_context_features(user_text=user_text)
-    context_key = build_context_key(project_id=project_id, assistant_id=assistant_id, features=features)
-
-    normalized_candidates: list[str] = []
-    seen: set[str] = set()
-    for raw in candidate_logical_models or []:
-        val = str(raw).strip()
-        if not val or val == baseline_logical_model:
-            continue
-        if val in seen:
-            continue
-        normalized_candidates.append(val)
-        seen.add(val)
+    features, context_key = _resolve_context(
+        project_id=project_id,
+        assistant_id=assistant_id,
+        user_text=user_text,
+        context_features=context_features,
+    )
+    normalized_candidates = _normalize_candidates(
+        candidate_logical_models, baseline_logical_model=baseline_logical_model
+    )
 
     if not normalized_candidates:
         return BanditRecommendation(
@@ -119,39 +270,71 @@ def recommend_challengers(
             exploration=True,
         )
 
-    rows = db.execute(
-        select(BanditArmStats).where(
-            BanditArmStats.api_key_id == project_id,
-            BanditArmStats.assistant_id == assistant_id,
-            BanditArmStats.context_key == context_key,
-            BanditArmStats.arm_logical_model.in_(normalized_candidates),
+    posteriors = _load_posteriors(
+        db,
+        project_id=project_id,
+        assistant_id=assistant_id,
+        context_key=context_key,
+        arms=normalized_candidates,
+    )
+    topk, exploration = _rank_candidates(
+        posteriors, normalized_candidates=normalized_candidates, k=k
+    )
+
+    return BanditRecommendation(
+        policy_version=policy_version,
+        context_key=context_key,
+        features=features,
+        candidates=topk,
+        exploration=exploration,
+    )
+
+
+async def arecommend_challengers(
+    db: Session,
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    baseline_logical_model: str,
+    user_text: str,
+    context_features: dict | None = None,
+    candidate_logical_models: list[str],
+    k: int,
+    policy_version: str = "ts-v1",
+) -> BanditRecommendation:
+    """
+    recommend_challengers 的异步版本：臂统计优先读进程内缓存，缓存缺失时通过异步 engine 加载，
+    异步 engine 不可用时回退到同步查询。
+    """
+    features, context_key = _resolve_context(
+        project_id=project_id,
+        assistant_id=assistant_id,
+        user_text=user_text,
+        context_features=context_features,
+    )
+    normalized_candidates = _normalize_candidates(
+        candidate_logical_models, baseline_logical_model=baseline_logical_model
+    )
+
+    if not normalized_candidates:
+        return BanditRecommendation(
+            policy_version=policy_version,
+            context_key=context_key,
+            features=features,
+            candidates=[],
+            exploration=True,
         )
-    ).scalars().all()
-    stats_by_arm = {row.arm_logical_model: row for row in rows}
-
-    scored: list[CandidateScore] = []
-    exploration = False
-    for arm in normalized_candidates:
-        stat = stats_by_arm.get(arm)
-        if stat is None:
-            exploration = True
-            alpha = 1.0
-            beta = 1.0
-            samples = 0
-        else:
-            alpha = float(stat.alpha or 1.0)
-            beta = float(stat.beta or 1.0)
-            samples = int(stat.samples or 0)
-            if samples < 10:
-                exploration = True
-        sampled = random.betavariate(alpha, beta)
-        scored.append(CandidateScore(logical_model=arm, sampled_score=float(sampled), samples=samples))
 
-    scored.sort(key=lambda item: item.sampled_score, reverse=True)
-    if k <= 0:
-        topk = []
-    else:
-        topk = scored[:k]
+    posteriors = await _aload_posteriors(
+        db,
+        project_id=project_id,
+        assistant_id=assistant_id,
+        context_key=context_key,
+        arms=normalized_candidates,
+    )
+    topk, exploration = _rank_candidates(
+        posteriors, normalized_candidates=normalized_candidates, k=k
+    )
 
     return BanditRecommendation(
         policy_version=policy_version,
@@ -186,6 +369,17 @@ def apply_winner_update(
     if not normalized or winner_model not in seen:
         return
 
+    if _arm_cache_active(db) and bandit_arm_store.running:
+        # 写回缓冲：只累加内存增量，由 bandit_arm_store 后台批量写回数据库。
+        bandit_arm_store.record_outcome(
+            project_id=project_id,
+            assistant_id=assistant_id,
+            context_key=context_key,
+            arms=normalized,
+            winner=winner_model,
+        )
+        return
+
     existing = db.execute(
         select(BanditArmStats).where(
             BanditArmStats.api_key_id == project_id,
@@ -229,6 +423,7 @@ __all__ = [
     "BanditRecommendation",
     "CandidateScore",
     "apply_winner_update",
+    "arecommend_challengers",
     "build_context_features",
     "build_context_key",
     "recommend_challengers",
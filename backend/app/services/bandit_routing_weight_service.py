@@ -8,7 +8,11 @@ from sqlalchemy.orm import Session
 
 from app.routing.provider_weight import clamp_provider_weight
 from app.schemas import PhysicalModel
-from app.services.bandit_policy_service import BanditRecommendation, recommend_challengers
+from app.services.bandit_policy_service import (
+    BanditRecommendation,
+    arecommend_challengers,
+    recommend_challengers,
+)
 from app.services.context_features_service import build_rule_context_features
 
 _ARM_PREFIX_LOGICAL_MODEL = "lm:"
@@ -97,25 +101,14 @@ class BanditRoutingWeightsResult:
     dynamic_weights: dict[str, float]
 
 
-def build_bandit_routing_weights(
-    db: Session,
+def _prepare_candidate_arms(
     *,
-    project_id: UUID,
-    assistant_id: UUID,
     logical_model_id: str,
     upstreams: list[PhysicalModel],
     user_text: str,
     request_payload: dict[str, Any] | None,
-    base_weights: dict[str, float],
-    current_weights: dict[str, float] | None,
-    top_n: int,
-    max_boost: float,
-    decay: float,
-    min_samples_per_arm: int,
-    apply_during_exploration: bool,
-    policy_version: str = "ts-routing-v1",
-    context_features: dict[str, str] | None = None,
-) -> BanditRoutingWeightsResult | None:
+    context_features: dict[str, str] | None,
+) -> tuple[dict[str, str], list[str]] | None:
     provider_ids = [u.provider_id for u in (upstreams or []) if getattr(u, "provider_id", None)]
     provider_ids = list(dict.fromkeys(provider_ids))
     if len(provider_ids) <= 1:
@@ -132,18 +125,21 @@ def build_bandit_routing_weights(
         build_provider_arm_key(logical_model_id=logical_model_id, provider_id=pid)
         for pid in provider_ids
     ]
+    return features, candidate_arms
 
-    rec = recommend_challengers(
-        db,
-        project_id=project_id,
-        assistant_id=assistant_id,
-        baseline_logical_model="",
-        user_text=user_text,
-        context_features=features,
-        candidate_logical_models=candidate_arms,
-        k=len(candidate_arms),
-        policy_version=policy_version,
-    )
+
+def _weights_from_recommendation(
+    rec: BanditRecommendation,
+    *,
+    logical_model_id: str,
+    base_weights: dict[str, float],
+    current_weights: dict[str, float] | None,
+    top_n: int,
+    max_boost: float,
+    decay: float,
+    min_samples_per_arm: int,
+    apply_during_exploration: bool,
+) -> BanditRoutingWeightsResult | None:
     if not rec.candidates:
         return None
 
@@ -177,8 +173,120 @@ def build_bandit_routing_weights(
     )
 
 
+def build_bandit_routing_weights(
+    db: Session,
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    logical_model_id: str,
+    upstreams: list[PhysicalModel],
+    user_text: str,
+    request_payload: dict[str, Any] | None,
+    base_weights: dict[str, float],
+    current_weights: dict[str, float] | None,
+    top_n: int,
+    max_boost: float,
+    decay: float,
+    min_samples_per_arm: int,
+    apply_during_exploration: bool,
+    policy_version: str = "ts-routing-v1",
+    context_features: dict[str, str] | None = None,
+) -> BanditRoutingWeightsResult | None:
+    prepared = _prepare_candidate_arms(
+        logical_model_id=logical_model_id,
+        upstreams=upstreams,
+        user_text=user_text,
+        request_payload=request_payload,
+        context_features=context_features,
+    )
+    if prepared is None:
+        return None
+    features, candidate_arms = prepared
+
+    rec = recommend_challengers(
+        db,
+        project_id=project_id,
+        assistant_id=assistant_id,
+        baseline_logical_model="",
+        user_text=user_text,
+        context_features=features,
+        candidate_logical_models=candidate_arms,
+        k=len(candidate_arms),
+        policy_version=policy_version,
+    )
+    return _weights_from_recommendation(
+        rec,
+        logical_model_id=logical_model_id,
+        base_weights=base_weights,
+        current_weights=current_weights,
+        top_n=top_n,
+        max_boost=max_boost,
+        decay=decay,
+        min_samples_per_arm=min_samples_per_arm,
+        apply_during_exploration=apply_during_exploration,
+    )
+
+
+async def abuild_bandit_routing_weights(
+    db: Session,
+    *,
+    project_id: UUID,
+    assistant_id: UUID,
+    logical_model_id: str,
+    upstreams: list[PhysicalModel],
+    user_text: str,
+    request_payload: dict[str, Any] | None,
+    base_weights: dict[str, float],
+    current_weights: dict[str, float] | None,
+    top_n: int,
+    max_boost: float,
+    decay: float,
+    min_samples_per_arm: int,
+    apply_during_exploration: bool,
+    policy_version: str = "ts-routing-v1",
+    context_features: dict[str, str] | None = None,
+) -> BanditRoutingWeightsResult | None:
+    """
+    build_bandit_routing_weights 的异步版本（选路热路径使用），臂统计走异步 engine。
+    """
+    prepared = _prepare_candidate_arms(
+        logical_model_id=logical_model_id,
+        upstreams=upstreams,
+        user_text=user_text,
+        request_payload=request_payload,
+        context_features=context_features,
+    )
+    if prepared is None:
+        return None
+    features, candidate_arms = prepared
+
+    rec = await arecommend_challengers(
+        db,
+        project_id=project_id,
+        assistant_id=assistant_id,
+        baseline_logical_model="",
+        user_text=user_text,
+        context_features=features,
+        candidate_logical_models=candidate_arms,
+        k=len(candidate_arms),
+        policy_version=policy_version,
+    )
+    return _weights_from_recommendation(
+        rec,
+        logical_model_id=logical_model_id,
+        base_weights=base_weights,
+        current_weights=current_weights,
+        top_n=top_n,
+        max_boost=max_boost,
+        decay=decay,
+        min_samples_per_arm=min_samples_per_arm,
+        apply_during_exploration=apply_during_exploration,
+    )
+
+
 __all__ = [
     "BanditRoutingWeightsResult",
+    "abuild_bandit_routing_weights",
     "apply_boost_factors_to_weights",
     "build_bandit_routing_weights",
     "build_provider_arm_key",
@@ -40,7 +40,7 @@ from app.auth import AuthenticatedAPIKey
 from app.errors import bad_request
 from app.jwt_auth import AuthenticatedUser
 from app.models import APIKey, Message, Run
-from app.services.bandit_policy_service import recommend_challengers
+from app.services.bandit_policy_service import arecommend_challengers
 from app.services.chat_history_service import (
     create_assistant_message_after_user,
     create_assistant_message_placeholder_after_user,
@@ -347,7 +347,7 @@ async def _resolve_final_model(
             details={"project_id": str(ctx.project_id)},
         )
 
-    rec = recommend_challengers(
+    rec = await arecommend_challengers(
         db,
         project_id=ctx.project_id,
         assistant_id=UUID(str(assistant.id)),
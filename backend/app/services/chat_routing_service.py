@@ -83,6 +83,7 @@ from app.services.metrics_service import (
     call_upstream_http_with_metrics,
     stream_upstream_with_metrics,
 )
+from app.services.sse_parser import SSEFramer
 from app.settings import settings
 from app.storage.redis_service import get_routing_metrics
 from app.upstream import UpstreamStreamError
@@ -464,7 +465,7 @@ class OpenAIToClaudeStreamAdapter:
         self.model = model
         self.message_id = f"msg_{uuid.uuid4().hex}"
         self.content_block_id = f"{self.message_id}-cb-0"
-        self.buffer = ""
+        self.framer = SSEFramer()
         self.started = False
         self.had_error = False
         self.stop_reason: str | None = None
@@ -533,19 +534,10 @@ class OpenAIToClaudeStreamAdapter:
 
     def process_chunk(self, chunk: bytes) -> list[bytes]:
         outputs: list[bytes] = []
-        try:
-            decoded = chunk.decode("utf-8")
-        except UnicodeDecodeError:
-            return outputs
         if self.had_error:
             return outputs
-        self.buffer += decoded
-        while "\n\n" in self.buffer:
-            raw_event, self.buffer = self.buffer.split("\n\n", 1)
-            raw_event = raw_event.strip()
-            if not raw_event.startswith("data:"):
-                continue
-            payload_str = raw_event[len("data:") :].strip()
+        for event in self.framer.feed_events(chunk):
+            payload_str = event.data.strip()
             if not payload_str:
                 continue
             if payload_str == "[DONE]":
@@ -939,8 +931,8 @@ async def _responses_streaming_fallback_iterator(
     fallback_payload = _adapt_responses_payload(payload)
     fallback_payload["model"] = model_id
 
-    # Create a buffer to collect all chunks from upstream
-    buffer = ""
+    # Incremental SSE framer for the upstream chat.completions stream
+    framer = SSEFramer()
     index_to_text: dict[int, str] = {}
     response_id: str | None = None
     model_name: str | None = None
@@ -969,18 +961,8 @@ async def _responses_streaming_fallback_iterator(
                 await bind_session_cb(provider_id, model_id)
 
             # Process chat completion chunks and convert to responses format
-            try:
-                decoded = chunk.decode("utf-8")
-            except UnicodeDecodeError:
-                continue
-
-            buffer += decoded
-            while "\n\n" in buffer:
-                raw_event, buffer = buffer.split("\n\n", 1)
-                raw_event = raw_event.strip()
-                if not raw_event.startswith("data:"):
-                    continue
-                payload_str = raw_event[len("data:") :].strip()
+            for event in framer.feed_events(chunk):
+                payload_str = event.data.strip()
                 if not payload_str:
                     continue
 
@@ -1182,7 +1164,7 @@ class GeminiToOpenAIStreamAdapter:
         self.model = model
         self.response_id = _ensure_response_id(None)
         self.created = int(time.time())
-        self.buffer = ""
+        self.framer = SSEFramer()
         self.done = False
         self.index_to_text: dict[int, str] = {}
 
@@ -1217,17 +1199,8 @@ class GeminiToOpenAIStreamAdapter:
 
     def process_chunk(self, chunk: bytes) -> list[bytes]:
         outputs: list[bytes] = []
-        try:
-            decoded = chunk.decode("utf-8")
-        except UnicodeDecodeError:
-            return outputs
-        self.buffer += decoded
-        while "\n\n" in self.buffer:
-            raw_event, self.buffer = self.buffer.split("\n\n", 1)
-            raw_event = raw_event.strip()
-            if not raw_event.startswith("data:"):
-                continue
-            payload_str = raw_event[len("data:") :].strip()
+        for event in self.framer.feed_events(chunk):
+            payload_str = event.data.strip()
             if not payload_str:
                 continue
             if payload_str == "[DONE]":
@@ -2028,7 +2001,7 @@ def _wrap_chat_stream_response(chat_response: StreamingResponse) -> StreamingRes
     """
 
     async def _iterator() -> AsyncIterator[bytes]:
-        buffer = ""
+        framer = SSEFramer()
         index_to_text: dict[int, str] = {}
         response_id: str | None = None
         model: str | None = None
@@ -2075,18 +2048,8 @@ def _wrap_chat_stream_response(chat_response: StreamingResponse) -> StreamingRes
             return payloads
 
         async for chunk in chat_response.body_iterator:
-            try:
-                decoded = chunk.decode("utf-8")
-            except UnicodeDecodeError:
-                continue
-            buffer += decoded
-
-            while "\n\n" in buffer:
-                raw_event, buffer = buffer.split("\n\n", 1)
-                raw_event = raw_event.strip()
-                if not raw_event.startswith("data:"):
-                    continue
-                payload_str = raw_event[len("data:") :].strip()
+            for event in framer.feed_events(chunk):
+                payload_str = event.data.strip()
                 if not payload_str:
                     continue
 
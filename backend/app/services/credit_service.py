@@ -9,6 +9,7 @@ from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.db.async_session import async_session_for
 from app.logging_config import logger
 from app.models import (
     CreditAccount,
@@ -21,6 +22,7 @@ from app.models import (
 from app.schemas.notification import NotificationCreateRequest
 from app.services.metrics_service import record_provider_token_usage
 from app.services.notification_service import create_notification
+from app.services.provider_model_snapshot import get_provider_model_snapshot
 from app.settings import settings
 
 
@@ -84,6 +86,9 @@ def ensure_account_usable(db: Session, *, user_id: UUID) -> None:
 def _load_multiplier_for_model(db: Session, model_name: str | None) -> float:
     if not model_name:
         return 1.0
+    snapshot = get_provider_model_snapshot(db)
+    if snapshot is not None:
+        return snapshot.multiplier_for(model_name)
     try:
         cfg = (
             db.execute(
@@ -122,16 +127,13 @@ def _load_provider_model_pricing(
     if not provider_id or not model_name:
         return None, None
 
+    snapshot = get_provider_model_snapshot(db)
+    if snapshot is not None:
+        return _parse_pricing(snapshot.pricing_for(provider_id, model_name))
+
     try:
         pricing_json = (
-            db.execute(
-                select(ProviderModel.pricing)
-                .join(Provider, ProviderModel.provider_id == Provider.id)
-                .where(Provider.provider_id == provider_id)
-                .where(ProviderModel.model_id == model_name)
-            )
-            .scalars()
-            .first()
+            db.execute(_pricing_stmt(provider_id, model_name)).scalars().first()
         )
     except Exception:  # pragma: no cover - 防御性日志
         logger.exception(
@@ -141,6 +143,19 @@ def _load_provider_model_pricing(
         )
         return None, None
 
+    return _parse_pricing(pricing_json)
+
+
+def _pricing_stmt(provider_id: str, model_name: str):
+    return (
+        select(ProviderModel.pricing)
+        .join(Provider, ProviderModel.provider_id == Provider.id)
+        .where(Provider.provider_id == provider_id)
+        .where(ProviderModel.model_id == model_name)
+    )
+
+
+def _parse_pricing(pricing_json: Any) -> tuple[float | None, float | None]:
     if not isinstance(pricing_json, dict):
         return None, None
 
@@ -155,6 +170,14 @@ def _load_provider_model_pricing(
     )
 
 
+def _factor_or_default(value: Any) -> float:
+    """与同步加载函数一致：空值 / 0 / 无法解析时回退到 1.0，其余按原值返回。"""
+    try:
+        return float(value or 1.0)
+    except Exception:
+        return 1.0
+
+
 def _load_provider_factor(db: Session, provider_id: str | None) -> float:
     """
     根据 provider_id 读取结算系数。
@@ -164,6 +187,9 @@ def _load_provider_factor(db: Session, provider_id: str | None) -> float:
     """
     if not provider_id:
         return 1.0
+    snapshot = get_provider_model_snapshot(db)
+    if snapshot is not None:
+        return snapshot.provider_factor_for(provider_id)
     try:
         provider = (
             db.execute(
@@ -223,16 +249,7 @@ def estimate_request_cost_credits(
     - 预估成本（int，向上取整）；
     - 若无法预估（缺少 tokens 或 pricing），返回 None。
     """
-    if not isinstance(request_payload, dict):
-        return None
-
-    approx_tokens: int | None = None
-    for key in ("max_tokens", "max_tokens_to_sample", "max_output_tokens"):
-        value = request_payload.get(key)
-        if isinstance(value, int) and value > 0:
-            approx_tokens = value
-            break
-
+    approx_tokens = _approx_request_tokens(request_payload)
     if approx_tokens is None:
         return None
 
@@ -242,21 +259,124 @@ def estimate_request_cost_credits(
     if input_price is None and output_price is None:
         return None
 
+    return _estimate_cost_from_parts(
+        approx_tokens,
+        input_price=input_price,
+        output_price=output_price,
+        model_multiplier=_load_multiplier_for_model(db, logical_model_name),
+        provider_factor=_load_provider_factor(db, provider_id),
+        log_context=(provider_id, provider_model_id, logical_model_name),
+    )
+
+
+async def aestimate_request_cost_credits(
+    db: Session,
+    *,
+    logical_model_name: str | None,
+    provider_id: str | None,
+    provider_model_id: str | None,
+    request_payload: dict[str, Any] | None,
+) -> int | None:
+    """
+    estimate_request_cost_credits 的异步版本（聊天热路径预算过滤使用）。
+
+    优先使用进程内快照；否则定价 / 倍率 / 结算系数在同一个 AsyncSession 中读取；
+    异步 engine 不可用（或 db 未绑定全局 engine）时回退到同步实现。
+    """
+    approx_tokens = _approx_request_tokens(request_payload)
+    if approx_tokens is None:
+        return None
+
+    factory = None
+    if get_provider_model_snapshot(db) is None:
+        factory = async_session_for(db)
+    if factory is None:
+        # 快照可用时同步实现只做字典查找，无需再开异步会话。
+        return estimate_request_cost_credits(
+            db,
+            logical_model_name=logical_model_name,
+            provider_id=provider_id,
+            provider_model_id=provider_model_id,
+            request_payload=request_payload,
+        )
+    if not provider_id or not provider_model_id:
+        return None
+
+    try:
+        async with factory() as session:
+            pricing_json = (
+                await session.execute(_pricing_stmt(provider_id, provider_model_id))
+            ).scalars().first()
+            input_price, output_price = _parse_pricing(pricing_json)
+            if input_price is None and output_price is None:
+                return None
+
+            model_multiplier = 1.0
+            if logical_model_name:
+                multiplier = (
+                    await session.execute(
+                        select(ModelBillingConfig.multiplier)
+                        .where(ModelBillingConfig.model_name == logical_model_name)
+                        .where(ModelBillingConfig.is_active.is_(True))
+                    )
+                ).scalars().first()
+                model_multiplier = _factor_or_default(multiplier)
+
+            billing_factor = (
+                await session.execute(
+                    select(Provider.billing_factor).where(Provider.provider_id == provider_id)
+                )
+            ).scalars().first()
+            provider_factor = _factor_or_default(billing_factor)
+    except Exception:
+        logger.exception(
+            "Failed to load pricing asynchronously for provider=%r model=%r logical=%r",
+            provider_id,
+            provider_model_id,
+            logical_model_name,
+        )
+        return None
+
+    return _estimate_cost_from_parts(
+        approx_tokens,
+        input_price=input_price,
+        output_price=output_price,
+        model_multiplier=model_multiplier,
+        provider_factor=provider_factor,
+        log_context=(provider_id, provider_model_id, logical_model_name),
+    )
+
+
+def _approx_request_tokens(request_payload: dict[str, Any] | None) -> int | None:
+    if not isinstance(request_payload, dict):
+        return None
+    for key in ("max_tokens", "max_tokens_to_sample", "max_output_tokens"):
+        value = request_payload.get(key)
+        if isinstance(value, int) and value > 0:
+            return value
+    return None
+
+
+def _estimate_cost_from_parts(
+    approx_tokens: int,
+    *,
+    input_price: float | None,
+    output_price: float | None,
+    model_multiplier: float,
+    provider_factor: float,
+    log_context: tuple[Any, Any, Any],
+) -> int | None:
     per_1k = output_price if output_price is not None else input_price
     if per_1k is None:
         return None
 
     try:
-        model_multiplier = _load_multiplier_for_model(db, logical_model_name)
-        provider_factor = _load_provider_factor(db, provider_id)
         raw_cost = (int(approx_tokens) / 1000.0) * float(per_1k) * model_multiplier * provider_factor
         cost = int(math.ceil(raw_cost))
     except Exception:  # pragma: no cover
         logger.exception(
             "Failed to estimate credit cost for provider=%r model=%r logical=%r",
-            provider_id,
-            provider_model_id,
-            logical_model_name,
+            *log_context,
         )
         return None
 
@@ -996,16 +1116,125 @@ def record_streaming_request(
     return cost
 
 
+def reconcile_streaming_usage(
+    db: Session,
+    *,
+    user_id: UUID,
+    api_key_id: UUID | None,
+    logical_model_name: str | None,
+    provider_id: str | None,
+    provider_model_id: str | None,
+    usage: dict[str, Any] | None,
+    precharge_idempotency_key: str | None = None,
+) -> int:
+    """
+    流式请求结束后按实际 usage 对账：
+
+    - 若预扣流水（precharge_idempotency_key）不存在：按实际成本扣费，并占用该幂等键，
+      使之后迟到的预扣任务自动跳过；
+    - 若预扣流水已存在：只补扣 / 退还差额，差额流水使用 "<key>:reconcile" 幂等键；
+    - usage 为 StreamUsageTap 汇总的结果，缺少 prompt_tokens 时只按输出 token 计费。
+
+    返回本次净扣减的积分数（退还时为负数）。
+    """
+    if not isinstance(usage, dict):
+        return 0
+
+    actual = compute_chat_completion_cost_credits(
+        db,
+        logical_model_name=logical_model_name,
+        provider_id=provider_id,
+        provider_model_id=provider_model_id,
+        response_payload={"usage": usage},
+    )
+    if actual is None:
+        return 0
+
+    precharge_tx: CreditTransaction | None = None
+    if precharge_idempotency_key:
+        precharge_tx = (
+            db.execute(
+                select(CreditTransaction).where(
+                    CreditTransaction.idempotency_key == precharge_idempotency_key
+                )
+            )
+            .scalars()
+            .first()
+        )
+
+    if precharge_tx is None:
+        delta = actual
+        tx_key = precharge_idempotency_key
+        reason = "stream_usage"
+        description = None
+    else:
+        delta = actual - max(0, -int(precharge_tx.amount or 0))
+        tx_key = f"{precharge_idempotency_key}:reconcile"
+        reason = "stream_reconcile"
+        description = "流式请求按实际 usage 对账"
+
+    if delta == 0:
+        return 0
+
+    if tx_key:
+        existing = (
+            db.execute(select(CreditTransaction).where(CreditTransaction.idempotency_key == tx_key))
+            .scalars()
+            .first()
+        )
+        if existing is not None:
+            return 0
+
+    input_tokens = usage.get("prompt_tokens")
+    output_tokens = usage.get("completion_tokens")
+    account = get_or_create_account_for_user(db, user_id)
+    account.balance = int(account.balance) - delta
+    _create_transaction(
+        db,
+        account=account,
+        user_id=user_id,
+        api_key_id=api_key_id,
+        provider_id=provider_id,
+        provider_model_id=provider_model_id,
+        amount=-delta,
+        idempotency_key=tx_key,
+        reason=reason,
+        description=description,
+        model_name=logical_model_name,
+        input_tokens=input_tokens if isinstance(input_tokens, int) else None,
+        output_tokens=output_tokens if isinstance(output_tokens, int) else None,
+        total_tokens=usage.get("total_tokens") if isinstance(usage.get("total_tokens"), int) else None,
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return 0
+    db.refresh(account)
+    logger.info(
+        "Reconciled streaming credit usage for user=%s model=%r actual_cost=%s delta=%s balance_after=%s",
+        user_id,
+        logical_model_name,
+        actual,
+        delta,
+        account.balance,
+    )
+    return delta
+
+
 __all__ = [
     "InsufficientCreditsError",
+    "aestimate_request_cost_credits",
     "apply_credit_delta",
     "apply_manual_delta",
     "compute_chat_completion_cost_credits",
     "disable_auto_topup_for_user",
     "ensure_account_usable",
+    "estimate_request_cost_credits",
     "estimate_streaming_precharge_cost_credits",
     "get_auto_topup_rule_for_user",
     "get_or_create_account_for_user",
+    "reconcile_streaming_usage",
     "record_chat_completion_usage",
     "record_streaming_request",
     "run_daily_auto_topups",
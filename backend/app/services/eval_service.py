@@ -27,7 +27,7 @@ from app.logging_config import logger
 from app.models import APIKey, AssistantPreset, Conversation, Eval, EvalRating, Message, Run, User
 from app.redis_client import get_redis_client
 from app.services import chat_run_service
-from app.services.bandit_policy_service import recommend_challengers
+from app.services.bandit_policy_service import arecommend_challengers
 from app.services.chat_history_service import update_assistant_message_for_user_sequence
 from app.services.context_features_service import build_rule_context_features
 from app.services.credit_service import compute_chat_completion_cost_credits, estimate_streaming_precharge_cost_credits
@@ -42,6 +42,7 @@ from app.services.project_eval_config_service import (
     get_or_default_project_eval_config,
     resolve_project_context,
 )
+from app.services.sse_parser import SSEFramer
 from app.settings import settings
 from app.upstream import detect_request_format
 
@@ -281,7 +282,7 @@ async def create_eval(
         except Exception:
             logger.info("eval_service: project ai context features skipped", exc_info=True)
 
-    rec = recommend_challengers(
+    rec = await arecommend_challengers(
         db,
         project_id=ctx.project_id,
         assistant_id=UUID(str(assistant.id)),
@@ -458,7 +459,7 @@ async def execute_run_stream(
     stream_created: int | None = None
     stream_model: str | None = None
     stream_usage: dict[str, Any] | None = None
-    buffer = ""
+    framer = SSEFramer()
     request_payload_for_billing: dict[str, Any] | None = None
     tool_call_acc: dict[int, dict[str, Any]] = {}
 
@@ -494,21 +495,8 @@ async def execute_run_stream(
         ):
             text_deltas: list[str] = []
             try:
-                buffer += chunk_bytes.decode("utf-8", errors="ignore")
-                while "\n\n" in buffer:
-                    raw_event, buffer = buffer.split("\n\n", 1)
-                    raw_event = raw_event.strip()
-                    if not raw_event:
-                        continue
-
-                    data_lines: list[str] = []
-                    for line in raw_event.splitlines():
-                        if line.startswith("data:"):
-                            data_lines.append(line[len("data:") :].strip())
-                    if not data_lines:
-                        continue
-
-                    data_str = "\n".join(data_lines).strip()
+                for event in framer.feed_events(chunk_bytes):
+                    data_str = event.data.strip()
                     if not data_str or data_str == "[DONE]":
                         continue
 
@@ -0,0 +1,246 @@
+"""
+网关图片短链（IMAGE_DELIVERY_MODE=proxy）的本地磁盘 LRU 缓存。
+
+生成图片的对象 key 含随机 UUID、写入后不再修改，因此可以长期缓存：
+
+- 首次访问时一边把对象分块转发给客户端，一边写入临时文件，完整写完才原子地提交到缓存；
+  客户端中途断开时丢弃临时文件，不会留下半截对象；
+- 命中时直接返回文件（FileResponse：支持 Range，服务器支持时走 zero-copy sendfile），
+  不再回源，也不把整个对象读进 worker 内存；
+- 总大小超过 IMAGE_CACHE_MAX_BYTES 时按最近使用顺序淘汰；索引在首次使用时扫描目录重建。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import suppress
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+
+import anyio
+
+from app.logging_config import logger
+from app.services.image_storage_service import ImageObjectStream, open_image_stream
+from app.settings import settings
+
+_DATA_SUFFIX = ".bin"
+_META_SUFFIX = ".json"
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    path: Path
+    content_type: str
+    size_bytes: int
+    etag: str
+
+
+def _digest(object_key: str) -> str:
+    return sha256(object_key.encode("utf-8")).hexdigest()
+
+
+def _fallback_etag(digest: str) -> str:
+    return f'"{digest[:32]}"'
+
+
+class _CacheWriter:
+    """把一个对象写入临时文件，commit 时原子地放入缓存目录。"""
+
+    def __init__(self, cache: ImageDiskCache, object_key: str, stream: ImageObjectStream) -> None:
+        self._cache = cache
+        self._digest = _digest(object_key)
+        self._stream = stream
+        self._size = 0
+        self._overflow = False
+        self._dir = cache.directory / self._digest[:2]
+        self._dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._dir, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self._tmp = Path(tmp)
+
+    def write(self, chunk: bytes) -> None:
+        if self._overflow:
+            return
+        self._size += len(chunk)
+        if self._size > self._cache.max_bytes:
+            # 单个对象超过缓存容量：只转发，不缓存。
+            self._overflow = True
+            self.abort()
+            return
+        self._file.write(chunk)
+
+    def commit(self) -> CachedImage | None:
+        if self._overflow:
+            return None
+        self._file.close()
+        data_path = self._dir / f"{self._digest}{_DATA_SUFFIX}"
+        meta_path = self._dir / f"{self._digest}{_META_SUFFIX}"
+        etag = self._stream.etag or _fallback_etag(self._digest)
+        meta = {"object_key": self._stream.object_key, "content_type": self._stream.content_type, "etag": etag}
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(self._tmp, data_path)
+        self._cache._admit(self._digest, self._size)
+        return CachedImage(path=data_path, content_type=self._stream.content_type, size_bytes=self._size, etag=etag)
+
+    def abort(self) -> None:
+        with suppress(OSError):
+            self._file.close()
+        with suppress(OSError):
+            self._tmp.unlink()
+
+
+class ImageDiskCache:
+    """按对象 key 缓存图片文件，容量有界（LRU）。文件操作在线程池中执行。"""
+
+    def __init__(self, directory: str | Path, *, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _paths(self, digest: str) -> tuple[Path, Path]:
+        base = self.directory / digest[:2] / digest
+        return base.with_suffix(_DATA_SUFFIX), base.with_suffix(_META_SUFFIX)
+
+    def _load_index(self) -> None:
+        if self._loaded:
+            return
+        found: list[tuple[float, str, int]] = []
+        if self.directory.is_dir():
+            for data_path in self.directory.glob(f"*/*{_DATA_SUFFIX}"):
+                with suppress(OSError):
+                    stat = data_path.stat()
+                    found.append((stat.st_mtime, data_path.stem, stat.st_size))
+        # 重启后以写入时间近似最近使用顺序。
+        for _mtime, digest, size in sorted(found):
+            self._entries[digest] = size
+            self._total_bytes += size
+        self._loaded = True
+        self._evict_locked(keep=None)
+
+    def _lookup(self, object_key: str) -> CachedImage | None:
+        digest = _digest(object_key)
+        with self._lock:
+            self._load_index()
+            size = self._entries.get(digest)
+            if size is None:
+                return None
+            self._entries.move_to_end(digest)
+        data_path, meta_path = self._paths(digest)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._forget(digest)
+            return None
+        if not data_path.is_file():
+            self._forget(digest)
+            return None
+        return CachedImage(
+            path=data_path,
+            content_type=str(meta.get("content_type") or "application/octet-stream"),
+            size_bytes=size,
+            etag=str(meta.get("etag") or _fallback_etag(digest)),
+        )
+
+    def _admit(self, digest: str, size: int) -> None:
+        with self._lock:
+            self._load_index()
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._total_bytes -= previous
+            self._entries[digest] = size
+            self._total_bytes += size
+            self._evict_locked(keep=digest)
+
+    def _forget(self, digest: str) -> None:
+        with self._lock:
+            size = self._entries.pop(digest, None)
+            if size is not None:
+                self._total_bytes -= size
+
+    def _evict_locked(self, *, keep: str | None) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            digest, size = next(iter(self._entries.items()))
+            if digest == keep:
+                break
+            del self._entries[digest]
+            self._total_bytes -= size
+            for path in self._paths(digest):
+                with suppress(OSError):
+                    path.unlink()
+
+    async def get(self, object_key: str) -> CachedImage | None:
+        return await anyio.to_thread.run_sync(self._lookup, object_key)
+
+    async def tee(self, stream: ImageObjectStream) -> AsyncIterator[bytes]:
+        """
+        转发对象分块的同时写入缓存；流完整结束才提交，异常或客户端断开时丢弃。
+        """
+        try:
+            writer = await anyio.to_thread.run_sync(_CacheWriter, self, stream.object_key, stream)
+        except OSError:
+            logger.warning("image cache: cannot write to %s, streaming without cache", self.directory, exc_info=True)
+            async for chunk in stream.chunks:
+                yield chunk
+            return
+
+        committed = False
+        try:
+            async for chunk in stream.chunks:
+                await anyio.to_thread.run_sync(writer.write, chunk)
+                yield chunk
+            await anyio.to_thread.run_sync(writer.commit)
+            committed = True
+        finally:
+            if not committed:
+                writer.abort()
+
+    def too_large(self, stream: ImageObjectStream) -> bool:
+        """对象大小已知且超过缓存容量：写入缓存注定失败，应直接转发。"""
+        return stream.size_bytes is not None and stream.size_bytes > self.max_bytes
+
+    async def fill(self, object_key: str, *, stream: ImageObjectStream | None = None) -> CachedImage | None:
+        """
+        把对象完整写入缓存（不经内存整块缓冲），返回缓存项；对象过大无法缓存时返回 None。
+
+        调用方已打开的 stream 可直接传入，避免再次回源。
+        """
+        if stream is None:
+            stream = await open_image_stream(object_key)
+        async for _chunk in self.tee(stream):
+            pass
+        return await self.get(object_key)
+
+
+_cache: ImageDiskCache | None = None
+
+
+def get_image_disk_cache() -> ImageDiskCache | None:
+    """返回按当前配置创建的进程级缓存；IMAGE_CACHE_MAX_BYTES=0 时不缓存。"""
+    global _cache
+    max_bytes = int(settings.image_cache_max_bytes)
+    if max_bytes <= 0:
+        return None
+    directory = Path(settings.image_cache_dir or Path(tempfile.gettempdir()) / "apiproxy-image-cache")
+    if _cache is None or _cache.directory != directory or _cache.max_bytes != max_bytes:
+        _cache = ImageDiskCache(directory, max_bytes=max_bytes)
+    return _cache
+
+
+__all__ = [
+    "CachedImage",
+    "ImageDiskCache",
+    "get_image_disk_cache",
+]
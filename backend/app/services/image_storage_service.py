@@ -5,6 +5,7 @@ import hmac
 import mimetypes
 import time
 import uuid
+from collections.abc import AsyncIterator, Callable
 from dataclasses import dataclass
 from hashlib import sha256
 from typing import Any, Literal
@@ -24,6 +25,10 @@ class SignedUrlError(ValueError):
     pass
 
 
+# 流式读取对象时每次从存储 SDK 读取的字节数。
+_STREAM_CHUNK_SIZE = 256 * 1024
+
+
 def _backend_kind() -> Literal["aliyun_oss", "s3"]:
     kind = str(settings.image_storage_provider or "aliyun_oss").strip().lower()
     if kind not in ("aliyun_oss", "s3"):
@@ -261,6 +266,94 @@ async def load_image_bytes(object_key: str) -> tuple[bytes, str]:
         raise
 
 
+@dataclass(frozen=True)
+class ImageObjectStream:
+    object_key: str
+    content_type: str
+    size_bytes: int | None
+    etag: str | None
+    chunks: AsyncIterator[bytes]
+    release: Callable[[], None] | None = None
+
+    async def close(self) -> None:
+        """
+        提前放弃读取时释放底层响应与连接（尚未开始迭代的 chunks 在 aclose() 时不会执行其 finally）。
+        """
+        aclose = getattr(self.chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        if self.release is not None:
+            self.release()
+
+
+def _quote_etag(raw: Any) -> str | None:
+    value = str(raw or "").strip().strip('"')
+    return f'"{value}"' if value else None
+
+
+async def open_image_stream(object_key: str, *, chunk_size: int = _STREAM_CHUNK_SIZE) -> ImageObjectStream:
+    """
+    以流的方式打开 OSS/S3 对象：元数据与首块在打开时读取，其余分块按需在线程中读取，不把整个对象读入内存。
+    """
+    if not _is_configured():
+        raise ImageStorageNotConfigured("IMAGE_OSS_* 未配置，无法读取 OSS 图片")
+
+    def _open_oss() -> tuple[Any, str, int | None, str | None, bytes]:
+        bucket = _create_oss_bucket()
+        result = bucket.get_object(object_key)
+        content_type = str(getattr(result, "content_type", None) or "")
+        headers: Any = getattr(result, "headers", None)
+        if not content_type and isinstance(headers, dict):
+            content_type = str(headers.get("Content-Type") or headers.get("content-type") or "")
+        size = getattr(result, "content_length", None)
+        return result, content_type, size, getattr(result, "etag", None), result.read(chunk_size)
+
+    def _open_s3() -> tuple[Any, str, int | None, str | None, bytes]:
+        client = _create_s3_client()
+        result = client.get_object(Bucket=str(settings.image_oss_bucket).strip(), Key=object_key)
+        body = result["Body"]
+        content_type = str(result.get("ContentType") or "")
+        return body, content_type, result.get("ContentLength"), result.get("ETag"), body.read(chunk_size)
+
+    try:
+        if _backend_kind() == "aliyun_oss":
+            body, content_type, size, etag, first = await anyio.to_thread.run_sync(_open_oss)
+        else:
+            body, content_type, size, etag, first = await anyio.to_thread.run_sync(_open_s3)
+    except Exception:
+        logger.exception("Failed to open image stream from OSS/S3 (key=%s)", object_key)
+        raise
+
+    released = False
+
+    def _release() -> None:
+        nonlocal released
+        if released:
+            return
+        released = True
+        close = getattr(body, "close", None)
+        if callable(close):
+            close()
+
+    async def _chunks() -> AsyncIterator[bytes]:
+        try:
+            chunk = first
+            while chunk:
+                yield chunk
+                chunk = await anyio.to_thread.run_sync(body.read, chunk_size)
+        finally:
+            _release()
+
+    return ImageObjectStream(
+        object_key=object_key,
+        content_type=content_type or _detect_content_type_from_bytes(first),
+        size_bytes=int(size) if size is not None else None,
+        etag=_quote_etag(etag),
+        chunks=_chunks(),
+        release=_release,
+    )
+
+
 async def presign_image_get_url(object_key: str, *, expires_seconds: int) -> str:
     """
     生成 OSS 预签名 GET URL，用于直下（不经由网关转发图片内容）。
@@ -355,6 +448,7 @@ async def presign_object_put_url(
 
 
 __all__ = [
+    "ImageObjectStream",
     "ImageStorageNotConfigured",
     "SignedUrlError",
     "StoredImage",
@@ -363,6 +457,7 @@ __all__ = [
     "detect_image_content_type_b64",
     "build_signed_image_url",
     "load_image_bytes",
+    "open_image_stream",
     "presign_image_get_url",
     "presign_object_put_url",
     "store_image_b64",
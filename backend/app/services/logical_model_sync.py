@@ -27,10 +27,12 @@ from app.routing.provider_weight import invalidate_provider_weights
 from app.schemas.logical_model import LogicalModel, PhysicalModel
 from app.schemas.model import ModelCapability
 from app.storage.redis_service import (
+    LOGICAL_MODEL_KEY_TEMPLATE,
     delete_logical_model,
     list_logical_models,
     set_logical_model,
 )
+from app.storage.routing_l1_cache import publish_routing_cache_invalidation
 
 
 def _normalize_capabilities(raw: Iterable[object] | None) -> list[ModelCapability]:
@@ -171,11 +173,14 @@ async def sync_logical_models_to_redis(
     将 LogicalModel 批量写入 Redis，返回写入数量。
     """
 
-    count = 0
+    keys: list[str] = []
     for logical in logical_models:
-        await set_logical_model(redis, logical)
-        count += 1
-    return count
+        await set_logical_model(redis, logical, publish_invalidation=False)
+        keys.append(LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model=logical.logical_id))
+    # 整批写完后只广播一次 L1 失效。
+    if keys:
+        await publish_routing_cache_invalidation(redis, keys=keys)
+    return len(keys)
 
 
 async def sync_logical_models(
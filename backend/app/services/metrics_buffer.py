@@ -1,21 +1,28 @@
 from __future__ import annotations
 
 import datetime as dt
-import math
 import random
 import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Hashable, Iterator, Sequence
 from dataclasses import dataclass, field
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import Float, cast
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Float, LargeBinary, cast, func, literal
+from sqlalchemy.orm import Session
 
 from app.db import SessionLocal
 from app.logging_config import logger
+from app.metrics.latency_sketch import LatencySketch
 from app.models import ProviderRoutingMetricsHistory, UserRoutingMetricsHistory
 
 BucketSeconds = int
 
+# 写回失败时放回缓冲区的上限（相对 max_buffered_buckets 的倍数），超出部分丢弃并告警。
+_REQUEUE_LIMIT_FACTOR = 4
+
 
 @dataclass(frozen=True)
 class MetricsKey:
@@ -39,7 +46,7 @@ class MetricsStats:
     error_429_requests: int = 0
     error_timeout_requests: int = 0
     latency_sum_ms: float = 0.0
-    latency_samples: list[float] = field(default_factory=list)
+    latency_sketch: LatencySketch = field(default_factory=LatencySketch)
 
     def record(
         self,
@@ -64,16 +71,21 @@ class MetricsStats:
                 self.error_timeout_requests += 1
 
         self.latency_sum_ms += latency_ms
-        if sample_limit <= 0:
-            return
-
-        if len(self.latency_samples) < sample_limit:
-            self.latency_samples.append(latency_ms)
-        else:
-            # Reservoir sampling：保持样本数量稳定。
-            replace_at = random.randint(0, self.total_requests - 1)
-            if replace_at < sample_limit:
-                self.latency_samples[replace_at] = latency_ms
+        # sample_limit <= 0 表示关闭分位数统计（分位数退化为平均值）。
+        if sample_limit > 0:
+            self.latency_sketch.add(latency_ms)
+
+    def merge(self, other: MetricsStats, *, sample_limit: int) -> None:
+        self.total_requests += other.total_requests
+        self.success_requests += other.success_requests
+        self.error_requests += other.error_requests
+        self.error_4xx_requests += other.error_4xx_requests
+        self.error_5xx_requests += other.error_5xx_requests
+        self.error_429_requests += other.error_429_requests
+        self.error_timeout_requests += other.error_timeout_requests
+        self.latency_sum_ms += other.latency_sum_ms
+        if sample_limit > 0:
+            self.latency_sketch.merge(other.latency_sketch)
 
     def latency_avg(self) -> float:
         if self.total_requests == 0:
@@ -81,17 +93,12 @@ class MetricsStats:
         return self.latency_sum_ms / self.total_requests
 
     def _percentile(self, percentile: float) -> float:
-        if not self.latency_samples:
+        if not self.latency_sketch:
             return self.latency_avg()
-        ordered = sorted(self.latency_samples)
-        if len(ordered) == 1:
-            return ordered[0]
-        k = (len(ordered) - 1) * percentile
-        f = math.floor(k)
-        c = math.ceil(k)
-        if f == c:
-            return ordered[int(k)]
-        return ordered[f] + (ordered[c] - ordered[f]) * (k - f)
+        return self.latency_sketch.quantile(percentile)
+
+    def latency_sketch_bytes(self) -> bytes | None:
+        return self.latency_sketch.to_bytes() if self.latency_sketch else None
 
     def latency_p95(self) -> float:
         return self._percentile(0.95)
@@ -103,7 +110,134 @@ class MetricsStats:
         return self._percentile(0.5)
 
 
-class BufferedMetricsRecorder:
+def _dialect_insert(session: Session):
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+
+def _concat_sketch(current, incoming):
+    """
+    草图段可首尾拼接（见 app.metrics.latency_sketch），ON CONFLICT 时直接 `old || new`；
+    SQLite 的 `||` 结果是 TEXT，需要显式 CAST 回 BLOB。
+    """
+    empty = literal(b"", LargeBinary)
+    joined = func.coalesce(current, empty).op("||")(func.coalesce(incoming, empty))
+    return cast(joined, LargeBinary)
+
+
+def _iter_batches[K](
+    items: Sequence[tuple[K, MetricsStats]],
+    *,
+    batch_size: int,
+    conflict_key: Callable[[K], Hashable],
+) -> Iterator[list[tuple[K, MetricsStats]]]:
+    """
+    按 batch_size 切分待写回的桶；同一批内冲突键不能重复
+    （PostgreSQL 的多行 ON CONFLICT DO UPDATE 不允许同一语句两次命中同一行）。
+    """
+    batch: list[tuple[K, MetricsStats]] = []
+    seen: set[Hashable] = set()
+    for item in items:
+        ck = conflict_key(item[0])
+        if len(batch) >= batch_size or ck in seen:
+            yield batch
+            batch = []
+            seen = set()
+        batch.append(item)
+        seen.add(ck)
+    if batch:
+        yield batch
+
+
+class _BatchFlushMixin(ABC):
+    """
+    两个 Recorder 共用的批量写回逻辑：多行 VALUES upsert，按批提交；
+    某一批失败时回滚，并把该批及剩余未写的桶合并回缓冲区，等待下一轮重试。
+    """
+
+    _buffer: dict[Any, MetricsStats]
+    _lock: threading.Lock
+    flush_interval_seconds: int
+    flush_batch_size: int
+    latency_sample_size: int
+    max_buffered_buckets: int
+    _flush_lock: threading.Lock
+    _last_failure_at: float
+
+    _log_label = "routing metrics"
+
+    @abstractmethod
+    def _conflict_key(self, key: Any) -> Hashable:
+        """同一批内需要合并的桶返回相同的键（对应表上的唯一约束）。"""
+
+    @abstractmethod
+    def _build_bulk_upsert_stmt(self, session: Session, batch: list[tuple[Any, MetricsStats]]):
+        """把一批桶构造成一条多行 upsert 语句。"""
+
+    def _should_trigger_flush(self) -> bool:
+        # 调用方已持有 self._lock。刷新进行中或刚失败过时不再额外起线程。
+        if len(self._buffer) < self.max_buffered_buckets or self._flush_lock.locked():
+            return False
+        return time.monotonic() - self._last_failure_at >= self.flush_interval_seconds
+
+    def _flush_in_batches(self, session_factory: Callable[[], Session] | None) -> int:
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            items = self._drain_buffer()
+            if not items:
+                return 0
+
+            batches = list(
+                _iter_batches(
+                    items, batch_size=self.flush_batch_size, conflict_key=self._conflict_key
+                )
+            )
+            session = (session_factory or SessionLocal)()
+            flushed = 0
+            try:
+                for idx, batch in enumerate(batches):
+                    try:
+                        session.execute(self._build_bulk_upsert_stmt(session, batch))
+                        session.commit()
+                    except Exception:
+                        session.rollback()
+                        self._last_failure_at = time.monotonic()
+                        logger.exception("Failed to flush buffered %s", self._log_label)
+                        self._requeue([item for rest in batches[idx:] for item in rest])
+                        break
+                    flushed += len(batch)
+            finally:
+                session.close()
+            return flushed
+        finally:
+            self._flush_lock.release()
+
+    def _requeue(self, items: list[tuple[Any, MetricsStats]]) -> None:
+        limit = self.max_buffered_buckets * _REQUEUE_LIMIT_FACTOR
+        dropped = 0
+        with self._lock:
+            for key, stats in items:
+                current = self._buffer.get(key)
+                if current is not None:
+                    stats.merge(current, sample_limit=self.latency_sample_size)
+                elif len(self._buffer) >= limit:
+                    dropped += 1
+                    continue
+                self._buffer[key] = stats
+        if dropped:
+            logger.warning(
+                "Dropped %d buffered %s buckets after failed flush (buffer limit %d)",
+                dropped,
+                self._log_label,
+                limit,
+            )
+
+
+class BufferedMetricsRecorder(_BatchFlushMixin):
     """In-memory metrics aggregator with periodic DB flush."""
 
     def __init__(
@@ -113,14 +247,18 @@ class BufferedMetricsRecorder:
         latency_sample_size: int,
         max_buffered_buckets: int,
         success_sample_rate: float,
+        flush_batch_size: int = 500,
     ) -> None:
         self.flush_interval_seconds = flush_interval_seconds
         self.latency_sample_size = latency_sample_size
         self.max_buffered_buckets = max_buffered_buckets
         self.success_sample_rate = max(0.0, min(1.0, success_sample_rate))
+        self.flush_batch_size = max(1, int(flush_batch_size))
 
         self._buffer: dict[MetricsKey, MetricsStats] = {}
         self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_failure_at = float("-inf")
         self._stop_event = threading.Event()
         self._flush_thread: threading.Thread | None = None
 
@@ -178,29 +316,12 @@ class BufferedMetricsRecorder:
             )
             self._buffer[key] = stats
 
-            if len(self._buffer) >= self.max_buffered_buckets:
+            if self._should_trigger_flush():
                 # 触发一次异步刷新，避免内存无限增长。
                 threading.Thread(target=self.flush, daemon=True).start()
 
-    def flush(self) -> int:
-        items = self._drain_buffer()
-        if not items:
-            return 0
-
-        session = SessionLocal()
-        flushed = 0
-        try:
-            for key, stats in items:
-                stmt = self._build_upsert_stmt(key, stats)
-                session.execute(stmt)
-                flushed += 1
-            session.commit()
-        except Exception:
-            session.rollback()
-            logger.exception("Failed to flush buffered routing metrics")
-        finally:
-            session.close()
-        return flushed
+    def flush(self, session_factory: Callable[[], Session] | None = None) -> int:
+        return self._flush_in_batches(session_factory)
 
     def _drain_buffer(self) -> list[tuple[MetricsKey, MetricsStats]]:
         with self._lock:
@@ -227,96 +348,103 @@ class BufferedMetricsRecorder:
             return "degraded"
         return "healthy"
 
-    def _build_upsert_stmt(self, key: MetricsKey, stats: MetricsStats):
+    def _conflict_key(self, key: MetricsKey) -> Hashable:
+        # 与 uq_provider_routing_metrics_history_bucket 的列保持一致。
+        return (
+            key.provider_id,
+            key.logical_model,
+            key.transport,
+            key.is_stream,
+            key.user_id,
+            key.api_key_id,
+            key.window_start,
+        )
+
+    def _row_values(self, key: MetricsKey, stats: MetricsStats) -> dict[str, Any]:
         total_requests = stats.total_requests
         success_requests = stats.success_requests
         error_requests = stats.error_requests
-
-        latency_avg = stats.latency_avg()
-        latency_p50 = stats.latency_p50()
-        latency_p95 = stats.latency_p95()
-        latency_p99 = stats.latency_p99()
         error_rate = (error_requests / total_requests) if total_requests else 0.0
         success_qps = success_requests / key.bucket_seconds if key.bucket_seconds else 0.0
-        status = self._status_from_error_rate(error_rate)
-
-        base_insert = insert(ProviderRoutingMetricsHistory).values(
-            provider_id=key.provider_id,
-            logical_model=key.logical_model,
-            transport=key.transport,
-            is_stream=key.is_stream,
-            user_id=key.user_id,
-            api_key_id=key.api_key_id,
-            window_start=key.window_start,
-            window_duration=key.bucket_seconds,
-            total_requests_1m=total_requests,
-            success_requests=success_requests,
-            error_requests=error_requests,
-            latency_avg_ms=latency_avg,
-            latency_p50_ms=latency_p50,
-            latency_p95_ms=latency_p95,
-            latency_p99_ms=latency_p99,
-            error_rate=error_rate,
-            success_qps_1m=success_qps,
-            status=status,
-            error_4xx_requests=stats.error_4xx_requests,
-            error_5xx_requests=stats.error_5xx_requests,
-            error_429_requests=stats.error_429_requests,
-            error_timeout_requests=stats.error_timeout_requests,
-        )
-
-        new_total = ProviderRoutingMetricsHistory.total_requests_1m + total_requests
-        new_success = ProviderRoutingMetricsHistory.success_requests + success_requests
-        new_error = ProviderRoutingMetricsHistory.error_requests + error_requests
 
-        existing_latency_sum = (
-            ProviderRoutingMetricsHistory.latency_avg_ms
-            * ProviderRoutingMetricsHistory.total_requests_1m
-        )
+        return {
+            "provider_id": key.provider_id,
+            "logical_model": key.logical_model,
+            "transport": key.transport,
+            "is_stream": key.is_stream,
+            "user_id": key.user_id,
+            "api_key_id": key.api_key_id,
+            "window_start": key.window_start,
+            "window_duration": key.bucket_seconds,
+            "total_requests_1m": total_requests,
+            "success_requests": success_requests,
+            "error_requests": error_requests,
+            "latency_avg_ms": stats.latency_avg(),
+            "latency_p50_ms": stats.latency_p50(),
+            "latency_p95_ms": stats.latency_p95(),
+            "latency_p99_ms": stats.latency_p99(),
+            "latency_sketch": stats.latency_sketch_bytes(),
+            "error_rate": error_rate,
+            "success_qps_1m": success_qps,
+            "status": self._status_from_error_rate(error_rate),
+            "error_4xx_requests": stats.error_4xx_requests,
+            "error_5xx_requests": stats.error_5xx_requests,
+            "error_429_requests": stats.error_429_requests,
+            "error_timeout_requests": stats.error_timeout_requests,
+        }
+
+    def _build_bulk_upsert_stmt(
+        self, session: Session, batch: list[tuple[MetricsKey, MetricsStats]]
+    ):
+        """
+        一条多行 INSERT ... ON CONFLICT DO UPDATE；合并表达式全部引用 excluded 列，
+        与逐行语句的结果一致（excluded.latency_avg_ms * excluded.total_requests_1m 即本批延迟总和）。
+
+        latency_sketch 按段拼接（`old || new`）原子合并，是该分钟桶的精确草图；
+        SQL 里无法解码草图，冲突时 p50/p95/p99 列仍按请求数加权，需要真实分位数的读方合并草图。
+        """
+        insert = _dialect_insert(session)
+        table = ProviderRoutingMetricsHistory
+        base_insert = insert(table).values([self._row_values(key, stats) for key, stats in batch])
+        excluded = base_insert.excluded
+
+        new_total = table.total_requests_1m + excluded.total_requests_1m
+        new_success = table.success_requests + excluded.success_requests
+        new_error = table.error_requests + excluded.error_requests
+
+        def _weighted(column: str):
+            return (
+                getattr(table, column) * table.total_requests_1m
+                + getattr(excluded, column) * excluded.total_requests_1m
+            ) / cast(new_total, Float)
 
         return base_insert.on_conflict_do_update(
-            constraint="uq_provider_routing_metrics_history_bucket",
+            index_elements=[
+                "provider_id",
+                "logical_model",
+                "transport",
+                "is_stream",
+                "user_id",
+                "api_key_id",
+                "window_start",
+            ],
             set_={
                 "total_requests_1m": new_total,
                 "success_requests": new_success,
                 "error_requests": new_error,
-                "error_4xx_requests": ProviderRoutingMetricsHistory.error_4xx_requests
-                + stats.error_4xx_requests,
-                "error_5xx_requests": ProviderRoutingMetricsHistory.error_5xx_requests
-                + stats.error_5xx_requests,
-                "error_429_requests": ProviderRoutingMetricsHistory.error_429_requests
-                + stats.error_429_requests,
-                "error_timeout_requests": ProviderRoutingMetricsHistory.error_timeout_requests
-                + stats.error_timeout_requests,
-                "latency_avg_ms": (existing_latency_sum + stats.latency_sum_ms)
-                / cast(new_total, Float),
-                "latency_p50_ms": (
-                    (
-                        ProviderRoutingMetricsHistory.latency_p50_ms
-                        * ProviderRoutingMetricsHistory.total_requests_1m
-                        + latency_p50 * total_requests
-                    )
-                    / cast(new_total, Float)
-                ),
-                "latency_p95_ms": (
-                    (
-                        ProviderRoutingMetricsHistory.latency_p95_ms
-                        * ProviderRoutingMetricsHistory.total_requests_1m
-                        + latency_p95 * total_requests
-                    )
-                    / cast(new_total, Float)
-                ),
-                "latency_p99_ms": (
-                    (
-                        ProviderRoutingMetricsHistory.latency_p99_ms
-                        * ProviderRoutingMetricsHistory.total_requests_1m
-                        + latency_p99 * total_requests
-                    )
-                    / cast(new_total, Float)
-                ),
+                "error_4xx_requests": table.error_4xx_requests + excluded.error_4xx_requests,
+                "error_5xx_requests": table.error_5xx_requests + excluded.error_5xx_requests,
+                "error_429_requests": table.error_429_requests + excluded.error_429_requests,
+                "error_timeout_requests": table.error_timeout_requests
+                + excluded.error_timeout_requests,
+                "latency_avg_ms": _weighted("latency_avg_ms"),
+                "latency_p50_ms": _weighted("latency_p50_ms"),
+                "latency_p95_ms": _weighted("latency_p95_ms"),
+                "latency_p99_ms": _weighted("latency_p99_ms"),
+                "latency_sketch": _concat_sketch(table.latency_sketch, excluded.latency_sketch),
                 "error_rate": cast(new_error, Float) / cast(new_total, Float),
-                "success_qps_1m": cast(new_success, Float) / float(key.bucket_seconds),
-                "status": self._status_from_error_rate(error_rate),
+                "success_qps_1m": cast(new_success, Float) / cast(table.window_duration, Float),
+                "status": excluded.status,
             },
         )
 
@@ -332,11 +460,13 @@ class UserMetricsKey:
     bucket_seconds: BucketSeconds
 
 
-class BufferedUserMetricsRecorder:
+class BufferedUserMetricsRecorder(_BatchFlushMixin):
     """
     Similar to BufferedMetricsRecorder but dedicated to per-user aggregates.
     """
 
+    _log_label = "user routing metrics"
+
     def __init__(
         self,
         *,
@@ -344,14 +474,18 @@ class BufferedUserMetricsRecorder:
         latency_sample_size: int,
         max_buffered_buckets: int,
         success_sample_rate: float,
+        flush_batch_size: int = 500,
     ) -> None:
         self.flush_interval_seconds = flush_interval_seconds
         self.latency_sample_size = latency_sample_size
         self.max_buffered_buckets = max_buffered_buckets
         self.success_sample_rate = max(0.0, min(1.0, success_sample_rate))
+        self.flush_batch_size = max(1, int(flush_batch_size))
 
         self._buffer: dict[UserMetricsKey, MetricsStats] = {}
         self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_failure_at = float("-inf")
         self._stop_event = threading.Event()
         self._flush_thread: threading.Thread | None = None
 
@@ -408,28 +542,11 @@ class BufferedUserMetricsRecorder:
             )
             self._buffer[key] = stats
 
-            if len(self._buffer) >= self.max_buffered_buckets:
+            if self._should_trigger_flush():
                 threading.Thread(target=self.flush, daemon=True).start()
 
-    def flush(self) -> int:
-        items = self._drain_buffer()
-        if not items:
-            return 0
-
-        session = SessionLocal()
-        flushed = 0
-        try:
-            for key, stats in items:
-                stmt = self._build_upsert_stmt(key, stats)
-                session.execute(stmt)
-                flushed += 1
-            session.commit()
-        except Exception:
-            session.rollback()
-            logger.exception("Failed to flush buffered user routing metrics")
-        finally:
-            session.close()
-        return flushed
+    def flush(self, session_factory: Callable[[], Session] | None = None) -> int:
+        return self._flush_in_batches(session_factory)
 
     def _drain_buffer(self) -> list[tuple[UserMetricsKey, MetricsStats]]:
         with self._lock:
@@ -448,66 +565,71 @@ class BufferedUserMetricsRecorder:
             except Exception:
                 logger.exception("Unexpected error while flushing user metrics buffer")
 
-    def _build_upsert_stmt(self, key: UserMetricsKey, stats: MetricsStats):
-        total_requests = stats.total_requests
-        success_requests = stats.success_requests
-        error_requests = stats.error_requests
-
-        latency_avg = stats.latency_avg()
-        latency_p95 = stats.latency_p95()
-        latency_p99 = stats.latency_p99()
-        error_rate = (error_requests / total_requests) if total_requests else 0.0
-
-        base_insert = insert(UserRoutingMetricsHistory).values(
-            user_id=key.user_id,
-            provider_id=key.provider_id,
-            logical_model=key.logical_model,
-            transport=key.transport,
-            is_stream=key.is_stream,
-            window_start=key.window_start,
-            window_duration=key.bucket_seconds,
-            total_requests=total_requests,
-            success_requests=success_requests,
-            error_requests=error_requests,
-            latency_avg_ms=latency_avg,
-            latency_p95_ms=latency_p95,
-            latency_p99_ms=latency_p99,
-            error_rate=error_rate,
+    def _conflict_key(self, key: UserMetricsKey) -> Hashable:
+        # 与 uq_user_routing_metrics_history_bucket 的列保持一致。
+        return (
+            key.user_id,
+            key.provider_id,
+            key.logical_model,
+            key.transport,
+            key.is_stream,
+            key.window_start,
         )
 
-        new_total = UserRoutingMetricsHistory.total_requests + total_requests
-        new_success = UserRoutingMetricsHistory.success_requests + success_requests
-        new_error = UserRoutingMetricsHistory.error_requests + error_requests
-
-        existing_latency_sum = (
-            UserRoutingMetricsHistory.latency_avg_ms
-            * UserRoutingMetricsHistory.total_requests
-        )
+    @staticmethod
+    def _row_values(key: UserMetricsKey, stats: MetricsStats) -> dict[str, Any]:
+        total_requests = stats.total_requests
+        error_requests = stats.error_requests
+        return {
+            "user_id": key.user_id,
+            "provider_id": key.provider_id,
+            "logical_model": key.logical_model,
+            "transport": key.transport,
+            "is_stream": key.is_stream,
+            "window_start": key.window_start,
+            "window_duration": key.bucket_seconds,
+            "total_requests": total_requests,
+            "success_requests": stats.success_requests,
+            "error_requests": error_requests,
+            "latency_avg_ms": stats.latency_avg(),
+            "latency_p95_ms": stats.latency_p95(),
+            "latency_p99_ms": stats.latency_p99(),
+            "error_rate": (error_requests / total_requests) if total_requests else 0.0,
+        }
+
+    def _build_bulk_upsert_stmt(
+        self, session: Session, batch: list[tuple[UserMetricsKey, MetricsStats]]
+    ):
+        insert = _dialect_insert(session)
+        table = UserRoutingMetricsHistory
+        base_insert = insert(table).values([self._row_values(key, stats) for key, stats in batch])
+        excluded = base_insert.excluded
+
+        new_total = table.total_requests + excluded.total_requests
+        new_error = table.error_requests + excluded.error_requests
+
+        def _weighted(column: str):
+            return (
+                getattr(table, column) * table.total_requests
+                + getattr(excluded, column) * excluded.total_requests
+            ) / cast(new_total, Float)
 
         return base_insert.on_conflict_do_update(
-            constraint="uq_user_routing_metrics_history_bucket",
+            index_elements=[
+                "user_id",
+                "provider_id",
+                "logical_model",
+                "transport",
+                "is_stream",
+                "window_start",
+            ],
             set_={
                 "total_requests": new_total,
-                "success_requests": new_success,
+                "success_requests": table.success_requests + excluded.success_requests,
                 "error_requests": new_error,
-                "latency_avg_ms": (existing_latency_sum + stats.latency_sum_ms)
-                / cast(new_total, Float),
-                "latency_p95_ms": (
-                    (
-                        UserRoutingMetricsHistory.latency_p95_ms
-                        * UserRoutingMetricsHistory.total_requests
-                        + latency_p95 * total_requests
-                    )
-                    / cast(new_total, Float)
-                ),
-                "latency_p99_ms": (
-                    (
-                        UserRoutingMetricsHistory.latency_p99_ms
-                        * UserRoutingMetricsHistory.total_requests
-                        + latency_p99 * total_requests
-                    )
-                    / cast(new_total, Float)
-                ),
+                "latency_avg_ms": _weighted("latency_avg_ms"),
+                "latency_p95_ms": _weighted("latency_p95_ms"),
+                "latency_p99_ms": _weighted("latency_p99_ms"),
                 "error_rate": cast(new_error, Float) / cast(new_total, Float),
             },
         )
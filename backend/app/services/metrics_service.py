@@ -33,6 +33,7 @@ metrics_recorder = BufferedMetricsRecorder(
     latency_sample_size=settings.metrics_latency_sample_size,
     max_buffered_buckets=settings.metrics_max_buffered_buckets,
     success_sample_rate=settings.metrics_success_sample_rate,
+    flush_batch_size=settings.metrics_flush_batch_size,
 )
 
 user_metrics_recorder = BufferedUserMetricsRecorder(
@@ -40,6 +41,7 @@ user_metrics_recorder = BufferedUserMetricsRecorder(
     latency_sample_size=settings.metrics_latency_sample_size,
     max_buffered_buckets=settings.metrics_max_buffered_buckets,
     success_sample_rate=settings.metrics_success_sample_rate,
+    flush_batch_size=settings.metrics_flush_batch_size,
 )
 
 if settings.metrics_buffer_enabled:
@@ -153,7 +155,7 @@ def record_provider_call_metric(
             window_start=window_start,
             bucket_seconds=bucket_seconds,
         )
-        immediate_stmt = metrics_recorder._build_upsert_stmt(key, stats)
+        immediate_stmt = metrics_recorder._build_bulk_upsert_stmt(db, [(key, stats)])
         db.execute(immediate_stmt)
 
         if user_id is not None:
@@ -349,7 +351,7 @@ def _record_user_metrics_immediate(
         window_start=window_start,
         bucket_seconds=bucket_seconds,
     )
-    stmt = user_metrics_recorder._build_upsert_stmt(key, stats)
+    stmt = user_metrics_recorder._build_bulk_upsert_stmt(db, [(key, stats)])
     db.execute(stmt)
 
 
@@ -810,13 +812,14 @@ async def stream_sdk_with_metrics(
     start = time.perf_counter()
     first_chunk_seen = False
 
+    chunks = driver.stream_content(
+        api_key=api_key,
+        model_id=model_id,
+        payload=payload,
+        base_url=base_url,
+    )
     try:
-        async for chunk in driver.stream_content(
-            api_key=api_key,
-            model_id=model_id,
-            payload=payload,
-            base_url=base_url,
-        ):
+        async for chunk in chunks:
             if not first_chunk_seen:
                 first_chunk_seen = True
                 latency_ms = (time.perf_counter() - start) * 1000.0
@@ -865,6 +868,9 @@ async def stream_sdk_with_metrics(
                     logical_model,
                 )
         raise
+    finally:
+        # 下游断开时立即关闭 driver 的流，让上游连接随之释放，而不是等到垃圾回收。
+        await chunks.aclose()
 
 
 __all__ = [
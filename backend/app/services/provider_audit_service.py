@@ -15,6 +15,7 @@ from app.models import (
     ProviderTestRecord,
 )
 from app.provider.config import get_provider_config
+from app.provider.config_registry import invalidate_provider_config
 from app.provider.health import HealthStatus
 from app.redis_client import get_redis_client
 from app.schemas import ProviderStatus
@@ -299,6 +300,7 @@ def trigger_provider_test(
         test_record=record,
     )
     repo_commit_refresh(session, provider=provider, record=record)
+    invalidate_provider_config(provider.provider_id)
     logger.info("Provider %s test recorded (mode=%s)", provider_id, mode)
     return record
 
@@ -329,6 +331,7 @@ def approve_provider(
         to_status=provider.audit_status,
     )
     repo_commit_refresh(session, provider=provider, record=None)
+    invalidate_provider_config(provider.provider_id)
     return provider
 
 
@@ -353,6 +356,7 @@ def reject_provider(
         to_status=provider.audit_status,
     )
     repo_commit_refresh(session, provider=provider, record=None)
+    invalidate_provider_config(provider.provider_id)
     return provider
 
 
@@ -380,6 +384,7 @@ def update_operation_status(
         operation_to_status=new_status,
     )
     repo_commit_refresh(session, provider=provider, record=None)
+    invalidate_provider_config(provider.provider_id)
     return provider
 
 
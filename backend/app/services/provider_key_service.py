@@ -8,6 +8,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.logging_config import logger
+from app.provider.config_registry import invalidate_provider_config
 from app.models import Provider, ProviderAPIKey
 from app.repositories.provider_key_repository import (
     create_provider_key as repo_create_provider_key,
@@ -179,6 +180,7 @@ def create_provider_key(
         api_key = repo_create_provider_key(session, api_key=api_key)
     except IntegrityError as exc:
         raise ProviderKeyServiceError(f"Failed to create provider key: {exc}") from exc
+    invalidate_provider_config(provider_id)
     logger.info(
         "Created new API key for provider %s (label=%s, id=%s)",
         provider_id,
@@ -249,6 +251,7 @@ def update_provider_key(
         api_key = repo_persist_provider_key(session, api_key=api_key)
     except IntegrityError as exc:
         raise ProviderKeyServiceError(f"Failed to update provider key: {exc}") from exc
+    invalidate_provider_config(provider_id)
     logger.info("Updated API key %s for provider %s", key_id, provider_id)
     return api_key
 
@@ -281,6 +284,7 @@ def delete_provider_key(
     except IntegrityError as exc:
         raise ProviderKeyServiceError(f"Failed to delete provider key: {exc}") from exc
 
+    invalidate_provider_config(provider_id)
     logger.info("Deleted API key %s for provider %s", key_id, provider_id)
 
 
@@ -0,0 +1,279 @@
+"""
+Provider 模型只读快照（禁用状态 / 定价 / 计费倍率 / Provider 结算系数）。
+
+eval / auto 选模一次请求要检查几十个候选，每个候选都会查询禁用对与定价；
+这里在进程内维护一份带版本号的快照，请求路径只做字典查找：
+- 后台任务在线程中构建快照，并定期比对相关表的指纹（行数 + 最大 updated_at），
+  因此其它 worker 的修改最多延迟 PROVIDER_MODEL_SNAPSHOT_REFRESH_SECONDS 生效；
+- 本进程的管理接口修改这些行后调用 invalidate_provider_model_snapshot：
+  立即丢弃快照（请求回退到查库）并唤醒后台任务重建；
+- 只有绑定在全局 engine 上的 Session 才会使用快照（测试中的 SQLite 库始终查库）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal, is_bound_to_global_engine
+from app.logging_config import logger
+from app.models import ModelBillingConfig, Provider, ProviderModel
+from app.settings import settings
+
+
+@dataclass(frozen=True)
+class ProviderModelSnapshot:
+    version: int
+    built_at: float
+    disabled_pairs: frozenset[tuple[str, str]] = frozenset()
+    pricing: dict[tuple[str, str], dict[str, Any]] = field(default_factory=dict)
+    multipliers: dict[str, float] = field(default_factory=dict)
+    provider_factors: dict[str, float] = field(default_factory=dict)
+
+    def disabled_pairs_for(
+        self, provider_ids: Iterable[str], model_ids: Iterable[str]
+    ) -> set[tuple[str, str]]:
+        model_set = set(model_ids)
+        return {
+            (pid, mid)
+            for pid in set(provider_ids)
+            for mid in model_set
+            if (pid, mid) in self.disabled_pairs
+        }
+
+    def any_disabled(self, model_ids: Iterable[str], provider_ids: Iterable[str]) -> bool:
+        return bool(self.disabled_pairs_for(provider_ids, model_ids))
+
+    def pricing_for(self, provider_id: str, model_id: str) -> dict[str, Any] | None:
+        return self.pricing.get((provider_id, model_id))
+
+    def multiplier_for(self, model_name: str | None) -> float:
+        if not model_name:
+            return 1.0
+        return self.multipliers.get(model_name, 1.0)
+
+    def provider_factor_for(self, provider_id: str | None) -> float:
+        if not provider_id:
+            return 1.0
+        return self.provider_factors.get(provider_id, 1.0)
+
+
+def _to_factor(value: Any) -> float:
+    try:
+        return float(value or 1.0)
+    except Exception:
+        return 1.0
+
+
+def build_provider_model_snapshot(db: Session, *, version: int) -> ProviderModelSnapshot:
+    """
+    从数据库构建快照（三次查询）。
+    """
+    disabled: set[tuple[str, str]] = set()
+    pricing: dict[tuple[str, str], dict[str, Any]] = {}
+    rows = db.execute(
+        select(Provider.provider_id, ProviderModel.model_id, ProviderModel.disabled, ProviderModel.pricing)
+        .select_from(ProviderModel)
+        .join(Provider, ProviderModel.provider_id == Provider.id)
+    ).all()
+    for provider_id, model_id, is_disabled, pricing_json in rows:
+        if not isinstance(provider_id, str) or not isinstance(model_id, str):
+            continue
+        if is_disabled:
+            disabled.add((provider_id, model_id))
+        if isinstance(pricing_json, dict):
+            pricing[(provider_id, model_id)] = dict(pricing_json)
+
+    multipliers: dict[str, float] = {}
+    for model_name, multiplier in db.execute(
+        select(ModelBillingConfig.model_name, ModelBillingConfig.multiplier).where(
+            ModelBillingConfig.is_active.is_(True)
+        )
+    ).all():
+        if isinstance(model_name, str):
+            multipliers.setdefault(model_name, _to_factor(multiplier))
+
+    provider_factors: dict[str, float] = {}
+    for provider_id, billing_factor in db.execute(
+        select(Provider.provider_id, Provider.billing_factor)
+    ).all():
+        if isinstance(provider_id, str):
+            provider_factors[provider_id] = _to_factor(billing_factor)
+
+    return ProviderModelSnapshot(
+        version=version,
+        built_at=time.time(),
+        disabled_pairs=frozenset(disabled),
+        pricing=pricing,
+        multipliers=multipliers,
+        provider_factors=provider_factors,
+    )
+
+
+def load_snapshot_fingerprint(db: Session) -> tuple[Any, ...]:
+    """
+    相关表的廉价指纹：任一行新增 / 删除 / 更新都会改变 (count, max(updated_at))。
+    """
+    parts: list[Any] = []
+    for model in (ProviderModel, Provider, ModelBillingConfig):
+        count, last_updated = db.execute(
+            select(func.count(), func.max(model.updated_at)).select_from(model)
+        ).one()
+        parts.extend([int(count or 0), str(last_updated) if last_updated is not None else None])
+    # updated_at 精度有限（SQLite 为秒级），额外带上禁用行数，保证禁用切换一定能被发现。
+    disabled_count = db.execute(
+        select(func.count()).select_from(ProviderModel).where(ProviderModel.disabled.is_(True))
+    ).scalar_one()
+    parts.append(int(disabled_count or 0))
+    return tuple(parts)
+
+
+class ProviderModelSnapshotStore:
+    """
+    持有当前快照；generation 在每次失效时递增，避免失效前开始的构建覆盖新数据。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: ProviderModelSnapshot | None = None
+        self._fingerprint: tuple[Any, ...] | None = None
+        self._generation = 0
+        self._version = 0
+
+    def get(self) -> ProviderModelSnapshot | None:
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+            self._fingerprint = None
+
+    def refresh(self, db: Session, *, force: bool = False) -> ProviderModelSnapshot | None:
+        """
+        指纹未变化时复用现有快照，否则重建；返回当前快照。
+        """
+        with self._lock:
+            generation = self._generation
+            current = self._snapshot
+            current_fingerprint = self._fingerprint
+
+        fingerprint = load_snapshot_fingerprint(db)
+        if not force and current is not None and fingerprint == current_fingerprint:
+            return current
+
+        with self._lock:
+            version = self._version + 1
+        snapshot = build_provider_model_snapshot(db, version=version)
+
+        with self._lock:
+            if generation != self._generation:
+                # 构建期间发生了本地失效，丢弃本次结果，等待下一轮重建。
+                return self._snapshot
+            self._version = version
+            self._snapshot = snapshot
+            self._fingerprint = fingerprint
+        return snapshot
+
+
+_store = ProviderModelSnapshotStore()
+_refresher_tasks: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, tuple[asyncio.Task[None], asyncio.Event]
+] = WeakKeyDictionary()
+
+
+def get_provider_model_snapshot_store() -> ProviderModelSnapshotStore:
+    return _store
+
+
+def get_provider_model_snapshot(db: Session | None) -> ProviderModelSnapshot | None:
+    """
+    请求路径入口：仅在启用且 db 绑定全局 engine 时返回快照；否则返回 None，由调用方查库。
+    """
+    if not settings.provider_model_snapshot_enabled:
+        return None
+    if not is_bound_to_global_engine(db):
+        return None
+    return _store.get()
+
+
+def invalidate_provider_model_snapshot() -> None:
+    """
+    本进程修改禁用状态 / 定价 / 倍率 / 结算系数后调用：丢弃快照并唤醒后台重建。
+    可在同步路由（线程池）中调用。
+    """
+    _store.invalidate()
+    for loop, (task, wake) in list(_refresher_tasks.items()):
+        if task.done() or loop.is_closed():
+            continue
+        with suppress(RuntimeError):
+            loop.call_soon_threadsafe(wake.set)
+
+
+def _refresh_with_new_session() -> None:
+    with SessionLocal() as db:
+        _store.refresh(db)
+
+
+async def _refresh_forever(interval_seconds: float, wake: asyncio.Event) -> None:
+    while True:
+        wake.clear()
+        try:
+            await asyncio.to_thread(_refresh_with_new_session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("provider model snapshot refresh failed: %s", exc)
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(wake.wait(), timeout=interval_seconds)
+
+
+def start_provider_model_snapshot_refresher() -> asyncio.Task[None] | None:
+    """
+    在当前事件循环中启动快照后台刷新任务（幂等）。
+    """
+    if not settings.provider_model_snapshot_enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    existing = _refresher_tasks.get(loop)
+    if existing is not None and not existing[0].done():
+        return existing[0]
+    wake = asyncio.Event()
+    task = loop.create_task(
+        _refresh_forever(float(settings.provider_model_snapshot_refresh_seconds), wake)
+    )
+    _refresher_tasks[loop] = (task, wake)
+    return task
+
+
+async def stop_provider_model_snapshot_refresher() -> None:
+    loop = asyncio.get_running_loop()
+    entry = _refresher_tasks.pop(loop, None)
+    if entry is None:
+        return
+    task, _ = entry
+    task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+__all__ = [
+    "ProviderModelSnapshot",
+    "ProviderModelSnapshotStore",
+    "build_provider_model_snapshot",
+    "get_provider_model_snapshot",
+    "get_provider_model_snapshot_store",
+    "invalidate_provider_model_snapshot",
+    "load_snapshot_fingerprint",
+    "start_provider_model_snapshot_refresher",
+    "stop_provider_model_snapshot_refresher",
+]
@@ -0,0 +1,302 @@
+"""
+进程内共享的 Redis pub/sub 订阅（run / workflow run 事件热通道）。
+
+每个 Redis 客户端（即每个 worker 进程的事件循环）只保持一条 PSUBSCRIBE 连接，
+读取任务按频道把消息分发到各 SSE 连接自己的有界 asyncio 队列：
+- 队列满时丢弃最旧的消息，慢消费者不会拖住其它订阅方（缺口可通过 after_seq 从 DB 回放补齐）；
+- 每条消息只解码一次，同一 run 的订阅方共享同一个 envelope（消费方不要原地修改）；
+- 订阅方等待队列而不是轮询；最后一个订阅方离开时关闭订阅连接，下次有订阅时再建立。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from fastapi import Request
+
+from app.logging_config import logger
+from app.settings import settings
+
+try:
+    from redis.asyncio import Redis
+except ModuleNotFoundError:  # pragma: no cover
+    Redis = object  # type: ignore[misc,assignment]
+
+
+# 事件热通道的频道前缀（与 run_event_bus / workflow_run_event_bus 的频道命名保持一致）。
+EVENT_CHANNEL_PATTERNS = ("run_events:*", "workflow_run_events:*")
+
+_CLOSED = object()
+_RECONNECT_MAX_SECONDS = 5.0
+
+
+def _decode_payload(value: Any) -> dict[str, Any] | None:
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", errors="ignore")
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class Subscription:
+    """单个订阅方的有界队列（丢弃最旧）。"""
+
+    __slots__ = ("_queue", "channel", "dropped")
+
+    def __init__(self, channel: str, *, maxsize: int) -> None:
+        self.channel = channel
+        self.dropped = 0
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max(1, int(maxsize)))
+
+    def offer(self, item: Any) -> None:
+        queue = self._queue
+        if queue.full():
+            with suppress(asyncio.QueueEmpty):
+                queue.get_nowait()
+            if item is not _CLOSED:
+                self.dropped += 1
+        queue.put_nowait(item)
+
+    def close(self) -> None:
+        """结束订阅：等待中的 get() 返回 None。"""
+        self.offer(_CLOSED)
+
+    async def get(self) -> dict[str, Any] | None:
+        """等待下一条 envelope；订阅被关闭时返回 None。"""
+        item = await self._queue.get()
+        if item is _CLOSED:
+            self.offer(_CLOSED)  # 保持关闭状态，后续 get() 立即返回
+            return None
+        return item
+
+
+class PubSubHub:
+    """一条 PSUBSCRIBE 连接 + 按频道分发的订阅表。"""
+
+    def __init__(self, redis: Redis, *, patterns: tuple[str, ...] = EVENT_CHANNEL_PATTERNS) -> None:
+        self._redis = redis
+        self._patterns = patterns
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = asyncio.Lock()
+        self._pubsub: Any = None
+        self._reader: asyncio.Task[None] | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    @property
+    def running(self) -> bool:
+        return self._reader is not None and not self._reader.done()
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        """
+        订阅一个频道。返回时底层 PSUBSCRIBE 已生效，之后发布的消息都会进入队列。
+        """
+        sub = Subscription(channel, maxsize=settings.event_stream_queue_size)
+        async with self._lock:
+            self._subscribers.setdefault(channel, set()).add(sub)
+            try:
+                await self._ensure_reader()
+            except BaseException:
+                self._discard(sub)
+                raise
+        try:
+            yield sub
+        finally:
+            if sub.dropped:
+                logger.info("pubsub hub: subscriber dropped %d messages (channel=%s)", sub.dropped, channel)
+            async with self._lock:
+                self._discard(sub)
+                if not self._subscribers:
+                    await self._stop_reader()
+
+    def _discard(self, sub: Subscription) -> None:
+        subs = self._subscribers.get(sub.channel)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            self._subscribers.pop(sub.channel, None)
+
+    async def _open_pubsub(self) -> Any:
+        pubsub = self._redis.pubsub()  # type: ignore[attr-defined]
+        await pubsub.psubscribe(*self._patterns)
+        return pubsub
+
+    async def _ensure_reader(self) -> None:
+        if self.running:
+            return
+        self._pubsub = await self._open_pubsub()
+        self._reader = asyncio.get_running_loop().create_task(self._read_forever())
+
+    async def _stop_reader(self) -> None:
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await reader
+        await self._close_pubsub()
+
+    async def _close_pubsub(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        with suppress(Exception):
+            await pubsub.punsubscribe(*self._patterns)
+        with suppress(Exception):
+            close = getattr(pubsub, "aclose", None) or pubsub.close
+            await close()
+
+    def _dispatch(self, msg: Any) -> None:
+        if not isinstance(msg, dict) or msg.get("type") not in ("pmessage", "message"):
+            return
+        channel = msg.get("channel")
+        if isinstance(channel, (bytes, bytearray)):
+            channel = channel.decode("utf-8", errors="ignore")
+        subs = self._subscribers.get(str(channel))
+        if not subs:
+            return
+        envelope = _decode_payload(msg.get("data"))
+        if envelope is None:
+            return
+        for sub in tuple(subs):
+            sub.offer(envelope)
+
+    async def _read_forever(self) -> None:
+        backoff = 0.1
+        while True:
+            try:
+                if self._pubsub is None:
+                    self._pubsub = await self._open_pubsub()
+                msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                backoff = 0.1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # 重连期间发布的消息会丢失；订阅方仍可依赖 seq + DB 回放自愈。
+                logger.warning("pubsub hub: reader error, reconnecting in %.1fs: %s", backoff, exc)
+                await self._close_pubsub()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, _RECONNECT_MAX_SECONDS)
+                continue
+            self._dispatch(msg)
+
+
+_hubs: WeakKeyDictionary[Any, PubSubHub] = WeakKeyDictionary()
+
+
+def get_pubsub_hub(redis: Redis) -> PubSubHub:
+    """返回与该 Redis 客户端绑定的共享订阅（Redis 客户端本身按事件循环隔离）。"""
+    hub = _hubs.get(redis)
+    if hub is None:
+        hub = PubSubHub(redis)
+        _hubs[redis] = hub
+    return hub
+
+
+def watch_disconnect(request: Request | None, sub: Subscription) -> asyncio.Task[None] | None:
+    """
+    等待客户端断开（http.disconnect）后关闭订阅，替代逐秒轮询 `request.is_disconnected()`。
+
+    仅用于非流式端点：StreamingResponse 自身会消费 receive 通道并在断开时取消生成器，
+    流式场景不需要（也不应该）再起一个 watcher。
+    """
+    receive = getattr(request, "receive", None)
+    if not callable(receive):
+        return None
+
+    async def _watch() -> None:
+        with suppress(Exception):
+            while True:
+                message = await receive()
+                if message.get("type") == "http.disconnect":
+                    break
+        sub.close()
+
+    return asyncio.get_running_loop().create_task(_watch())
+
+
+async def iter_subscription(
+    sub: Subscription,
+    *,
+    run_id: Any,
+    after_seq: int,
+    heartbeat_seconds: float = 15,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    从已建立的订阅中按 seq 去重地产出 envelope；空闲超过 heartbeat_seconds 时产出一条 heartbeat。
+    """
+    current_after = int(after_seq or 0)
+    heartbeat = float(heartbeat_seconds or 15)
+    last_activity = time.monotonic()
+    while True:
+        remaining = max(0.0, heartbeat - (time.monotonic() - last_activity))
+        try:
+            async with asyncio.timeout(remaining):
+                env = await sub.get()
+        except TimeoutError:
+            last_activity = time.monotonic()
+            yield {
+                "type": "heartbeat",
+                "ts": int(time.time()),
+                "run_id": str(run_id),
+                "after_seq": current_after,
+            }
+            continue
+        if env is None:
+            break
+        try:
+            seq_int = int(env.get("seq"))
+        except (TypeError, ValueError):
+            continue
+        if seq_int > current_after:
+            current_after = seq_int
+            last_activity = time.monotonic()
+            yield env
+
+
+async def iter_channel_envelopes(
+    redis: Redis,
+    *,
+    channel: str,
+    run_id: Any,
+    after_seq: int,
+    request: Request | None = None,
+    heartbeat_seconds: float = 15,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    订阅事件热通道并按 seq 去重地产出 envelope；空闲超过 heartbeat_seconds 时产出一条 heartbeat。
+    """
+    async with get_pubsub_hub(redis).subscribe(channel) as sub:
+        watcher = watch_disconnect(request, sub)
+        try:
+            async for env in iter_subscription(
+                sub, run_id=run_id, after_seq=after_seq, heartbeat_seconds=heartbeat_seconds
+            ):
+                yield env
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+
+__all__ = [
+    "EVENT_CHANNEL_PATTERNS",
+    "PubSubHub",
+    "Subscription",
+    "get_pubsub_hub",
+    "iter_channel_envelopes",
+    "iter_subscription",
+    "watch_disconnect",
+]
@@ -10,6 +10,7 @@ except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is
     Redis = object  # type: ignore[misc,assignment]
 
 from app.logging_config import logger
+from app.storage.redis_write_coalescer import get_redis_write_coalescer, redis_write_coalescing_enabled
 
 REQUEST_LOG_KEY_PREFIX = "request_logs:user:"
 REQUEST_LOG_MAX_ENTRIES = 100
@@ -21,6 +22,10 @@ def _key(user_id: str) -> str:
     return f"{REQUEST_LOG_KEY_PREFIX}{user_id}"
 
 
+def _dumps(entry: dict[str, Any]) -> str:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
 def _truncate_text(value: Any, *, limit: int = REQUEST_LOG_MAX_TEXT_CHARS) -> str | None:
     if value is None:
         return None
@@ -83,14 +88,44 @@ async def append_request_log(
 
     key = _key(user_id)
     try:
-        raw = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
-        await redis.lpush(key, raw)
-        await redis.ltrim(key, 0, REQUEST_LOG_MAX_ENTRIES - 1)
-        await redis.expire(key, REQUEST_LOG_TTL_SECONDS)
+        pipe = redis.pipeline(transaction=False)
+        pipe.lpush(key, _dumps(entry))
+        pipe.ltrim(key, 0, REQUEST_LOG_MAX_ENTRIES - 1)
+        pipe.expire(key, REQUEST_LOG_TTL_SECONDS)
+        await pipe.execute()
     except Exception:  # pragma: no cover - best-effort only
         logger.debug("request_log: failed to append (user_id=%s)", user_id, exc_info=True)
 
 
+async def enqueue_request_log(
+    redis: Redis,
+    *,
+    user_id: str,
+    entry: dict[str, Any],
+) -> None:
+    """
+    请求路径使用的写入方式：交给当前 worker 的 Redis 写合并器，与其它小写入合并为一次 pipeline，
+    不等待 Redis 往返。REDIS_WRITE_COALESCE_MS=0 时退回直接写入。
+    """
+    if not user_id:
+        return
+    if redis is object or redis is None:
+        return
+    if not redis_write_coalescing_enabled():
+        await append_request_log(redis, user_id=user_id, entry=entry)
+        return
+
+    try:
+        get_redis_write_coalescer(redis).push_list(
+            _key(user_id),
+            _dumps(entry),
+            max_length=REQUEST_LOG_MAX_ENTRIES,
+            ttl_seconds=REQUEST_LOG_TTL_SECONDS,
+        )
+    except Exception:  # pragma: no cover - best-effort only
+        logger.debug("request_log: failed to enqueue (user_id=%s)", user_id, exc_info=True)
+
+
 async def list_request_logs(
     redis: Redis,
     *,
@@ -131,6 +166,7 @@ __all__ = [
     "REQUEST_LOG_MAX_ENTRIES",
     "append_request_log",
     "build_request_log_entry",
+    "enqueue_request_log",
     "list_request_logs",
 ]
 
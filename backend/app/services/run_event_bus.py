@@ -4,11 +4,16 @@ import asyncio
 import json
 import time
 from collections.abc import AsyncIterator
-from contextlib import suppress
 from typing import Any
 from uuid import UUID
 
 from fastapi import Request
+from sqlalchemy.orm import Session
+
+from app.models import RunEvent
+from app.repositories.run_event_repository import list_run_events
+from app.services.pubsub_hub import get_pubsub_hub, iter_channel_envelopes, iter_subscription, watch_disconnect
+from app.settings import settings
 
 try:
     from redis.asyncio import Redis
@@ -16,6 +21,9 @@ except ModuleNotFoundError:  # pragma: no cover
     Redis = object  # type: ignore
 
 
+_GAP_POLL_SECONDS = 0.05
+
+
 def run_event_channel(*, run_id: UUID | str) -> str:
     return f"run_events:{run_id}"
 
@@ -38,6 +46,22 @@ def build_run_event_envelope(
     }
 
 
+def run_event_to_envelope(ev: RunEvent) -> dict[str, Any]:
+    """把 DB 中的 RunEvent 转成与热通道一致的 envelope。"""
+    created_at_iso = None
+    try:
+        created_at_iso = ev.created_at.isoformat() if getattr(ev, "created_at", None) is not None else None
+    except Exception:
+        created_at_iso = None
+    return build_run_event_envelope(
+        run_id=ev.run_id,
+        seq=int(getattr(ev, "seq", 0) or 0),
+        event_type=str(getattr(ev, "event_type", "event") or "event"),
+        created_at_iso=created_at_iso,
+        payload=getattr(ev, "payload", None) or {},
+    )
+
+
 async def publish_run_event(
     redis: Redis,
     *,
@@ -65,25 +89,7 @@ def publish_run_event_best_effort(
     loop.create_task(publish_run_event(redis, run_id=run_id, envelope=envelope))
 
 
-def _decode_pubsub_payload(value: Any) -> dict[str, Any] | None:
-    if value is None:
-        return None
-    if isinstance(value, (bytes, bytearray)):
-        raw = value.decode("utf-8", errors="ignore")
-    elif isinstance(value, str):
-        raw = value
-    else:
-        return None
-    try:
-        parsed = json.loads(raw)
-    except Exception:
-        return None
-    if not isinstance(parsed, dict):
-        return None
-    return parsed
-
-
-async def subscribe_run_events(
+def subscribe_run_events(
     redis: Redis,
     *,
     run_id: UUID | str,
@@ -95,63 +101,96 @@ async def subscribe_run_events(
     订阅 RunEvent 的 Redis 热通道（pub/sub）。
 
     注意：pubsub 只提供实时热流；断线回放依赖 DB 真相（由上层先 replay）。
+    订阅复用进程内共享的 PSUBSCRIBE 连接（见 app.services.pubsub_hub）；request 仅在非流式
+    端点中传入，用于在客户端断开时结束等待。
     """
-    channel = run_event_channel(run_id=run_id)
-    pubsub = redis.pubsub()
-    await pubsub.subscribe(channel)
+    return iter_channel_envelopes(
+        redis,
+        channel=run_event_channel(run_id=run_id),
+        run_id=run_id,
+        after_seq=after_seq,
+        request=request,
+        heartbeat_seconds=heartbeat_seconds,
+    )
+
+
+async def replay_run_event_gap(
+    db: Session,
+    *,
+    run_id: UUID,
+    after_seq: int,
+    before_seq: int,
+) -> list[RunEvent]:
+    """
+    从 DB 补齐热通道上 (after_seq, before_seq) 之间缺失的事件。
 
-    last_activity = time.monotonic()
-    current_after = int(after_seq or 0)
+    worker 的批量写入器先发布、后落库（最多延迟一个 RUN_EVENT_FLUSH_INTERVAL_MS），订阅方在两者之间
+    加入时会看到跳号；这里在约两个落库周期内轮询 DB，超时后返回已查到的部分（计数器重建或坏行被丢弃
+    时序号本身可能有空洞）。
+    """
+    expected = int(before_seq) - int(after_seq) - 1
+    deadline = time.monotonic() + 2 * settings.run_event_flush_interval_ms / 1000.0
+    while True:
+        rows = [
+            ev
+            for ev in list_run_events(db, run_id=run_id, after_seq=after_seq, limit=1000)
+            if int(getattr(ev, "seq", 0) or 0) < before_seq
+        ]
+        if len(rows) >= expected or time.monotonic() >= deadline:
+            return rows
+        await asyncio.sleep(_GAP_POLL_SECONDS)
+
+
+async def iter_run_events(
+    redis: Redis,
+    db: Session,
+    *,
+    run_id: UUID,
+    after_seq: int,
+    request: Request | None = None,
+    heartbeat_seconds: int = 15,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    按 seq 顺序产出 after_seq 之后的 RunEvent envelope：先订阅热通道，再从 DB 回放，然后实时续订。
 
-    try:
-        while True:
-            if request is not None:
-                try:
-                    if await request.is_disconnected():
-                        break
-                except Exception:  # pragma: no cover
-                    break
-
-            msg = None
-            try:
-                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            except Exception:
-                msg = None
-
-            if isinstance(msg, dict) and msg.get("type") == "message":
-                env = _decode_pubsub_payload(msg.get("data"))
-                if env is not None:
-                    seq_val = env.get("seq")
-                    try:
-                        seq_int = int(seq_val)
-                    except Exception:
-                        seq_int = None
-                    if seq_int is not None and seq_int > current_after:
-                        current_after = seq_int
-                        last_activity = time.monotonic()
-                        yield env
-                continue
-
-            if time.monotonic() - last_activity >= float(heartbeat_seconds or 15):
-                last_activity = time.monotonic()
-                yield {
-                    "type": "heartbeat",
-                    "ts": int(time.time()),
-                    "run_id": str(run_id),
-                    "after_seq": current_after,
-                }
-    finally:
-        with suppress(Exception):
-            await pubsub.unsubscribe(channel)
-        with suppress(Exception):
-            await pubsub.close()
+    先订阅保证回放与订阅之间发布的事件不会丢；热通道跳号（事件已发布但尚未落库）时从 DB 补齐。
+    """
+    last_seq = int(after_seq or 0)
+    async with get_pubsub_hub(redis).subscribe(run_event_channel(run_id=run_id)) as sub:
+        watcher = watch_disconnect(request, sub)
+        try:
+            for ev in list_run_events(db, run_id=run_id, after_seq=last_seq, limit=1000):
+                env = run_event_to_envelope(ev)
+                if env["seq"] <= last_seq:
+                    continue
+                last_seq = env["seq"]
+                yield env
+
+            async for env in iter_subscription(
+                sub, run_id=run_id, after_seq=last_seq, heartbeat_seconds=heartbeat_seconds
+            ):
+                if str(env.get("type") or "") == "heartbeat":
+                    yield env
+                    continue
+                seq = int(env["seq"])
+                if seq > last_seq + 1:
+                    for ev in await replay_run_event_gap(db, run_id=run_id, after_seq=last_seq, before_seq=seq):
+                        yield run_event_to_envelope(ev)
+                last_seq = seq
+                yield env
+        finally:
+            if watcher is not None:
+                watcher.cancel()
 
 
 __all__ = [
     "build_run_event_envelope",
+    "iter_run_events",
     "publish_run_event",
     "publish_run_event_best_effort",
+    "replay_run_event_gap",
     "run_event_channel",
+    "run_event_to_envelope",
     "subscribe_run_events",
 ]
 
@@ -0,0 +1,217 @@
+"""
+Run 事件批量写入器（worker 内使用）。
+
+- 序号由 Redis 计数器原子分配（首次按 DB 中的最大序号对齐），API 的取消接口与 worker
+  并发写同一 run 时也不会撞上唯一约束，且不再需要逐条 `SELECT max(seq)`；
+- 分配到序号后立即发布到 Redis 热通道，实时订阅方无需等待落库；在发布与落库之间加入的订阅方
+  会看到跳号，由 `run_event_bus.iter_run_events` / `replay_run_event_gap` 从 DB 补齐；
+- 事件先进入本地缓冲，按条数 / 时间批量以一条多行 INSERT 落库，终态事件与 `aclose()`
+  会立即落库，保证 run 结束时 DB 回放完整；
+- 同步 SQLAlchemy 写入放到线程池执行，不阻塞事件循环，批次之间按提交顺序串行落库。
+
+Redis 不可用时退化为进程内计数（与原先 max(seq)+1 的单写入方假设一致）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.logging_config import logger
+from app.repositories.run_event_repository import get_max_run_event_seq, insert_run_events
+from app.services.run_event_bus import build_run_event_envelope, publish_run_event_best_effort
+from app.settings import settings
+
+try:
+    from redis.asyncio import Redis
+except ModuleNotFoundError:  # pragma: no cover
+    Redis = object  # type: ignore[misc,assignment]
+
+
+# 这些事件代表 run 已收敛，写入后立即落库，便于断线重连的客户端从 DB 回放到终态。
+_FLUSH_IMMEDIATELY_EVENT_TYPES = frozenset({"message.completed", "message.failed", "run.canceled"})
+
+
+def run_event_seq_key(*, run_id: UUID | str) -> str:
+    return f"run_events:seq:{run_id}"
+
+
+async def allocate_run_event_seq(redis: Redis, *, run_id: UUID | str, floor: int) -> int:
+    """
+    从 Redis 计数器分配下一个事件序号。
+
+    floor 为调用方已知的 DB 最大序号：计数器不存在（首次 / 已过期）时用 SET NX 对齐到 floor；
+    若计数器落后于 floor（例如曾有单写入方直接按 max+1 落库），用 INCRBY 追平，结果仍然唯一。
+    """
+    key = run_event_seq_key(run_id=run_id)
+    floor = int(floor or 0)
+    pipe = redis.pipeline(transaction=False)
+    pipe.set(key, floor, ex=int(settings.run_event_seq_ttl_seconds), nx=True)
+    pipe.incr(key)
+    _, seq = await pipe.execute()
+    seq = int(seq)
+    if seq <= floor:
+        seq = int(await redis.incrby(key, floor + 1 - seq))
+    return seq
+
+
+class RunEventWriter:
+    """单个 run 的事件写入器：Redis 分配序号 → 立即发布热通道 → 批量落库。"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        redis: Redis | None,
+        run_id: UUID,
+        flush_interval_seconds: float | None = None,
+        max_batch_size: int | None = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._redis = redis
+        self._run_id = run_id
+        if flush_interval_seconds is None:
+            flush_interval_seconds = settings.run_event_flush_interval_ms / 1000.0
+        self._flush_interval = max(0.0, float(flush_interval_seconds))
+        self._max_batch_size = max(1, int(max_batch_size or settings.run_event_flush_max_batch))
+        self._pending: list[dict[str, Any]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        # 定时器触发的落库任务，保留引用避免被 GC 回收。
+        self._flush_tasks: set[asyncio.Task[int]] = set()
+        self._db_floor: int | None = None
+        self._seq_aligned = False
+        self._last_seq = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _load_db_floor(self) -> int:
+        if self._db_floor is None:
+            with self._session_factory() as session:
+                self._db_floor = get_max_run_event_seq(session, run_id=self._run_id)
+        return self._db_floor
+
+    async def _next_seq(self) -> int:
+        if self._redis is not None:
+            try:
+                seq = 0
+                if self._seq_aligned:
+                    seq = int(await self._redis.incr(run_event_seq_key(run_id=self._run_id)))
+                if seq <= self._last_seq:
+                    # 首次分配，或计数器在 run 执行期间过期被重建：重新对齐到已知的最大序号。
+                    floor = max(self._last_seq, await asyncio.to_thread(self._load_db_floor))
+                    seq = await allocate_run_event_seq(self._redis, run_id=self._run_id, floor=floor)
+                    self._seq_aligned = True
+                self._last_seq = max(self._last_seq, seq)
+                return seq
+            except Exception:
+                logger.debug("run_event_writer: redis seq allocation failed (run_id=%s)", self._run_id, exc_info=True)
+        self._last_seq = max(self._last_seq, await asyncio.to_thread(self._load_db_floor)) + 1
+        return self._last_seq
+
+    async def append(self, event_type: str, payload: dict[str, Any] | None) -> int | None:
+        """追加一条事件并返回其序号；best-effort，失败时返回 None 而不抛出。"""
+        try:
+            seq = await self._next_seq()
+        except Exception:  # pragma: no cover - best-effort only
+            logger.debug("run_event_writer: seq allocation failed (run_id=%s)", self._run_id, exc_info=True)
+            return None
+
+        event_type = str(event_type or "").strip() or "event"
+        payload = payload or {}
+        created_at = datetime.now(UTC)
+        publish_run_event_best_effort(
+            self._redis,
+            run_id=self._run_id,
+            envelope=build_run_event_envelope(
+                run_id=self._run_id,
+                seq=seq,
+                event_type=event_type,
+                created_at_iso=created_at.isoformat(),
+                payload=payload,
+            ),
+        )
+        self._pending.append(
+            {
+                "run_id": self._run_id,
+                "seq": seq,
+                "event_type": event_type,
+                "payload": payload,
+                "created_at": created_at,
+            }
+        )
+
+        if (
+            event_type in _FLUSH_IMMEDIATELY_EVENT_TYPES
+            or len(self._pending) >= self._max_batch_size
+            or self._flush_interval <= 0
+        ):
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval, self._on_timer)
+        return seq
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> int:
+        """把缓冲中的事件以一条多行 INSERT 落库（在线程池中执行），返回成功写入的条数。"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, self._pending = self._pending, []
+        # 空批次也等待锁：aclose() 返回时，之前由定时器发起的落库一定已经完成。
+        async with self._flush_lock:
+            if not rows:
+                return 0
+            return await asyncio.to_thread(self._write_rows, rows)
+
+    def _write_rows(self, rows: list[dict[str, Any]]) -> int:
+        try:
+            with self._session_factory() as session:
+                insert_run_events(session, rows)
+                session.commit()
+            return len(rows)
+        except Exception:
+            logger.warning(
+                "run_event_writer: batch insert failed, retrying row by row (run_id=%s rows=%d)",
+                self._run_id,
+                len(rows),
+                exc_info=True,
+            )
+        return self._flush_rows(rows)
+
+    def _flush_rows(self, rows: list[dict[str, Any]]) -> int:
+        # 逐条写入隔离出问题的行（例如序号冲突），其余事件仍能落库；坏行已实时发布过，这里丢弃并告警。
+        written = 0
+        for row in rows:
+            try:
+                with self._session_factory() as session:
+                    insert_run_events(session, [row])
+                    session.commit()
+                written += 1
+            except Exception:
+                logger.warning(
+                    "run_event_writer: dropping run event (run_id=%s seq=%s type=%s)",
+                    self._run_id,
+                    row.get("seq"),
+                    row.get("event_type"),
+                    exc_info=True,
+                )
+        return written
+
+    async def aclose(self) -> None:
+        await self.flush()
+
+
+__all__ = ["RunEventWriter", "allocate_run_event_seq", "run_event_seq_key"]
@@ -2,6 +2,11 @@ from __future__ import annotations
 
 from collections.abc import AsyncIterator
 
+ByteChunk = bytes | bytearray | memoryview
+
+_LF = 0x0A
+_CR = 0x0D
+
 
 class SSEEvent:
     def __init__(self, *, event: str, data: str) -> None:
@@ -9,6 +14,113 @@ class SSEEvent:
         self.data = data
 
 
+class SSEFramer:
+    """
+    Incremental text/event-stream framer working directly on bytes.
+
+    Notes:
+    - Accepts bytes / bytearray / memoryview chunks; frames are cut at a blank line
+      (LF or CRLF, mixed separators included) in a single forward scan.
+    - Keeps a scan offset so bytes already inspected are never scanned again, and only
+      decodes a frame once it is complete (multi-byte UTF-8 split across chunks is safe).
+    """
+
+    __slots__ = ("_buffer", "_scan")
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._scan = 0
+
+    def feed(self, chunk: ByteChunk) -> list[bytes]:
+        """
+        Append a chunk and return the complete raw frames (without the terminator).
+        """
+        if not chunk:
+            return []
+        buf = self._buffer
+        buf += chunk
+
+        frames: list[bytes] = []
+        frame_start = 0
+        pos = self._scan
+        size = len(buf)
+        while True:
+            nl = buf.find(b"\n", pos)
+            if nl < 0:
+                pos = size
+                break
+            nxt = nl + 1
+            if nxt >= size:
+                pos = nl
+                break
+            if buf[nxt] == _LF:
+                end = nxt + 1
+            elif buf[nxt] == _CR:
+                if nxt + 1 >= size:
+                    pos = nl
+                    break
+                if buf[nxt + 1] != _LF:
+                    pos = nxt
+                    continue
+                end = nxt + 2
+            else:
+                pos = nxt
+                continue
+
+            frame_end = nl - 1 if nl > frame_start and buf[nl - 1] == _CR else nl
+            if frame_end > frame_start:
+                frames.append(bytes(buf[frame_start:frame_end]))
+            frame_start = end
+            pos = end
+
+        if frame_start:
+            # bytearray 头部删除是 O(1) 的（只移动起始偏移）。
+            del buf[:frame_start]
+            pos -= frame_start
+        self._scan = max(0, pos)
+        return frames
+
+    def feed_events(self, chunk: ByteChunk) -> list[SSEEvent]:
+        events: list[SSEEvent] = []
+        for frame in self.feed(chunk):
+            event = parse_sse_frame(frame)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> bytes | None:
+        """
+        Return the trailing unterminated frame (if any) and reset the buffer.
+        """
+        tail = bytes(self._buffer).strip()
+        self._buffer.clear()
+        self._scan = 0
+        return tail or None
+
+
+def parse_sse_frame(frame: ByteChunk) -> SSEEvent | None:
+    """
+    Parse one raw frame into an SSEEvent; frames without `data:` lines return None.
+    """
+    text = bytes(frame).decode("utf-8", errors="ignore")
+    event = "message"
+    data_lines: list[str] = []
+    for raw_line in text.split("\n"):
+        line = raw_line.rstrip("\r")
+        if not line or line.startswith(":"):
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[len("data:") :].lstrip())
+            continue
+        if line.startswith("event:"):
+            event = line[len("event:") :].strip() or "message"
+            continue
+
+    if not data_lines:
+        return None
+    return SSEEvent(event=event, data="\n".join(data_lines))
+
+
 async def iter_sse_events(byte_iter: AsyncIterator[bytes]) -> AsyncIterator[SSEEvent]:
     """
     Parse a text/event-stream response body from raw bytes.
@@ -17,49 +129,10 @@ async def iter_sse_events(byte_iter: AsyncIterator[bytes]) -> AsyncIterator[SSEE
     - This is a minimal parser for internal use (Gateway SSE).
     - Supports multi-line `data:` fields.
     """
-    buffer = ""
+    framer = SSEFramer()
     async for chunk in byte_iter:
-        if not chunk:
-            continue
-        buffer += chunk.decode("utf-8", errors="ignore")
-
-        while True:
-            lf_idx = buffer.find("\n\n")
-            crlf_idx = buffer.find("\r\n\r\n")
-
-            if lf_idx == -1 and crlf_idx == -1:
-                break
+        for event in framer.feed_events(chunk):
+            yield event
 
-            if lf_idx == -1:
-                idx = crlf_idx
-                sep_len = 4
-            elif crlf_idx == -1:
-                idx = lf_idx
-                sep_len = 2
-            else:
-                if lf_idx < crlf_idx:
-                    idx = lf_idx
-                    sep_len = 2
-                else:
-                    idx = crlf_idx
-                    sep_len = 4
-
-            frame = buffer[:idx]
-            buffer = buffer[idx + sep_len :]
-
-            event = "message"
-            data_lines: list[str] = []
-            for raw_line in frame.split("\n"):
-                line = raw_line.rstrip("\r")
-                if not line or line.startswith(":"):
-                    continue
-                if line.startswith("event:"):
-                    event = line[len("event:") :].strip() or "message"
-                    continue
-                if line.startswith("data:"):
-                    data_lines.append(line[len("data:") :].lstrip())
-                    continue
 
-            if not data_lines:
-                continue
-            yield SSEEvent(event=event, data="\n".join(data_lines))
+__all__ = ["SSEEvent", "SSEFramer", "iter_sse_events", "parse_sse_frame"]
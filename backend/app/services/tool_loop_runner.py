@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
 import json
 import math
 import time
@@ -16,7 +17,7 @@ from app.services.bridge_tool_runner import (
 )
 
 
-RunEventSink = Callable[[str, dict[str, Any]], None]
+RunEventSink = Callable[[str, dict[str, Any]], Awaitable[Any] | None]
 InvokeTool = Callable[[str, str, str, dict[str, Any]], Awaitable[BridgeToolResult]]
 CancelTool = Callable[[str, str, str], Awaitable[None]]
 CallModel = Callable[[dict[str, Any], str], Awaitable[dict[str, Any] | None]]
@@ -79,11 +80,13 @@ class ToolLoopRunner:
         round_idx = 0
         invocation_records: list[dict[str, Any]] = []
 
-        def emit(event_type: str, payload: dict[str, Any]) -> None:
+        async def emit(event_type: str, payload: dict[str, Any]) -> None:
             if self._event_sink is None:
                 return
             try:
-                self._event_sink(event_type, payload)
+                result = self._event_sink(event_type, payload)
+                if inspect.isawaitable(result):
+                    await result
             except Exception:
                 return
 
@@ -150,7 +153,7 @@ class ToolLoopRunner:
                     continue
 
                 req_id = "req_" + uuid.uuid4().hex
-                emit(
+                await emit(
                     "tool.status",
                     {
                         "type": "tool.status",
@@ -247,7 +250,7 @@ class ToolLoopRunner:
                     "result_preview": result_preview,
                 }
                 invocation_records.append(record)
-                emit(
+                await emit(
                     "tool.result",
                     {
                         "type": "tool.result",
@@ -8,6 +8,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.logging_config import logger
+from app.provider.config_registry import invalidate_provider_config
 from app.models import Provider, ProviderAllowedUser, ProviderAPIKey
 from app.repositories.user_provider_repository import (
     count_user_private_providers as repo_count_user_private_providers,
@@ -202,6 +203,7 @@ def update_private_provider(
     except IntegrityError as exc:  # pragma: no cover - 并发场景保护
         logger.error("Failed to update private provider: %s", exc)
         raise UserProviderServiceError("无法更新私有提供商") from exc
+    invalidate_provider_config(provider_id)
     return provider
 
 
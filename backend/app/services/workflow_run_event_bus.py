@@ -2,14 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import json
-import time
 from collections.abc import AsyncIterator
-from contextlib import suppress
 from typing import Any
 from uuid import UUID
 
 from fastapi import Request
 
+from app.services.pubsub_hub import iter_channel_envelopes
+
 try:
     from redis.asyncio import Redis
 except ModuleNotFoundError:  # pragma: no cover
@@ -66,25 +66,7 @@ def publish_workflow_run_event_best_effort(
     loop.create_task(publish_workflow_run_event(redis, run_id=run_id, envelope=envelope))
 
 
-def _decode_pubsub_payload(value: Any) -> dict[str, Any] | None:
-    if value is None:
-        return None
-    if isinstance(value, (bytes, bytearray)):
-        raw = value.decode("utf-8", errors="ignore")
-    elif isinstance(value, str):
-        raw = value
-    else:
-        return None
-    try:
-        parsed = json.loads(raw)
-    except Exception:
-        return None
-    if not isinstance(parsed, dict):
-        return None
-    return parsed
-
-
-async def subscribe_workflow_run_events(
+def subscribe_workflow_run_events(
     redis: Redis,
     *,
     run_id: UUID | str,
@@ -93,57 +75,16 @@ async def subscribe_workflow_run_events(
     heartbeat_seconds: int = 15,
 ) -> AsyncIterator[dict[str, Any]]:
     """
-    订阅 WorkflowRunEvent 的 Redis 热通道（pub/sub）。
+    订阅 WorkflowRunEvent 的 Redis 热通道（pub/sub），复用进程内共享的 PSUBSCRIBE 连接。
     """
-    channel = workflow_run_event_channel(run_id=run_id)
-    pubsub = redis.pubsub()
-    await pubsub.subscribe(channel)
-
-    last_activity = time.monotonic()
-    current_after = int(after_seq or 0)
-
-    try:
-        while True:
-            if request is not None:
-                try:
-                    if await request.is_disconnected():
-                        break
-                except Exception:  # pragma: no cover
-                    break
-
-            msg = None
-            try:
-                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            except Exception:
-                msg = None
-
-            if isinstance(msg, dict) and msg.get("type") == "message":
-                env = _decode_pubsub_payload(msg.get("data"))
-                if env is not None:
-                    seq_val = env.get("seq")
-                    try:
-                        seq_int = int(seq_val)
-                    except Exception:
-                        seq_int = None
-                    if seq_int is not None and seq_int > current_after:
-                        current_after = seq_int
-                        last_activity = time.monotonic()
-                        yield env
-                continue
-
-            if time.monotonic() - last_activity >= float(heartbeat_seconds or 15):
-                last_activity = time.monotonic()
-                yield {
-                    "type": "heartbeat",
-                    "ts": int(time.time()),
-                    "run_id": str(run_id),
-                    "after_seq": current_after,
-                }
-    finally:
-        with suppress(Exception):
-            await pubsub.unsubscribe(channel)
-        with suppress(Exception):
-            await pubsub.close()
+    return iter_channel_envelopes(
+        redis,
+        channel=workflow_run_event_channel(run_id=run_id),
+        run_id=run_id,
+        after_seq=after_seq,
+        request=request,
+        heartbeat_seconds=heartbeat_seconds,
+    )
 
 
 __all__ = [
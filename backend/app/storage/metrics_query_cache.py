@@ -0,0 +1,361 @@
+"""
+Dashboard / 概览指标查询的合并缓存（single-flight + stale-while-revalidate）。
+
+原先各接口都是“读缓存 → 未命中查库 → 写缓存”，缓存键过期的瞬间所有正在看面板的用户
+会同时对汇总表跑同一条重聚合查询。这里在 Redis 缓存前加一层请求合并：
+- 进程内：同一个键同时只有一个协程查库，其余协程等待同一个 Future；
+- 跨 worker：查库前以 `SET NX` 抢占 `<key>:lock`，没抢到的 worker 轮询缓存等待结果，
+  超过 METRICS_CACHE_LOCK_WAIT_SECONDS 仍未写回才自己查询兜底；
+- 缓存值带 fresh_until，过期后仍保留 METRICS_CACHE_STALE_SECONDS：期间直接返回旧值，
+  并在后台用新的 Session 刷新；
+- 记录各键的访问热度，后台任务在最热的若干个键过期前主动刷新，热门面板基本不会冷启动查库。
+
+只有绑定在全局 engine 上的 Session 才会后台刷新（测试中的 SQLite 库始终同步查询）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+try:
+    from redis.asyncio import Redis
+except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is missing
+    Redis = object  # type: ignore[misc,assignment]
+
+from app.db.session import SessionLocal, is_bound_to_global_engine
+from app.logging_config import logger
+from app.redis_client import redis_get_json, redis_set_json
+from app.settings import settings
+
+_LOCK_POLL_SECONDS = 0.05
+_MAX_HOT_ENTRIES = 512
+
+
+@dataclass
+class _HotKey:
+    redis: Redis
+    model: type[BaseModel]
+    load: Callable[[Session], BaseModel]
+    ttl_seconds: int
+    loop: asyncio.AbstractEventLoop
+    hits: float = 0.0
+    last_hit: float = 0.0
+
+
+def _load_with_new_session[M: BaseModel](load: Callable[[Session], M]) -> M:
+    with SessionLocal() as db:
+        return load(db)
+
+
+class MetricsQueryCache:
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
+        self._hot: dict[str, _HotKey] = {}
+        self._background: set[asyncio.Task[Any]] = set()
+
+    async def get_or_load[M: BaseModel](
+        self,
+        redis: Redis,
+        key: str,
+        model: type[M],
+        load: Callable[[Session], M],
+        *,
+        db: Session,
+        ttl_seconds: int,
+    ) -> M:
+        """
+        返回 key 对应的指标结果；未命中时合并并发查询，只执行一次 load(db)。
+        """
+        if redis is object:
+            return load(db)
+
+        cached, fresh_until = await self._read(redis, key, model)
+        refreshable = is_bound_to_global_engine(db)
+        if refreshable:
+            self._note_hit(redis, key, model, load, ttl_seconds)
+        if cached is not None and time.time() < fresh_until:
+            return cached
+        if cached is not None and refreshable:
+            self._revalidate_in_background(redis, key, model, load, ttl_seconds)
+            return cached
+
+        async def _compute() -> M:
+            return load(db)
+
+        result = await self._single_flight(
+            key,
+            lambda: self._load_and_store(redis, key, model, _compute, ttl_seconds=ttl_seconds, wait=True),
+        )
+        return result  # type: ignore[return-value]
+
+    async def refresh_hot_keys(self) -> int:
+        """
+        刷新当前事件循环中最热且即将过期的键，返回发起刷新的数量。
+        """
+        loop = asyncio.get_running_loop()
+        now = time.time()
+        idle_cutoff = now - float(settings.metrics_cache_stale_seconds)
+        for key in [k for k, entry in self._hot.items() if entry.last_hit < idle_cutoff]:
+            del self._hot[key]
+
+        hottest = sorted(
+            ((key, entry) for key, entry in self._hot.items() if entry.loop is loop),
+            key=lambda item: item[1].hits,
+            reverse=True,
+        )[: max(0, int(settings.metrics_cache_hot_keys))]
+        horizon = float(settings.metrics_cache_refresh_interval_seconds)
+        refreshed = 0
+        for key, entry in hottest:
+            cached, fresh_until = await self._read(entry.redis, key, entry.model)
+            if cached is not None and fresh_until - time.time() > horizon:
+                continue
+            await self._refresh(entry.redis, key, entry.model, entry.load, entry.ttl_seconds)
+            refreshed += 1
+
+        for entry in self._hot.values():
+            entry.hits /= 2
+        return refreshed
+
+    def _note_hit(
+        self,
+        redis: Redis,
+        key: str,
+        model: type[BaseModel],
+        load: Callable[[Session], BaseModel],
+        ttl_seconds: int,
+    ) -> None:
+        now = time.time()
+        entry = self._hot.get(key)
+        if entry is None:
+            if len(self._hot) >= _MAX_HOT_ENTRIES:
+                coldest = min(self._hot, key=lambda k: self._hot[k].hits)
+                del self._hot[coldest]
+            entry = _HotKey(
+                redis=redis,
+                model=model,
+                load=load,
+                ttl_seconds=ttl_seconds,
+                loop=asyncio.get_running_loop(),
+            )
+            self._hot[key] = entry
+        else:
+            # 保留最近一次请求的闭包（参数相同，但 redis 客户端可能随事件循环变化）。
+            entry.redis = redis
+            entry.load = load
+            entry.loop = asyncio.get_running_loop()
+        entry.hits += 1
+        entry.last_hit = now
+
+    def _revalidate_in_background(
+        self,
+        redis: Redis,
+        key: str,
+        model: type[BaseModel],
+        load: Callable[[Session], BaseModel],
+        ttl_seconds: int,
+    ) -> None:
+        existing = self._inflight.get(f"{key}#refresh")
+        if existing is not None and not existing.done():
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh(redis, key, model, load, ttl_seconds))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(
+        self,
+        redis: Redis,
+        key: str,
+        model: type[BaseModel],
+        load: Callable[[Session], BaseModel],
+        ttl_seconds: int,
+    ) -> None:
+        async def _compute() -> BaseModel:
+            return await asyncio.to_thread(_load_with_new_session, load)
+
+        try:
+            await self._single_flight(
+                f"{key}#refresh",
+                lambda: self._load_and_store(redis, key, model, _compute, ttl_seconds=ttl_seconds, wait=False),
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("metrics cache: background refresh failed (key=%s): %s", key, exc)
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None or fut.get_loop() is not loop:
+                break
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if fut.cancelled() and not (current is not None and current.cancelling()):
+                    # 负责查询的请求被取消：由等待者之一接手。
+                    continue
+                raise
+
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as exc:
+            fut.set_exception(exc)
+            # 标记异常已读取，避免没有等待者时 asyncio 打印告警。
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    async def _load_and_store[M: BaseModel](
+        self,
+        redis: Redis,
+        key: str,
+        model: type[M],
+        compute: Callable[[], Awaitable[M]],
+        *,
+        ttl_seconds: int,
+        wait: bool,
+    ) -> M | None:
+        """
+        持有跨 worker 锁时查询并写回；未抢到锁时 wait=True 则等待其它 worker 写回，否则放弃。
+        """
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        locked = await self._try_lock(redis, lock_key, token)
+        if not locked:
+            if not wait:
+                return None
+            deadline = time.monotonic() + float(settings.metrics_cache_lock_wait_seconds)
+            while time.monotonic() < deadline:
+                await asyncio.sleep(_LOCK_POLL_SECONDS)
+                cached, fresh_until = await self._read(redis, key, model)
+                if cached is not None and time.time() < fresh_until:
+                    return cached
+            logger.info("metrics cache: lock wait timed out, querying directly (key=%s)", key)
+
+        try:
+            value = await compute()
+            await self._write(redis, key, value, ttl_seconds=ttl_seconds)
+            return value
+        finally:
+            if locked:
+                await self._unlock(redis, lock_key, token)
+
+    async def _read[M: BaseModel](self, redis: Redis, key: str, model: type[M]) -> tuple[M | None, float]:
+        try:
+            cached = await redis_get_json(redis, key)
+        except Exception:
+            logger.exception("metrics cache: failed to read from Redis (key=%s)", key)
+            return None, 0.0
+        if not isinstance(cached, dict) or "data" not in cached:
+            return None, 0.0
+        try:
+            return model.model_validate(cached["data"]), float(cached.get("fresh_until") or 0.0)
+        except Exception:
+            logger.info("metrics cache malformed (key=%s)", key)
+            return None, 0.0
+
+    async def _write(self, redis: Redis, key: str, value: BaseModel, *, ttl_seconds: int) -> None:
+        envelope = {
+            "fresh_until": time.time() + ttl_seconds,
+            "data": value.model_dump(mode="json"),
+        }
+        try:
+            await redis_set_json(
+                redis,
+                key,
+                envelope,
+                ttl_seconds=ttl_seconds + int(settings.metrics_cache_stale_seconds),
+            )
+        except Exception:
+            logger.exception("metrics cache: failed to write to Redis (key=%s)", key)
+
+    async def _try_lock(self, redis: Redis, lock_key: str, token: str) -> bool:
+        try:
+            return bool(
+                await redis.set(
+                    lock_key,
+                    token,
+                    nx=True,
+                    ex=max(1, int(settings.metrics_cache_lock_seconds)),
+                )
+            )
+        except Exception as exc:
+            # Redis 不可用时不做跨 worker 合并，直接查询。
+            logger.warning("metrics cache: failed to acquire lock %s: %s", lock_key, exc)
+            return True
+
+    async def _unlock(self, redis: Redis, lock_key: str, token: str) -> None:
+        with suppress(Exception):
+            if await redis.get(lock_key) == token:
+                await redis.delete(lock_key)
+
+
+metrics_query_cache = MetricsQueryCache()
+_refresher_tasks: WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task[None]] = WeakKeyDictionary()
+
+
+async def _refresh_hot_keys_forever(interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await metrics_query_cache.refresh_hot_keys()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("metrics cache: hot key refresh failed: %s", exc)
+
+
+def start_metrics_cache_refresher() -> asyncio.Task[None] | None:
+    """
+    在当前事件循环中启动热门指标键的后台刷新任务（幂等）。
+    """
+    if int(settings.metrics_cache_hot_keys) <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    existing = _refresher_tasks.get(loop)
+    if existing is not None and not existing.done():
+        return existing
+    task = loop.create_task(
+        _refresh_hot_keys_forever(float(settings.metrics_cache_refresh_interval_seconds))
+    )
+    _refresher_tasks[loop] = task
+    return task
+
+
+async def stop_metrics_cache_refresher() -> None:
+    loop = asyncio.get_running_loop()
+    task = _refresher_tasks.pop(loop, None)
+    if task is None:
+        return
+    task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+__all__ = [
+    "MetricsQueryCache",
+    "metrics_query_cache",
+    "start_metrics_cache_refresher",
+    "stop_metrics_cache_refresher",
+]
@@ -0,0 +1,197 @@
+"""
+滑动窗口限流：Redis 原子脚本 + 进程内环形缓冲兜底。
+
+供 RateLimitMiddleware（按 IP + 路径）与 provider key 的 QPS 预占（app.provider.key_pool）共用：
+
+- `RedisSlidingWindowLimiter`：一段 Lua 脚本在 Redis 端完成“清理过期 → 计数 → 未超限则占用”，
+  一次 EVALSHA 往返，并发下不会超发；时间取 Redis 服务器的 TIME，避免各 worker 时钟偏差。
+  被拒绝的请求不会写入窗口，不会延长自己的封禁时间；
+- `LocalSlidingWindowLimiter`：每个 key 一个容量为 limit 的时间戳环形队列，只在队头淘汰过期项，
+  单次判断为摊还 O(1)，不再每次重建整条列表。Redis 不可用或客户端不支持脚本时使用。
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+from weakref import WeakKeyDictionary
+
+try:
+    from redis.asyncio import Redis
+except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is missing
+    Redis = object  # type: ignore[misc,assignment]
+
+from app.logging_config import log_sampled, logger
+
+# KEYS[1]: 窗口 ZSET；ARGV[1]: 窗口毫秒数；ARGV[2]: 上限；ARGV[3]: 本次请求的唯一成员名。
+# 返回 {allowed, remaining, reset_at_ms}。
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+  redis.call('ZADD', key, now, ARGV[3])
+  redis.call('PEXPIRE', key, window)
+  return {1, limit - count - 1, now + window}
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local reset_at = now + window
+if oldest[2] then
+  reset_at = tonumber(oldest[2]) + window
+end
+return {0, 0, reset_at}
+"""
+
+_MEMBER_PREFIX = uuid.uuid4().hex[:8]
+_member_seq = itertools.count()
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitDecision:
+    allowed: bool
+    remaining: int
+    # 窗口内最早一次占用过期的时间（epoch 秒）。
+    reset_at: float
+
+
+class _Ring:
+    """容量固定的时间戳环形队列（按写入顺序，队头最旧）。"""
+
+    __slots__ = ("head", "size", "stamps")
+
+    def __init__(self, capacity: int) -> None:
+        self.stamps = [0.0] * capacity
+        self.head = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.stamps)
+
+    def newest(self) -> float:
+        if not self.size:
+            return 0.0
+        return self.stamps[(self.head + self.size - 1) % self.capacity]
+
+
+class LocalSlidingWindowLimiter:
+    """进程内滑动窗口限流（单实例或 Redis 不可用时使用）。"""
+
+    def __init__(self) -> None:
+        self._rings: dict[str, _Ring] = {}
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def acquire(
+        self,
+        key: str,
+        *,
+        limit: int,
+        window_seconds: float,
+        now: float | None = None,
+    ) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        limit = max(1, int(limit))
+        ring = self._rings.get(key)
+        if ring is None or ring.capacity != limit:
+            ring = self._resize(ring, limit)
+            self._rings[key] = ring
+
+        stamps, capacity = ring.stamps, ring.capacity
+        cutoff = now - window_seconds
+        while ring.size and stamps[ring.head] <= cutoff:
+            ring.head = (ring.head + 1) % capacity
+            ring.size -= 1
+
+        if ring.size >= limit:
+            return RateLimitDecision(False, 0, stamps[ring.head] + window_seconds)
+
+        stamps[(ring.head + ring.size) % capacity] = now
+        ring.size += 1
+        return RateLimitDecision(True, limit - ring.size, now + window_seconds)
+
+    @staticmethod
+    def _resize(ring: _Ring | None, capacity: int) -> _Ring:
+        # 上限变化（例如动态调整了网关配置）时保留最新的记录。
+        resized = _Ring(capacity)
+        if ring is None:
+            return resized
+        kept = [ring.stamps[(ring.head + i) % ring.capacity] for i in range(ring.size)][-capacity:]
+        resized.stamps[: len(kept)] = kept
+        resized.size = len(kept)
+        return resized
+
+    def cleanup(self, max_age_seconds: float, *, now: float | None = None) -> int:
+        """移除最近一次占用早于 max_age_seconds 的 key，返回移除数量。"""
+        cutoff = (time.time() if now is None else now) - max_age_seconds
+        stale = [key for key, ring in self._rings.items() if ring.newest() <= cutoff]
+        for key in stale:
+            del self._rings[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._rings.clear()
+
+
+class RedisSlidingWindowLimiter:
+    """
+    基于 Lua 脚本的分布式滑动窗口限流。
+
+    客户端不支持脚本（测试替身等）或 Redis 调用失败时，退回进程内限流，保证请求路径不因限流存储故障而报错。
+    """
+
+    def __init__(self, redis: Redis, *, fallback: LocalSlidingWindowLimiter | None = None) -> None:
+        self.redis = redis
+        self.fallback = fallback or LocalSlidingWindowLimiter()
+        register_script = getattr(redis, "register_script", None)
+        self._script: Any = register_script(SLIDING_WINDOW_LUA) if callable(register_script) else None
+
+    async def acquire(self, key: str, *, limit: int, window_seconds: float) -> RateLimitDecision:
+        if self._script is None:
+            return self.fallback.acquire(key, limit=limit, window_seconds=window_seconds)
+
+        limit = max(1, int(limit))
+        window_ms = max(1, int(window_seconds * 1000))
+        member = f"{_MEMBER_PREFIX}:{next(_member_seq)}"
+        try:
+            allowed, remaining, reset_at_ms = await self._script(keys=[key], args=[window_ms, limit, member])
+        except Exception as exc:
+            log_sampled(
+                logger,
+                "rate_limit.redis_error",
+                "rate limit: redis script failed, using local limiter: %s",
+                exc,
+                level=logging.WARNING,
+            )
+            return self.fallback.acquire(key, limit=limit, window_seconds=window_seconds)
+        return RateLimitDecision(bool(int(allowed)), int(remaining), int(reset_at_ms) / 1000.0)
+
+
+_redis_limiters: WeakKeyDictionary[Any, RedisSlidingWindowLimiter] = WeakKeyDictionary()
+
+
+def get_redis_rate_limiter(redis: Redis) -> RedisSlidingWindowLimiter:
+    """返回与该 Redis 客户端绑定的限流器（脚本 SHA 只计算一次）。"""
+    limiter = _redis_limiters.get(redis)
+    if limiter is None:
+        limiter = RedisSlidingWindowLimiter(redis)
+        _redis_limiters[redis] = limiter
+    return limiter
+
+
+__all__ = [
+    "SLIDING_WINDOW_LUA",
+    "LocalSlidingWindowLimiter",
+    "RateLimitDecision",
+    "RedisSlidingWindowLimiter",
+    "get_redis_rate_limiter",
+]
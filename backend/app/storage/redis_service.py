@@ -8,6 +8,7 @@ does not have to deal with raw Redis keys directly.
 
 from __future__ import annotations
 
+import json
 from typing import Any
 
 try:
@@ -17,6 +18,10 @@ except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is
 
 from app.redis_client import redis_get_json, redis_set_json
 from app.schemas import LogicalModel, MetricsHistory, RoutingMetrics
+from app.storage.routing_l1_cache import (
+    get_routing_l1_cache,
+    publish_routing_cache_invalidation,
+)
 
 # Key templates (must match data-model.md).
 PROVIDER_MODELS_KEY_TEMPLATE = "llm:vendor:{provider_id}:models"
@@ -26,6 +31,27 @@ METRICS_HISTORY_KEY_TEMPLATE = (
     "llm:metrics:history:{logical_model}:{provider_id}:{timestamp}"
 )
 
+# Secondary indexes (kept in sync on every write so reads never need KEYS).
+LOGICAL_MODEL_INDEX_KEY = "llm:index:logical_models"
+LOGICAL_MODEL_INDEX_READY_KEY = "llm:index:logical_models:ready"
+METRICS_INDEX_KEY_TEMPLATE = "llm:index:metrics:{provider_id}"
+# 不能放在 llm:index:metrics:* 下，否则 provider_id 为 "ready" 时与其索引键冲突（WRONGTYPE）。
+METRICS_INDEX_READY_KEY = "llm:index:metrics_ready"
+
+_SCAN_DELETE_BATCH_SIZE = 500
+
+# 只移除数据键仍不存在的索引成员（KEYS[1] 为索引，KEYS[2..] 与 ARGV 一一对应）：
+# 读取到清理之间若有并发写入补回了数据键，对应成员会被保留。
+PRUNE_INDEX_LUA = """
+local removed = 0
+for i = 2, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 0 then
+        removed = removed + redis.call('SREM', KEYS[1], ARGV[i - 1])
+    end
+end
+return removed
+"""
+
 
 async def get_provider_models_json(
     redis: Redis, provider_id: str
@@ -65,18 +91,34 @@ async def set_provider_models(
 
 
 async def get_logical_model(redis: Redis, logical_model_id: str) -> LogicalModel | None:
+    """
+    读取逻辑模型；优先命中进程内 L1 缓存（含不存在的负缓存）。
+    """
     key = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model=logical_model_id)
+    cache = get_routing_l1_cache()
+    if cache is not None:
+        hit, cached = cache.get(key)
+        if hit:
+            return cached
+
     data = await redis_get_json(redis, key)
-    if not data:
-        return None
-    return LogicalModel.model_validate(data)
+    logical_model = LogicalModel.model_validate(data) if data else None
+    if cache is not None:
+        cache.put(key, logical_model)
+    return logical_model
 
 
 async def set_logical_model(
-    redis: Redis, logical_model: LogicalModel
+    redis: Redis, logical_model: LogicalModel, *, publish_invalidation: bool = True
 ) -> None:
+    """
+    写入逻辑模型并广播 L1 失效；批量写入方可关闭 publish_invalidation 后自行合并广播。
+    """
     key = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model=logical_model.logical_id)
     await redis_set_json(redis, key, logical_model.model_dump(), ttl_seconds=None)
+    await redis.sadd(LOGICAL_MODEL_INDEX_KEY, logical_model.logical_id)  # type: ignore[attr-defined]
+    if publish_invalidation:
+        await publish_routing_cache_invalidation(redis, keys=[key])
 
 
 async def delete_logical_model(redis: Redis, logical_model_id: str) -> int:
@@ -85,41 +127,124 @@ async def delete_logical_model(redis: Redis, logical_model_id: str) -> int:
     """
 
     key = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model=logical_model_id)
-    return int(await redis.delete(key))  # type: ignore[attr-defined]
+    deleted = int(await redis.delete(key))  # type: ignore[attr-defined]
+    await redis.srem(LOGICAL_MODEL_INDEX_KEY, logical_model_id)  # type: ignore[attr-defined]
+    await publish_routing_cache_invalidation(redis, keys=[key])
+    return deleted
+
+
+async def scan_keys(redis: Redis, pattern: str, *, count: int = 500) -> list[str]:
+    """
+    使用基于游标的 SCAN 收集匹配 pattern 的 key（替代会阻塞 Redis 的 KEYS）。
+    """
+    keys: list[str] = []
+    async for key in redis.scan_iter(match=pattern, count=count):  # type: ignore[attr-defined]
+        keys.append(key)
+    return keys
+
+
+async def _prune_index(redis: Redis, index_key: str, stale: dict[str, str]) -> None:
+    """
+    从索引集合中移除数据键已不存在的成员；stale 为 {数据键: 索引成员}。
+    """
+    register_script = getattr(redis, "register_script", None)
+    if not callable(register_script):
+        # 不支持脚本的客户端（测试替身等）：直接移除。
+        await redis.srem(index_key, *stale.values())  # type: ignore[attr-defined]
+        return
+    await register_script(PRUNE_INDEX_LUA)(keys=[index_key, *stale], args=list(stale.values()))
+
+
+async def _ensure_logical_model_index(redis: Redis) -> None:
+    """
+    首次使用时用 SCAN 把已有的 llm:logical:* 键补进索引集合（兼容索引上线前写入的数据）。
+    """
+    if await redis.exists(LOGICAL_MODEL_INDEX_READY_KEY):  # type: ignore[attr-defined]
+        return
+    prefix = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model="")
+    keys = await scan_keys(redis, LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model="*"))
+    logical_ids = [key[len(prefix) :] for key in keys]
+    if logical_ids:
+        await redis.sadd(LOGICAL_MODEL_INDEX_KEY, *logical_ids)  # type: ignore[attr-defined]
+    await redis.set(LOGICAL_MODEL_INDEX_READY_KEY, "1")  # type: ignore[attr-defined]
+
+
+async def _ensure_metrics_index(redis: Redis) -> None:
+    """
+    首次使用时用 SCAN 把已有的 llm:metrics:{logical_model}:{provider_id} 键补进按 provider 的索引。
+    """
+    if await redis.exists(METRICS_INDEX_READY_KEY):  # type: ignore[attr-defined]
+        return
+    prefix = METRICS_KEY_TEMPLATE.split("{", 1)[0]
+    history_prefix = METRICS_HISTORY_KEY_TEMPLATE.split("{", 1)[0]
+    by_provider: dict[str, list[str]] = {}
+    for key in await scan_keys(redis, f"{prefix}*"):
+        if key.startswith(history_prefix):
+            continue
+        logical_model, sep, provider_id = key[len(prefix) :].rpartition(":")
+        if not sep or not logical_model or not provider_id:
+            continue
+        by_provider.setdefault(provider_id, []).append(logical_model)
+    for provider_id, logical_models in by_provider.items():
+        await redis.sadd(  # type: ignore[attr-defined]
+            METRICS_INDEX_KEY_TEMPLATE.format(provider_id=provider_id), *logical_models
+        )
+    await redis.set(METRICS_INDEX_READY_KEY, "1")  # type: ignore[attr-defined]
 
 
 async def list_logical_models(redis: Redis) -> list[LogicalModel]:
     """
     List all logical models stored under llm:logical:*.
-    This uses a simple KEYS-based scan for now; it can be refined to SCAN
-    if the keyspace grows large.
+
+    逻辑模型 ID 维护在索引集合中，读取时一次 SMEMBERS + 一次 MGET；
+    索引中已不存在的键会被顺带清理。
     """
-    pattern = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model="*")
-    keys = await redis.keys(pattern)  # type: ignore[attr-defined]
+    await _ensure_logical_model_index(redis)
+    logical_ids = sorted(await redis.smembers(LOGICAL_MODEL_INDEX_KEY))  # type: ignore[attr-defined]
+    if not logical_ids:
+        return []
+
+    keys = [LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model=lid) for lid in logical_ids]
+    raws = await redis.mget(keys)  # type: ignore[attr-defined]
     models: list[LogicalModel] = []
-    for key in keys:
-        data = await redis_get_json(redis, key)
-        if not data:
+    stale: dict[str, str] = {}
+    for key, logical_id, raw in zip(keys, logical_ids, raws, strict=True):
+        if raw is None:
+            stale[key] = logical_id
             continue
         try:
-            models.append(LogicalModel.model_validate(data))
+            models.append(LogicalModel.model_validate(json.loads(raw)))
         except Exception:
             # Skip malformed entries; callers can inspect logs separately
             continue
+    if stale:
+        await _prune_index(redis, LOGICAL_MODEL_INDEX_KEY, stale)
     return models
 
 
 async def invalidate_logical_models_cache(redis: Redis) -> int:
     """
     清空所有逻辑模型缓存，用于 Provider 创建/更新后触发缓存失效。
-    
+
+    属于低频维护操作：用游标 SCAN（而非 KEYS）找出全部 llm:logical:* 键，
+    连同索引外的遗留键一并删除，并同步清理索引集合。
+
     返回删除的键数量。
     """
-    pattern = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model="*")
-    keys = await redis.keys(pattern)  # type: ignore[attr-defined]
-    if not keys:
-        return 0
-    return int(await redis.delete(*keys))  # type: ignore[attr-defined]
+    prefix = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model="")
+    keys = await scan_keys(redis, LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model="*"))
+    deleted = 0
+    for start in range(0, len(keys), _SCAN_DELETE_BATCH_SIZE):
+        batch = keys[start : start + _SCAN_DELETE_BATCH_SIZE]
+        deleted += int(await redis.delete(*batch))  # type: ignore[attr-defined]
+        # 只移除本次删除的成员，避免吞掉并发写入的新逻辑模型。
+        await redis.srem(  # type: ignore[attr-defined]
+            LOGICAL_MODEL_INDEX_KEY, *[key[len(prefix) :] for key in batch]
+        )
+    # 删除完成后再广播：先广播会让其它 worker 重新读到尚未删除的旧键并缓存一个 L1 TTL。
+    # 即使 Redis 中已无键，也要清理各 worker 的 L1（可能存在负缓存）。
+    await publish_routing_cache_invalidation(redis, prefix=prefix)
+    return deleted
 
 
 async def get_routing_metrics(
@@ -128,10 +253,17 @@ async def get_routing_metrics(
     key = METRICS_KEY_TEMPLATE.format(
         logical_model=logical_model_id, provider_id=provider_id
     )
+    cache = get_routing_l1_cache()
+    if cache is not None:
+        hit, cached = cache.get(key)
+        if hit:
+            return cached
+
     data = await redis_get_json(redis, key)
-    if not data:
-        return None
-    return RoutingMetrics.model_validate(data)
+    metrics = RoutingMetrics.model_validate(data) if data else None
+    if cache is not None:
+        cache.put(key, metrics)
+    return metrics
 
 
 async def get_all_provider_metrics(
@@ -140,25 +272,33 @@ async def get_all_provider_metrics(
     """
     获取指定 provider 在所有逻辑模型下的路由指标。
     
-    扫描 Redis 中所有匹配 llm:metrics:*:{provider_id} 的 key，
-    并返回解析后的 RoutingMetrics 列表。
+    通过按 provider 维护的索引集合找到相关逻辑模型，再一次 MGET 读取，
+    并返回解析后的 RoutingMetrics 列表；已过期的索引成员会被顺带清理。
     """
-    pattern = f"llm:metrics:*:{provider_id}"
-    keys = await redis.keys(pattern)  # type: ignore[attr-defined]
-
-    if not keys:
+    await _ensure_metrics_index(redis)
+    index_key = METRICS_INDEX_KEY_TEMPLATE.format(provider_id=provider_id)
+    logical_models = sorted(await redis.smembers(index_key))  # type: ignore[attr-defined]
+    if not logical_models:
         return []
 
+    keys = [
+        METRICS_KEY_TEMPLATE.format(logical_model=lm, provider_id=provider_id)
+        for lm in logical_models
+    ]
+    raws = await redis.mget(keys)  # type: ignore[attr-defined]
     metrics_list: list[RoutingMetrics] = []
-    for key in keys:
-        data = await redis_get_json(redis, key)
-        if data:
-            try:
-                metrics = RoutingMetrics.model_validate(data)
-                metrics_list.append(metrics)
-            except Exception:
-                # 跳过无效的数据
-                continue
+    stale: dict[str, str] = {}
+    for key, logical_model, raw in zip(keys, logical_models, raws, strict=True):
+        if raw is None:
+            stale[key] = logical_model
+            continue
+        try:
+            metrics_list.append(RoutingMetrics.model_validate(json.loads(raw)))
+        except Exception:
+            # 跳过无效的数据
+            continue
+    if stale:
+        await _prune_index(redis, index_key, stale)
 
     return metrics_list
 
@@ -169,7 +309,18 @@ async def set_routing_metrics(
     key = METRICS_KEY_TEMPLATE.format(
         logical_model=metrics.logical_model, provider_id=metrics.provider_id
     )
-    await redis_set_json(redis, key, metrics.model_dump(), ttl_seconds=ttl_seconds)
+    index_key = METRICS_INDEX_KEY_TEMPLATE.format(provider_id=metrics.provider_id)
+    # 指标与索引在同一个 pipeline 中写入（一次往返）；索引随最新一次写入续期，
+    # 长期无写入的 provider 索引会自然过期。
+    pipe = redis.pipeline(transaction=False)  # type: ignore[attr-defined]
+    pipe.set(key, json.dumps(metrics.model_dump(mode="json"), ensure_ascii=False), ex=ttl_seconds)
+    pipe.sadd(index_key, metrics.logical_model)
+    pipe.expire(index_key, ttl_seconds)
+    await pipe.execute()
+    # 指标写入频繁，只失效本进程条目；其它 worker 依赖短 TTL 收敛。
+    cache = get_routing_l1_cache()
+    if cache is not None:
+        cache.invalidate([key])
 
 
 async def append_metrics_history(
@@ -184,10 +335,13 @@ async def append_metrics_history(
 
 
 __all__ = [
+    "LOGICAL_MODEL_INDEX_KEY",
     "LOGICAL_MODEL_KEY_TEMPLATE",
     "METRICS_HISTORY_KEY_TEMPLATE",
+    "METRICS_INDEX_KEY_TEMPLATE",
     "METRICS_KEY_TEMPLATE",
     "PROVIDER_MODELS_KEY_TEMPLATE",
+    "PRUNE_INDEX_LUA",
     "append_metrics_history",
     "delete_logical_model",
     "get_all_provider_metrics",
@@ -196,6 +350,7 @@ __all__ = [
     "get_routing_metrics",
     "invalidate_logical_models_cache",
     "list_logical_models",
+    "scan_keys",
     "set_logical_model",
     "set_provider_models",
     "set_routing_metrics",
@@ -0,0 +1,211 @@
+"""
+热路径小写入的 Redis 合并器（每个 Redis 客户端 / 事件循环一个）。
+
+请求日志（LPUSH + LTRIM + EXPIRE）与 provider 动态权重微调（ZADD NX + ZINCRBY）
+过去每次请求各自发起多次往返，权重微调还为每个结果单独起一个后台任务。合并器把
+这些写入先放进内存，等待 REDIS_WRITE_COALESCE_MS 后用一个非事务 pipeline 批量写出：
+
+- 同一列表的多条 LPUSH 合并为一条，LTRIM / EXPIRE 每批只发一次；
+- 同一 (zset, member) 的增量先在本地求和，再做一次 ZINCRBY，最后按调用方给出的
+  钳制函数校正（超出范围时再补一条 ZADD）；
+- 任意时刻最多只有一个 flush 任务，突发流量下后台任务数量有界；
+  积压达到 REDIS_WRITE_COALESCE_MAX_PENDING 时立即写出。
+
+写入是 best-effort：Redis 异常只记录日志并丢弃该批数据，与原先的语义一致。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+from weakref import WeakKeyDictionary
+
+try:
+    from redis.asyncio import Redis
+except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is missing
+    Redis = object  # type: ignore[misc,assignment]
+
+from app.logging_config import logger
+from app.settings import settings
+
+
+@dataclass
+class _ListPush:
+    values: list[str]
+    max_length: int
+    ttl_seconds: int | None
+
+
+@dataclass
+class _ZSetIncrement:
+    delta: float
+    default: float
+    clamp: Callable[[float], float] | None
+
+
+class RedisWriteCoalescer:
+    """收集小写入并在短暂延迟后合并为一次 pipeline。"""
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        flush_interval_seconds: float | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        self._redis = redis
+        self._interval = float(
+            settings.redis_write_coalesce_ms / 1000.0
+            if flush_interval_seconds is None
+            else flush_interval_seconds
+        )
+        self._max_pending = max(
+            1, int(settings.redis_write_coalesce_max_pending if max_pending is None else max_pending)
+        )
+        self._lists: dict[str, _ListPush] = {}
+        self._zsets: dict[tuple[str, str], _ZSetIncrement] = {}
+        self._pending = 0
+        self._full = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def push_list(self, key: str, value: str, *, max_length: int, ttl_seconds: int | None = None) -> None:
+        """LPUSH value 到 key，并在写出时裁剪到 max_length 条、刷新 TTL。"""
+        entry = self._lists.get(key)
+        if entry is None:
+            self._lists[key] = _ListPush(values=[value], max_length=max_length, ttl_seconds=ttl_seconds)
+        else:
+            entry.values.append(value)
+            entry.max_length = max_length
+            entry.ttl_seconds = ttl_seconds
+        self._added()
+
+    def incr_zset(
+        self,
+        key: str,
+        member: str,
+        delta: float,
+        *,
+        default: float,
+        clamp: Callable[[float], float] | None = None,
+    ) -> None:
+        """
+        ZINCRBY key delta member；member 不存在时先以 default 初始化（ZADD NX），
+        写出后若结果超出 clamp 的范围则写回钳制后的值。
+        """
+        slot = (key, member)
+        entry = self._zsets.get(slot)
+        if entry is None:
+            self._zsets[slot] = _ZSetIncrement(delta=delta, default=default, clamp=clamp)
+        else:
+            entry.delta += delta
+            entry.default = default
+            entry.clamp = clamp
+        self._added()
+
+    def _added(self) -> None:
+        self._pending += 1
+        if self._pending >= self._max_pending:
+            self._full.set()
+        if self._task is None or self._task.done():
+            self.loop = asyncio.get_running_loop()
+            self._task = self.loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        if not self._full.is_set() and self._interval > 0:
+            with suppress(TimeoutError):
+                async with asyncio.timeout(self._interval):
+                    await self._full.wait()
+        try:
+            await self.flush()
+        finally:
+            self._task = None
+        if self._pending:
+            # flush 期间又有新写入：继续下一轮。
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """立即写出当前缓冲的所有写入。"""
+        lists, self._lists = self._lists, {}
+        zsets, self._zsets = self._zsets, {}
+        self._pending = 0
+        self._full.clear()
+        if not lists and not zsets:
+            return
+
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, push in lists.items():
+                pipe.lpush(key, *push.values)
+                pipe.ltrim(key, 0, push.max_length - 1)
+                if push.ttl_seconds is not None:
+                    pipe.expire(key, push.ttl_seconds)
+            incr_slots: list[tuple[int, tuple[str, str], _ZSetIncrement]] = []
+            index = sum(2 + (push.ttl_seconds is not None) for push in lists.values())
+            for slot, incr in zsets.items():
+                key, member = slot
+                pipe.zadd(key, {member: incr.default}, nx=True)
+                pipe.zincrby(key, incr.delta, member)
+                incr_slots.append((index + 1, slot, incr))
+                index += 2
+            results = await pipe.execute()
+
+            fixes: list[tuple[str, str, float]] = []
+            for result_index, (key, member), incr in incr_slots:
+                if incr.clamp is None:
+                    continue
+                updated = float(results[result_index])
+                clamped = incr.clamp(updated)
+                if clamped != updated:
+                    fixes.append((key, member, clamped))
+            if fixes:
+                pipe = self._redis.pipeline(transaction=False)
+                for key, member, clamped in fixes:
+                    pipe.zadd(key, {member: clamped})
+                await pipe.execute()
+        except Exception:
+            logger.debug(
+                "redis write coalescer: dropped batch (lists=%d zsets=%d)",
+                len(lists),
+                len(zsets),
+                exc_info=True,
+            )
+
+
+_coalescers: WeakKeyDictionary[Any, RedisWriteCoalescer] = WeakKeyDictionary()
+
+
+def redis_write_coalescing_enabled() -> bool:
+    return int(settings.redis_write_coalesce_ms) > 0
+
+
+def get_redis_write_coalescer(redis: Redis) -> RedisWriteCoalescer:
+    """返回与该 Redis 客户端绑定的合并器（Redis 客户端本身按事件循环隔离）。"""
+    coalescer = _coalescers.get(redis)
+    if coalescer is None:
+        coalescer = RedisWriteCoalescer(redis)
+        _coalescers[redis] = coalescer
+    return coalescer
+
+
+async def flush_redis_write_coalescers() -> None:
+    """写出当前事件循环上所有合并器的缓冲（应用关闭 / 任务 loop 结束前调用）。"""
+    loop = asyncio.get_running_loop()
+    for coalescer in list(_coalescers.values()):
+        if coalescer.loop is loop and coalescer.pending:
+            await coalescer.flush()
+
+
+__all__ = [
+    "RedisWriteCoalescer",
+    "flush_redis_write_coalescers",
+    "get_redis_write_coalescer",
+    "redis_write_coalescing_enabled",
+]
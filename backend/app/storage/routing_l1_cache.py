@@ -0,0 +1,278 @@
+"""
+路由热路径的进程内 L1 缓存。
+
+缓存 Redis 中逻辑模型（llm:logical:*）与路由指标（llm:metrics:*）的解析结果，
+避免每次请求都访问 Redis 并重复执行 Pydantic 校验：
+- 有界 LRU + 短 TTL：TTL 是兜底，保证即使错过失效消息也只会短暂读到旧值；
+- 跨 worker 失效：写入方通过 Redis pub/sub 广播失效的 key / 前缀，各进程的监听任务清理本地条目；
+- 负缓存：Redis 中不存在的逻辑模型同样会被缓存（动态逻辑模型的常见路径）。
+
+缓存对象在进程内共享，调用方应视为只读。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from typing import Any
+from weakref import WeakKeyDictionary
+
+try:
+    from redis.asyncio import Redis
+except ModuleNotFoundError:  # pragma: no cover - type placeholder when redis is missing
+    Redis = object  # type: ignore[misc,assignment]
+
+from app.logging_config import logger
+from app.settings import settings
+
+INVALIDATION_CHANNEL = "llm:routing_l1:invalidate"
+
+_MISSING = object()
+
+
+@dataclass
+class RoutingL1CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class RoutingL1Cache:
+    """
+    线程安全的 LRU + TTL 缓存；值可以为 None（负缓存）。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.stats = RoutingL1CacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """
+        返回 (命中, 值)；值为 None 表示命中了负缓存。
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def invalidate(self, keys: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, _MISSING) is not _MISSING:
+                    removed += 1
+            self.stats.invalidations += removed
+        return removed
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            self.stats.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self.stats.invalidations += removed
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: RoutingL1Cache | None = None
+_listener_tasks: WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task[None]] = (
+    WeakKeyDictionary()
+)
+
+
+def get_routing_l1_cache() -> RoutingL1Cache | None:
+    """
+    返回进程级 L1 缓存；未启用时返回 None。
+    """
+    global _cache
+    if not settings.routing_l1_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = RoutingL1Cache(
+            max_entries=int(settings.routing_l1_cache_max_entries),
+            ttl_seconds=float(settings.routing_l1_cache_ttl_seconds),
+        )
+    return _cache
+
+
+def reset_routing_l1_cache() -> None:
+    """
+    丢弃当前进程的 L1 缓存（测试或配置变更后使用）。
+    """
+    global _cache
+    _cache = None
+
+
+def _apply_invalidation(message: dict[str, Any]) -> None:
+    cache = get_routing_l1_cache()
+    if cache is None:
+        return
+    keys = message.get("keys")
+    if isinstance(keys, list) and keys:
+        cache.invalidate(str(k) for k in keys)
+    prefix = message.get("prefix")
+    if isinstance(prefix, str) and prefix:
+        cache.invalidate_prefix(prefix)
+
+
+async def publish_routing_cache_invalidation(
+    redis: Redis,
+    *,
+    keys: Iterable[str] | None = None,
+    prefix: str | None = None,
+) -> None:
+    """
+    本地立即失效，并通过 pub/sub 通知其它 worker（失败时仅记录日志，依赖 TTL 兜底）。
+    """
+    message: dict[str, Any] = {}
+    key_list = [str(k) for k in keys] if keys is not None else []
+    if key_list:
+        message["keys"] = key_list
+    if prefix:
+        message["prefix"] = prefix
+    if not message:
+        return
+
+    _apply_invalidation(message)
+    if not settings.routing_l1_cache_enabled:
+        return
+    try:
+        await redis.publish(INVALIDATION_CHANNEL, json.dumps(message))  # type: ignore[attr-defined]
+    except Exception as exc:  # pragma: no cover - Redis 可用性问题不影响写入
+        logger.debug("routing L1 cache invalidation publish failed: %s", exc)
+
+
+def _decode_message(data: Any) -> dict[str, Any] | None:
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8", errors="ignore")
+    if not isinstance(data, str):
+        return None
+    try:
+        parsed = json.loads(data)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+async def _listen_forever(redis: Redis, *, retry_seconds: float) -> None:
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis.pubsub()  # type: ignore[attr-defined]
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # 订阅建立前可能错过失效消息，重新订阅时清空本地缓存。
+            cache = get_routing_l1_cache()
+            if cache is not None:
+                cache.clear()
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if isinstance(msg, dict) and msg.get("type") == "message":
+                    decoded = _decode_message(msg.get("data"))
+                    if decoded is not None:
+                        _apply_invalidation(decoded)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("routing L1 cache invalidation listener error: %s", exc)
+            await asyncio.sleep(retry_seconds)
+        finally:
+            if pubsub is not None:
+                with suppress(Exception):
+                    await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+                with suppress(Exception):
+                    close = getattr(pubsub, "aclose", None) or pubsub.close
+                    await close()
+
+
+def start_routing_cache_invalidation_listener(
+    redis: Redis, *, retry_seconds: float = 1.0
+) -> asyncio.Task[None] | None:
+    """
+    在当前事件循环中启动失效消息监听任务（幂等）。
+    """
+    if not settings.routing_l1_cache_enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    task = _listener_tasks.get(loop)
+    if task is not None and not task.done():
+        return task
+    task = loop.create_task(_listen_forever(redis, retry_seconds=retry_seconds))
+    _listener_tasks[loop] = task
+    return task
+
+
+async def stop_routing_cache_invalidation_listener() -> None:
+    loop = asyncio.get_running_loop()
+    task = _listener_tasks.pop(loop, None)
+    if task is None:
+        return
+    task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+def get_routing_l1_cache_stats() -> dict[str, Any]:
+    cache = get_routing_l1_cache()
+    if cache is None:
+        return {"enabled": False, "entries": 0, **asdict(RoutingL1CacheStats())}
+    return {"enabled": True, "entries": len(cache), **asdict(cache.stats)}
+
+
+__all__ = [
+    "INVALIDATION_CHANNEL",
+    "RoutingL1Cache",
+    "RoutingL1CacheStats",
+    "get_routing_l1_cache",
+    "get_routing_l1_cache_stats",
+    "publish_routing_cache_invalidation",
+    "reset_routing_l1_cache",
+    "start_routing_cache_invalidation_listener",
+    "stop_routing_cache_invalidation_listener",
+]
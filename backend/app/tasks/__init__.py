@@ -9,14 +9,14 @@ Celery 任务定义入口。
   后续可以扩展为定时任务或在 Provider 变更后触发。
 """
 
-import asyncio
 from collections.abc import Sequence
 
 from celery import shared_task
 
 from app.logging_config import logger
-from app.redis_client import close_redis_client_for_current_loop, get_redis_client
+from app.redis_client import get_redis_client
 from app.services.logical_model_sync import sync_logical_models
+from app.worker_loop import run_async
 
 
 @shared_task(name="tasks.debug_ping")
@@ -46,19 +46,16 @@ def sync_logical_models_task(provider_ids: Sequence[str] | None = None) -> int:
 
     async def _run() -> int:
         redis = get_redis_client()
-        try:
-            logical_models = await sync_logical_models(redis, provider_ids=provider_ids)
-            logger.info(
-                "Celery sync_logical_models_task finished: %d logical models synced (providers=%s)",
-                len(logical_models),
-                list(provider_ids) if provider_ids is not None else "ALL",
-            )
-            return len(logical_models)
-        finally:
-            await close_redis_client_for_current_loop()
+        logical_models = await sync_logical_models(redis, provider_ids=provider_ids)
+        logger.info(
+            "Celery sync_logical_models_task finished: %d logical models synced (providers=%s)",
+            len(logical_models),
+            list(provider_ids) if provider_ids is not None else "ALL",
+        )
+        return len(logical_models)
 
     # 在 Celery 同步任务中执行异步逻辑。
-    return asyncio.run(_run())
+    return run_async(_run())
 
 
 __all__ = ["debug_ping", "sync_logical_models_task"]
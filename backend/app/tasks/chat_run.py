@@ -12,13 +12,12 @@ from sqlalchemy import select
 
 from app.auth import AuthenticatedAPIKey
 from app.db.session import SessionLocal
-from app.http_client import CurlCffiClient
+from app.http_client_pool import upstream_http_client
 from app.jwt_auth import AuthenticatedUser
 from app.logging_config import logger
 from app.models import APIKey, AssistantPreset, Conversation, Message, Run, User
-from app.redis_client import close_redis_client_for_current_loop, get_redis_client
+from app.redis_client import get_redis_client
 from app.repositories.chat_repository import persist_run, refresh_run
-from app.repositories.run_event_repository import append_run_event
 from app.services.bridge_gateway_client import BridgeGatewayClient
 from app.services.bridge_tool_runner import bridge_tools_by_agent_to_openai_tools, invoke_bridge_tool_and_wait
 from app.services.chat_history_service import (
@@ -33,16 +32,12 @@ from app.services.project_eval_config_service import (
     get_or_default_project_eval_config,
     resolve_project_context,
 )
-from app.services.run_event_bus import build_run_event_envelope, publish_run_event_best_effort
+from app.services.run_event_writer import RunEventWriter
 from app.services.run_cancel_service import is_run_canceled
 from app.services.tool_loop_runner import ToolLoopRunner, split_text_into_deltas
 from app.services.eval_service import execute_run_stream
 from app.settings import settings
-
-try:
-    from redis.asyncio import Redis
-except ModuleNotFoundError:  # pragma: no cover
-    Redis = object  # type: ignore[misc,assignment]
+from app.worker_loop import run_async
 
 
 def _to_authenticated_user(user: User) -> AuthenticatedUser:
@@ -98,38 +93,6 @@ def _run_to_summary(run: Run) -> dict[str, Any]:
     }
 
 
-def _append_run_event_and_publish_best_effort(
-    db,
-    *,
-    redis: Redis | None,
-    run_id: UUID,
-    event_type: str,
-    payload: dict[str, Any],
-) -> int | None:
-    try:
-        row = append_run_event(db, run_id=run_id, event_type=event_type, payload=payload)
-        created_at_iso = None
-        try:
-            created_at_iso = row.created_at.isoformat() if getattr(row, "created_at", None) is not None else None
-        except Exception:
-            created_at_iso = None
-        publish_run_event_best_effort(
-            redis,
-            run_id=run_id,
-            envelope=build_run_event_envelope(
-                run_id=run_id,
-                seq=int(getattr(row, "seq", 0) or 0),
-                event_type=str(getattr(row, "event_type", event_type) or event_type),
-                created_at_iso=created_at_iso,
-                payload=payload,
-            ),
-        )
-        return int(getattr(row, "seq", 0) or 0)
-    except Exception:  # pragma: no cover - best-effort only
-        logger.debug("chat_run task: append_run_event failed (run_id=%s type=%s)", run_id, event_type, exc_info=True)
-        return None
-
-
 async def _build_tool_name_map_for_payload(
     *,
     payload: dict[str, Any],
@@ -179,13 +142,14 @@ async def execute_chat_run(
     """
     执行一个 chat run（在 Celery worker 中运行）：
     - LLM 调用与 tool loop 在 worker 内完成；
-    - 过程事件写入 RunEvent（DB 真相）并同步发布到 Redis 热通道；
+    - 过程事件由 RunEventWriter 分配序号后立即发布到 Redis 热通道，并批量落库为 RunEvent（DB 真相）；
     - streaming=True 时，会持续写入 message.delta 事件（供 SSE 转发/回放）。
     """
     run_uuid = UUID(str(run_id))
     SessionFactory = SessionLocal
 
     redis = get_redis_client()
+    events = RunEventWriter(SessionFactory, redis=redis, run_id=run_uuid)
     try:
         with SessionFactory() as db:
             run = db.get(Run, run_uuid)
@@ -227,11 +191,7 @@ async def execute_chat_run(
 
             bridge_agent_ids = list(effective_bridge_agent_ids or [])
 
-        async with CurlCffiClient(
-            timeout=settings.upstream_timeout,
-            impersonate="chrome120",
-            trust_env=True,
-        ) as client:
+        async with upstream_http_client(request_timeout=settings.upstream_timeout) as client:
             with SessionFactory() as db:
                 run = db.get(Run, run_uuid)
                 if run is None:
@@ -273,17 +233,11 @@ async def execute_chat_run(
                 db.commit()
                 db.refresh(run)
 
-                _append_run_event_and_publish_best_effort(
-                    db,
-                    redis=redis,
-                    run_id=UUID(str(run.id)),
+                await events.append(
                     event_type="run.canceled",
                     payload={"type": "run.canceled", "run_id": str(run.id)},
                 )
-                _append_run_event_and_publish_best_effort(
-                    db,
-                    redis=redis,
-                    run_id=UUID(str(run.id)),
+                await events.append(
                     event_type="message.failed",
                     payload={
                         "type": "message.failed",
@@ -376,13 +330,7 @@ async def execute_chat_run(
                         invoke_tool=_invoke_tool,
                         call_model=_call_model,
                         cancel_tool=_cancel_tool,
-                        event_sink=lambda et, p: _append_run_event_and_publish_best_effort(
-                            db,
-                            redis=redis,
-                            run_id=UUID(str(run.id)),
-                            event_type=et,
-                            payload=p,
-                        ),
+                        event_sink=events.append,
                     )
 
                     result = await runner.run(
@@ -447,10 +395,7 @@ async def execute_chat_run(
                             exc_info=True,
                         )
 
-                _append_run_event_and_publish_best_effort(
-                    db,
-                    redis=redis,
-                    run_id=UUID(str(run.id)),
+                await events.append(
                     event_type="message.completed" if run.status == "succeeded" else "message.failed",
                     payload={
                         "type": "message.completed" if run.status == "succeeded" else "message.failed",
@@ -491,10 +436,7 @@ async def execute_chat_run(
                     delta = item.get("delta")
                     if isinstance(delta, str) and delta:
                         parts.append(delta)
-                        _append_run_event_and_publish_best_effort(
-                            db,
-                            redis=redis,
-                            run_id=UUID(str(run.id)),
+                        await events.append(
                             event_type="message.delta",
                             payload={
                                 "type": "message.delta",
@@ -506,10 +448,7 @@ async def execute_chat_run(
                         )
                 elif itype == "run.error":
                     errored = True
-                    _append_run_event_and_publish_best_effort(
-                        db,
-                        redis=redis,
-                        run_id=UUID(str(run.id)),
+                    await events.append(
                         event_type="message.error",
                         payload={
                             "type": "message.error",
@@ -583,13 +522,7 @@ async def execute_chat_run(
                     invoke_tool=_invoke_tool,
                     call_model=_call_model,
                     cancel_tool=_cancel_tool,
-                    event_sink=lambda et, p: _append_run_event_and_publish_best_effort(
-                        db,
-                        redis=redis,
-                        run_id=UUID(str(run.id)),
-                        event_type=et,
-                        payload=p,
-                    ),
+                    event_sink=events.append,
                 )
 
                 result = await runner.run(
@@ -639,10 +572,7 @@ async def execute_chat_run(
                             pace_s = min(0.05, 0.9 / float(len(chunks)))
                         for idx, chunk in enumerate(chunks):
                             parts.append(chunk)
-                            _append_run_event_and_publish_best_effort(
-                                db,
-                                redis=redis,
-                                run_id=UUID(str(run.id)),
+                            await events.append(
                                 event_type="message.delta",
                                 payload={
                                     "type": "message.delta",
@@ -681,10 +611,7 @@ async def execute_chat_run(
                         exc_info=True,
                     )
 
-            _append_run_event_and_publish_best_effort(
-                db,
-                redis=redis,
-                run_id=UUID(str(run.id)),
+            await events.append(
                 event_type="message.completed" if run.status == "succeeded" else "message.failed",
                 payload={
                     "type": "message.completed" if run.status == "succeeded" else "message.failed",
@@ -696,7 +623,7 @@ async def execute_chat_run(
             )
             return "done"
     finally:
-        await close_redis_client_for_current_loop()
+        await events.aclose()
 
 
 @shared_task(name="tasks.execute_chat_run")
@@ -707,7 +634,7 @@ def execute_chat_run_task(
     streaming: bool = False,
 ) -> str:
     try:
-        return asyncio.run(
+        return run_async(
             execute_chat_run(
                 run_id=run_id,
                 assistant_message_id=assistant_message_id,
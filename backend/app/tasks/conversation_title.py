@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 from contextlib import asynccontextmanager
 from typing import Any
 from uuid import UUID
@@ -9,11 +8,11 @@ from celery import shared_task
 from sqlalchemy import select
 
 from app.db.session import SessionLocal
-from app.http_client import CurlCffiClient
+from app.http_client_pool import upstream_http_client
 from app.jwt_auth import AuthenticatedUser
 from app.logging_config import logger
 from app.models import APIKey, AssistantPreset, Conversation, Message, User
-from app.redis_client import close_redis_client_for_current_loop, get_redis_client
+from app.redis_client import get_redis_client
 from app.services.chat_app_service import _maybe_auto_title_conversation
 from app.services.project_eval_config_service import (
     DEFAULT_PROVIDER_SCOPES,
@@ -21,6 +20,7 @@ from app.services.project_eval_config_service import (
     get_or_default_project_eval_config,
 )
 from app.settings import settings
+from app.worker_loop import run_async
 
 try:
     from redis.asyncio import Redis
@@ -38,11 +38,7 @@ def _get_title_redis() -> Redis:
 
 @asynccontextmanager
 async def _title_http_client():
-    async with CurlCffiClient(
-        timeout=settings.upstream_timeout,
-        impersonate="chrome120",
-        trust_env=True,
-    ) as client:
+    async with upstream_http_client(request_timeout=settings.upstream_timeout) as client:
         yield client
 
 
@@ -112,31 +108,28 @@ async def generate_conversation_title(
         )
 
         redis = _get_title_redis()
-        try:
-            async with _title_http_client() as client:
-                def _safe_user_text(value: Any) -> str:
-                    if isinstance(value, str):
-                        return value
-                    if isinstance(value, dict):
-                        text = value.get("text")
-                        if isinstance(text, str):
-                            return text
-                    return ""
-
-                await _maybe_auto_title_conversation(
-                    db,
-                    redis=redis,
-                    client=client,
-                    current_user=auth_user,
-                    conv=conv,
-                    assistant=assistant,
-                    effective_provider_ids=effective_provider_ids,
-                    user_text=_safe_user_text(message.content),
-                    user_sequence=int(message.sequence or 0),
-                    requested_model_for_title_fallback=requested_model_for_title_fallback or "",
-                )
-        finally:
-            await close_redis_client_for_current_loop()
+        async with _title_http_client() as client:
+            def _safe_user_text(value: Any) -> str:
+                if isinstance(value, str):
+                    return value
+                if isinstance(value, dict):
+                    text = value.get("text")
+                    if isinstance(text, str):
+                        return text
+                return ""
+
+            await _maybe_auto_title_conversation(
+                db,
+                redis=redis,
+                client=client,
+                current_user=auth_user,
+                conv=conv,
+                assistant=assistant,
+                effective_provider_ids=effective_provider_ids,
+                user_text=_safe_user_text(message.content),
+                user_sequence=int(message.sequence or 0),
+                requested_model_for_title_fallback=requested_model_for_title_fallback or "",
+            )
         return "done"
 
 
@@ -149,7 +142,7 @@ def generate_conversation_title_task(
     requested_model_for_title_fallback: str | None = None,
 ) -> str:
     try:
-        return asyncio.run(
+        return run_async(
             generate_conversation_title(
                 conversation_id=conversation_id,
                 message_id=message_id,
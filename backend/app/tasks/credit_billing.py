@@ -16,7 +16,11 @@ from celery import shared_task
 
 from app.db import SessionLocal
 from app.logging_config import logger
-from app.services.credit_service import record_chat_completion_usage, record_streaming_request
+from app.services.credit_service import (
+    reconcile_streaming_usage,
+    record_chat_completion_usage,
+    record_streaming_request,
+)
 
 
 def _to_uuid(value: str | None) -> UUID | None:
@@ -114,4 +118,43 @@ def record_streaming_request_task(
         session.close()
 
 
-__all__ = ["record_chat_completion_usage_task", "record_streaming_request_task"]
+@shared_task(name="tasks.credits.reconcile_streaming_usage")
+def reconcile_streaming_usage_task(
+    *,
+    user_id: str,
+    api_key_id: str | None,
+    logical_model_name: str | None,
+    provider_id: str | None,
+    provider_model_id: str | None,
+    usage: dict[str, Any] | None,
+    idempotency_key: str | None = None,
+) -> int:
+    session = SessionLocal()
+    try:
+        return reconcile_streaming_usage(
+            session,
+            user_id=UUID(user_id),
+            api_key_id=_to_uuid(api_key_id),
+            logical_model_name=logical_model_name,
+            provider_id=provider_id,
+            provider_model_id=provider_model_id,
+            usage=usage if isinstance(usage, dict) else None,
+            precharge_idempotency_key=idempotency_key,
+        )
+    except Exception:  # pragma: no cover - 防御性日志
+        logger.exception(
+            "Async streaming reconciliation failed: user=%s model=%s provider=%s",
+            user_id,
+            logical_model_name,
+            provider_id,
+        )
+        return 0
+    finally:
+        session.close()
+
+
+__all__ = [
+    "reconcile_streaming_usage_task",
+    "record_chat_completion_usage_task",
+    "record_streaming_request_task",
+]
@@ -4,15 +4,14 @@
 
 from __future__ import annotations
 
-import asyncio
-
 from celery import shared_task
 
 from app.celery_app import celery_app
 from app.logging_config import logger
-from app.redis_client import close_redis_client_for_current_loop, get_redis_client
+from app.redis_client import get_redis_client
 from app.services.model_catalog_service import refresh_models_dev_catalog
 from app.settings import settings
+from app.worker_loop import run_async
 
 
 @shared_task(name="tasks.model_catalog.refresh_models_dev")
@@ -23,12 +22,9 @@ def refresh_models_dev_catalog_task() -> dict:
 
     async def _run():
         redis = get_redis_client()
-        try:
-            return await refresh_models_dev_catalog(redis, force=False)
-        finally:
-            await close_redis_client_for_current_loop()
+        return await refresh_models_dev_catalog(redis, force=False)
 
-    result = asyncio.run(_run())
+    result = run_async(_run())
     logger.info(
         "模型目录刷新任务完成：refreshed=%s providers=%s models=%s",
         result.get("refreshed"),
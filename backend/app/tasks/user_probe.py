@@ -6,15 +6,14 @@ Celery 任务：用户自定义探针任务调度器。
 
 from __future__ import annotations
 
-import asyncio
-
 from celery import shared_task
 
 from app.celery_app import celery_app
 from app.db import SessionLocal
-from app.redis_client import close_redis_client_for_current_loop, get_redis_client
+from app.redis_client import get_redis_client
 from app.services.user_probe_service import run_due_user_probe_tasks
 from app.settings import settings
+from app.worker_loop import run_async
 
 
 @shared_task(name="tasks.user_probe.run_due")
@@ -29,16 +28,13 @@ def run_due_user_probes() -> int:
     try:
         async def _run() -> int:
             redis = get_redis_client()
-            try:
-                return await run_due_user_probe_tasks(
-                    session=session,
-                    redis=redis,
-                    max_tasks=settings.user_probe_max_due_tasks_per_tick,
-                )
-            finally:
-                await close_redis_client_for_current_loop()
-
-        return asyncio.run(_run())
+            return await run_due_user_probe_tasks(
+                session=session,
+                redis=redis,
+                max_tasks=settings.user_probe_max_due_tasks_per_tick,
+            )
+
+        return run_async(_run())
     finally:
         session.close()
 
@@ -0,0 +1,165 @@
+"""
+Celery worker 进程内常驻的事件循环。
+
+异步任务过去在同步任务入口里各自 `asyncio.run(...)`：每个任务都要新建事件循环、
+Redis 客户端（按 loop 缓存，见 app.redis_client）与上游 HTTP 会话，结束时再全部关闭。
+本模块在 worker 子进程初始化时启动一个后台线程运行常驻 loop，任务入口通过
+`run_async` 把协程提交过去并同步等待结果：
+
+- Redis 客户端、上游 HTTP 连接池（app.http_client_pool）、异步数据库引擎都绑定在该 loop 上，
+  在任务之间复用；
+- 进程退出时统一关闭这些资源；
+- 未启动常驻 loop 时（测试、eager 模式、CELERY_WORKER_PERSISTENT_LOOP=false）退回一次性的
+  `asyncio.run`，并在结束时关闭该 loop 上创建的资源，行为与过去一致。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Coroutine
+from typing import Any
+
+from app.logging_config import logger
+from app.settings import settings
+
+# 进程退出时等待资源关闭的上限（秒）。
+_STOP_TIMEOUT_SECONDS = 10.0
+
+
+async def _close_loop_resources() -> None:
+    """
+    写出合并中的 Redis 小写入，再关闭当前 loop 上缓存的 Redis 客户端、上游 HTTP 连接池与异步数据库引擎。
+    """
+    from app.db.async_session import dispose_async_engine_for_current_loop
+    from app.http_client_pool import close_upstream_http_pool_for_current_loop
+    from app.redis_client import close_redis_client_for_current_loop
+    from app.storage.redis_write_coalescer import flush_redis_write_coalescers
+
+    for close in (
+        flush_redis_write_coalescers,
+        close_redis_client_for_current_loop,
+        close_upstream_http_pool_for_current_loop,
+        dispose_async_engine_for_current_loop,
+    ):
+        try:
+            await close()
+        except Exception:
+            logger.warning("worker loop: failed to close %s", close.__name__, exc_info=True)
+
+
+class WorkerLoopRunner:
+    """在后台线程中运行的常驻事件循环。"""
+
+    def __init__(self, *, name: str = "celery-worker-loop") -> None:
+        self._name = name
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._thread is not None and self._thread.is_alive()
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self) -> None:
+        """启动常驻 loop（幂等）。"""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                try:
+                    loop.run_forever()
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                finally:
+                    loop.close()
+
+            thread = threading.Thread(target=_run, name=self._name, daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread = loop, thread
+
+        # 空闲会话回收任务需要在常驻 loop 上启动。
+        from app.http_client_pool import start_upstream_http_pool
+
+        loop.call_soon_threadsafe(start_upstream_http_pool)
+        logger.info("worker loop: started persistent event loop (thread=%s)", self._name)
+
+    def run[T](self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """
+        把协程提交到常驻 loop 并阻塞等待结果（不能在 loop 线程内调用）。
+
+        等待超时、或等待期间被 SoftTimeLimitExceeded / 信号打断时取消 loop 上的协程，
+        避免它在任务已经结束后继续占用常驻 loop 和连接。
+        """
+        loop = self._loop
+        if loop is None or not self.running:
+            coro.close()
+            raise RuntimeError("worker loop is not running")
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("run() must not be called from the worker loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = _STOP_TIMEOUT_SECONDS) -> None:
+        """关闭 loop 上的共享资源并停止线程（幂等）。"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None or thread is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(_close_loop_resources(), loop).result(timeout)
+        except Exception:
+            logger.warning("worker loop: resource shutdown failed", exc_info=True)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+_worker_loop = WorkerLoopRunner()
+
+
+def start_worker_loop() -> None:
+    """worker 子进程初始化时调用（见 app.celery_app）。"""
+    _worker_loop.start()
+
+
+def stop_worker_loop() -> None:
+    """worker 子进程退出时调用。"""
+    _worker_loop.stop()
+
+
+async def _run_and_close[T](coro: Coroutine[Any, Any, T]) -> T:
+    try:
+        return await coro
+    finally:
+        await _close_loop_resources()
+
+
+def run_async[T](coro: Coroutine[Any, Any, T]) -> T:
+    """
+    在同步任务入口中执行协程：优先提交到常驻 loop，否则退回一次性的 asyncio.run。
+    """
+    if _worker_loop.running and not _worker_loop.in_loop_thread():
+        return _worker_loop.run(coro, timeout=settings.celery_worker_task_timeout_seconds)
+    return asyncio.run(_run_and_close(coro))
+
+
+__all__ = [
+    "WorkerLoopRunner",
+    "run_async",
+    "start_worker_loop",
+    "stop_worker_loop",
+]
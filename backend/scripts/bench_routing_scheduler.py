@@ -0,0 +1,144 @@
+"""
+路由打分基准：逐候选循环（原 score_upstreams / _weighted_choice 写法）vs 列式打分引擎。
+
+构造一个大型动态逻辑模型（默认 500 个上游、分布在 60 个 provider 上），
+重复调用 choose_upstream，输出每次选择的平均耗时（微秒）与加速比。
+
+- legacy：逐个候选计算分数，每个候选格式化一条 f-string INFO 日志，排序后线性累加采样；
+- engine：app.routing.scheduler.choose_upstream（列式打分 + 累积数组 + bisect，明细日志仅 DEBUG）。
+
+日志级别默认 INFO（与生产一致），handler 替换为 NullHandler，只计入日志记录本身的开销。
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import time
+
+from app.logging_config import logger
+from app.routing import scheduler
+from app.schemas import (
+    LogicalModel,
+    ModelCapability,
+    PhysicalModel,
+    RoutingMetrics,
+    SchedulingStrategy,
+)
+
+
+def _legacy_choose(upstreams, metrics_by_provider, strategy, dynamic_weights, enable_health_check=True):
+    results = []
+    for up in upstreams:
+        metrics = metrics_by_provider.get(up.provider_id)
+        base = dynamic_weights.get(up.provider_id, up.base_weight) if dynamic_weights else up.base_weight
+        if metrics is not None:
+            norm_lat = scheduler._normalise_latency(metrics.latency_p95_ms)
+            err = metrics.error_rate
+        else:
+            norm_lat = 0.5
+            err = 0.0
+        quota_penalty = scheduler._status_penalty(metrics, enable_check=enable_health_check)
+        score = base - strategy.alpha * norm_lat - strategy.beta * err - strategy.delta * quota_penalty
+        logger.info(
+            f"🔍 Scoring upstream: provider={up.provider_id} model={up.model_id} "
+            f"base={base:.2f} norm_lat={norm_lat:.2f} err={err:.2f} "
+            f"quota_penalty={quota_penalty:.2f} score={score:.2f} min_score={strategy.min_score:.2f} "
+            f"health_check={'enabled' if enable_health_check else 'disabled'}"
+        )
+        if enable_health_check and score < strategy.min_score:
+            continue
+        results.append(scheduler.CandidateScore(upstream=up, metrics=metrics, score=score))
+    results.sort(key=lambda c: c.score, reverse=True)
+    logger.info(f"✅ Total scored candidates: {len(results)}")
+
+    weights = [max(c.score, 0.0) for c in results]
+    r = random.random() * sum(weights)
+    acc = 0.0
+    for cand, w in zip(results, weights, strict=True):
+        acc += w
+        if r <= acc:
+            return cand, results
+    return results[-1], results
+
+
+def _build(upstream_count: int, provider_count: int, seed: int):
+    rng = random.Random(seed)
+    upstreams = [
+        PhysicalModel(
+            provider_id=f"p{i % provider_count}",
+            model_id=f"model-{i}",
+            endpoint=f"https://p{i % provider_count}.example.com/v1/chat/completions",
+            base_weight=rng.uniform(0.5, 2.0),
+            region="global",
+            max_qps=50,
+            meta_hash=None,
+            updated_at=1704067200.0,
+        )
+        for i in range(upstream_count)
+    ]
+    metrics = {
+        f"p{i}": RoutingMetrics(
+            logical_model="dyn",
+            provider_id=f"p{i}",
+            latency_p95_ms=rng.uniform(100, 5000),
+            latency_p99_ms=6000.0,
+            error_rate=rng.uniform(0, 0.2),
+            success_qps_1m=10.0,
+            total_requests_1m=100,
+            last_updated=1.0,
+            status=rng.choice(["healthy", "healthy", "healthy", "degraded"]),
+        )
+        for i in range(provider_count)
+    }
+    weights = {f"p{i}": rng.uniform(0.5, 3.0) for i in range(provider_count)}
+    logical = LogicalModel(
+        logical_id="dyn",
+        display_name="dyn",
+        description="benchmark",
+        capabilities=[ModelCapability.CHAT],
+        upstreams=upstreams,
+        enabled=True,
+        updated_at=1704067200.0,
+    )
+    return logical, upstreams, metrics, weights
+
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstreams", type=int, default=500)
+    parser.add_argument("--providers", type=int, default=60)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logger.handlers = [logging.NullHandler()]
+    logger.propagate = False
+    logger.setLevel(args.log_level.upper())
+
+    logical, upstreams, metrics, weights = _build(args.upstreams, args.providers, args.seed)
+    strategy = SchedulingStrategy(name="balanced", description="benchmark", min_score=0.0)
+
+    legacy_us = _time(lambda: _legacy_choose(upstreams, metrics, strategy, weights), args.iterations)
+    engine_us = _time(
+        lambda: scheduler.choose_upstream(logical, upstreams, metrics, strategy, dynamic_weights=weights),
+        args.iterations,
+    )
+    print(
+        f"upstreams={args.upstreams} providers={args.providers} log_level={args.log_level.upper()}"
+    )
+    print(f"legacy  {legacy_us:10.1f} us/choice")
+    print(f"engine  {engine_us:10.1f} us/choice  speedup x{legacy_us / max(engine_us, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+SSE 分帧微基准：旧的 str 缓冲写法 vs app.services.sse_parser.SSEFramer。
+
+构造一条 OpenAI chat.completions 风格的 SSE 流，按固定大小切成 N 个 chunk
+（默认 10k，切分点随机落在事件内部 / 分隔符中间），分别统计：
+- legacy：原 iter_sse_events 的写法——每个 chunk decode 为 str 追加到缓冲区，
+  每轮对整个缓冲区各 find 一次 LF / CRLF 分隔符；
+- framer：SSEFramer.feed 直接在 bytes 上增量切帧。
+
+输出每种实现的总耗时与每 chunk 平均耗时（微秒），并校验两者切出的帧数一致。
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import time
+
+from app.services.sse_parser import SSEFramer
+
+
+def _build_stream(events: int, *, crlf: bool, content_bytes: int) -> bytes:
+    sep = "\r\n\r\n" if crlf else "\n\n"
+    filler = "x" * content_bytes
+    parts = []
+    for i in range(events):
+        payload = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "choices": [
+                {"index": 0, "delta": {"content": f"token-{i} 你好{filler}"}, "finish_reason": None}
+            ],
+        }
+        parts.append(f"data: {json.dumps(payload, ensure_ascii=False)}{sep}")
+    parts.append(f"data: [DONE]{sep}")
+    return "".join(parts).encode("utf-8")
+
+
+def _split(body: bytes, chunks: int, seed: int) -> list[bytes]:
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(body)), min(chunks - 1, len(body) - 1)))
+    bounds = [0, *cuts, len(body)]
+    return [body[a:b] for a, b in itertools.pairwise(bounds)]
+
+
+def _legacy(chunks: list[bytes]) -> int:
+    buffer = ""
+    frames = 0
+    for chunk in chunks:
+        buffer += chunk.decode("utf-8", errors="ignore")
+        while True:
+            lf_idx = buffer.find("\n\n")
+            crlf_idx = buffer.find("\r\n\r\n")
+            if lf_idx == -1 and crlf_idx == -1:
+                break
+            if crlf_idx == -1 or (lf_idx != -1 and lf_idx < crlf_idx):
+                idx, sep_len = lf_idx, 2
+            else:
+                idx, sep_len = crlf_idx, 4
+            raw_event, buffer = buffer[:idx], buffer[idx + sep_len :]
+            if raw_event.strip():
+                frames += 1
+    return frames
+
+
+def _framer(chunks: list[bytes]) -> int:
+    framer = SSEFramer()
+    frames = 0
+    for chunk in chunks:
+        frames += len(framer.feed(chunk))
+    return frames
+
+
+def _run(name: str, fn, chunks: list[bytes], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    frames = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    per_chunk_us = best / max(1, len(chunks)) * 1e6
+    print(f"{name:8s} total={best * 1000:8.2f}ms per_chunk={per_chunk_us:6.2f}us frames={frames}")
+    return best, frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10_000, help="切分后的 chunk 数")
+    parser.add_argument("--events", type=int, default=5_000, help="流中的 SSE 事件数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最优）")
+    parser.add_argument("--content-bytes", type=int, default=0, help="每个事件额外的正文字节数（模拟大事件）")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for crlf in (False, True):
+        body = _build_stream(args.events, crlf=crlf, content_bytes=args.content_bytes)
+        chunks = _split(body, args.chunks, args.seed)
+        print(f"== {'CRLF' if crlf else 'LF'} stream: {len(body)} bytes, {len(chunks)} chunks")
+        _, legacy_frames = _run("legacy", _legacy, chunks, args.repeat)
+        _, framer_frames = _run("framer", _framer, chunks, args.repeat)
+        if legacy_frames != framer_frames:
+            raise SystemExit(f"frame count mismatch: legacy={legacy_frames} framer={framer_frames}")
+
+
+if __name__ == "__main__":
+    main()
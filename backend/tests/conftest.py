@@ -25,6 +25,25 @@ from app.routes import create_app
 from tests.utils import auth_headers, install_inmemory_db
 
 
+@pytest.fixture(autouse=True)
+def _reset_routing_l1_cache():
+    """每个用例使用独立的路由 L1 缓存，避免不同 InMemoryRedis 之间串数据。"""
+    from app.storage.routing_l1_cache import reset_routing_l1_cache
+
+    reset_routing_l1_cache()
+    yield
+    reset_routing_l1_cache()
+
+
+@pytest.fixture(autouse=True)
+def _reset_log_sampler():
+    """热路径日志采样按 key 记忆时间窗口，每个用例从空窗口开始。"""
+    from app.logging_config import reset_log_sampler
+
+    reset_log_sampler()
+    yield
+
+
 @pytest.fixture()
 def app_with_inmemory_db() -> tuple[FastAPI, sessionmaker[Session]]:
     fastapi_app = create_app()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from app.metrics.latency_sketch import RELATIVE_ACCURACY, LatencySketch, merge_sketch_blobs
+
+
+def _exact(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def _sketch(values: list[float]) -> LatencySketch:
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.95, 0.99])
+def test_quantiles_stay_within_relative_accuracy(q: float):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(5.5, 1.2) for _ in range(20_000)]
+
+    estimate = _sketch(values).quantile(q)
+
+    assert estimate == pytest.approx(_exact(values, q), rel=RELATIVE_ACCURACY + 1e-9)
+
+
+def test_merge_matches_sketch_of_union_and_concatenated_bytes():
+    rng = random.Random(11)
+    left = [rng.uniform(1, 500) for _ in range(1000)]
+    right = [rng.uniform(200, 8000) for _ in range(300)] + [0.0]
+
+    merged = _sketch(left)
+    merged.merge(_sketch(right))
+    union = _sketch(left + right)
+    # 序列化段可直接拼接（数据库里的 `old || new`）。
+    concatenated = LatencySketch.from_bytes(_sketch(left).to_bytes() + _sketch(right).to_bytes())
+
+    for q in (0.0, 0.5, 0.95, 0.99, 1.0):
+        assert merged.quantile(q) == union.quantile(q) == concatenated.quantile(q)
+    assert merged.count == concatenated.count == len(left) + len(right)
+    assert union.to_bytes() == concatenated.to_bytes()
+
+
+def test_collapse_bounds_buckets_and_keeps_tail():
+    sketch = LatencySketch(max_buckets=16)
+    for value in range(1, 5000):
+        sketch.add(float(value))
+
+    assert len(sketch.to_bytes()) < 64
+    assert sketch.quantile(0.99) == pytest.approx(4950.0, rel=RELATIVE_ACCURACY)
+
+
+def test_merge_sketch_blobs_skips_missing_and_corrupt_values():
+    good = _sketch([10.0, 20.0]).to_bytes()
+
+    merged = merge_sketch_blobs([None, b"", b"\x09\x00", good])
+
+    assert merged.count == 2
+    with pytest.raises(ValueError):
+        LatencySketch.from_bytes(good[:-1] + b"\x80")
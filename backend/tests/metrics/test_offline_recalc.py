@@ -1,9 +1,11 @@
 import datetime as dt
 
+import pytest
 from sqlalchemy import create_engine, select
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.metrics.latency_sketch import LatencySketch
 from app.metrics.offline_recalc import OfflineMetricsRecalculator
 from app.models import AggregateRoutingMetrics, Base, ProviderRoutingMetricsHistory
 
@@ -29,6 +31,7 @@ def _seed_history(
     latency_avg: float,
     latency_p95: float,
     latency_p99: float,
+    latency_sketch: bytes | None = None,
 ) -> None:
     session.add(
         ProviderRoutingMetricsHistory(
@@ -46,6 +49,7 @@ def _seed_history(
             latency_avg_ms=latency_avg,
             latency_p95_ms=latency_p95,
             latency_p99_ms=latency_p99,
+            latency_sketch=latency_sketch,
             error_rate=error / total if total else 0.0,
             success_qps_1m=success / 60 if total else 0.0,
             status="healthy",
@@ -225,3 +229,55 @@ def test_recalculate_and_persist_aligns_start_to_avoid_duplicate_bucket() -> Non
         assert written == 1
         assert rows[0].window_start == dt.datetime(2024, 1, 1, 6, 0, tzinfo=dt.UTC)
         assert rows[0].total_requests == 2
+
+
+def _sketch(values: list[float]) -> bytes:
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    return sketch.to_bytes()
+
+
+def test_recalculate_merges_latency_sketches_for_true_percentiles() -> None:
+    SessionLocal = _setup_session()
+    with SessionLocal() as session:
+        base = dt.datetime(2024, 1, 1, 0, 0, tzinfo=dt.UTC)
+        # 一分钟全是快请求，另一分钟只有少量慢请求：分位数平均会严重低估尾延迟。
+        fast = [100.0] * 90
+        slow = [1000.0] * 10
+        _seed_history(
+            session,
+            window_start=base - dt.timedelta(minutes=2),
+            total=90,
+            success=90,
+            error=0,
+            latency_avg=100.0,
+            latency_p95=100.0,
+            latency_p99=100.0,
+            latency_sketch=_sketch(fast),
+        )
+        _seed_history(
+            session,
+            window_start=base - dt.timedelta(minutes=3),
+            total=10,
+            success=10,
+            error=0,
+            latency_avg=1000.0,
+            latency_p95=1000.0,
+            latency_p99=1000.0,
+            latency_sketch=_sketch(slow),
+        )
+
+        recalculator = OfflineMetricsRecalculator(
+            diff_threshold=0.02, source_version="test", min_total_requests=1
+        )
+        payload = recalculator.recalculate(
+            session,
+            start=base - dt.timedelta(minutes=5),
+            end=base + dt.timedelta(seconds=1),
+            window_seconds=300,
+        )[0]
+
+        assert payload["latency_p50_ms"] == pytest.approx(100.0, rel=0.01)
+        assert payload["latency_p95_ms"] == pytest.approx(1000.0, rel=0.01)
+        assert payload["latency_p99_ms"] == pytest.approx(1000.0, rel=0.01)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.metrics import tasks
+from app.metrics.latency_sketch import LatencySketch
+from app.models import Base, ProviderRoutingMetricsHistory, ProviderRoutingMetricsHourly
+
+NOW = dt.datetime(2026, 1, 1, 12, 0, tzinfo=dt.UTC)
+
+
+def _setup_session() -> sessionmaker[Session]:
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        future=True,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+
+def _minute_row(window_start: dt.datetime, values: list[float]) -> ProviderRoutingMetricsHistory:
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+    return ProviderRoutingMetricsHistory(
+        provider_id="provider",
+        logical_model="gpt-4",
+        transport="http",
+        is_stream=False,
+        window_start=window_start,
+        window_duration=60,
+        total_requests_1m=len(values),
+        success_requests=len(values),
+        error_requests=0,
+        latency_avg_ms=sum(values) / len(values),
+        latency_p50_ms=ordered[len(ordered) // 2],
+        latency_p95_ms=ordered[int(0.95 * (len(ordered) - 1))],
+        latency_p99_ms=ordered[int(0.99 * (len(ordered) - 1))],
+        latency_sketch=sketch.to_bytes(),
+        error_rate=0.0,
+        success_qps_1m=len(values) / 60,
+        status="healthy",
+    )
+
+
+def test_hourly_rollup_merges_minute_sketches(monkeypatch):
+    monkeypatch.setattr(tasks, "_now_utc_minute", lambda: NOW)
+    monkeypatch.setattr(tasks.settings, "dashboard_metrics_rollup_guard_minutes", 0)
+    SessionLocal = _setup_session()
+    hour = NOW - dt.timedelta(hours=2)
+    with SessionLocal() as session:
+        session.add(_minute_row(hour + dt.timedelta(minutes=1), [100.0] * 90))
+        session.add(_minute_row(hour + dt.timedelta(minutes=2), [1000.0] * 10))
+        session.commit()
+
+        written = tasks._rollup_range(
+            session=session,
+            bucket="hour",
+            target_model=ProviderRoutingMetricsHourly,
+            uq_constraint="uq_provider_routing_metrics_hourly_bucket",
+            window_seconds=3600,
+            default_lookback_days=1,
+        )
+        row = session.execute(select(ProviderRoutingMetricsHourly)).scalar_one()
+
+    assert written == 1
+    assert row.total_requests == 100
+    # 分位数平均会得到 (90 * 100 + 10 * 1000) / 100 = 190ms；合并草图得到真实 p95。
+    assert row.latency_p95_ms == pytest.approx(1000.0, rel=0.01)
+    assert row.latency_p50_ms == pytest.approx(100.0, rel=0.01)
+    assert LatencySketch.from_bytes(row.latency_sketch).count == 100
+
+
+def test_kpi_p95_reads_rolled_up_hours_and_caps_minute_rows(monkeypatch):
+    from app.api import metrics_dashboard_v2_routes as routes
+
+    SessionLocal = _setup_session()
+    start_at = NOW - dt.timedelta(hours=3)
+    hour = start_at
+    with SessionLocal() as session:
+        session.add(_minute_row(hour + dt.timedelta(minutes=1), [100.0] * 90))
+        session.add(_minute_row(hour + dt.timedelta(minutes=2), [1000.0] * 10))
+        session.add(_minute_row(NOW - dt.timedelta(minutes=5), [1000.0] * 100))
+        session.commit()
+        monkeypatch.setattr(tasks, "_now_utc_minute", lambda: NOW - dt.timedelta(hours=1))
+        monkeypatch.setattr(tasks.settings, "dashboard_metrics_rollup_guard_minutes", 0)
+        tasks._rollup_range(
+            session=session,
+            bucket="hour",
+            target_model=ProviderRoutingMetricsHourly,
+            uq_constraint="uq_provider_routing_metrics_hourly_bucket",
+            window_seconds=3600,
+            default_lookback_days=1,
+        )
+
+        sources = routes._sketch_sources(
+            session, start_at=start_at, end_at=NOW, model=ProviderRoutingMetricsHistory
+        )
+        assert [(src.__name__, a, b) for src, a, b in sources] == [
+            ("ProviderRoutingMetricsHistory", start_at, start_at),
+            ("ProviderRoutingMetricsHourly", start_at, start_at + dt.timedelta(hours=1)),
+            ("ProviderRoutingMetricsHistory", start_at + dt.timedelta(hours=1), NOW),
+        ]
+
+        kwargs = {
+            "start_at": start_at,
+            "end_at": NOW,
+            "model": ProviderRoutingMetricsHistory,
+            "scope_user_id": None,
+            "transport": "all",
+            "is_stream": "all",
+            "total_requests": 200,
+        }
+        # 90 条快请求 + 110 条慢请求：p95 来自合并后的草图，而不是分钟 p95 的加权平均。
+        assert routes._sketch_latency_p95(session, **kwargs) == pytest.approx(1000.0, rel=0.01)
+
+        monkeypatch.setattr(routes, "_SKETCH_MERGE_MAX_ROWS", 1)
+        assert routes._sketch_latency_p95(session, **kwargs) is None
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import Provider, ProviderAPIKey
+from app.provider import config_registry
+from app.provider.config import get_provider_config
+from app.provider.config_registry import ProviderConfigRegistry
+from app.provider.key_pool import acquire_provider_key, reset_key_pool
+from app.schemas import ProviderConfig
+from app.services.encryption import encrypt_secret
+
+
+def _add_provider(db: Session, slug: str, *, keys: int = 1) -> Provider:
+    provider = Provider(
+        provider_id=slug,
+        name=slug,
+        base_url=f"https://{slug}.local",
+        transport="http",
+    )
+    db.add(provider)
+    db.flush()
+    for idx in range(keys):
+        db.add(
+            ProviderAPIKey(
+                provider_uuid=provider.id,
+                encrypted_key=encrypt_secret(f"sk-{slug}-{idx}"),
+                label=f"k{idx}",
+            )
+        )
+    db.commit()
+    return provider
+
+
+@pytest.fixture()
+def build_calls(monkeypatch) -> list[str]:
+    calls: list[str] = []
+    original = config_registry._build_provider_config
+
+    def _counting(provider: Provider):
+        calls.append(provider.provider_id)
+        return original(provider)
+
+    monkeypatch.setattr(config_registry, "_build_provider_config", _counting)
+    return calls
+
+
+def test_registry_rebuilds_only_changed_providers(db_session: Session, build_calls):
+    _add_provider(db_session, "reg-a")
+    provider_b = _add_provider(db_session, "reg-b")
+    _add_provider(db_session, "reg-empty", keys=0)
+    registry = ProviderConfigRegistry()
+
+    assert registry.lookup("reg-a") == (False, None)
+    assert registry.refresh(db_session) == db_session.query(Provider).count()
+    assert {"reg-a", "reg-b", "reg-empty"} <= set(build_calls)
+    hit, cfg_a = registry.lookup("reg-a")
+    assert hit and cfg_a is not None and cfg_a.api_key == "sk-reg-a-0"  # pragma: allowlist secret
+    # 没有启用 key 的 Provider 命中“不可用”条目，未知 Provider 交给调用方查库。
+    assert registry.lookup("reg-empty") == (True, None)
+    assert registry.lookup("unknown") == (False, None)
+
+    build_calls.clear()
+    assert registry.refresh(db_session) == 0
+    assert build_calls == []
+
+    db_session.add(
+        ProviderAPIKey(provider_uuid=provider_b.id, encrypted_key=encrypt_secret("sk-new"), label="k1")
+    )
+    db_session.commit()
+    version_a = registry.version_of(cfg_a)
+
+    assert registry.refresh(db_session) == 1
+    assert build_calls == ["reg-b"]
+    assert len(registry.lookup("reg-b")[1].get_api_keys()) == 2
+    # 未变化的 Provider 保持同一对象与版本号。
+    assert registry.lookup("reg-a")[1] is cfg_a
+    assert registry.version_of(cfg_a) == version_a
+
+    db_session.delete(provider_b)
+    db_session.commit()
+    registry.refresh(db_session)
+    assert registry.lookup("reg-b") == (False, None)
+
+
+def test_invalidated_provider_falls_back_until_rebuilt(db_session: Session, build_calls):
+    _add_provider(db_session, "reg-inv")
+    registry = ProviderConfigRegistry()
+    registry.refresh(db_session)
+    _, cfg = registry.lookup("reg-inv")
+
+    registry.invalidate("reg-inv")
+    assert registry.lookup("reg-inv") == (False, None)
+    assert registry.version_of(cfg) is None
+
+    build_calls.clear()
+    registry.refresh(db_session)
+    assert build_calls == ["reg-inv"]
+    hit, rebuilt = registry.lookup("reg-inv")
+    assert hit and rebuilt is not cfg
+
+
+def test_get_provider_config_serves_from_registry_without_db(db_session: Session, monkeypatch):
+    _add_provider(db_session, "reg-hot")
+    registry = ProviderConfigRegistry()
+    registry.refresh(db_session)
+    monkeypatch.setattr(config_registry, "_registry", registry)
+
+    def _no_db():
+        raise AssertionError("registry hit should not open a session")
+
+    monkeypatch.setattr("app.provider.config.SessionLocal", _no_db)
+
+    cfg = get_provider_config("reg-hot")
+    assert cfg is registry.lookup("reg-hot")[1]
+    # 显式传入 Session 时总是查库（可以看到调用方未提交的修改）。
+    assert get_provider_config("reg-hot", session=db_session) is not cfg
+
+
+@pytest.mark.asyncio
+async def test_key_pool_skips_key_sync_for_unchanged_registry_config(db_session: Session, monkeypatch):
+    _add_provider(db_session, "reg-keys", keys=2)
+    registry = ProviderConfigRegistry()
+    registry.refresh(db_session)
+    monkeypatch.setattr(config_registry, "_registry", registry)
+    reset_key_pool("reg-keys")
+
+    calls = 0
+    original = ProviderConfig.get_api_keys
+
+    def _counting(self):
+        nonlocal calls
+        calls += 1
+        return original(self)
+
+    monkeypatch.setattr(ProviderConfig, "get_api_keys", _counting)
+    cfg = registry.lookup("reg-keys")[1]
+
+    for _ in range(3):
+        await acquire_provider_key(cfg)
+    assert calls == 1
+
+    reset_key_pool("reg-keys")
@@ -10,6 +10,7 @@ from app.provider.key_pool import (
     reset_key_pool,
 )
 from app.schemas import ProviderAPIKey, ProviderConfig
+from tests.utils import InMemoryRedis
 
 
 def _make_provider(provider_id: str = "multi") -> ProviderConfig:
@@ -24,29 +25,6 @@ def _make_provider(provider_id: str = "multi") -> ProviderConfig:
     )
 
 
-class InMemoryRedis:
-    def __init__(self) -> None:
-        self.zsets: dict[str, dict[str, float]] = {}
-
-    async def zadd(self, key: str, mapping: dict[str, float], nx: bool = False) -> int:
-        zset = self.zsets.setdefault(key, {})
-        added = 0
-        for member, score in mapping.items():
-            if nx and member in zset:
-                continue
-            zset[member] = float(score)
-            added += 1
-        return added
-
-    async def zscore(self, key: str, member: str):
-        return self.zsets.get(key, {}).get(member)
-
-    async def zincrby(self, key: str, amount: float, member: str) -> float:
-        zset = self.zsets.setdefault(key, {})
-        zset[member] = zset.get(member, 0.0) + float(amount)
-        return zset[member]
-
-
 @pytest.mark.asyncio
 async def test_acquire_provider_key_skips_backoff_key(monkeypatch):
     provider = _make_provider("backoff")
@@ -92,9 +70,9 @@ async def test_acquire_prefers_high_score_from_redis(monkeypatch):
     reset_key_pool(provider_id)
     # 使随机选择确定性：总是挑最大权重的候选。
     monkeypatch.setattr(
-        key_pool.random,
-        "choices",
-        lambda seq, weights, k=1: [seq[weights.index(max(weights))]],
+        key_pool._AliasTable,
+        "sample",
+        lambda self: self.items[self.weights.index(max(self.weights))],
     )
     redis = InMemoryRedis()
 
@@ -128,3 +106,93 @@ async def test_acquire_prefers_high_score_from_redis(monkeypatch):
     assert second.key == "k2"
 
     reset_key_pool(provider_id)
+
+
+def test_alias_table_matches_configured_weights(monkeypatch):
+    from app.provider import key_pool
+
+    states = [
+        key_pool.ProviderKeyState(key=f"k{i}", label=f"k{i}", weight=w, max_qps=None)
+        for i, w in enumerate([1.0, 3.0, 6.0])
+    ]
+    table = key_pool._AliasTable(states, [s.weight for s in states])
+
+    # 在 [0, 1) 上均匀取点：别名表的抽样分布应精确等于权重占比。
+    grid = iter([i / 10000 for i in range(10000)])
+    monkeypatch.setattr(key_pool.random, "random", lambda: next(grid))
+    counts = {s.key: 0 for s in states}
+    for _ in range(10000):
+        counts[table.sample().key] += 1
+
+    assert counts == pytest.approx({"k0": 1000, "k1": 3000, "k2": 6000}, abs=3)
+
+
+class CountingRedis(InMemoryRedis):
+    def __init__(self) -> None:
+        super().__init__()
+        self.zscore_calls = 0
+
+    async def zscore(self, key: str, member: str):
+        self.zscore_calls += 1
+        return await super().zscore(key, member)
+
+    async def zmscore(self, key: str, members):
+        self.zscore_calls += 1
+        await asyncio.sleep(0)
+        return await super().zmscore(key, members)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_acquires_share_one_preference_load():
+    provider = _make_provider("concurrent")
+    reset_key_pool(provider.id)
+    redis = CountingRedis()
+
+    selections = await asyncio.gather(
+        *(acquire_provider_key(provider, redis=redis) for _ in range(50))
+    )
+
+    assert {s.key for s in selections} <= {"k1", "k2"}
+    # 首次使用时所有并发请求共享一次加载（所有 key 一次 pipeline 往返）；之后在刷新周期内不再读取 Redis。
+    assert redis.zscore_calls == 1
+    assert redis.pipeline_executions == 1
+    await acquire_provider_key(provider, redis=redis)
+    assert redis.zscore_calls == 1
+
+    reset_key_pool(provider.id)
+
+
+@pytest.mark.asyncio
+async def test_local_score_update_takes_effect_before_refresh():
+    provider = _make_provider("local-score")
+    reset_key_pool(provider.id)
+    redis = InMemoryRedis()
+
+    first = await acquire_provider_key(provider, redis=redis)
+    record_key_failure(first, retryable=True, redis=redis)
+    # 即使退避结束，本进程的优选分也已降低，另一个 key 单独成组并被优先选择。
+    first.state.backoff_until = 0.0
+    for _ in range(5):
+        assert (await acquire_provider_key(provider, redis=redis)).key != first.key
+    await asyncio.sleep(0)
+
+    reset_key_pool(provider.id)
+
+
+def test_nudge_score_rebuilds_groups_only_when_membership_changes():
+    from app.provider import key_pool
+
+    pool = key_pool._ProviderKeyPool(provider_id="nudge")
+    pool.sync_config(_make_provider("nudge"))
+    groups = pool.groups()
+    version = pool.version
+
+    # 分数变化但仍在同一分组内：沿用现有别名表。
+    pool.nudge_score("k1", key_pool._PREFERENCE_GROUP_TOLERANCE / 2)
+    assert pool.version == version
+    assert pool.groups() is groups
+
+    # 拆分出新的分组时才重建。
+    pool.nudge_score("k1", -1.0)
+    assert pool.version == version + 1
+    assert [[s.key for s in g.states] for g in pool.groups()] == [["k2"], ["k1"]]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.provider import claude_sdk, openai_sdk, sdk_clients
+from app.provider.sdk_clients import (
+    close_sdk_clients_for_current_loop,
+    lease_sdk_client,
+    reset_sdk_clients,
+)
+from app.settings import settings
+
+
+class _FakeClient:
+    def __init__(self, api_key: str, base_url: str | None) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _FakeOpenAIStream:
+    def __init__(self, chunks: list[dict]) -> None:
+        self._chunks = list(chunks)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def _reset_clients():
+    reset_sdk_clients()
+    yield
+    reset_sdk_clients()
+
+
+@pytest.mark.asyncio
+async def test_sdk_client_cached_per_key_and_base_url(monkeypatch):
+    monkeypatch.setattr(settings, "sdk_client_cache_size", 2)
+    created: list[_FakeClient] = []
+
+    def _factory(api_key: str, base_url: str | None) -> _FakeClient:
+        client = _FakeClient(api_key, base_url)
+        created.append(client)
+        return client
+
+    async def _get(api_key: str, base_url: str) -> _FakeClient:
+        async with lease_sdk_client("openai", api_key, base_url, _factory) as client:
+            return client
+
+    first = await _get("sk-a", "https://a.local")
+    assert await _get("sk-a", "https://a.local") is first
+    assert await _get("sk-b", "https://a.local") is not first
+    assert await _get("sk-a", "https://b.local") is not first
+    assert len(created) == 3
+
+    # 容量为 2：最早使用的 (sk-a, a.local) 被淘汰并在后台关闭，再次获取会重新创建。
+    assert await _get("sk-a", "https://a.local") is not first
+    assert len(created) == 4
+
+    await close_sdk_clients_for_current_loop()
+    assert [c.closed for c in created] == [True, True, True, True]
+
+
+@pytest.mark.asyncio
+async def test_evicted_sdk_client_closes_after_last_lease(monkeypatch):
+    monkeypatch.setattr(settings, "sdk_client_cache_size", 1)
+
+    async with lease_sdk_client("openai", "sk-a", None, _FakeClient) as in_flight:
+        async with lease_sdk_client("openai", "sk-b", None, _FakeClient) as newer:
+            await asyncio.sleep(0)
+            # 被淘汰但仍有请求在用：保持打开。
+            assert in_flight.closed is False
+        await asyncio.sleep(0)
+        assert in_flight.closed is False
+
+    await asyncio.sleep(0)
+    assert in_flight.closed is True
+    assert newer.closed is False
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_closes_upstream_when_consumer_stops(monkeypatch):
+    stream = _FakeOpenAIStream([{"id": "c1"}, {"id": "c2"}, {"id": "c3"}])
+    payloads: list[dict] = []
+
+    class _Completions:
+        async def create(self, **payload):
+            payloads.append(payload)
+            return stream
+
+    class _Client(_FakeClient):
+        def __init__(self, api_key: str, base_url: str | None) -> None:
+            super().__init__(api_key, base_url)
+            self.chat = type("Chat", (), {"completions": _Completions()})()
+
+    monkeypatch.setattr(openai_sdk, "_create_client", _Client)
+
+    chunks = openai_sdk.stream_content(
+        api_key="sk-a",
+        model_id="gpt-test",
+        payload={"messages": []},
+        base_url=None,
+    )
+    assert await chunks.__anext__() == {"id": "c1"}
+    await chunks.aclose()
+
+    assert stream.closed is True
+    assert payloads == [{"messages": [], "model": "gpt-test", "stream": True}]
+
+
+@pytest.mark.asyncio
+async def test_claude_stream_exits_context_on_error(monkeypatch):
+    state = {"exited": False}
+
+    class _Stream:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            state["exited"] = True
+            return False
+
+        def __aiter__(self):
+            return self._events()
+
+        async def _events(self):
+            yield {"type": "message_start"}
+            raise RuntimeError("upstream reset")
+
+    class _Messages:
+        def stream(self, **payload):
+            return _Stream()
+
+    class _Client(_FakeClient):
+        def __init__(self, api_key: str, base_url: str | None) -> None:
+            super().__init__(api_key, base_url)
+            self.messages = _Messages()
+
+    monkeypatch.setattr(claude_sdk, "_create_client", _Client)
+
+    received: list[dict] = []
+    with pytest.raises(claude_sdk.ClaudeSDKError):
+        async for event in claude_sdk.stream_content(
+            api_key="sk-a",
+            model_id="claude-test",
+            payload={"messages": [], "max_tokens": 16},
+            base_url=None,
+        ):
+            received.append(event)
+
+    assert received == [{"type": "message_start"}]
+    assert state["exited"] is True
+    # 同一凭证的后续调用复用已缓存的客户端。
+    assert len(sdk_clients._clients_by_loop) == 1
@@ -8,7 +8,7 @@ from app.deps import get_redis
 from app.jwt_auth import AuthenticatedUser, require_jwt_token
 from app.routes import create_app
 from app.schemas import LogicalModel, ModelCapability, PhysicalModel
-from app.storage.redis_service import LOGICAL_MODEL_KEY_TEMPLATE
+from app.storage.redis_service import LOGICAL_MODEL_INDEX_KEY, LOGICAL_MODEL_KEY_TEMPLATE
 from tests.utils import install_inmemory_db
 
 
@@ -20,10 +20,36 @@ class DummyRedis:
 
     def __init__(self) -> None:
         self._data: dict[str, Any] = {}
+        self._sets: dict[str, set[str]] = {}
 
     async def get(self, key: str):
         return self._data.get(key)
 
+    async def mget(self, keys: list[str]):
+        return [self._data.get(k) for k in keys]
+
+    async def exists(self, *keys: str) -> int:
+        return sum(1 for k in keys if k in self._data or k in self._sets)
+
+    async def scan_iter(self, match: str, count: int | None = None):
+        for key in list(await self.keys(match)):
+            yield key
+
+    async def sadd(self, key: str, *members: str) -> int:
+        bucket = self._sets.setdefault(key, set())
+        before = len(bucket)
+        bucket.update(members)
+        return len(bucket) - before
+
+    async def srem(self, key: str, *members: str) -> int:
+        bucket = self._sets.get(key, set())
+        before = len(bucket)
+        bucket.difference_update(members)
+        return before - len(bucket)
+
+    async def smembers(self, key: str) -> set[str]:
+        return set(self._sets.get(key, set()))
+
     async def set(self, key: str, value: str, ex: int | None = None):
         self._data[key] = value
 
@@ -34,8 +60,8 @@ class DummyRedis:
             return [k for k in self._data.keys() if k.startswith(prefix)]
         return [k for k in self._data.keys() if k == pattern]
 
-    async def delete(self, key: str):
-        self._data.pop(key, None)
+    async def delete(self, *keys: str):
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
 
 
 fake_redis = DummyRedis()
@@ -63,6 +89,7 @@ def make_override_require_jwt_token(user_id: str) -> Callable:
 def _store_logical_model(logical: LogicalModel) -> None:
     key = LOGICAL_MODEL_KEY_TEMPLATE.format(logical_model=logical.logical_id)
     fake_redis._data[key] = json.dumps(logical.model_dump(), ensure_ascii=False)
+    fake_redis._sets.setdefault(LOGICAL_MODEL_INDEX_KEY, set()).add(logical.logical_id)
 
 
 def _make_sample_models() -> list[LogicalModel]:
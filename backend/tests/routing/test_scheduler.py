@@ -1,4 +1,7 @@
 
+import logging
+
+from app.routing import scheduler
 from app.routing.scheduler import CandidateScore, choose_upstream, score_upstreams
 from app.schemas import LogicalModel, ModelCapability, PhysicalModel, RoutingMetrics, SchedulingStrategy
 
@@ -89,3 +92,55 @@ def test_score_upstreams_respects_dynamic_weights():
     assert scored
     assert scored[0].upstream.provider_id == "slow"
     assert scored[0].score > scored[-1].score
+
+
+def _metrics(provider_id: str, *, latency: float, status: str = "healthy") -> RoutingMetrics:
+    return RoutingMetrics(
+        logical_model="gpt-4",
+        provider_id=provider_id,
+        latency_p95_ms=latency,
+        latency_p99_ms=latency,
+        error_rate=0.0,
+        success_qps_1m=1.0,
+        total_requests_1m=1,
+        last_updated=1.0,
+        status=status,
+    )
+
+
+def test_choose_upstream_samples_with_cumulative_weights(monkeypatch):
+    logical, upstreams = _logical_and_upstreams()
+    strategy = SchedulingStrategy(name="balanced", description="test")
+    weights = {"fast": 3.0, "slow": 1.0}
+
+    # 累积权重（按分数降序）：fast≈2.85, fast+slow≈3.7；r 落在第一段之后应选中 slow。
+    monkeypatch.setattr(scheduler.random, "random", lambda: 0.99)
+    selected, scored = choose_upstream(
+        logical, upstreams, metrics_by_provider={}, strategy=strategy, dynamic_weights=weights
+    )
+    assert [c.upstream.provider_id for c in scored] == ["fast", "slow"]
+    assert selected.upstream.provider_id == "slow"
+
+    monkeypatch.setattr(scheduler.random, "random", lambda: 0.1)
+    selected, _ = choose_upstream(
+        logical, upstreams, metrics_by_provider={}, strategy=strategy, dynamic_weights=weights
+    )
+    assert selected.upstream.provider_id == "fast"
+
+
+def test_score_upstreams_filters_and_logs_details_only_at_debug(caplog):
+    logical, upstreams = _logical_and_upstreams()
+    strategy = SchedulingStrategy(name="balanced", description="test", delta=2.0)
+    metrics = {"fast": _metrics("fast", latency=100.0), "slow": _metrics("slow", latency=100.0, status="down")}
+
+    with caplog.at_level(logging.INFO, logger="apiproxy"):
+        scored = score_upstreams(logical, upstreams, metrics, strategy)
+    assert [c.upstream.provider_id for c in scored] == ["fast"]
+    assert scored[0].metrics is metrics["fast"]
+    assert not any("Scoring upstream" in r.getMessage() for r in caplog.records)
+    assert any("Filtered out slow/gpt-4" in r.getMessage() for r in caplog.records)
+
+    caplog.clear()
+    with caplog.at_level(logging.DEBUG, logger="apiproxy"):
+        score_upstreams(logical, upstreams, metrics, strategy)
+    assert sum("Scoring upstream" in r.getMessage() for r in caplog.records) == 2
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import threading
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import BanditArmStats
+from app.services import bandit_policy_service
+from app.services.bandit_arm_store import (
+    ArmKey,
+    ArmPosterior,
+    BanditArmStatsStore,
+    posterior_from_row,
+)
+from app.services.bandit_policy_service import (
+    apply_winner_update,
+    build_context_key,
+    recommend_challengers,
+)
+
+
+def _store(clock=None) -> BanditArmStatsStore:
+    kwargs = {"clock": clock} if clock is not None else {}
+    return BanditArmStatsStore(ttl_seconds=10, max_entries=100, flush_interval_seconds=60, **kwargs)
+
+
+def test_store_overlays_pending_updates_and_expires():
+    now = [0.0]
+    store = _store(clock=lambda: now[0])
+    project, assistant = uuid4(), uuid4()
+    key_a = ArmKey(project, assistant, "ctx", "a")
+    key_b = ArmKey(project, assistant, "ctx", "b")
+
+    found, missing = store.lookup([key_a, key_b])
+    assert found == {} and missing == [key_a, key_b]
+
+    filled = store.fill(missing, {key_a: ArmPosterior(alpha=3.0, beta=2.0, samples=3)})
+    assert filled[key_a] == ArmPosterior(alpha=3.0, beta=2.0, samples=3)
+    assert filled[key_b] == ArmPosterior()
+
+    store.record_outcome(project_id=project, assistant_id=assistant, context_key="ctx", arms=["a", "b"], winner="a")
+    found, missing = store.lookup([key_a, key_b])
+    assert missing == []
+    assert found[key_a] == ArmPosterior(alpha=4.0, beta=2.0, samples=4)
+    assert found[key_b] == ArmPosterior(alpha=1.0, beta=2.0, samples=1)
+    assert store.pending_count() == 2
+
+    now[0] = 11.0
+    _, missing = store.lookup([key_a])
+    assert missing == [key_a]
+
+
+def test_flush_upserts_accumulated_deltas(app_with_inmemory_db):
+    _, SessionLocal = app_with_inmemory_db
+    store = _store()
+    project, assistant = uuid4(), uuid4()
+
+    for winner in ("a", "a", "b"):
+        store.record_outcome(
+            project_id=project, assistant_id=assistant, context_key="ctx", arms=["a", "b"], winner=winner
+        )
+    assert store.flush(SessionLocal) == 2
+    store.record_outcome(project_id=project, assistant_id=assistant, context_key="ctx", arms=["a", "b"], winner="b")
+    assert store.flush(SessionLocal) == 2
+    assert store.flush(SessionLocal) == 0
+
+    with SessionLocal() as session:
+        rows = {
+            row.arm_logical_model: row
+            for row in session.execute(select(BanditArmStats)).scalars().all()
+        }
+    assert (rows["a"].alpha, rows["a"].beta, rows["a"].wins, rows["a"].samples) == (3.0, 3.0, 2, 4)
+    assert (rows["b"].alpha, rows["b"].beta, rows["b"].losses, rows["b"].samples) == (3.0, 3.0, 2, 4)
+
+
+def test_recommend_reads_cache_and_apply_buffers(db_session: Session, monkeypatch):
+    store = _store()
+    monkeypatch.setattr(bandit_policy_service, "bandit_arm_store", store)
+    monkeypatch.setattr(bandit_policy_service, "is_bound_to_global_engine", lambda _db: True)
+    # 只有启动了写回线程的进程才缓冲写入；这里不真正起线程。
+    monkeypatch.setattr(BanditArmStatsStore, "running", property(lambda _self: True))
+    project, assistant = uuid4(), uuid4()
+    context_key = build_context_key(project_id=project, assistant_id=assistant, features={"language": "en"})
+    db_session.add(
+        BanditArmStats(
+            api_key_id=project,
+            assistant_id=assistant,
+            context_key=context_key,
+            arm_logical_model="a",
+            alpha=50.0,
+            beta=1.0,
+            wins=49,
+            losses=0,
+            samples=49,
+        )
+    )
+    db_session.commit()
+
+    executed = []
+    original_execute = db_session.execute
+    monkeypatch.setattr(db_session, "execute", lambda *a, **kw: executed.append(a) or original_execute(*a, **kw))
+
+    def _recommend():
+        return recommend_challengers(
+            db_session,
+            project_id=project,
+            assistant_id=assistant,
+            baseline_logical_model="",
+            user_text="hello",
+            context_features={"language": "en"},
+            candidate_logical_models=["a", "b"],
+            k=2,
+        )
+
+    first = _recommend()
+    second = _recommend()
+    assert len(executed) == 1
+    assert first.context_key == second.context_key == context_key
+    assert {c.logical_model: c.samples for c in second.candidates} == {"a": 49, "b": 0}
+
+    apply_winner_update(
+        db_session,
+        project_id=project,
+        assistant_id=assistant,
+        context_key=context_key,
+        candidate_models=["a", "b"],
+        winner_model="b",
+    )
+    assert len(executed) == 1
+    assert store.pending_count() == 2
+    assert {c.logical_model: c.samples for c in _recommend().candidates} == {"a": 50, "b": 1}
+
+
+def test_failing_rows_are_isolated_and_dropped_after_retries(app_with_inmemory_db, monkeypatch):
+    from app.services import bandit_arm_store as store_module
+
+    _, SessionLocal = app_with_inmemory_db
+    store = _store()
+    project, assistant = uuid4(), uuid4()
+    store.record_outcome(project_id=project, assistant_id=assistant, context_key="ctx", arms=["ok", "bad"], winner="ok")
+
+    original = store_module._build_upsert_stmt
+
+    def _broken(session, items):
+        if any(key.arm == "bad" for key, _ in items):
+            raise RuntimeError("foreign key violation")
+        return original(session, items)
+
+    monkeypatch.setattr(store_module, "_build_upsert_stmt", _broken)
+
+    assert store.flush(SessionLocal) == 1
+    assert store.pending_count() == 1
+    for _ in range(store_module._MAX_FLUSH_ATTEMPTS - 1):
+        assert store.flush(SessionLocal) == 0
+    assert store.pending_count() == 0
+
+    with SessionLocal() as session:
+        arms = [row.arm_logical_model for row in session.execute(select(BanditArmStats)).scalars()]
+    assert arms == ["ok"]
+
+
+def test_apply_writes_directly_when_flusher_is_not_running(db_session: Session, monkeypatch):
+    store = _store()
+    monkeypatch.setattr(bandit_policy_service, "bandit_arm_store", store)
+    monkeypatch.setattr(bandit_policy_service, "is_bound_to_global_engine", lambda _db: True)
+    project, assistant = uuid4(), uuid4()
+
+    apply_winner_update(
+        db_session,
+        project_id=project,
+        assistant_id=assistant,
+        context_key="ctx",
+        candidate_models=["a", "b"],
+        winner_model="a",
+    )
+
+    db_session.flush()
+    assert store.pending_count() == 0
+    rows = db_session.execute(select(BanditArmStats)).scalars().all()
+    assert sorted((row.arm_logical_model, row.wins) for row in rows) == [("a", 1), ("b", 0)]
+
+
+def test_reads_during_flush_count_each_delta_exactly_once(app_with_inmemory_db):
+    _, SessionLocal = app_with_inmemory_db
+    store = _store()
+    project, assistant = uuid4(), uuid4()
+    key_a = ArmKey(project, assistant, "ctx", "a")
+    key_b = ArmKey(project, assistant, "ctx", "b")
+    store.fill([key_a], {})
+    store.record_outcome(project_id=project, assistant_id=assistant, context_key="ctx", arms=["a", "b"], winner="a")
+
+    committed = threading.Event()
+    release = threading.Event()
+
+    def _paused_session():
+        session = SessionLocal()
+        real_commit = session.commit
+
+        def _commit():
+            real_commit()
+            committed.set()
+            release.wait(5)
+
+        session.commit = _commit
+        return session
+
+    flusher = threading.Thread(target=store.flush, args=(_paused_session,))
+    flusher.start()
+    try:
+        assert committed.wait(5)
+        # 写回窗口内：已缓存的臂仍能看到正在写回的增量。
+        found, _ = store.lookup([key_a])
+        assert found[key_a] == ArmPosterior(alpha=2.0, beta=1.0, samples=1)
+
+        # 写回窗口内的 TTL 重新加载读到已提交的行，不能再叠加一次在途增量，也不能写入缓存。
+        generation = store.generation
+        _, missing = store.lookup([key_b])
+        assert missing == [key_b]
+        with SessionLocal() as session:
+            row = session.execute(select(BanditArmStats).where(BanditArmStats.arm_logical_model == "b")).scalar_one()
+            loaded = {key_b: posterior_from_row(row)}
+        filled = store.fill(missing, loaded, generation=generation)
+        assert filled[key_b] == ArmPosterior(alpha=1.0, beta=2.0, samples=1)
+    finally:
+        release.set()
+        flusher.join(5)
+
+    found, missing = store.lookup([key_a, key_b])
+    assert found[key_a] == ArmPosterior(alpha=2.0, beta=1.0, samples=1)
+    assert missing == [key_b]
+    assert store.pending_count() == 0
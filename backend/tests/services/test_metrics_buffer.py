@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import datetime as dt
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.metrics.latency_sketch import LatencySketch
+from app.models import ProviderRoutingMetricsHistory
+from app.services.metrics_buffer import (
+    BufferedMetricsRecorder,
+    MetricsKey,
+    MetricsStats,
+    _BatchFlushMixin,
+    _iter_batches,
+)
+
+WINDOW = dt.datetime(2026, 1, 1, 12, 0, tzinfo=dt.UTC)
+# user_id / api_key_id 为 NULL 时唯一约束不会冲突，这里使用固定的非空维度。
+USER_ID = uuid4()
+API_KEY_ID = uuid4()
+
+
+def _recorder(batch_size: int = 2) -> BufferedMetricsRecorder:
+    return BufferedMetricsRecorder(
+        flush_interval_seconds=60,
+        latency_sample_size=16,
+        max_buffered_buckets=1000,
+        success_sample_rate=1.0,
+        flush_batch_size=batch_size,
+    )
+
+
+def _record(recorder: BufferedMetricsRecorder, provider_id: str, *, success: bool, latency_ms: float) -> None:
+    recorder.record_sample(
+        provider_id=provider_id,
+        logical_model="gpt-4",
+        transport="http",
+        is_stream=False,
+        user_id=USER_ID,
+        api_key_id=API_KEY_ID,
+        window_start=WINDOW,
+        bucket_seconds=60,
+        success=success,
+        latency_ms=latency_ms,
+        error_kind=None if success else "5xx",
+    )
+
+
+def _rows(SessionLocal) -> dict[str, ProviderRoutingMetricsHistory]:
+    with SessionLocal() as session:
+        return {
+            row.provider_id: row
+            for row in session.execute(select(ProviderRoutingMetricsHistory)).scalars().all()
+        }
+
+
+def test_flush_writes_multi_row_batches_and_merges_existing(app_with_inmemory_db):
+    _, SessionLocal = app_with_inmemory_db
+    recorder = _recorder(batch_size=2)
+    for idx in range(5):
+        _record(recorder, f"p{idx}", success=True, latency_ms=100.0)
+
+    statements: list[int] = []
+    original = recorder._build_bulk_upsert_stmt
+
+    def _spy(session, batch):
+        statements.append(len(batch))
+        return original(session, batch)
+
+    recorder._build_bulk_upsert_stmt = _spy  # type: ignore[method-assign]
+    assert recorder.flush(SessionLocal) == 5
+    assert statements == [2, 2, 1]
+
+    _record(recorder, "p0", success=False, latency_ms=300.0)
+    assert recorder.flush(SessionLocal) == 1
+
+    row = _rows(SessionLocal)["p0"]
+    assert (row.total_requests_1m, row.success_requests, row.error_requests) == (2, 1, 1)
+    assert row.error_5xx_requests == 1
+    assert row.latency_avg_ms == pytest.approx(200.0)
+    assert row.error_rate == pytest.approx(0.5)
+    assert row.success_qps_1m == pytest.approx(1 / 60)
+
+
+def test_failed_batch_is_requeued_instead_of_dropped(app_with_inmemory_db):
+    _, SessionLocal = app_with_inmemory_db
+    recorder = _recorder(batch_size=10)
+    _record(recorder, "p-retry", success=True, latency_ms=50.0)
+
+    class _BrokenSession:
+        def get_bind(self):
+            raise RuntimeError("db down")
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    assert recorder.flush(lambda: _BrokenSession()) == 0
+    _record(recorder, "p-retry", success=True, latency_ms=150.0)
+
+    assert recorder.flush(SessionLocal) == 1
+    row = _rows(SessionLocal)["p-retry"]
+    assert row.total_requests_1m == 2
+    assert row.latency_avg_ms == pytest.approx(100.0)
+
+
+def test_batches_never_repeat_a_conflict_key():
+    keys = [
+        MetricsKey("p", "m", "http", False, None, None, WINDOW, 60),
+        MetricsKey("p", "m", "http", False, None, None, WINDOW, 300),
+        MetricsKey("q", "m", "http", False, None, None, WINDOW, 60),
+    ]
+    recorder = _recorder()
+    batches = list(
+        _iter_batches(
+            [(key, MetricsStats()) for key in keys],
+            batch_size=10,
+            conflict_key=recorder._conflict_key,
+        )
+    )
+    assert [len(batch) for batch in batches] == [1, 2]
+
+
+def test_unbuffered_path_upserts_single_row(app_with_inmemory_db, monkeypatch):
+    from app.services import metrics_service
+    from app.settings import settings
+
+    _, SessionLocal = app_with_inmemory_db
+    monkeypatch.setattr(settings, "metrics_buffer_enabled", False)
+    with SessionLocal() as session:
+        for latency in (100.0, 300.0):
+            metrics_service.record_provider_call_metric(
+                session,
+                provider_id="p-direct",
+                logical_model="gpt-4",
+                transport="http",
+                is_stream=False,
+                user_id=USER_ID,
+                api_key_id=API_KEY_ID,
+                success=True,
+                latency_ms=latency,
+            )
+
+    row = _rows(SessionLocal)["p-direct"]
+    assert row.total_requests_1m == 2
+    assert row.latency_avg_ms == pytest.approx(200.0)
+
+
+def test_conflicting_flushes_concatenate_latency_sketches(app_with_inmemory_db):
+    _, SessionLocal = app_with_inmemory_db
+    recorder = _recorder()
+    for latency in (100.0, 100.0, 100.0):
+        _record(recorder, "p-sketch", success=True, latency_ms=latency)
+    recorder.flush(SessionLocal)
+    _record(recorder, "p-sketch", success=True, latency_ms=2000.0)
+    recorder.flush(SessionLocal)
+
+    row = _rows(SessionLocal)["p-sketch"]
+    sketch = LatencySketch.from_bytes(row.latency_sketch)
+    assert sketch.count == row.total_requests_1m == 4
+    assert sketch.quantile(0.5) == pytest.approx(100.0, rel=0.01)
+    assert sketch.quantile(1.0) == pytest.approx(2000.0, rel=0.01)
+
+
+def test_batch_flush_mixin_requires_upsert_hooks():
+    class _Incomplete(_BatchFlushMixin):
+        def _conflict_key(self, key):
+            return key
+
+    with pytest.raises(TypeError, match="_build_bulk_upsert_stmt"):
+        _Incomplete()
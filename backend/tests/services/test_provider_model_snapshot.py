@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import ModelBillingConfig, Provider, ProviderModel
+from app.services import provider_model_snapshot as snapshot_module
+from app.services.credit_service import estimate_request_cost_credits
+from app.services.provider_model_snapshot import (
+    ProviderModelSnapshotStore,
+    build_provider_model_snapshot,
+    get_provider_model_snapshot,
+    get_provider_model_snapshot_store,
+    invalidate_provider_model_snapshot,
+)
+
+
+@pytest.fixture()
+def seeded_db(db_session: Session) -> Session:
+    provider = Provider(
+        provider_id="p-snap",
+        name="Provider Snapshot",
+        base_url="https://p-snap.local",
+        transport="http",
+        billing_factor=2.0,
+    )
+    db_session.add(provider)
+    db_session.flush()
+    db_session.add_all(
+        [
+            ProviderModel(
+                provider_id=provider.id,
+                model_id="m-priced",
+                family="test-family",
+                display_name="m-priced",
+                context_length=8192,
+                capabilities=["chat"],
+                pricing={"input": 1.0, "output": 3.0},
+            ),
+            ProviderModel(
+                provider_id=provider.id,
+                model_id="m-disabled",
+                family="test-family",
+                display_name="m-disabled",
+                context_length=8192,
+                capabilities=["chat"],
+                disabled=True,
+            ),
+            ModelBillingConfig(model_name="logical-snap", multiplier=1.5, is_active=True),
+            ModelBillingConfig(model_name="logical-off", multiplier=9.0, is_active=False),
+        ]
+    )
+    db_session.commit()
+    yield db_session
+    invalidate_provider_model_snapshot()
+
+
+def test_build_snapshot_lookups(seeded_db: Session):
+    snapshot = build_provider_model_snapshot(seeded_db, version=7)
+
+    assert snapshot.version == 7
+    assert snapshot.disabled_pairs_for({"p-snap", "other"}, {"m-priced", "m-disabled"}) == {
+        ("p-snap", "m-disabled")
+    }
+    assert snapshot.any_disabled(["m-disabled"], {"p-snap"})
+    assert not snapshot.any_disabled(["m-priced"], {"p-snap"})
+    assert snapshot.pricing_for("p-snap", "m-priced") == {"input": 1.0, "output": 3.0}
+    assert snapshot.pricing_for("p-snap", "m-disabled") is None
+    assert snapshot.multiplier_for("logical-snap") == 1.5
+    assert snapshot.multiplier_for("logical-off") == 1.0
+    assert snapshot.provider_factor_for("p-snap") == 2.0
+    assert snapshot.provider_factor_for("unknown") == 1.0
+
+
+def test_store_rebuilds_only_when_rows_change(seeded_db: Session):
+    store = ProviderModelSnapshotStore()
+
+    first = store.refresh(seeded_db)
+    assert first is not None and first.version == 1
+    assert store.refresh(seeded_db) is first
+
+    row = seeded_db.execute(
+        select(ProviderModel).where(ProviderModel.model_id == "m-priced")
+    ).scalar_one()
+    row.disabled = True
+    seeded_db.commit()
+
+    second = store.refresh(seeded_db)
+    assert second is not first
+    assert second.version == 2
+    assert ("p-snap", "m-priced") in second.disabled_pairs
+
+    store.invalidate()
+    assert store.get() is None
+
+
+def test_store_discards_build_started_before_invalidation(seeded_db: Session, monkeypatch):
+    store = ProviderModelSnapshotStore()
+    real_build = snapshot_module.build_provider_model_snapshot
+
+    def _build_then_invalidate(db, *, version):
+        snapshot = real_build(db, version=version)
+        store.invalidate()
+        return snapshot
+
+    monkeypatch.setattr(snapshot_module, "build_provider_model_snapshot", _build_then_invalidate)
+    assert store.refresh(seeded_db) is None
+    assert store.get() is None
+
+
+def test_cost_estimate_served_from_snapshot(seeded_db: Session, monkeypatch):
+    kwargs = dict(
+        logical_model_name="logical-snap",
+        provider_id="p-snap",
+        provider_model_id="m-priced",
+        request_payload={"max_tokens": 1000},
+    )
+    # 测试库不是全局 engine，默认不使用快照。
+    assert get_provider_model_snapshot(seeded_db) is None
+
+    monkeypatch.setattr(snapshot_module, "is_bound_to_global_engine", lambda _db: True)
+    get_provider_model_snapshot_store().refresh(seeded_db)
+    assert estimate_request_cost_credits(seeded_db, **kwargs) == 9
+
+    # 未失效前修改数据库不影响请求路径（只查快照）。
+    row = seeded_db.execute(
+        select(ProviderModel).where(ProviderModel.model_id == "m-priced")
+    ).scalar_one()
+    row.pricing = {"input": 1.0, "output": 10.0}
+    seeded_db.commit()
+    assert estimate_request_cost_credits(seeded_db, **kwargs) == 9
+
+    invalidate_provider_model_snapshot()
+    assert estimate_request_cost_credits(seeded_db, **kwargs) == 30
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.pubsub_hub import PubSubHub, get_pubsub_hub
+from app.services.run_event_bus import run_event_channel, subscribe_run_events
+from app.settings import settings
+from tests.utils import InMemoryRedis
+
+
+async def _publish(redis: InMemoryRedis, run_id: str, seq: int) -> None:
+    await redis.publish(run_event_channel(run_id=run_id), json.dumps({"type": "run.event", "seq": seq}))
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_one_pattern_connection_and_are_routed_by_channel() -> None:
+    redis = InMemoryRedis()
+    hub = PubSubHub(redis)
+
+    async with hub.subscribe(run_event_channel(run_id="a")) as sub_a:
+        async with hub.subscribe(run_event_channel(run_id="b")) as sub_b:
+            assert hub.subscriber_count == 2
+            # 两个订阅方只对应一条 PSUBSCRIBE 连接。
+            assert {pattern: len(queues) for pattern, queues in redis._pubsub_patterns.items()} == {
+                "run_events:*": 1,
+                "workflow_run_events:*": 1,
+            }
+
+            await _publish(redis, "a", 1)
+            await _publish(redis, "b", 7)
+            assert (await asyncio.wait_for(sub_a.get(), 1))["seq"] == 1
+            assert (await asyncio.wait_for(sub_b.get(), 1))["seq"] == 7
+
+        assert hub.running
+
+    # 最后一个订阅方离开后关闭共享连接。
+    assert not hub.running
+    assert redis._pubsub_patterns == {}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_messages(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "event_stream_queue_size", 2)
+    redis = InMemoryRedis()
+
+    async with get_pubsub_hub(redis).subscribe(run_event_channel(run_id="slow")) as sub:
+        for seq in range(1, 5):
+            await _publish(redis, "slow", seq)
+        for _ in range(10):
+            if sub.dropped == 2:
+                break
+            await asyncio.sleep(0)
+
+        assert sub.dropped == 2
+        assert [(await sub.get())["seq"] for _ in range(2)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_run_events_ends_on_disconnect_without_polling() -> None:
+    redis = InMemoryRedis()
+    disconnected = asyncio.Event()
+
+    class _Request:
+        async def is_disconnected(self) -> bool:  # pragma: no cover - must not be polled
+            raise AssertionError("is_disconnected should not be polled")
+
+        async def receive(self) -> dict:
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+    seen: list[int] = []
+
+    async def _consume() -> None:
+        async for env in subscribe_run_events(redis, run_id="r1", after_seq=1, request=_Request()):
+            seen.append(int(env["seq"]))
+            if len(seen) == 1:
+                disconnected.set()
+
+    consumer = asyncio.create_task(_consume())
+    for _ in range(50):
+        if redis._pubsub_patterns:
+            break
+        await asyncio.sleep(0.01)
+
+    await _publish(redis, "r1", 1)  # 已回放过的序号被忽略
+    await _publish(redis, "r1", 2)
+    await asyncio.wait_for(consumer, 1)
+
+    assert seen == [2]
+    assert redis._pubsub_patterns == {}
+
+
+@pytest.mark.asyncio
+async def test_subscribe_run_events_emits_heartbeat_when_idle() -> None:
+    redis = InMemoryRedis()
+    stream = subscribe_run_events(redis, run_id="idle", after_seq=3, heartbeat_seconds=0.01)
+    try:
+        env = await asyncio.wait_for(anext(stream), 1)
+    finally:
+        await stream.aclose()
+
+    assert env["type"] == "heartbeat"
+    assert env["after_seq"] == 3
@@ -5,8 +5,9 @@ import json
 
 import pytest
 
+from app.api.v1.chat.protocol_stream_adapter import ClaudeToOpenAIStreamAdapter
 from app.services.bridge_tool_runner import wait_for_bridge_result
-from app.services.sse_parser import iter_sse_events
+from app.services.sse_parser import SSEFramer, iter_sse_events
 
 
 async def _aiter(chunks: list[bytes]):
@@ -29,6 +30,42 @@ async def test_iter_sse_events_parses_crlf_frame_separator():
     assert events == [("bridge", "{\"type\":\"RESULT\",\"req_id\":\"r1\",\"payload\":{\"ok\":true}}")]
 
 
+@pytest.mark.parametrize("step", [1, 2, 3, 7, 1024])
+def test_sse_framer_handles_any_split_and_mixed_separators(step):
+    body = (
+        b"event: a\r\ndata: 1\r\n\r\n"
+        b"data: \xe4\xbd\xa0\n\n"
+        b": keepalive\n\n"
+        b"data: x\n\r\n"
+        b"data: y\ndata: z\n\n"
+        b"data: tail"
+    )
+    framer = SSEFramer()
+    events = []
+    for i in range(0, len(body), step):
+        events.extend((ev.event, ev.data) for ev in framer.feed_events(memoryview(body)[i : i + step]))
+
+    assert events == [("a", "1"), ("message", "你"), ("message", "x"), ("message", "y\nz")]
+    assert framer.flush() == b"data: tail"
+
+
+def test_claude_adapter_keeps_multibyte_text_split_across_chunks():
+    body = (
+        "event: content_block_delta\r\n"
+        'data: {"type":"content_block_delta","delta":{"type":"text_delta","text":"你好"}}\r\n\r\n'
+    ).encode()
+    adapter = ClaudeToOpenAIStreamAdapter("m")
+    outputs = []
+    for i in range(0, len(body), 5):
+        outputs.extend(adapter.process_chunk(body[i : i + 5]))
+
+    texts = [
+        json.loads(out[len(b"data: ") :])["choices"][0]["delta"].get("content")
+        for out in outputs
+    ]
+    assert "你好" in texts
+
+
 @pytest.mark.asyncio
 async def test_wait_for_bridge_result_times_out_when_stream_never_yields_data_frames():
     hang = asyncio.Event()
@@ -0,0 +1,142 @@
+"""
+测试聊天热路径的异步数据库读取（AsyncSession 与同步回退）
+"""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.api.v1.chat.provider_selector import ProviderSelector
+from app.db.async_session import async_session_for, to_async_database_url
+from app.models import ModelBillingConfig, Provider, ProviderModel
+from app.services.credit_service import (
+    aestimate_request_cost_credits,
+    estimate_request_cost_credits,
+)
+
+
+class _SyncBackedAsyncSession:
+    """用同步 Session 模拟 AsyncSession，验证异步分支执行的语句与结果。"""
+
+    def __init__(self, db: Session) -> None:
+        self._db = db
+        self.executed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.executed += 1
+        return self._db.execute(stmt)
+
+
+def _seed_priced_models(db: Session) -> None:
+    provider = Provider(
+        provider_id="p-async",
+        name="Provider Async",
+        base_url="https://p-async.local",
+        transport="http",
+        billing_factor=2.0,
+    )
+    db.add(provider)
+    db.flush()
+    db.add_all(
+        [
+            ProviderModel(
+                provider_id=provider.id,
+                model_id="m-priced",
+                family="test-family",
+                display_name="m-priced",
+                context_length=8192,
+                capabilities=["chat"],
+                pricing={"input": 1.0, "output": 3.0},
+            ),
+            ProviderModel(
+                provider_id=provider.id,
+                model_id="m-disabled",
+                family="test-family",
+                display_name="m-disabled",
+                context_length=8192,
+                capabilities=["chat"],
+                disabled=True,
+            ),
+            ModelBillingConfig(model_name="logical-async", multiplier=1.5, is_active=True),
+        ]
+    )
+    db.commit()
+
+
+def test_to_async_database_url():
+    assert (
+        to_async_database_url("postgresql+psycopg://u:p@db:5432/app")
+        == "postgresql+psycopg://u:p@db:5432/app"
+    )
+    assert (
+        to_async_database_url("postgresql://u:p@db:5432/app")
+        == "postgresql+psycopg://u:p@db:5432/app"
+    )
+    assert to_async_database_url("mysql://u:p@db/app") is None
+    assert to_async_database_url("not a url") is None
+
+
+def test_async_session_for_skips_foreign_engine(db_session: Session):
+    assert async_session_for(None) is None
+    # 测试库（SQLite）不是全局 engine，调用方应回退到同步查询。
+    assert async_session_for(db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_aestimate_request_cost_matches_sync(db_session: Session, monkeypatch):
+    _seed_priced_models(db_session)
+    kwargs = dict(
+        logical_model_name="logical-async",
+        provider_id="p-async",
+        provider_model_id="m-priced",
+        request_payload={"max_tokens": 1000},
+    )
+
+    expected = estimate_request_cost_credits(db_session, **kwargs)
+    assert expected == 9  # 1000/1000 * 3.0 * 1.5 * 2.0
+    assert await aestimate_request_cost_credits(db_session, **kwargs) == expected
+
+    fake = _SyncBackedAsyncSession(db_session)
+    monkeypatch.setattr(
+        "app.services.credit_service.async_session_for", lambda _db: (lambda: fake)
+    )
+    assert await aestimate_request_cost_credits(db_session, **kwargs) == expected
+    assert fake.executed == 3
+
+
+@pytest.mark.asyncio
+async def test_selector_disabled_lookups_use_async_session(db_session: Session, monkeypatch):
+    _seed_priced_models(db_session)
+    selector = ProviderSelector(client=MagicMock(), redis=object, db=db_session)
+
+    sync_pairs = selector._load_disabled_pairs(
+        provider_ids={"p-async"}, model_ids={"m-priced", "m-disabled"}
+    )
+    assert sync_pairs == {("p-async", "m-disabled")}
+
+    fake = _SyncBackedAsyncSession(db_session)
+    monkeypatch.setattr(
+        "app.api.v1.chat.provider_selector.async_session_for", lambda _db: (lambda: fake)
+    )
+    assert (
+        await selector._aload_disabled_pairs(
+            provider_ids={"p-async"}, model_ids={"m-priced", "m-disabled"}
+        )
+        == sync_pairs
+    )
+    assert await selector._ais_any_model_disabled(
+        model_ids=["m-disabled"], provider_ids={"p-async"}
+    )
+    assert not await selector._ais_any_model_disabled(
+        model_ids=["m-priced"], provider_ids={"p-async"}
+    )
+    assert fake.executed == 3
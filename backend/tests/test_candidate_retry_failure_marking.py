@@ -14,6 +14,7 @@ from app.api.v1.chat.routing_state import FailureCooldownStatus, RoutingStateSer
 from app.api.v1.chat.transport_handlers import TransportResult
 from app.routing.scheduler import CandidateScore
 from app.schemas import PhysicalModel
+from tests.utils import wire_candidate_states
 
 
 @pytest.fixture
@@ -62,6 +63,7 @@ def mock_routing_state():
     )
     state.increment_provider_failure = AsyncMock(return_value=1)
     state.clear_provider_failure = AsyncMock()
+    wire_candidate_states(state)
     return state
 
 
@@ -0,0 +1,237 @@
+"""
+测试非流式对冲请求：首选上游超过对冲延迟未返回时并发请求下一个候选
+"""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.chat.candidate_retry import _hedge_delay_seconds, try_candidates_non_stream
+from app.api.v1.chat.routing_state import FailureCooldownStatus, RoutingStateService
+from app.api.v1.chat.transport_handlers import TransportResult
+from app.routing.scheduler import CandidateScore
+from app.schemas import PhysicalModel, ProviderStatus, RoutingMetrics
+from app.settings import settings
+from tests.utils import wire_candidate_states
+
+
+def _candidate(provider_id: str, *, p95_ms: float | None = None) -> CandidateScore:
+    metrics = None
+    if p95_ms is not None:
+        metrics = RoutingMetrics(
+            logical_model="test-model",
+            provider_id=provider_id,
+            latency_p95_ms=p95_ms,
+            latency_p99_ms=p95_ms * 2,
+            error_rate=0.0,
+            success_qps_1m=1.0,
+            total_requests_1m=60,
+            last_updated=0.0,
+            status=ProviderStatus.HEALTHY,
+        )
+    upstream = PhysicalModel(
+        provider_id=provider_id,
+        model_id=f"{provider_id}-model",
+        endpoint=f"https://{provider_id}.example.com/v1/chat/completions",
+        base_weight=1.0,
+        updated_at=0.0,
+    )
+    return CandidateScore(upstream=upstream, score=1.0, metrics=metrics)
+
+
+@pytest.fixture
+def routing_state():
+    state = MagicMock(spec=RoutingStateService)
+    state.get_failure_cooldown_status = AsyncMock(
+        side_effect=lambda pid: FailureCooldownStatus(
+            provider_id=pid,
+            count=0,
+            threshold=3,
+            cooldown_seconds=60,
+            should_skip=False,
+        )
+    )
+    state.increment_provider_failure = AsyncMock(return_value=1)
+    state.clear_provider_failure = AsyncMock()
+    wire_candidate_states(state)
+    return state
+
+
+@pytest.fixture
+def hedging_settings(monkeypatch):
+    monkeypatch.setattr(settings, "hedged_requests_logical_models", "test-model")
+    monkeypatch.setattr(settings, "hedged_requests_min_delay_ms", 0)
+    monkeypatch.setattr(settings, "hedged_requests_default_delay_ms", 20)
+
+
+async def _run(candidates, routing_state, exec_fn, attempts):
+    api_key = MagicMock()
+    api_key.id = "key-123"
+    api_key.user_id = "user-123"
+    on_success = AsyncMock()
+    with patch("app.api.v1.chat.candidate_retry.get_provider_config") as mock_cfg:
+        mock_cfg.return_value = MagicMock(transport="http")
+        with patch("app.api.v1.chat.candidate_retry.execute_http_transport", side_effect=exec_fn):
+            response = await try_candidates_non_stream(
+                candidates=candidates,
+                client=AsyncMock(),
+                redis=AsyncMock(),
+                db=MagicMock(),
+                payload={"model": "test"},
+                logical_model_id="test-model",
+                api_key=api_key,
+                on_success=on_success,
+                routing_state=routing_state,
+                attempts=attempts,
+            )
+    return response, on_success
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_primary_stalls(routing_state, hedging_settings):
+    cancelled: list[str] = []
+    hedge_response = MagicMock(status_code=200)
+
+    async def _exec(**kwargs):
+        if kwargs["provider_id"] == "provider-1":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("provider-1")
+                raise
+        return TransportResult(success=True, response=hedge_response)
+
+    attempts: list[dict] = []
+    response, on_success = await _run(
+        [_candidate("provider-1"), _candidate("provider-2")], routing_state, _exec, attempts
+    )
+
+    assert response is hedge_response
+    assert cancelled == ["provider-1"]
+    # 只有胜出者触发 on_success（计费 / 路由记录）。
+    on_success.assert_awaited_once_with("provider-2", "provider-2-model")
+    by_provider = {a["provider_id"]: a for a in attempts}
+    assert by_provider["provider-1"]["error_category"] == "hedge_cancelled"
+    assert by_provider["provider-2"]["success"] is True
+    assert by_provider["provider-2"]["hedged"] is True
+
+
+@pytest.mark.asyncio
+async def test_simultaneous_loser_failure_is_still_recorded(routing_state, hedging_settings):
+    gate = asyncio.Event()
+    hedge_response = MagicMock(status_code=200)
+
+    async def _exec(**kwargs):
+        if kwargs["provider_id"] == "provider-1":
+            await gate.wait()
+            return TransportResult(success=False, status_code=503, error_text="busy", retryable=True)
+        # 对冲请求返回的同时放行首选请求：两者在同一轮等待中完成。
+        gate.set()
+        return TransportResult(success=True, response=hedge_response)
+
+    attempts: list[dict] = []
+    response, on_success = await _run(
+        [_candidate("provider-1"), _candidate("provider-2")], routing_state, _exec, attempts
+    )
+
+    assert response is hedge_response
+    on_success.assert_awaited_once_with("provider-2", "provider-2-model")
+    routing_state.increment_provider_failure.assert_awaited_once_with("provider-1")
+    by_provider = {a["provider_id"]: a for a in attempts}
+    assert by_provider["provider-1"]["success"] is False
+    assert by_provider["provider-1"]["status_code"] == 503
+    assert by_provider["provider-1"]["error_category"] != "hedge_cancelled"
+
+
+@pytest.mark.asyncio
+async def test_fast_non_retryable_hedge_failure_waits_for_primary(routing_state, hedging_settings):
+    primary_response = MagicMock(status_code=200)
+
+    async def _exec(**kwargs):
+        if kwargs["provider_id"] == "provider-1":
+            await asyncio.sleep(0.1)
+            return TransportResult(success=True, response=primary_response)
+        return TransportResult(success=False, status_code=400, error_text="bad request", retryable=False)
+
+    attempts: list[dict] = []
+    response, on_success = await _run(
+        [_candidate("provider-1"), _candidate("provider-2")], routing_state, _exec, attempts
+    )
+
+    # 对冲请求的不可重试失败只记录，不取消仍在途的首选请求。
+    assert response is primary_response
+    on_success.assert_awaited_once_with("provider-1", "provider-1-model")
+    by_provider = {a["provider_id"]: a for a in attempts}
+    assert by_provider["provider-1"]["success"] is True
+    assert by_provider["provider-2"]["success"] is False
+    assert by_provider["provider-2"]["status_code"] == 400
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_hedge_failure_raised_once_nothing_in_flight(routing_state, hedging_settings):
+    async def _exec(**kwargs):
+        if kwargs["provider_id"] == "provider-1":
+            await asyncio.sleep(0.1)
+            return TransportResult(success=False, status_code=503, error_text="busy", retryable=True)
+        return TransportResult(success=False, status_code=400, error_text="bad request", retryable=False)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await _run(
+            [_candidate("provider-1"), _candidate("provider-2"), _candidate("provider-3")],
+            routing_state,
+            _exec,
+            [],
+        )
+
+    assert exc_info.value.status_code == 502
+    assert "provider=provider-2" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_does_not_hedge(routing_state, hedging_settings):
+    called: list[str] = []
+
+    async def _exec(**kwargs):
+        called.append(kwargs["provider_id"])
+        return TransportResult(success=True, response=MagicMock(status_code=200))
+
+    attempts: list[dict] = []
+    _, on_success = await _run(
+        [_candidate("provider-1"), _candidate("provider-2")], routing_state, _exec, attempts
+    )
+
+    assert called == ["provider-1"]
+    assert len(attempts) == 1
+    on_success.assert_awaited_once_with("provider-1", "provider-1-model")
+
+
+@pytest.mark.asyncio
+async def test_hedging_disabled_by_default(routing_state, monkeypatch):
+    monkeypatch.setattr(settings, "hedged_requests_logical_models", "")
+    monkeypatch.setattr(settings, "hedged_requests_api_key_ids", "")
+    called: list[str] = []
+
+    async def _exec(**kwargs):
+        called.append(kwargs["provider_id"])
+        if kwargs["provider_id"] == "provider-1":
+            return TransportResult(success=False, status_code=503, error_text="busy", retryable=True)
+        return TransportResult(success=True, response=MagicMock(status_code=200))
+
+    await _run([_candidate("provider-1"), _candidate("provider-2")], routing_state, _exec, [])
+
+    assert called == ["provider-1", "provider-2"]
+
+
+def test_hedge_delay_uses_p95_within_bounds(monkeypatch):
+    monkeypatch.setattr(settings, "hedged_requests_default_delay_ms", 1500)
+    monkeypatch.setattr(settings, "hedged_requests_min_delay_ms", 200)
+    monkeypatch.setattr(settings, "hedged_requests_max_delay_ms", 5000)
+
+    assert _hedge_delay_seconds(_candidate("p", p95_ms=800)) == pytest.approx(0.8)
+    assert _hedge_delay_seconds(_candidate("p", p95_ms=50)) == pytest.approx(0.2)
+    assert _hedge_delay_seconds(_candidate("p", p95_ms=90000)) == pytest.approx(5.0)
+    assert _hedge_delay_seconds(_candidate("p")) == pytest.approx(1.5)
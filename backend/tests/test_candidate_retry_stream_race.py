@@ -0,0 +1,199 @@
+"""
+测试流式首字节竞速：同时请求排名靠前的候选，先产出首个数据块者胜出
+"""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.api.v1.chat.candidate_retry import _stream_race_budget, try_candidates_stream
+from app.api.v1.chat.routing_state import FailureCooldownStatus, RoutingStateService
+from app.routing.scheduler import CandidateScore
+from app.schemas import PhysicalModel
+from app.settings import settings
+from tests.utils import InMemoryRedis, wire_candidate_states
+
+
+def _candidate(provider_id: str) -> CandidateScore:
+    upstream = PhysicalModel(
+        provider_id=provider_id,
+        model_id=f"{provider_id}-model",
+        endpoint=f"https://{provider_id}.example.com/v1/chat/completions",
+        base_weight=1.0,
+        updated_at=0.0,
+    )
+    return CandidateScore(upstream=upstream, score=1.0, metrics=None)
+
+
+@pytest.fixture
+def routing_state():
+    state = MagicMock(spec=RoutingStateService)
+    state.get_failure_cooldown_status = AsyncMock(
+        side_effect=lambda pid: FailureCooldownStatus(
+            provider_id=pid,
+            count=0,
+            threshold=3,
+            cooldown_seconds=60,
+            should_skip=False,
+        )
+    )
+    state.increment_provider_failure = AsyncMock(return_value=1)
+    state.clear_provider_failure = AsyncMock()
+    wire_candidate_states(state)
+    return state
+
+
+@pytest.fixture
+def race_settings(monkeypatch):
+    monkeypatch.setattr(settings, "stream_race_logical_models", "test-model")
+    monkeypatch.setattr(settings, "stream_race_width", 2)
+    monkeypatch.setattr(settings, "stream_race_extra_budget_per_minute", 10)
+
+
+async def _collect(candidates, routing_state, stream_fn, attempts, *, redis=None):
+    api_key = MagicMock()
+    api_key.id = "key-123"
+    api_key.user_id = "user-123"
+    on_first_chunk = AsyncMock()
+    chunks: list[bytes] = []
+    with patch("app.api.v1.chat.candidate_retry.get_provider_config") as mock_cfg:
+        mock_cfg.return_value = MagicMock(transport="http")
+        with patch(
+            "app.api.v1.chat.transport_handlers_stream.execute_http_stream",
+            side_effect=stream_fn,
+        ):
+            async for chunk in try_candidates_stream(
+                candidates=candidates,
+                client=AsyncMock(),
+                redis=redis or InMemoryRedis(),
+                db=MagicMock(),
+                payload={"model": "test", "stream": True},
+                logical_model_id="test-model",
+                api_key=api_key,
+                on_first_chunk=on_first_chunk,
+                routing_state=routing_state,
+                attempts=attempts,
+            ):
+                chunks.append(chunk)
+    return chunks, on_first_chunk
+
+
+@pytest.mark.asyncio
+async def test_fastest_first_chunk_wins_and_loser_is_aborted(routing_state, race_settings):
+    aborted: list[str] = []
+
+    async def _stream(**kwargs):
+        provider_id = kwargs["provider_id"]
+        if provider_id == "provider-1":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                aborted.append(provider_id)
+                raise
+        yield f"data: {provider_id}-1\n\n".encode()
+        yield f"data: {provider_id}-2\n\n".encode()
+
+    attempts: list[dict] = []
+    chunks, on_first_chunk = await _collect(
+        [_candidate("provider-1"), _candidate("provider-2")], routing_state, _stream, attempts
+    )
+
+    assert chunks == [b"data: provider-2-1\n\n", b"data: provider-2-2\n\n"]
+    assert aborted == ["provider-1"]
+    on_first_chunk.assert_awaited_once_with("provider-2", "provider-2-model")
+    by_provider = {a["provider_id"]: a for a in attempts}
+    assert by_provider["provider-1"]["error_category"] == "race_cancelled"
+    assert by_provider["provider-2"]["success"] is True
+    assert by_provider["provider-2"]["raced"] is True
+    assert by_provider["provider-2"]["ttfb_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_racer_failure_leaves_other_racer_running(routing_state, race_settings):
+    async def _stream(**kwargs):
+        if kwargs["provider_id"] == "provider-1":
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(0.01)
+        yield b"data: ok\n\n"
+
+    attempts: list[dict] = []
+    chunks, on_first_chunk = await _collect(
+        [_candidate("provider-1"), _candidate("provider-2")], routing_state, _stream, attempts
+    )
+
+    assert chunks == [b"data: ok\n\n"]
+    on_first_chunk.assert_awaited_once_with("provider-2", "provider-2-model")
+    assert [a["success"] for a in attempts] == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_falls_back_to_sequential(routing_state, race_settings, monkeypatch):
+    monkeypatch.setattr(settings, "stream_race_extra_budget_per_minute", 1)
+    redis = InMemoryRedis()
+    started: list[str] = []
+
+    async def _stream(**kwargs):
+        started.append(kwargs["provider_id"])
+        yield b"data: ok\n\n"
+
+    candidates = [_candidate("provider-1"), _candidate("provider-2")]
+    await _collect(candidates, routing_state, _stream, [], redis=redis)
+    assert sorted(started) == ["provider-1", "provider-2"]
+
+    started.clear()
+    await _collect(candidates, routing_state, _stream, [], redis=redis)
+    assert started == ["provider-1"]
+
+
+@pytest.mark.asyncio
+async def test_denied_race_slot_keeps_candidate_for_sequential_retry(routing_state, race_settings):
+    started: list[str] = []
+
+    async def _stream(**kwargs):
+        started.append(kwargs["provider_id"])
+        if kwargs["provider_id"] == "provider-1":
+            raise RuntimeError("connection reset")
+        yield b"data: ok\n\n"
+
+    with patch("app.api.v1.chat.candidate_retry._reserve_race_slot", AsyncMock(return_value=False)):
+        chunks, _ = await _collect([_candidate("provider-1"), _candidate("provider-2")], routing_state, _stream, [])
+
+    assert started == ["provider-1", "provider-2"]
+    assert chunks == [b"data: ok\n\n"]
+
+
+@pytest.mark.asyncio
+async def test_no_race_slot_reserved_without_runnable_candidate(routing_state, race_settings):
+    routing_state.get_failure_cooldown_status = AsyncMock(
+        side_effect=lambda pid: FailureCooldownStatus(
+            provider_id=pid,
+            count=3,
+            threshold=3,
+            cooldown_seconds=60,
+            should_skip=pid == "provider-2",
+        )
+    )
+
+    async def _stream(**kwargs):
+        yield b"data: ok\n\n"
+
+    reserve = AsyncMock(return_value=True)
+    with patch("app.api.v1.chat.candidate_retry._reserve_race_slot", reserve):
+        await _collect([_candidate("provider-1"), _candidate("provider-2")], routing_state, _stream, [])
+
+    reserve.assert_not_awaited()
+
+
+def test_race_budget_parsing(monkeypatch):
+    monkeypatch.setattr(settings, "stream_race_extra_budget_per_minute", 60)
+
+    monkeypatch.setattr(settings, "stream_race_logical_models", "")
+    assert _stream_race_budget("gpt-4o") == 0
+
+    monkeypatch.setattr(settings, "stream_race_logical_models", "gpt-4o=5, claude, *=2")
+    assert _stream_race_budget("gpt-4o") == 5
+    assert _stream_race_budget("claude") == 60
+    assert _stream_race_budget("other") == 2
@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+
+from app.logging_config import (
+    BoundedQueueHandler,
+    DispatchingQueueListener,
+    LogQueueStats,
+    LogSampler,
+    log_sampled,
+)
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: list[str] = []
+        self.threads: set[str] = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.threads.add(threading.current_thread().name)
+        self.lines.append(self.format(record))
+
+
+def _isolated_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    test_logger = logging.getLogger(name)
+    test_logger.handlers = [handler]
+    test_logger.setLevel(logging.DEBUG)
+    test_logger.propagate = False
+    return test_logger
+
+
+def test_queue_handler_formats_and_writes_on_listener_thread() -> None:
+    log_queue: queue.Queue = queue.Queue(maxsize=100)
+    stats = LogQueueStats()
+    target = _RecordingHandler()
+    target.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    target.setLevel(logging.INFO)
+    listener = DispatchingQueueListener(log_queue, stats)
+    test_logger = _isolated_logger("apiproxy.test_queue", BoundedQueueHandler(log_queue, target, stats))
+
+    payload = {"n": 1}
+    listener.start()
+    try:
+        test_logger.info("payload=%s", payload)
+        payload["n"] = 2  # 入队后修改参数不影响日志内容
+        test_logger.debug("below target level")
+    finally:
+        listener.stop()
+
+    assert target.lines == ["[INFO] payload={'n': 1}"]
+    assert threading.current_thread().name not in target.threads
+
+
+def test_full_queue_drops_records_and_reports_count() -> None:
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    stats = LogQueueStats()
+    target = _RecordingHandler()
+    target.setFormatter(logging.Formatter("%(message)s"))
+    test_logger = _isolated_logger("apiproxy.test_queue_full", BoundedQueueHandler(log_queue, target, stats))
+
+    # 监听线程尚未启动：前两条入队，其余直接丢弃，调用方不会阻塞。
+    for i in range(5):
+        test_logger.info("line %d", i)
+    assert stats.dropped == 3
+
+    listener = DispatchingQueueListener(log_queue, stats, drop_report_handler=target)
+    listener.start()
+    listener.stop()
+
+    assert target.lines == [
+        "logging queue full: dropped 3 log records",
+        "line 0",
+        "line 1",
+    ]
+
+
+def test_log_sampler_emits_once_per_window_with_suppressed_count() -> None:
+    now = [0.0]
+    sampler = LogSampler(10.0, clock=lambda: now[0])
+    target = _RecordingHandler()
+    target.setFormatter(logging.Formatter("%(message)s"))
+    test_logger = _isolated_logger("apiproxy.test_sampler", target)
+
+    for _ in range(3):
+        sampler.log(test_logger, logging.INFO, ("send", "p1"), "sending to %s", "p1")
+    sampler.log(test_logger, logging.INFO, ("send", "p2"), "sending to %s", "p2")
+    now[0] = 10.0
+    sampler.log(test_logger, logging.INFO, ("send", "p1"), "sending to %s", "p1")
+
+    assert target.lines == [
+        "sending to p1",
+        "sending to p2",
+        "sending to p1 (suppressed 2 similar)",
+    ]
+
+
+def test_log_sampler_keeps_caller_location_and_can_be_disabled() -> None:
+    records: list[logging.LogRecord] = []
+
+    class _Capture(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            records.append(record)
+
+    test_logger = _isolated_logger("apiproxy.test_sampler_disabled", _Capture())
+    sampler = LogSampler(0)
+    for _ in range(3):
+        sampler.log(test_logger, logging.INFO, "same", "hello")
+
+    log_sampled(test_logger, "module-level", "hello")
+
+    assert len(records) == 4
+    # 业务分桶依赖调用方文件路径，采样不能把记录归到 logging_config.py。
+    assert {r.pathname for r in records} == {__file__}
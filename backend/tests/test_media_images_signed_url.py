@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import time
 
+import pytest
+
 from app.services.image_storage_service import build_signed_image_url
 
 
@@ -32,3 +34,152 @@ def test_media_images_endpoint_expired_signature_returns_403(client):
     # A dummy sig; should fail due to expiry first.
     resp = client.get(f"/media/images/{object_key}?expires={expires}&sig=deadbeef")
     assert resp.status_code == 403
+
+
+class _FakeStorage:
+    def __init__(self, objects: dict[str, bytes]) -> None:
+        self.objects = objects
+        self.opens = 0
+        self.closed = 0
+
+    async def open_image_stream(self, object_key: str, *, chunk_size: int = 4):
+        from app.services.image_storage_service import ImageObjectStream
+
+        self.opens += 1
+        data = self.objects[object_key]
+
+        async def _chunks():
+            for i in range(0, len(data), chunk_size):
+                yield data[i : i + chunk_size]
+
+        return ImageObjectStream(
+            object_key=object_key,
+            content_type="image/png",
+            size_bytes=len(data),
+            etag='"abc123"',
+            chunks=_chunks(),
+            release=self._release,
+        )
+
+    def _release(self) -> None:
+        self.closed += 1
+
+
+@pytest.fixture()
+def proxied_storage(monkeypatch, tmp_path) -> _FakeStorage:
+    from app.settings import settings
+
+    storage = _FakeStorage({"generated-images/2025/01/01/abc.png": b"\x89PNG\r\n\x1a\n0123456789"})
+    monkeypatch.setattr(settings, "image_delivery_mode", "proxy")
+    monkeypatch.setattr(settings, "image_cache_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "image_cache_max_bytes", 1024)
+    monkeypatch.setattr("app.api.v1.media_routes.open_image_stream", storage.open_image_stream)
+    monkeypatch.setattr("app.services.image_disk_cache.open_image_stream", storage.open_image_stream)
+    return storage
+
+
+def _signed_path(object_key: str) -> str:
+    signed = build_signed_image_url(object_key, base_url="http://localhost:8000", ttl_seconds=3600)
+    return signed.replace("http://localhost:8000", "")
+
+
+def test_media_images_proxy_streams_then_serves_from_disk_cache(client, proxied_storage):
+    object_key = "generated-images/2025/01/01/abc.png"
+    path = _signed_path(object_key)
+    data = proxied_storage.objects[object_key]
+
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.content == data
+    assert first.headers["etag"] == '"abc123"'
+    assert first.headers["content-type"] == "image/png"
+
+    second = client.get(path)
+    assert second.status_code == 200
+    assert second.content == data
+    assert second.headers["accept-ranges"] == "bytes"
+    # 第二次命中本地磁盘缓存，不再回源。
+    assert proxied_storage.opens == 1
+
+    partial = client.get(path, headers={"Range": "bytes=8-11"})
+    assert partial.status_code == 206
+    assert partial.content == b"0123"
+
+    not_modified = client.get(path, headers={"If-None-Match": '"abc123"'})
+    assert not_modified.status_code == 304
+    assert proxied_storage.opens == 1
+
+
+def test_media_images_proxy_range_on_cold_cache_fills_cache_first(client, proxied_storage):
+    path = _signed_path("generated-images/2025/01/01/abc.png")
+
+    resp = client.get(path, headers={"Range": "bytes=0-7"})
+
+    assert resp.status_code == 206
+    assert resp.content == b"\x89PNG\r\n\x1a\n"
+    assert proxied_storage.opens == 1
+    assert client.get(path).status_code == 200
+    assert proxied_storage.opens == 1
+
+
+def test_media_images_proxy_range_for_oversized_object_downloads_once(client, proxied_storage, monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "image_cache_max_bytes", 8)
+    object_key = "generated-images/2025/01/01/abc.png"
+    path = _signed_path(object_key)
+
+    resp = client.get(path, headers={"Range": "bytes=0-7"})
+
+    # 对象超过缓存容量：不写缓存，按 200 返回完整内容，只回源一次。
+    assert resp.status_code == 200
+    assert resp.content == proxied_storage.objects[object_key]
+    assert proxied_storage.opens == 1
+
+
+def test_media_images_proxy_without_cache_streams_every_time(client, proxied_storage, monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "image_cache_max_bytes", 0)
+    path = _signed_path("generated-images/2025/01/01/abc.png")
+
+    assert client.get(path).content == proxied_storage.objects["generated-images/2025/01/01/abc.png"]
+    assert client.get(path, headers={"If-None-Match": '"abc123"'}).status_code == 304
+    assert proxied_storage.opens == 2
+
+
+def test_media_images_proxy_not_modified_closes_storage_body(client, proxied_storage, monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "image_cache_max_bytes", 0)
+    path = _signed_path("generated-images/2025/01/01/abc.png")
+
+    resp = client.get(path, headers={"If-None-Match": '"abc123"'})
+
+    # 未开始读取的对象流同样要释放底层响应，否则每次 304 都会占住一个连接。
+    assert resp.status_code == 304
+    assert proxied_storage.opens == 1
+    assert proxied_storage.closed == 1
+
+
+@pytest.mark.asyncio
+async def test_image_disk_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    from app.services.image_disk_cache import ImageDiskCache
+
+    storage = _FakeStorage({"a": b"a" * 40, "b": b"b" * 40, "c": b"c" * 40})
+    monkeypatch.setattr("app.services.image_disk_cache.open_image_stream", storage.open_image_stream)
+    cache = ImageDiskCache(tmp_path, max_bytes=100)
+
+    assert (await cache.fill("a")).size_bytes == 40
+    await cache.fill("b")
+    assert await cache.get("a") is not None  # a 变为最近使用
+    await cache.fill("c")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    assert cache.total_bytes == 80
+
+    # 重启后从目录重建索引。
+    reloaded = ImageDiskCache(tmp_path, max_bytes=100)
+    assert (await reloaded.get("c")).path.read_bytes() == b"c" * 40
+    assert reloaded.total_bytes == 80
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import BaseModel
+
+from app.redis_client import redis_get_json, redis_set_json
+from app.settings import settings
+from app.storage.metrics_query_cache import MetricsQueryCache
+from tests.utils import InMemoryRedis
+
+
+class _Summary(BaseModel):
+    total: int
+
+
+class _SlowRedis(InMemoryRedis):
+    """写入时让出事件循环，模拟真实 Redis 往返，让并发请求在查询期间到达。"""
+
+    async def set(self, key: str, value: str, ex: int | None = None, nx: bool = False):
+        await asyncio.sleep(0.01)
+        return await super().set(key, value, ex=ex, nx=nx)
+
+
+def _counting_loader(value: int = 1):
+    calls: list[object] = []
+
+    def _load(db) -> _Summary:
+        calls.append(db)
+        return _Summary(total=value)
+
+    return _load, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_run_one_query() -> None:
+    cache = MetricsQueryCache()
+    redis = _SlowRedis()
+    load, calls = _counting_loader(7)
+
+    results = await asyncio.gather(
+        *(cache.get_or_load(redis, "metrics:k", _Summary, load, db=MagicMock(), ttl_seconds=60) for _ in range(10))
+    )
+
+    assert [r.total for r in results] == [7] * 10
+    assert len(calls) == 1
+    cached = await redis_get_json(redis, "metrics:k")
+    assert cached["data"] == {"total": 7}
+    # 查询结束后释放跨 worker 锁。
+    assert await redis.get("metrics:k:lock") is None
+
+
+@pytest.mark.asyncio
+async def test_waits_for_other_worker_holding_the_lock(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "metrics_cache_lock_wait_seconds", 2.0)
+    cache = MetricsQueryCache()
+    redis = InMemoryRedis()
+    load, calls = _counting_loader()
+    await redis.set("metrics:k:lock", "other-worker", nx=True, ex=15)
+
+    async def _other_worker_writes() -> None:
+        await asyncio.sleep(0.1)
+        await redis_set_json(
+            redis,
+            "metrics:k",
+            {"fresh_until": time.time() + 60, "data": {"total": 42}},
+            ttl_seconds=60,
+        )
+
+    writer = asyncio.create_task(_other_worker_writes())
+    result = await cache.get_or_load(redis, "metrics:k", _Summary, load, db=MagicMock(), ttl_seconds=60)
+    await writer
+
+    assert result.total == 42
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_refreshing_in_background() -> None:
+    cache = MetricsQueryCache()
+    redis = InMemoryRedis()
+    await redis_set_json(
+        redis,
+        "metrics:k",
+        {"fresh_until": time.time() - 1, "data": {"total": 1}},
+        ttl_seconds=600,
+    )
+    load, calls = _counting_loader(2)
+
+    with (
+        patch("app.storage.metrics_query_cache.is_bound_to_global_engine", return_value=True),
+        patch("app.storage.metrics_query_cache._load_with_new_session", side_effect=lambda fn: fn("fresh-db")),
+    ):
+        result = await cache.get_or_load(redis, "metrics:k", _Summary, load, db=MagicMock(), ttl_seconds=60)
+        assert result.total == 1
+        await asyncio.gather(*cache._background)
+
+    assert calls == ["fresh-db"]
+    cached = await redis_get_json(redis, "metrics:k")
+    assert cached["data"] == {"total": 2}
+    assert cached["fresh_until"] > time.time()
+
+
+@pytest.mark.asyncio
+async def test_hot_keys_are_refreshed_before_expiry(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "metrics_cache_hot_keys", 1)
+    monkeypatch.setattr(settings, "metrics_cache_refresh_interval_seconds", 30.0)
+    cache = MetricsQueryCache()
+    redis = InMemoryRedis()
+    hot_load, hot_calls = _counting_loader(1)
+    cold_load, cold_calls = _counting_loader(1)
+
+    with (
+        patch("app.storage.metrics_query_cache.is_bound_to_global_engine", return_value=True),
+        patch("app.storage.metrics_query_cache._load_with_new_session", side_effect=lambda fn: fn("bg-db")),
+    ):
+        for _ in range(3):
+            await cache.get_or_load(redis, "metrics:hot", _Summary, hot_load, db=MagicMock(), ttl_seconds=10)
+        await cache.get_or_load(redis, "metrics:cold", _Summary, cold_load, db=MagicMock(), ttl_seconds=10)
+
+        # TTL（10s）小于检查间隔（30s）：下一轮检查前就会过期，需要提前刷新。
+        assert await cache.refresh_hot_keys() == 1
+
+    assert hot_calls[-1] == "bg-db"
+    assert "bg-db" not in cold_calls
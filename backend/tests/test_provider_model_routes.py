@@ -249,3 +249,73 @@ def test_provider_models_response_overlays_capabilities_override(client, db_sess
     assert models and models[0]["model_id"] == model_id
     # 覆盖生效：即使上游缓存里只有 chat，响应也应反映已配置的 image_generation
     assert "image_generation" in (models[0].get("capabilities") or [])
+
+
+def _load_billing_snapshot(db_session, monkeypatch):
+    from app.services import provider_model_snapshot as snapshot_module
+
+    monkeypatch.setattr(snapshot_module, "is_bound_to_global_engine", lambda _db: True)
+    store = snapshot_module.get_provider_model_snapshot_store()
+    store.refresh(db_session)
+    assert store.get() is not None
+    return store
+
+
+def test_admin_update_billing_factor_invalidates_snapshot(client, db_session, monkeypatch):
+    admin = _create_admin(db_session)
+    provider = _create_provider(db_session, "provider-billing-factor")
+    store = _load_billing_snapshot(db_session, monkeypatch)
+    assert store.get().provider_factor_for(provider.provider_id) == 1.0
+
+    resp = client.put(
+        f"/admin/providers/{provider.provider_id}/billing-factor",
+        headers=jwt_auth_headers(str(admin.id)),
+        json={"billing_factor": 2.5},
+    )
+
+    assert resp.status_code == 200
+    assert resp.json() == {"provider_id": provider.provider_id, "billing_factor": 2.5}
+    # 旧快照立即丢弃，重建后使用新的结算系数。
+    assert store.get() is None
+    store.refresh(db_session)
+    assert store.get().provider_factor_for(provider.provider_id) == 2.5
+
+
+def test_admin_update_model_multiplier_invalidates_snapshot(client, db_session, monkeypatch):
+    admin = _create_admin(db_session)
+    store = _load_billing_snapshot(db_session, monkeypatch)
+    headers = jwt_auth_headers(str(admin.id))
+
+    resp = client.put("/admin/model-billing/gpt-4o", headers=headers, json={"multiplier": 1.5})
+
+    assert resp.status_code == 200
+    assert resp.json() == {"model_name": "gpt-4o", "multiplier": 1.5, "is_active": True}
+    assert store.get() is None
+    store.refresh(db_session)
+    assert store.get().multiplier_for("gpt-4o") == 1.5
+
+    resp = client.put(
+        "/admin/model-billing/gpt-4o", headers=headers, json={"multiplier": 3.0, "is_active": False}
+    )
+    assert resp.status_code == 200
+    assert store.get() is None
+    store.refresh(db_session)
+    assert store.get().multiplier_for("gpt-4o") == 1.0
+
+
+def test_admin_update_billing_requires_superuser(client, db_session):
+    user, _ = seed_user_and_key(
+        db_session,
+        token_plain="billing-user-token",
+        username="billing-user",
+        email="billing-user@example.com",
+        is_superuser=False,
+    )
+    provider = _create_provider(db_session, "provider-billing-forbidden")
+    headers = jwt_auth_headers(str(user.id))
+
+    resp = client.put(
+        f"/admin/providers/{provider.provider_id}/billing-factor", headers=headers, json={"billing_factor": 2.0}
+    )
+    assert resp.status_code == 403
+    assert client.put("/admin/model-billing/gpt-4o", headers=headers, json={"multiplier": 2.0}).status_code == 403
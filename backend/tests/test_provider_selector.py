@@ -12,6 +12,7 @@ from app.api.v1.chat.provider_selector import ProviderSelector
 from app.api.v1.chat.routing_state import RoutingStateService
 from app.routing.scheduler import CandidateScore
 from app.schemas import LogicalModel, PhysicalModel, RoutingMetrics
+from tests.utils import wire_candidate_states
 
 
 @pytest.fixture
@@ -35,6 +36,7 @@ def provider_selector(mock_client, mock_redis, mock_db):
     routing_state.get_cached_health_status = AsyncMock(return_value=None)
     routing_state.load_metrics_for_candidates = AsyncMock(return_value={})
     routing_state.load_dynamic_weights = AsyncMock(return_value={})
+    wire_candidate_states(routing_state)
     return ProviderSelector(
         client=mock_client, redis=mock_redis, db=mock_db, routing_state=routing_state
     )
@@ -8,6 +8,7 @@ from app.api.v1.chat.provider_selector import ProviderSelector
 from app.api.v1.chat.routing_state import RoutingStateService
 from app.provider.health import HealthStatus
 from app.schemas import LogicalModel, PhysicalModel, ProviderStatus
+from tests.utils import wire_candidate_states
 
 
 @pytest.fixture
@@ -29,6 +30,7 @@ def provider_selector(mock_client, mock_redis, mock_db):
     routing_state.get_failure_cooldown_status = AsyncMock(
         return_value=MagicMock(should_skip=False)
     )
+    wire_candidate_states(routing_state)
     # Mock load_disabled_pairs default to empty set
     provider_selector = ProviderSelector(
         client=mock_client, redis=mock_redis, db=mock_db, routing_state=routing_state
@@ -193,7 +195,8 @@ async def test_check_candidate_availability(provider_selector, sample_logical_mo
 
         # Test 12: Budget feasibility (filter by estimated credits)
         with patch(
-            "app.api.v1.chat.provider_selector.estimate_request_cost_credits"
+            "app.api.v1.chat.provider_selector.aestimate_request_cost_credits",
+            new_callable=AsyncMock,
         ) as mock_estimate:
             mock_estimate.side_effect = lambda _db, **kw: 10 if kw.get("provider_id") == "prov-1" else 3
             available = await provider_selector.check_candidate_availability(
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.provider.key_pool import NoAvailableProviderKey, acquire_provider_key, reset_key_pool
+from app.schemas import ProviderAPIKey, ProviderConfig
+from app.storage.rate_limit import (
+    SLIDING_WINDOW_LUA,
+    LocalSlidingWindowLimiter,
+    RedisSlidingWindowLimiter,
+)
+
+
+class _ScriptRedis:
+    """只实现 register_script 的 Redis 替身：记录脚本调用并返回预设结果。"""
+
+    def __init__(self, results: list[object]) -> None:
+        self.results = results
+        self.scripts: list[str] = []
+        self.calls: list[tuple[list[str], list[object]]] = []
+
+    def register_script(self, script: str):
+        self.scripts.append(script)
+
+        async def _call(*, keys: list[str], args: list[object]):
+            self.calls.append((keys, args))
+            result = self.results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return _call
+
+
+def test_local_limiter_allows_up_to_limit_and_reports_reset() -> None:
+    limiter = LocalSlidingWindowLimiter()
+
+    decisions = [limiter.acquire("k", limit=3, window_seconds=10, now=100.0 + i) for i in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+    # 被拒绝时 reset 为最早一次占用过期的时间，且拒绝不占用窗口。
+    assert decisions[3].reset_at == 110.0
+    assert limiter.acquire("k", limit=3, window_seconds=10, now=110.5).allowed
+    assert not limiter.acquire("k", limit=3, window_seconds=10, now=110.6).allowed
+
+
+def test_local_limiter_keeps_newest_entries_when_limit_changes() -> None:
+    limiter = LocalSlidingWindowLimiter()
+    for i in range(3):
+        assert limiter.acquire("k", limit=3, window_seconds=10, now=100.0 + i).allowed
+
+    shrunk = limiter.acquire("k", limit=2, window_seconds=10, now=103.0)
+    assert not shrunk.allowed
+    assert shrunk.reset_at == 111.0
+
+    assert limiter.acquire("k", limit=5, window_seconds=10, now=103.5).remaining == 2
+
+
+def test_local_limiter_cleanup_removes_idle_keys() -> None:
+    limiter = LocalSlidingWindowLimiter()
+    limiter.acquire("old", limit=1, window_seconds=1, now=100.0)
+    limiter.acquire("fresh", limit=1, window_seconds=1, now=200.0)
+
+    assert limiter.cleanup(60, now=210.0) == 1
+    assert len(limiter) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_runs_script_once_per_request() -> None:
+    redis = _ScriptRedis([[1, 4, 1_700_000_001_500], [0, 0, 1_700_000_002_000]])
+    limiter = RedisSlidingWindowLimiter(redis)
+
+    allowed = await limiter.acquire("ratelimit:ip:/x", limit=5, window_seconds=1.5)
+    denied = await limiter.acquire("ratelimit:ip:/x", limit=5, window_seconds=1.5)
+
+    assert redis.scripts == [SLIDING_WINDOW_LUA]
+    assert (allowed.allowed, allowed.remaining, allowed.reset_at) == (True, 4, 1_700_000_001.5)
+    assert not denied.allowed
+    keys, args = redis.calls[0]
+    assert keys == ["ratelimit:ip:/x"]
+    assert args[:2] == [1500, 5]
+    # 每次请求使用唯一的 ZSET 成员名。
+    assert redis.calls[0][1][2] != redis.calls[1][1][2]
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_falls_back_to_local_window_on_errors() -> None:
+    redis = _ScriptRedis([ConnectionError("down"), ConnectionError("down")])
+    limiter = RedisSlidingWindowLimiter(redis)
+
+    assert (await limiter.acquire("k", limit=1, window_seconds=60)).allowed
+    assert not (await limiter.acquire("k", limit=1, window_seconds=60)).allowed
+
+
+@pytest.mark.asyncio
+async def test_key_qps_is_enforced_without_redis() -> None:
+    provider = ProviderConfig(
+        id="qps-local",
+        name="QPS Provider",
+        base_url="https://api.qps.local",
+        api_keys=[ProviderAPIKey(key="solo", max_qps=2)],  # pragma: allowlist secret
+    )
+    reset_key_pool()
+
+    await acquire_provider_key(provider, redis=None)
+    await acquire_provider_key(provider, redis=None)
+    with pytest.raises(NoAvailableProviderKey):
+        await acquire_provider_key(provider, redis=None)
+
+    reset_key_pool()
+    assert (await acquire_provider_key(provider, redis=None)).key == "solo"  # pragma: allowlist secret
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_script_evicts_at_boundary_and_rejects_without_writing(monkeypatch) -> None:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from fakeredis.commands_mixins import server_mixin
+
+    now = [1_000.0]
+    # 脚本用 Redis TIME 取时间；固定 fakeredis 的时钟以便精确落在窗口边界。
+    monkeypatch.setattr(server_mixin, "time", SimpleNamespace(time=lambda: now[0]))
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    limiter = RedisSlidingWindowLimiter(redis)
+    key = "ratelimit:ip:/lua"
+
+    first = await limiter.acquire(key, limit=2, window_seconds=1)
+    now[0] = 1_000.5
+    second = await limiter.acquire(key, limit=2, window_seconds=1)
+    denied = await limiter.acquire(key, limit=2, window_seconds=1)
+    assert (first.allowed, first.remaining, first.reset_at) == (True, 1, 1_001.0)
+    assert (second.allowed, second.remaining) == (True, 0)
+    # 拒绝时不写入窗口，reset_at 为最早一次占用过期的时间。
+    assert (denied.allowed, denied.remaining, denied.reset_at) == (False, 0, 1_001.0)
+    assert await redis.zcard(key) == 2
+
+    # 恰好到达窗口边界：最早的占用被淘汰，腾出一个名额。
+    now[0] = 1_001.0
+    reopened = await limiter.acquire(key, limit=2, window_seconds=1)
+    assert (reopened.allowed, reopened.remaining, reopened.reset_at) == (True, 0, 1_002.0)
+    assert not (await limiter.acquire(key, limit=2, window_seconds=1)).allowed
+    assert await redis.zcard(key) == 2
+    assert 0 < await redis.pttl(key) <= 1_000
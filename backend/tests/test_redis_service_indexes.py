@@ -0,0 +1,141 @@
+"""
+测试 redis_service 的二级索引（替代 KEYS 扫描）
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.schemas import LogicalModel, PhysicalModel, RoutingMetrics
+from app.storage.redis_service import (
+    LOGICAL_MODEL_INDEX_KEY,
+    LOGICAL_MODEL_INDEX_READY_KEY,
+    METRICS_INDEX_KEY_TEMPLATE,
+    METRICS_INDEX_READY_KEY,
+    delete_logical_model,
+    get_all_provider_metrics,
+    invalidate_logical_models_cache,
+    list_logical_models,
+    set_logical_model,
+    set_routing_metrics,
+)
+from tests.utils import InMemoryRedis
+
+
+class _NoKeysRedis(InMemoryRedis):
+    async def keys(self, pattern: str):  # pragma: no cover - 调用即失败
+        raise AssertionError("KEYS must not be used")
+
+
+def _logical_model(logical_id: str) -> LogicalModel:
+    return LogicalModel(
+        logical_id=logical_id,
+        display_name=logical_id,
+        description="test",
+        capabilities=["chat"],
+        upstreams=[
+            PhysicalModel(
+                provider_id="openai",
+                model_id=logical_id,
+                endpoint="https://api.openai.com/v1/chat/completions",
+                base_weight=1.0,
+                updated_at=0.0,
+            )
+        ],
+        updated_at=0.0,
+    )
+
+
+def _metrics(logical_model: str, provider_id: str) -> RoutingMetrics:
+    return RoutingMetrics(
+        logical_model=logical_model,
+        provider_id=provider_id,
+        latency_p95_ms=100.0,
+        latency_p99_ms=150.0,
+        error_rate=0.0,
+        success_qps_1m=1.0,
+        total_requests_1m=60,
+        last_updated=1.0,
+        status="healthy",
+    )
+
+
+@pytest.mark.asyncio
+async def test_logical_model_index_tracks_writes():
+    redis = _NoKeysRedis()
+    await set_logical_model(redis, _logical_model("a"))
+    await set_logical_model(redis, _logical_model("b"))
+    await delete_logical_model(redis, "a")
+
+    models = await list_logical_models(redis)
+    assert [m.logical_id for m in models] == ["b"]
+    assert await redis.smembers(LOGICAL_MODEL_INDEX_KEY) == {"b"}
+
+    assert await invalidate_logical_models_cache(redis) == 1
+    assert await list_logical_models(redis) == []
+    assert await redis.smembers(LOGICAL_MODEL_INDEX_KEY) == set()
+
+
+@pytest.mark.asyncio
+async def test_logical_model_index_backfilled_and_pruned():
+    redis = _NoKeysRedis()
+    # 索引上线前直接写入的键：首次读取时通过 SCAN 补齐索引。
+    await redis.set("llm:logical:legacy", json.dumps(_logical_model("legacy").model_dump()))
+
+    models = await list_logical_models(redis)
+    assert [m.logical_id for m in models] == ["legacy"]
+
+    # 键被外部删除后，索引成员在下次读取时被清理。
+    await redis.delete("llm:logical:legacy")
+    assert await list_logical_models(redis) == []
+    assert await redis.smembers(LOGICAL_MODEL_INDEX_KEY) == set()
+
+
+@pytest.mark.asyncio
+async def test_provider_metrics_index():
+    redis = _NoKeysRedis()
+    await redis.set(
+        "llm:metrics:legacy-model:openai",
+        json.dumps(_metrics("legacy-model", "openai").model_dump()),
+    )
+    await redis.set("llm:metrics:history:legacy-model:openai:1", "{}")
+    await set_routing_metrics(redis, _metrics("gpt-4", "openai"))
+    await set_routing_metrics(redis, _metrics("gpt-4", "azure"))
+    # 指标与索引每次写入只占一次 pipeline 往返。
+    assert redis.pipeline_executions == 2
+
+    metrics = await get_all_provider_metrics(redis, "openai")
+    assert sorted(m.logical_model for m in metrics) == ["gpt-4", "legacy-model"]
+    assert [m.logical_model for m in await get_all_provider_metrics(redis, "azure")] == ["gpt-4"]
+    assert await get_all_provider_metrics(redis, "unknown") == []
+
+
+@pytest.mark.asyncio
+async def test_provider_named_ready_does_not_collide_with_index_marker():
+    redis = InMemoryRedis()
+    await set_routing_metrics(redis, _metrics("gpt-4", "ready"))
+
+    assert [m.provider_id for m in await get_all_provider_metrics(redis, "ready")] == ["ready"]
+    assert METRICS_INDEX_READY_KEY != METRICS_INDEX_KEY_TEMPLATE.format(provider_id="ready")
+
+
+@pytest.mark.asyncio
+async def test_index_prune_keeps_member_rewritten_concurrently():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    class _RacingRedis(fakeredis.FakeAsyncRedis):
+        async def mget(self, keys, *args):
+            raws = await super().mget(keys, *args)
+            # 读取之后、清理之前，另一个 worker 重新写入了该逻辑模型。
+            await set_logical_model(self, _logical_model("a"), publish_invalidation=False)
+            return raws
+
+    redis = _RacingRedis(decode_responses=True)
+    await redis.set(LOGICAL_MODEL_INDEX_READY_KEY, "1")
+    await redis.sadd(LOGICAL_MODEL_INDEX_KEY, "a", "gone")
+
+    assert await list_logical_models(redis) == []
+    assert await redis.smembers(LOGICAL_MODEL_INDEX_KEY) == {"a"}
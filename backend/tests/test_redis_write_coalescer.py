@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.routing.provider_weight import record_provider_failure, record_provider_success
+from app.services.request_log_service import enqueue_request_log, list_request_logs
+from app.settings import settings
+from app.storage.redis_write_coalescer import (
+    RedisWriteCoalescer,
+    flush_redis_write_coalescers,
+    get_redis_write_coalescer,
+)
+from tests.utils import InMemoryRedis
+
+
+@pytest.mark.asyncio
+async def test_request_logs_and_weight_nudges_share_one_pipeline() -> None:
+    redis = InMemoryRedis()
+    for i in range(3):
+        await enqueue_request_log(redis, user_id="u1", entry={"request_id": f"r{i}"})
+    record_provider_success(redis, "gpt-4", "p1", 2.0)
+    record_provider_success(redis, "gpt-4", "p1", 2.0)
+    record_provider_failure(redis, "gpt-4", "p2", 1.0, retryable=True)
+
+    # 还没到合并窗口：尚未写入 Redis。
+    assert await redis.lrange("request_logs:user:u1", 0, -1) == []
+    await flush_redis_write_coalescers()
+
+    assert redis.pipeline_executions == 1
+    items = await list_request_logs(redis, user_id="u1")
+    assert [item["request_id"] for item in items] == ["r2", "r1", "r0"]
+    # 同一 (逻辑模型, provider) 的增量先求和：2.0 + 2 * 0.1
+    assert await redis.zscore("routing:gpt-4:provider_weights", "p1") == pytest.approx(2.2)
+    assert await redis.zscore("routing:gpt-4:provider_weights", "p2") == pytest.approx(0.8)
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_after_interval_and_clamps() -> None:
+    redis = InMemoryRedis()
+    coalescer = RedisWriteCoalescer(redis, flush_interval_seconds=0.01)
+    coalescer.push_list("logs", json.dumps({"n": 1}), max_length=2, ttl_seconds=60)
+    coalescer.push_list("logs", json.dumps({"n": 2}), max_length=2, ttl_seconds=60)
+    coalescer.push_list("logs", json.dumps({"n": 3}), max_length=2, ttl_seconds=60)
+    coalescer.incr_zset("weights", "p1", 100.0, default=1.0, clamp=lambda value: min(value, 3.0))
+
+    await asyncio.sleep(0.05)
+
+    assert coalescer.pending == 0
+    assert [json.loads(raw)["n"] for raw in await redis.lrange("logs", 0, -1)] == [3, 2]
+    assert await redis.zscore("weights", "p1") == 3.0
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_immediately_when_backlog_is_full() -> None:
+    redis = InMemoryRedis()
+    coalescer = RedisWriteCoalescer(redis, flush_interval_seconds=60, max_pending=2)
+    coalescer.push_list("logs", "a", max_length=10)
+    await asyncio.sleep(0)
+    assert await redis.lrange("logs", 0, -1) == []
+
+    coalescer.push_list("logs", "b", max_length=10)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert await redis.lrange("logs", 0, -1) == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_request_log_writes_directly_when_coalescing_disabled(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "redis_write_coalesce_ms", 0)
+    redis = InMemoryRedis()
+
+    await enqueue_request_log(redis, user_id="u1", entry={"request_id": "r1"})
+
+    assert get_redis_write_coalescer(redis).pending == 0
+    assert [item["request_id"] for item in await list_request_logs(redis, user_id="u1")] == ["r1"]
+
+
+@pytest.mark.asyncio
+async def test_weight_nudge_keeps_background_task_when_coalescing_disabled(monkeypatch) -> None:
+    from app.routing import provider_weight
+
+    monkeypatch.setattr(settings, "redis_write_coalesce_ms", 0)
+    redis = InMemoryRedis()
+
+    record_provider_success(redis, "gpt-4", "p1", 2.0)
+    # 后台写入任务在完成前一直被持有，完成后自动移除。
+    assert len(provider_weight._pending_updates) == 1
+    await asyncio.gather(*provider_weight._pending_updates)
+
+    assert not provider_weight._pending_updates
+    assert await redis.zscore("routing:gpt-4:provider_weights", "p1") == pytest.approx(2.1)
@@ -0,0 +1,193 @@
+"""
+测试路由 L1 进程内缓存（LRU + TTL + pub/sub 失效）
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models import User
+from app.schemas import LogicalModel, PhysicalModel, RoutingMetrics
+from app.storage.redis_service import (
+    delete_logical_model,
+    get_logical_model,
+    get_routing_metrics,
+    invalidate_logical_models_cache,
+    set_logical_model,
+    set_routing_metrics,
+)
+from app.storage.routing_l1_cache import (
+    RoutingL1Cache,
+    get_routing_l1_cache,
+    get_routing_l1_cache_stats,
+    start_routing_cache_invalidation_listener,
+    stop_routing_cache_invalidation_listener,
+)
+from tests.utils import InMemoryRedis, jwt_auth_headers
+
+
+def _logical_model(logical_id: str = "gpt-4", display_name: str = "GPT-4") -> LogicalModel:
+    return LogicalModel(
+        logical_id=logical_id,
+        display_name=display_name,
+        description="test",
+        capabilities=["chat"],
+        upstreams=[
+            PhysicalModel(
+                provider_id="openai",
+                model_id="gpt-4",
+                endpoint="https://api.openai.com/v1/chat/completions",
+                base_weight=1.0,
+                updated_at=0.0,
+            )
+        ],
+        updated_at=0.0,
+    )
+
+
+class _CountingRedis(InMemoryRedis):
+    def __init__(self) -> None:
+        super().__init__()
+        self.get_calls = 0
+
+    async def get(self, key: str):
+        self.get_calls += 1
+        return await super().get(key)
+
+
+def test_l1_cache_lru_and_ttl():
+    now = [0.0]
+    cache = RoutingL1Cache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)  # b 最久未使用，被淘汰
+    assert cache.get("b") == (False, None)
+    assert cache.stats.evictions == 1
+
+    now[0] = 11.0
+    assert cache.get("a") == (False, None)
+    assert cache.stats.expirations == 1
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_get_logical_model_served_from_l1():
+    redis = _CountingRedis()
+    await set_logical_model(redis, _logical_model())
+
+    first = await get_logical_model(redis, "gpt-4")
+    second = await get_logical_model(redis, "gpt-4")
+    missing_1 = await get_logical_model(redis, "unknown")
+    missing_2 = await get_logical_model(redis, "unknown")
+
+    assert first is second
+    assert missing_1 is None and missing_2 is None
+    assert redis.get_calls == 2
+    stats = get_routing_l1_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_l1():
+    redis = InMemoryRedis()
+    assert await get_logical_model(redis, "gpt-4") is None  # 负缓存
+
+    await set_logical_model(redis, _logical_model(display_name="v1"))
+    assert (await get_logical_model(redis, "gpt-4")).display_name == "v1"
+
+    await set_logical_model(redis, _logical_model(display_name="v2"))
+    assert (await get_logical_model(redis, "gpt-4")).display_name == "v2"
+
+    await delete_logical_model(redis, "gpt-4")
+    assert await get_logical_model(redis, "gpt-4") is None
+
+    await set_logical_model(redis, _logical_model(display_name="v3"))
+    await get_logical_model(redis, "gpt-4")
+    await invalidate_logical_models_cache(redis)
+    assert await get_logical_model(redis, "gpt-4") is None
+
+    metrics = RoutingMetrics(
+        logical_model="gpt-4",
+        provider_id="openai",
+        latency_p95_ms=100.0,
+        latency_p99_ms=150.0,
+        error_rate=0.0,
+        success_qps_1m=1.0,
+        total_requests_1m=60,
+        last_updated=1.0,
+        status="healthy",
+    )
+    assert await get_routing_metrics(redis, "gpt-4", "openai") is None
+    await set_routing_metrics(redis, metrics)
+    assert await get_routing_metrics(redis, "gpt-4", "openai") == metrics
+
+
+@pytest.mark.asyncio
+async def test_listener_applies_remote_invalidation():
+    redis = InMemoryRedis()
+    await set_logical_model(redis, _logical_model(display_name="v1"))
+
+    task = start_routing_cache_invalidation_listener(redis)
+    assert task is not None
+    try:
+        for _ in range(50):
+            if redis._pubsub_channels:
+                break
+            await asyncio.sleep(0.01)
+        assert (await get_logical_model(redis, "gpt-4")).display_name == "v1"
+
+        # 模拟其它 worker：直接改写 Redis 并只发布失效消息。
+        await redis.set(
+            "llm:logical:gpt-4", _logical_model(display_name="v2").model_dump_json()
+        )
+        await redis.publish(
+            "llm:routing_l1:invalidate", '{"keys": ["llm:logical:gpt-4"]}'
+        )
+        for _ in range(50):
+            hit, _ = get_routing_l1_cache().get("llm:logical:gpt-4")
+            if not hit:
+                break
+            await asyncio.sleep(0.01)
+        assert (await get_logical_model(redis, "gpt-4")).display_name == "v2"
+    finally:
+        await stop_routing_cache_invalidation_listener()
+
+
+def test_routing_l1_cache_metrics_route_requires_superuser(client: TestClient, db_session: Session):
+    user = db_session.query(User).first()
+    assert user is not None
+
+    resp = client.get("/metrics/routing-l1-cache", headers=jwt_auth_headers(str(user.id)))
+    assert resp.status_code == 200
+    assert set(resp.json()) == set(get_routing_l1_cache_stats())
+
+    user.is_superuser = False
+    db_session.commit()
+    resp = client.get("/metrics/routing-l1-cache", headers=jwt_auth_headers(str(user.id)))
+    assert resp.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_bulk_invalidation_publishes_after_keys_are_deleted():
+    class _RecordingRedis(InMemoryRedis):
+        def __init__(self) -> None:
+            super().__init__()
+            self.keys_at_publish: list[list[str]] = []
+
+        async def publish(self, channel: str, message: str) -> int:
+            self.keys_at_publish.append(sorted(k for k in self._data if k.startswith("llm:logical:")))
+            return 0
+
+    redis = _RecordingRedis()
+    await set_logical_model(redis, _logical_model(), publish_invalidation=False)
+
+    assert await invalidate_logical_models_cache(redis) == 1
+    assert redis.keys_at_publish == [[]]
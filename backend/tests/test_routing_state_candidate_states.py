@@ -0,0 +1,128 @@
+"""
+测试 RoutingStateService.load_candidate_states 的批量（pipeline）读取
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.api.v1.chat.routing_state import RoutingStateService
+from app.schemas import PhysicalModel
+from app.settings import settings
+from tests.utils import InMemoryRedis
+
+
+def _upstream(provider_id: str, base_weight: float = 1.0) -> PhysicalModel:
+    return PhysicalModel(
+        provider_id=provider_id,
+        model_id=f"{provider_id}-model",
+        endpoint=f"https://{provider_id}.example.com/v1/chat/completions",
+        base_weight=base_weight,
+        updated_at=0.0,
+    )
+
+
+def _metrics_json(provider_id: str) -> str:
+    return json.dumps(
+        {
+            "logical_model": "gpt-4",
+            "provider_id": provider_id,
+            "latency_p95_ms": 120.0,
+            "latency_p99_ms": 200.0,
+            "error_rate": 0.01,
+            "success_qps_1m": 3.0,
+            "total_requests_1m": 180,
+            "last_updated": 1.0,
+            "status": "healthy",
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_load_candidate_states_uses_single_pipeline(monkeypatch):
+    monkeypatch.setattr(settings, "enable_provider_health_check", True)
+    monkeypatch.setattr(settings, "provider_failure_threshold", 3)
+
+    redis = InMemoryRedis()
+    await redis.set("provider:failure:p1", "3")
+    await redis.set("llm:metrics:gpt-4:p2", _metrics_json("p2"))
+    await redis.set(
+        "llm:provider:health:p1",
+        json.dumps({"provider_id": "p1", "status": "down", "timestamp": 1.0}),
+    )
+    # 越界的动态权重会被钳制并回写。
+    await redis.zadd("routing:gpt-4:provider_weights", {"p2": 100.0})
+
+    state = RoutingStateService(redis=redis)
+    result = await state.load_candidate_states(
+        [_upstream("p1"), _upstream("p2", base_weight=2.0), _upstream("p1")],
+        logical_model_id="gpt-4",
+    )
+
+    assert redis.pipeline_executions == 1
+    assert result.cooldown("p1").should_skip is True
+    assert result.cooldown("p2").should_skip is False
+    assert result.health_by_provider["p1"].status.value == "down"
+    assert "p2" not in result.health_by_provider
+    assert set(result.metrics_by_provider) == {"p2"}
+    assert result.dynamic_weights == {"p1": 1.0, "p2": 6.0}
+    assert await redis.zscore("routing:gpt-4:provider_weights", "p2") == 6.0
+
+
+@pytest.mark.asyncio
+async def test_load_candidate_states_skips_disabled_sections(monkeypatch):
+    monkeypatch.setattr(settings, "enable_provider_health_check", False)
+    monkeypatch.setattr(settings, "provider_failure_threshold", 0)
+
+    redis = InMemoryRedis()
+    await redis.set("provider:failure:p1", "10")
+
+    state = RoutingStateService(redis=redis)
+    result = await state.load_candidate_states(
+        [_upstream("p1")],
+        include_metrics=False,
+        include_weights=False,
+    )
+
+    assert redis.pipeline_executions == 0
+    assert result.cooldown("p1").should_skip is False
+    assert result.health_by_provider == {}
+
+
+@pytest.mark.asyncio
+async def test_load_candidate_states_falls_back_without_pipeline(monkeypatch):
+    monkeypatch.setattr(settings, "provider_failure_threshold", 2)
+
+    class _NoPipelineRedis(InMemoryRedis):
+        def pipeline(self, transaction: bool = True):
+            raise RuntimeError("pipeline unsupported")
+
+    redis = _NoPipelineRedis()
+    await redis.set("provider:failure:p1", "2")
+
+    state = RoutingStateService(redis=redis)
+    result = await state.load_candidate_states(
+        [_upstream("p1"), _upstream("p2")],
+        include_health=False,
+        include_metrics=False,
+        include_weights=False,
+    )
+
+    assert result.cooldown("p1").should_skip is True
+    assert result.cooldown("p2").should_skip is False
+
+
+def test_note_failure_refreshes_cooldown(monkeypatch):
+    monkeypatch.setattr(settings, "provider_failure_threshold", 2)
+
+    from app.api.v1.chat.routing_state import CandidateRoutingState
+
+    snapshot = CandidateRoutingState()
+    snapshot.note_failure("p1", 1)
+    assert snapshot.cooldown("p1").should_skip is False
+    snapshot.note_failure("p1", 2)
+    assert snapshot.cooldown("p1").should_skip is True
+    snapshot.note_failure("p1", 0)
+    assert snapshot.cooldown("p1").should_skip is True
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import APIKey, RunEvent, User
+from app.repositories.run_event_repository import append_run_event, list_run_events
+from app.services.chat_history_service import create_assistant, create_conversation, create_user_message
+from app.services.chat_run_service import create_run_record
+from app.services.pubsub_hub import get_pubsub_hub
+from app.services.run_event_bus import iter_run_events, run_event_channel
+from app.services.run_event_writer import RunEventWriter, allocate_run_event_seq
+from app.settings import settings
+from tests.utils import InMemoryRedis
+
+
+def _create_run(db: Session) -> UUID:
+    user = db.execute(select(User).limit(1)).scalars().first()
+    api_key = db.execute(select(APIKey).limit(1)).scalars().first()
+    assert user is not None
+    assert api_key is not None
+    user_id, project_id = UUID(str(user.id)), UUID(str(api_key.id))
+
+    assistant = create_assistant(
+        db,
+        user_id=user_id,
+        project_id=project_id,
+        name="writer-assistant",
+        system_prompt="",
+        default_logical_model="gpt-test",
+        model_preset=None,
+    )
+    conv = create_conversation(
+        db,
+        user_id=user_id,
+        project_id=project_id,
+        assistant_id=UUID(str(assistant.id)),
+        title=None,
+    )
+    msg = create_user_message(db, conversation=conv, content_text="hello")
+    run = create_run_record(
+        db,
+        user_id=user_id,
+        api_key_id=project_id,
+        message_id=UUID(str(msg.id)),
+        requested_logical_model="gpt-test",
+        request_payload={"model": "gpt-test", "messages": [{"role": "user", "content": "hello"}]},
+    )
+    return UUID(str(run.id))
+
+
+def _persisted_seqs(session_factory, run_id: UUID) -> list[int]:
+    with session_factory() as session:
+        return [int(ev.seq) for ev in list_run_events(session, run_id=run_id)]
+
+
+@pytest.mark.asyncio
+async def test_writer_publishes_immediately_and_persists_in_batches(app_with_inmemory_db) -> None:
+    _, SessionLocal = app_with_inmemory_db
+    with SessionLocal() as db:
+        run_id = _create_run(db)
+        append_run_event(db, run_id=run_id, event_type="message.created", payload={})
+
+    redis = InMemoryRedis()
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(run_event_channel(run_id=run_id))
+
+    writer = RunEventWriter(SessionLocal, redis=redis, run_id=run_id, flush_interval_seconds=60, max_batch_size=3)
+    seqs = [await writer.append("message.delta", {"delta": str(i)}) for i in range(4)]
+    await asyncio.sleep(0)
+
+    # 序号从 DB 已有的最大值之后继续分配；发布不等待落库。
+    assert seqs == [2, 3, 4, 5]
+    published = []
+    while (msg := await pubsub.get_message(timeout=0)) is not None:
+        published.append(json.loads(msg["data"])["seq"])
+    assert published == [2, 3, 4, 5]
+
+    # 前 3 条达到批量上限后一次落库，第 4 条仍在缓冲中。
+    assert _persisted_seqs(SessionLocal, run_id) == [1, 2, 3, 4]
+    assert writer.pending == 1
+
+    await writer.aclose()
+    assert _persisted_seqs(SessionLocal, run_id) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_terminal_event_and_timer_flush_pending_events(app_with_inmemory_db) -> None:
+    _, SessionLocal = app_with_inmemory_db
+    with SessionLocal() as db:
+        run_id = _create_run(db)
+
+    writer = RunEventWriter(
+        SessionLocal, redis=InMemoryRedis(), run_id=run_id, flush_interval_seconds=0.01, max_batch_size=100
+    )
+    await writer.append("message.delta", {"delta": "a"})
+    assert _persisted_seqs(SessionLocal, run_id) == []
+    await asyncio.sleep(0.05)
+    assert _persisted_seqs(SessionLocal, run_id) == [1]
+
+    await writer.append("message.delta", {"delta": "b"})
+    await writer.append("message.completed", {"output_text": "ab"})
+    assert writer.pending == 0
+    assert _persisted_seqs(SessionLocal, run_id) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writers_share_the_redis_sequence(app_with_inmemory_db) -> None:
+    _, SessionLocal = app_with_inmemory_db
+    with SessionLocal() as db:
+        run_id = _create_run(db)
+
+    redis = InMemoryRedis()
+    worker = RunEventWriter(SessionLocal, redis=redis, run_id=run_id, flush_interval_seconds=60, max_batch_size=100)
+    await worker.append("message.delta", {"delta": "a"})
+    await worker.append("message.delta", {"delta": "b"})
+
+    # 另一个写入方（例如取消接口）在 worker 落库前追加事件：DB 中还看不到缓冲的序号，但 Redis 计数器可以。
+    with SessionLocal() as db:
+        seq = await allocate_run_event_seq(redis, run_id=run_id, floor=0)
+        append_run_event(db, run_id=run_id, event_type="run.canceled", payload={}, seq=seq)
+
+    await worker.append("message.failed", {})
+    with SessionLocal() as db:
+        rows = db.execute(select(RunEvent).where(RunEvent.run_id == run_id).order_by(RunEvent.seq)).scalars().all()
+    assert [(int(r.seq), r.event_type) for r in rows] == [
+        (1, "message.delta"),
+        (2, "message.delta"),
+        (3, "run.canceled"),
+        (4, "message.failed"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writer_realigns_stale_counter_and_falls_back_without_redis(app_with_inmemory_db) -> None:
+    _, SessionLocal = app_with_inmemory_db
+    with SessionLocal() as db:
+        run_id = _create_run(db)
+        for _ in range(3):
+            append_run_event(db, run_id=run_id, event_type="e", payload={})
+
+    redis = InMemoryRedis()
+    # 计数器落后于 DB（例如曾有单写入方直接按 max+1 落库）。
+    await redis.set(f"run_events:seq:{run_id}", "1")
+    writer = RunEventWriter(SessionLocal, redis=redis, run_id=run_id, flush_interval_seconds=0)
+    assert await writer.append("e", {}) == 4
+
+    offline = RunEventWriter(SessionLocal, redis=None, run_id=run_id, flush_interval_seconds=0)
+    assert await offline.append("e", {}) == 5
+    assert _persisted_seqs(SessionLocal, run_id) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_subscriber_joining_between_publish_and_flush_sees_every_event(app_with_inmemory_db, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "run_event_flush_interval_ms", 300)
+    _, SessionLocal = app_with_inmemory_db
+    with SessionLocal() as db:
+        run_id = _create_run(db)
+
+    redis = InMemoryRedis()
+    writer = RunEventWriter(SessionLocal, redis=redis, run_id=run_id, max_batch_size=100)
+    # 第 1 条已发布但仍在缓冲中：订阅方此时加入，DB 回放和热通道都看不到它。
+    await writer.append("message.delta", {"delta": "a"})
+    await asyncio.sleep(0)
+
+    seen: list[tuple[int, str]] = []
+
+    async def _consume() -> None:
+        with SessionLocal() as db:
+            async for env in iter_run_events(redis, db, run_id=run_id, after_seq=0):
+                seen.append((int(env["seq"]), env["event_type"]))
+                if env["event_type"] == "message.completed":
+                    return
+
+    consumer = asyncio.create_task(_consume())
+    for _ in range(50):
+        if get_pubsub_hub(redis).subscriber_count:
+            break
+        await asyncio.sleep(0.01)
+    assert _persisted_seqs(SessionLocal, run_id) == []
+
+    # 第 2 条经热通道到达时序号跳过了 1：订阅方等待批量落库后从 DB 补齐。
+    await writer.append("message.delta", {"delta": "b"})
+    for _ in range(100):
+        if len(seen) == 2:
+            break
+        await asyncio.sleep(0.01)
+    await writer.append("message.completed", {"output_text": "ab"})
+    await asyncio.wait_for(consumer, 2)
+
+    assert seen == [(1, "message.delta"), (2, "message.delta"), (3, "message.completed")]
+
+
+@pytest.mark.asyncio
+async def test_flush_runs_database_writes_off_the_event_loop(app_with_inmemory_db) -> None:
+    _, SessionLocal = app_with_inmemory_db
+    with SessionLocal() as db:
+        run_id = _create_run(db)
+
+    loop_thread = threading.get_ident()
+    commit_threads: list[int] = []
+
+    def _session_factory():
+        session = SessionLocal()
+        real_commit = session.commit
+
+        def _commit():
+            commit_threads.append(threading.get_ident())
+            real_commit()
+
+        session.commit = _commit
+        return session
+
+    writer = RunEventWriter(
+        _session_factory, redis=InMemoryRedis(), run_id=run_id, flush_interval_seconds=0.01, max_batch_size=100
+    )
+    await writer.append("message.delta", {"delta": "a"})
+    await writer.append("message.completed", {"output_text": "a"})
+    await writer.aclose()
+
+    assert commit_threads
+    assert loop_thread not in commit_threads
+    assert _persisted_seqs(SessionLocal, run_id) == [1, 2]
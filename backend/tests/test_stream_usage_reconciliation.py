@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.v1.chat.request_handler import RequestHandler
+from app.api.v1.chat.stream_usage_tap import StreamUsageTap
+from app.models import CreditTransaction, Provider, ProviderModel, User
+from app.services.credit_service import (
+    get_or_create_account_for_user,
+    reconcile_streaming_usage,
+)
+from app.settings import settings
+
+
+def _feed(tap: StreamUsageTap, chunks: list[bytes]) -> list[bytes]:
+    passed = []
+    for chunk in chunks:
+        tap.feed(chunk)
+        passed.append(chunk)
+    return passed
+
+
+def test_tap_reads_openai_usage_split_across_chunks():
+    body = (
+        b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\n'
+        b'data: {"choices":[],"usage":{"prompt_tokens":12,"completion_tokens":34,"total_tokens":46}}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    chunks = [body[i : i + 7] for i in range(0, len(body), 7)]
+    tap = StreamUsageTap()
+
+    passed = _feed(tap, chunks)
+
+    assert all(a is b for a, b in zip(passed, chunks, strict=True))
+    assert tap.usage() == {"prompt_tokens": 12, "completion_tokens": 34, "total_tokens": 46}
+
+
+def test_tap_merges_claude_message_start_and_delta_usage():
+    tap = StreamUsageTap()
+    _feed(
+        tap,
+        [
+            b'event: message_start\ndata: {"type":"message_start","message":{"usage":{"input_tokens":25,"output_tokens":1}}}\n\n',
+            b'event: content_block_delta\ndata: {"type":"content_block_delta","delta":{"type":"text_delta","text":"x"}}\n\n',
+            b'event: message_delta\ndata: {"type":"message_delta","delta":{},"usage":{"output_tokens":15}}\n\n',
+        ],
+    )
+
+    assert tap.usage() == {"prompt_tokens": 25, "completion_tokens": 15, "total_tokens": 40}
+
+
+def test_tap_counts_output_deltas_without_usage():
+    tap = StreamUsageTap()
+    assert tap.usage() is None
+
+    _feed(tap, [b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'] * 3 + [b"data: [DONE]\n\n"])
+
+    assert tap.usage() == {"completion_tokens": 3, "total_tokens": 3}
+
+
+@pytest.fixture()
+def priced_db(db_session: Session) -> Session:
+    provider = Provider(
+        provider_id="p-stream",
+        name="Provider Stream",
+        base_url="https://p-stream.local",
+        transport="http",
+    )
+    db_session.add(provider)
+    db_session.flush()
+    db_session.add(
+        ProviderModel(
+            provider_id=provider.id,
+            model_id="m-stream",
+            family="test-family",
+            display_name="m-stream",
+            context_length=8192,
+            capabilities=["chat"],
+            pricing={"input": 1.0, "output": 2.0},
+        )
+    )
+    db_session.commit()
+    return db_session
+
+
+def _reconcile(db: Session, user: User, usage: dict[str, int], key: str | None) -> int:
+    return reconcile_streaming_usage(
+        db,
+        user_id=user.id,
+        api_key_id=None,
+        logical_model_name="logical-stream",
+        provider_id="p-stream",
+        provider_model_id="m-stream",
+        usage=usage,
+        precharge_idempotency_key=key,
+    )
+
+
+def test_reconcile_charges_difference_against_precharge(priced_db: Session):
+    user = priced_db.execute(select(User)).scalars().first()
+    account = get_or_create_account_for_user(priced_db, user.id)
+    start_balance = int(account.balance)
+    priced_db.add(
+        CreditTransaction(
+            account_id=account.id,
+            user_id=user.id,
+            amount=-10,
+            reason="stream_estimate",
+            idempotency_key="chat:r1:precharge",
+        )
+    )
+    account.balance = start_balance - 10
+    priced_db.commit()
+
+    usage = {"prompt_tokens": 1000, "completion_tokens": 1000, "total_tokens": 2000}
+    assert _reconcile(priced_db, user, usage, "chat:r1:precharge") == -7
+    assert _reconcile(priced_db, user, usage, "chat:r1:precharge") == 0
+
+    priced_db.refresh(account)
+    assert int(account.balance) == start_balance - 3
+    reconcile_tx = priced_db.execute(
+        select(CreditTransaction).where(
+            CreditTransaction.idempotency_key == "chat:r1:precharge:reconcile"
+        )
+    ).scalar_one()
+    assert reconcile_tx.amount == 7
+    assert reconcile_tx.reason == "stream_reconcile"
+
+
+def test_reconcile_without_precharge_claims_precharge_key(priced_db: Session):
+    user = priced_db.execute(select(User)).scalars().first()
+    usage = {"completion_tokens": 1500, "total_tokens": 1500}
+
+    assert _reconcile(priced_db, user, usage, "chat:r2:precharge") == 3
+    # 重复投递：预扣键已被占用且金额一致，不会再次扣费。
+    assert _reconcile(priced_db, user, usage, "chat:r2:precharge") == 0
+
+    tx = priced_db.execute(
+        select(CreditTransaction).where(CreditTransaction.idempotency_key == "chat:r2:precharge")
+    ).scalar_one()
+    assert (tx.amount, tx.reason, tx.output_tokens) == (-3, "stream_usage", 1500)
+
+
+async def _drain_stream(monkeypatch) -> MagicMock:
+    handler = RequestHandler(
+        api_key=MagicMock(user_id=str(uuid4()), id=str(uuid4()), is_superuser=False),
+        db=MagicMock(),
+        redis=MagicMock(),
+        client=MagicMock(),
+    )
+
+    async def _fake_try_candidates_stream(*, on_first_chunk, outcome, **kwargs):
+        await on_first_chunk("p-stream", "m-stream")
+        outcome.update(provider_id="p-stream", model_id="m-stream", success=True)
+        yield b'data: {"choices":[{"delta":{"content":"a"}}],"usage":{"completion_tokens":9}}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    reconcile = MagicMock()
+    monkeypatch.setattr("app.api.v1.chat.request_handler.try_candidates_stream", _fake_try_candidates_stream)
+    monkeypatch.setattr("app.api.v1.chat.request_handler.record_provider_token_usage", lambda *a, **kw: None)
+    monkeypatch.setattr("app.api.v1.chat.request_handler.record_stream_usage", lambda *a, **kw: None)
+    monkeypatch.setattr("app.api.v1.chat.request_handler.record_stream_usage_reconciliation", reconcile)
+
+    async for _chunk in handler.handle_stream(
+        payload={"model": "x", "stream": True},
+        requested_model="x",
+        lookup_model_id="x",
+        api_style="openai",
+        effective_provider_ids=set(),
+        selection=SimpleNamespace(ordered_candidates=[], base_weights={}),
+        idempotency_key="chat:r3:precharge",
+        log_request=False,
+    ):
+        pass
+    return reconcile
+
+
+@pytest.mark.asyncio
+async def test_stream_not_reconciled_by_default(monkeypatch):
+    # 默认预扣与对账均关闭：流式请求结束后不产生新的扣费。
+    assert settings.enable_streaming_precharge is False
+    assert settings.streaming_usage_reconcile_enabled is False
+
+    reconcile = await _drain_stream(monkeypatch)
+
+    reconcile.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_reconciled_when_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "streaming_usage_reconcile_enabled", True)
+
+    reconcile = await _drain_stream(monkeypatch)
+
+    reconcile.assert_called_once()
+    kwargs = reconcile.call_args.kwargs
+    assert kwargs["usage"]["completion_tokens"] == 9
+    assert kwargs["idempotency_key"] == "chat:r3:precharge"
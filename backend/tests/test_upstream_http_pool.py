@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.http_client import CurlCffiClient
+from app.http_client_pool import (
+    UpstreamHttpClientPool,
+    UpstreamHttpPoolTimeout,
+    get_upstream_http_pool_stats,
+)
+from app.models import User
+from tests.utils import jwt_auth_headers
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        return None
+
+
+@pytest.fixture()
+def local_http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _make_pool(monkeypatch, created: list[tuple]) -> UpstreamHttpClientPool:
+    pool = UpstreamHttpClientPool(
+        max_clients=4,
+        max_connections_per_host=2,
+        idle_seconds=60,
+        acquire_timeout=1.0,
+    )
+
+    def _fake_create_session(key):
+        created.append(key)
+        pool.stats.sessions_created += 1
+        return FakeSession()
+
+    monkeypatch.setattr(pool, "_create_session", _fake_create_session)
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_session_for_same_key(monkeypatch):
+    created: list[tuple] = []
+    pool = _make_pool(monkeypatch, created)
+
+    async with pool.lease(impersonate="chrome120") as first:
+        first_session = first._session
+    async with pool.lease(impersonate="chrome120") as second:
+        second_session = second._session
+
+    assert first_session is second_session
+    assert first_session.closed is False
+    assert len(created) == 1
+    assert pool.stats.leases == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_keys_by_proxy_and_http_version(monkeypatch):
+    created: list[tuple] = []
+    pool = _make_pool(monkeypatch, created)
+
+    async with pool.lease(impersonate="chrome120"):
+        pass
+    async with pool.lease(impersonate="chrome120", proxy="http://proxy.local:3128"):
+        pass
+    async with pool.lease(impersonate="chrome120", http_version="1.1"):
+        pass
+    async with pool.lease(impersonate="chrome120", http_version="http/1.1"):
+        pass
+
+    assert len(created) == 3
+    assert pool.snapshot()["sessions"] == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_evicts_only_idle_sessions(monkeypatch):
+    created: list[tuple] = []
+    pool = _make_pool(monkeypatch, created)
+
+    async with pool.lease(impersonate="chrome120") as idle_client:
+        idle_session = idle_client._session
+
+    async with pool.lease(impersonate="safari15_5") as busy_client:
+        busy_session = busy_client._session
+        evicted = await pool.evict_idle(now=10_000_000.0)
+        assert evicted == 1
+        assert idle_session.closed is True
+        assert busy_session.closed is False
+
+    await pool.aclose()
+    assert busy_session.closed is True
+    assert pool.stats.sessions_evicted == 1
+
+    with pytest.raises(RuntimeError):
+        async with pool.lease():
+            pass
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_keepalive_connection(local_http_server):
+    pool = UpstreamHttpClientPool(
+        max_clients=4,
+        max_connections_per_host=0,
+        idle_seconds=60,
+        acquire_timeout=5.0,
+    )
+    try:
+        for _ in range(2):
+            async with pool.lease(impersonate="chrome120") as client:
+                resp = await client.get(f"{local_http_server}/ok")
+                assert resp.status_code == 200
+    finally:
+        await pool.aclose()
+
+    assert pool.stats.connections_new == 1
+    assert pool.stats.connections_reused >= 1
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_waits_when_handles_exhausted(local_http_server):
+    pool = UpstreamHttpClientPool(
+        max_clients=1,
+        max_connections_per_host=0,
+        idle_seconds=60,
+        acquire_timeout=5.0,
+    )
+
+    async def _call() -> int:
+        async with pool.lease(impersonate="chrome120") as client:
+            resp = await client.get(f"{local_http_server}/slow")
+            return resp.status_code
+
+    try:
+        statuses = await asyncio.gather(_call(), _call())
+    finally:
+        await pool.aclose()
+
+    assert statuses == [200, 200]
+    assert pool.stats.pool_waits >= 1
+    assert pool.stats.pool_timeouts == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_is_bounded(local_http_server):
+    pool = UpstreamHttpClientPool(
+        max_clients=1,
+        max_connections_per_host=0,
+        idle_seconds=60,
+        acquire_timeout=0.05,
+    )
+
+    async def _call() -> int:
+        async with pool.lease(impersonate="chrome120") as client:
+            resp = await client.get(f"{local_http_server}/slow")
+            return resp.status_code
+
+    try:
+        results = await asyncio.gather(_call(), _call(), return_exceptions=True)
+    finally:
+        await pool.aclose()
+
+    timeouts = [r for r in results if isinstance(r, UpstreamHttpPoolTimeout)]
+    assert len(timeouts) == 1
+    assert isinstance(timeouts[0], httpx.TimeoutException)
+    assert pool.stats.pool_timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_sweeper_evicts_without_new_leases(monkeypatch):
+    created: list[tuple] = []
+    pool = _make_pool(monkeypatch, created)
+    pool.idle_seconds = 0
+
+    async with pool.lease(impersonate="chrome120") as client:
+        session = client._session
+
+    pool.start_idle_sweeper(interval_seconds=0.01)
+    for _ in range(50):
+        if session.closed:
+            break
+        await asyncio.sleep(0.01)
+
+    assert session.closed is True
+    assert pool.snapshot()["sessions"] == 0
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_curlcffi_client_does_not_close_external_session():
+    session = FakeSession()
+    async with CurlCffiClient(session=session) as client:
+        assert client._session is session
+    assert session.closed is False
+
+
+def test_upstream_http_pool_metrics_route_requires_superuser(client: TestClient, db_session: Session):
+    user = db_session.query(User).first()
+    assert user is not None
+
+    resp = client.get("/metrics/upstream-http-pool", headers=jwt_auth_headers(str(user.id)))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(body) == set(get_upstream_http_pool_stats())
+
+    user.is_superuser = False
+    db_session.commit()
+    resp = client.get("/metrics/upstream-http-pool", headers=jwt_auth_headers(str(user.id)))
+    assert resp.status_code == 403
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from app import redis_client, worker_loop
+from app.worker_loop import WorkerLoopRunner, run_async
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture()
+def fake_redis_clients(monkeypatch) -> list[_FakeRedis]:
+    created: list[_FakeRedis] = []
+
+    def _create() -> _FakeRedis:
+        client = _FakeRedis()
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(redis_client, "_create_client", _create)
+    return created
+
+
+async def _use_redis() -> tuple[int, int]:
+    return id(asyncio.get_running_loop()), id(redis_client.get_redis_client())
+
+
+def test_run_async_without_worker_loop_closes_per_task_resources(fake_redis_clients) -> None:
+    first = run_async(_use_redis())
+    second = run_async(_use_redis())
+
+    # 未启动常驻 loop：每次一次性 asyncio.run，结束时关闭该 loop 上的 Redis 客户端。
+    assert len(fake_redis_clients) == 2
+    assert all(client.closed for client in fake_redis_clients)
+    assert first[1] != second[1]
+
+
+def test_persistent_loop_reuses_redis_client_across_tasks(monkeypatch, fake_redis_clients) -> None:
+    runner = WorkerLoopRunner(name="test-worker-loop")
+    monkeypatch.setattr(worker_loop, "_worker_loop", runner)
+    runner.start()
+    try:
+        first = run_async(_use_redis())
+        second = run_async(_use_redis())
+        assert first == second
+        assert len(fake_redis_clients) == 1
+        assert not fake_redis_clients[0].closed
+    finally:
+        runner.stop()
+
+    # 进程退出时统一关闭常驻 loop 上的资源。
+    assert not runner.running
+    assert fake_redis_clients[0].closed
+
+
+def test_persistent_loop_propagates_task_exceptions(monkeypatch) -> None:
+    runner = WorkerLoopRunner(name="test-worker-loop-errors")
+    monkeypatch.setattr(worker_loop, "_worker_loop", runner)
+    runner.start()
+
+    async def _boom() -> None:
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError, match="boom"):
+            run_async(_boom())
+        # 单个任务失败不影响 loop 继续服务后续任务。
+        assert run_async(asyncio.sleep(0, result=42)) == 42
+    finally:
+        runner.stop()
+
+
+def test_persistent_loop_cancels_coroutine_after_timeout(monkeypatch) -> None:
+    runner = WorkerLoopRunner(name="test-worker-loop-timeout")
+    monkeypatch.setattr(worker_loop, "_worker_loop", runner)
+    monkeypatch.setattr(worker_loop.settings, "celery_worker_task_timeout_seconds", 0.05)
+    runner.start()
+    cancelled = threading.Event()
+
+    async def _hang() -> None:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    try:
+        with pytest.raises(TimeoutError):
+            run_async(_hang())
+        # 超时后协程在常驻 loop 上被取消，不会继续在后台运行。
+        assert cancelled.wait(1)
+        assert run_async(asyncio.sleep(0, result=42)) == 42
+    finally:
+        runner.stop()
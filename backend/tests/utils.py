@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import fnmatch
 
 from sqlalchemy import create_engine, select
@@ -141,7 +142,9 @@ class InMemoryRedis:
         self._counters: dict[str, int] = {}
         self._zsets: dict[str, dict[str, float]] = {}
         self._lists: dict[str, list[str]] = {}
-        self._pubsub_channels: dict[str, set["asyncio.Queue[str]"]] = {}
+        self._pubsub_channels: dict[str, set[asyncio.Queue[tuple[str, str | None, str, str]]]] = {}
+        self._pubsub_patterns: dict[str, set[asyncio.Queue[tuple[str, str | None, str, str]]]] = {}
+        self.pipeline_executions = 0
 
     async def get(self, key: str):
         if key in self._data:
@@ -171,8 +174,12 @@ class InMemoryRedis:
         return out
 
     async def incr(self, key: str) -> int:
-        current = int(self._counters.get(key, 0))
-        current += 1
+        return await self.incrby(key, 1)
+
+    async def incrby(self, key: str, amount: int) -> int:
+        # 与 Redis 一致：SET 写入的整数字符串也可以被 INCR/INCRBY 继续累加。
+        current = int(self._counters.get(key, self._data.get(key) or 0))
+        current += int(amount)
         self._counters[key] = current
         # Redis 的 INCR 会更新字符串值：这里同步到 _data，便于 get/mget 读取。
         self._data[key] = str(current)
@@ -203,6 +210,10 @@ class InMemoryRedis:
             return None
         return float(val)
 
+    async def zmscore(self, key: str, members: list[str] | tuple[str, ...]):
+        z = self._zsets.get(key, {})
+        return [float(z[m]) if m in z else None for m in members]
+
     async def zincrby(self, key: str, amount: float, member: str) -> float:
         z = self._zsets.setdefault(key, {})
         z[member] = float(z.get(member, 0.0)) + float(amount)
@@ -239,6 +250,14 @@ class InMemoryRedis:
         """使用 fnmatch 实现简单模式匹配。"""
         return [k for k in self._data.keys() if fnmatch.fnmatch(k, pattern)]
 
+    async def scan_iter(self, match: str | None = None, count: int | None = None):
+        _ = count
+        keys = list(self._data.keys()) + list(self._counters.keys())
+        keys += list(self._sets.keys()) + list(self._zsets.keys()) + list(self._lists.keys())
+        for k in dict.fromkeys(keys):
+            if match is None or fnmatch.fnmatch(k, match):
+                yield k
+
     async def delete(self, *keys: str) -> int:
         removed = 0
         for key in keys:
@@ -264,7 +283,11 @@ class InMemoryRedis:
     async def publish(self, channel: str, message: str) -> int:
         import asyncio
 
-        queues = list(self._pubsub_channels.get(str(channel), set()))
+        channel = str(channel)
+        targets = [(q, "message", None) for q in self._pubsub_channels.get(channel, set())]
+        for pattern, pattern_queues in self._pubsub_patterns.items():
+            if fnmatch.fnmatchcase(channel, pattern):
+                targets.extend((q, "pmessage", pattern) for q in pattern_queues)
         delivered = 0
 
         try:
@@ -272,7 +295,8 @@ class InMemoryRedis:
         except RuntimeError:
             current_loop = None
 
-        for q in queues:
+        for q, kind, pattern in targets:
+            item = (kind, pattern, channel, str(message))
             try:
                 # In tests, the ASGI app runs in a different thread/event loop than the test thread.
                 # Use loop.call_soon_threadsafe to safely deliver messages across loops.
@@ -284,11 +308,11 @@ class InMemoryRedis:
                     and current_loop is not None
                     and target_loop is not current_loop
                 ):
-                    target_loop.call_soon_threadsafe(q.put_nowait, str(message))
+                    target_loop.call_soon_threadsafe(q.put_nowait, item)
                     delivered += 1
                     continue
 
-                q.put_nowait(str(message))
+                q.put_nowait(item)
                 delivered += 1
             except asyncio.QueueFull:
                 continue
@@ -297,6 +321,10 @@ class InMemoryRedis:
 
         return delivered
 
+    def pipeline(self, transaction: bool = True):
+        _ = transaction
+        return _InMemoryPipeline(self)
+
     def pubsub(self):
         return _InMemoryPubSub(self)
 
@@ -332,9 +360,10 @@ class InMemoryRedis:
 
     # --- List operations (minimal subset used by context store) ---
 
-    async def lpush(self, key: str, value: str) -> int:
+    async def lpush(self, key: str, *values: str) -> int:
         lst = self._lists.setdefault(key, [])
-        lst.insert(0, str(value))
+        for value in values:
+            lst.insert(0, str(value))
         return len(lst)
 
     async def ltrim(self, key: str, start: int, stop: int) -> bool:
@@ -392,13 +421,70 @@ class InMemoryRedis:
         return list(lst[s : e + 1])
 
 
+def wire_candidate_states(routing_state) -> None:
+    """
+    让 MagicMock(spec=RoutingStateService) 的 load_candidate_states 走逐项回退路径，
+    从而复用测试里对 get_failure_cooldown_status / get_cached_health_status 等方法的 mock。
+    """
+    from unittest.mock import AsyncMock
+
+    from app.api.v1.chat.routing_state import RoutingStateService
+
+    async def _load(
+        upstreams,
+        *,
+        logical_model_id=None,
+        include_cooldown=True,
+        include_health=True,
+        include_metrics=True,
+        include_weights=True,
+    ):
+        provider_ids = list(dict.fromkeys(up.provider_id for up in upstreams))
+        return await RoutingStateService._load_candidate_states_serial(
+            routing_state,
+            upstreams,
+            provider_ids,
+            logical_model_id=logical_model_id,
+            include_cooldown=include_cooldown,
+            include_health=include_health,
+            include_metrics=include_metrics,
+            include_weights=include_weights,
+        )
+
+    routing_state.load_candidate_states = AsyncMock(side_effect=_load)
+
+
+class _InMemoryPipeline:
+    """按顺序缓存命令，execute 时依次执行，模拟 redis-py 非事务 pipeline。"""
+
+    def __init__(self, redis: InMemoryRedis) -> None:
+        self._redis = redis
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not hasattr(self._redis, name):
+            raise AttributeError(name)
+
+        def _queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+
+        return _queue
+
+    async def execute(self):
+        commands, self._commands = self._commands, []
+        self._redis.pipeline_executions += 1
+        return [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
 class _InMemoryPubSub:
     def __init__(self, redis: InMemoryRedis) -> None:
         import asyncio
 
         self._redis = redis
         self._channels: set[str] = set()
-        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._patterns: set[str] = set()
+        self._queue: asyncio.Queue[tuple[str, str | None, str, str]] = asyncio.Queue()
 
     async def subscribe(self, *channels: str) -> None:
         for ch in channels:
@@ -416,8 +502,25 @@ class _InMemoryPubSub:
                 if not queues:
                     self._redis._pubsub_channels.pop(ch, None)
 
+    async def psubscribe(self, *patterns: str) -> None:
+        for pattern in patterns:
+            name = str(pattern)
+            self._patterns.add(name)
+            self._redis._pubsub_patterns.setdefault(name, set()).add(self._queue)
+
+    async def punsubscribe(self, *patterns: str) -> None:
+        targets = [str(p) for p in patterns] if patterns else list(self._patterns)
+        for pattern in targets:
+            self._patterns.discard(pattern)
+            queues = self._redis._pubsub_patterns.get(pattern)
+            if queues is not None:
+                queues.discard(self._queue)
+                if not queues:
+                    self._redis._pubsub_patterns.pop(pattern, None)
+
     async def close(self) -> None:
         await self.unsubscribe()
+        await self.punsubscribe()
 
     async def get_message(
         self, *, ignore_subscribe_messages: bool = True, timeout: float | None = None
@@ -427,14 +530,22 @@ class _InMemoryPubSub:
 
         try:
             if timeout is None:
-                data = await self._queue.get()
+                item = await self._queue.get()
             elif timeout <= 0:
-                data = self._queue.get_nowait()
+                item = self._queue.get_nowait()
             else:
-                data = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
         except (asyncio.QueueEmpty, asyncio.TimeoutError):
             return None
-        return {"type": "message", "data": data}
-
-
-__all__ = ["InMemoryRedis", "auth_headers", "install_inmemory_db", "jwt_auth_headers", "seed_user_and_key"]
+        kind, pattern, channel, data = item
+        return {"type": kind, "pattern": pattern, "channel": channel, "data": data}
+
+
+__all__ = [
+    "InMemoryRedis",
+    "auth_headers",
+    "install_inmemory_db",
+    "jwt_auth_headers",
+    "seed_user_and_key",
+    "wire_candidate_states",
+]